@@ -0,0 +1,178 @@
+"""
+Data server sampling rate benchmark.
+
+Starts data server for every dataset class, requests episode samples the same way environment server does
+at every episode reset, measures samples per second and serialized sample size.
+Every configuration runs in its own process.
+
+Datasets:
+    dataset:        BTgymDataset
+    casual:         BTgymCasualDataDomain
+    multi:          BTgymMultiData of four BTgymCasualDataDomain data lines
+
+Usage:
+    python benchmarks/data_server_throughput.py --datasets dataset casual multi --samples 100
+"""
+import os
+import sys
+import time
+import copy
+import argparse
+
+from collections import OrderedDict
+
+from isolated import run_isolated
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'data')
+DATA_FILENAME = os.path.join(DATA_PATH, 'DAT_ASCII_EURUSD_M1_201703.csv')
+
+DATASETS = ['dataset', 'casual', 'multi']
+
+# Keys identifying configuration and metrics with +1 if higher is better, -1 otherwise, see benchmarks/suite.py:
+CONFIG_KEYS = ('dataset',)
+METRICS = {'samples_per_sec': 1, 'start_seconds': -1}
+
+TRIAL_PARAMS = dict(
+    start_weekdays={0, 1, 2, 3, 4, 5, 6},
+    sample_duration={'days': 10, 'hours': 0, 'minutes': 0},
+    start_00=False,
+    time_gap={'days': 5, 'hours': 0},
+    test_period={'days': 2, 'hours': 0, 'minutes': 0},
+    expanding=True,
+)
+EPISODE_PARAMS = dict(
+    start_weekdays={0, 1, 2, 3, 4, 5, 6},
+    sample_duration={'days': 1, 'hours': 23, 'minutes': 0},
+    start_00=False,
+    time_gap={'days': 1, 'hours': 15},
+)
+
+
+def make_dataset(name):
+    from btgym import BTgymDataset
+    from btgym.datafeed.casual import BTgymCasualDataDomain
+    from btgym.datafeed.multi import BTgymMultiData
+
+    if name == 'dataset':
+        return BTgymDataset(
+            filename=DATA_FILENAME,
+            episode_duration={'days': 0, 'hours': 23, 'minutes': 40},
+            start_00=False,
+            time_gap={'hours': 10},
+        )
+
+    elif name == 'casual':
+        return BTgymCasualDataDomain(
+            filename=DATA_FILENAME,
+            trial_params=TRIAL_PARAMS,
+            episode_params=EPISODE_PARAMS,
+            frozen_time_split={'year': 2017, 'month': 3, 'day': 20},
+        )
+
+    elif name == 'multi':
+        return BTgymMultiData(
+            data_class_ref=BTgymCasualDataDomain,
+            data_config=OrderedDict([(line, {'filename': DATA_FILENAME}) for line in ['USD', 'GBP', 'JPY', 'CHF']]),
+            trial_params=TRIAL_PARAMS,
+            episode_params=EPISODE_PARAMS,
+            frozen_time_split={'year': 2017, 'month': 3, 'day': 20},
+        )
+
+    else:
+        raise ValueError('Unknown dataset: {}'.format(name))
+
+
+def run_trial(name, num_samples, port):
+    """
+    Requests `num_samples` samples from data server.
+
+    Returns:
+        dictionary of results
+    """
+    import zmq
+    from logbook import WARNING
+
+    from btgym import BTgymDataFeedServer, DataSampleConfig
+
+    server = BTgymDataFeedServer(
+        dataset=make_dataset(name),
+        network_address='tcp://127.0.0.1:{}'.format(port),
+        log_level=WARNING,
+    )
+    context = zmq.Context()
+    socket = context.socket(zmq.REQ)
+    socket.setsockopt(zmq.RCVTIMEO, 60 * 1000)
+    socket.setsockopt(zmq.SNDTIMEO, 60 * 1000)
+    socket.connect('tcp://127.0.0.1:{}'.format(port))
+
+    start = time.time()
+    server.start()
+    try:
+        # Data server reads data at startup:
+        socket.send_pyobj({'ctrl': '_get_info'})
+        socket.recv()
+        start_seconds = time.time() - start
+
+        socket.send_pyobj({'ctrl': '_reset_data', 'kwargs': {}})
+        socket.recv()
+
+        sample_bytes = 0
+        start = time.time()
+        for i in range(num_samples):
+            socket.send_pyobj({'ctrl': '_get_data', 'kwargs': copy.deepcopy(DataSampleConfig)})
+            sample_bytes += len(socket.recv())
+        elapsed = time.time() - start
+
+        socket.send_pyobj({'ctrl': '_stop'})
+        socket.recv()
+
+    finally:
+        server.join(timeout=10)
+        if server.is_alive():
+            server.terminate()
+        context.destroy()
+
+    return dict(
+        dataset=name,
+        num_samples=num_samples,
+        start_seconds=start_seconds,
+        samples_per_sec=num_samples / elapsed,
+        sample_kbytes=sample_bytes / num_samples / 1024,
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Data server sampling rate benchmark.')
+    parser.add_argument('--datasets', nargs='+', choices=DATASETS, default=DATASETS)
+    parser.add_argument('--samples', type=int, default=100, help='number of samples to request')
+    parser.add_argument('--port', type=int, default=12500, help='first port to use')
+    args = parser.parse_args(args)
+
+    results = []
+    port = args.port
+    for name in args.datasets:
+        try:
+            result = run_isolated(run_trial, (name, args.samples, port))
+
+        except RuntimeError as e:
+            result = dict(dataset=name, error=str(e))
+
+        # Do not reuse ports possibly left in TIME_WAIT:
+        port += 1
+        results.append(result)
+        if 'error' in result:
+            print('{dataset}: failed with {error}'.format(**result))
+
+        else:
+            print(
+                '{dataset}: samples/s: {samples_per_sec:.1f}, sample size: {sample_kbytes:.1f}KB, '
+                'start: {start_seconds:.3f}s'.format(**result)
+            )
+        sys.stdout.flush()
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Environment throughput benchmark.
+
+Runs single environment for every combination of scenario (environment class and strategy),
+`skip_frame` and `time_dim` values, measures environment steps per second and reset latency.
+Every configuration runs in its own process. `time_dim` only applies to scenarios whose strategy
+takes observation shape as parameter, others always run with strategy class default.
+
+Scenarios:
+    base:               BTgymEnv, BTgymBaseStrategy
+    casual_conv:        BTgymEnv, CasualConvStrategy_0
+    multi_discrete:     MultiDiscreteEnv, CasualConvStrategyMulti
+    portfolio:          PortfolioEnv, CasualConvStrategyMulti
+    pair_spread:        MultiDiscreteEnv, PairSpreadStrategy_0
+
+Multi-asset scenarios use EURUSD data file for every asset data line.
+
+Usage:
+    python benchmarks/env_throughput.py --scenarios base casual_conv --skip-frame 1 10 --time-dim 4 32 --steps 200
+"""
+import os
+import sys
+import time
+import argparse
+
+from collections import OrderedDict
+
+from isolated import run_isolated
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'data')
+DATA_FILENAME = os.path.join(DATA_PATH, 'DAT_ASCII_EURUSD_M1_201703.csv')
+
+SCENARIOS = ['base', 'casual_conv', 'multi_discrete', 'portfolio', 'pair_spread']
+TIME_DIM_SCENARIOS = ['base']
+
+# Keys identifying configuration and metrics with +1 if higher is better, -1 otherwise, see benchmarks/suite.py:
+CONFIG_KEYS = ('scenario', 'skip_frame', 'time_dim')
+METRICS = {'env_steps_per_sec': 1, 'reset_seconds': -1, 'make_seconds': -1}
+
+
+def make_multi_dataset(names):
+    """
+    Returns:
+        BTgymMultiData instance with every data line sourced from same file.
+    """
+    from btgym.datafeed.casual import BTgymCasualDataDomain
+    from btgym.datafeed.multi import BTgymMultiData
+
+    return BTgymMultiData(
+        data_class_ref=BTgymCasualDataDomain,
+        data_config=OrderedDict([(name, {'filename': DATA_FILENAME}) for name in names]),
+        trial_params=dict(
+            start_weekdays={0, 1, 2, 3, 4, 5, 6},
+            sample_duration={'days': 10, 'hours': 0, 'minutes': 0},
+            start_00=False,
+            time_gap={'days': 5, 'hours': 0},
+            test_period={'days': 2, 'hours': 0, 'minutes': 0},
+            expanding=True,
+        ),
+        episode_params=dict(
+            start_weekdays={0, 1, 2, 3, 4, 5, 6},
+            sample_duration={'days': 1, 'hours': 23, 'minutes': 0},
+            start_00=False,
+            time_gap={'days': 1, 'hours': 15},
+        ),
+        frozen_time_split={'year': 2017, 'month': 3, 'day': 20},
+    )
+
+
+def make_env(scenario, skip_frame, time_dim, port):
+    """
+    Returns:
+        environment instance, `time_dim` actually used
+    """
+    import numpy as np
+    import backtrader as bt
+    from gym import spaces
+    from logbook import WARNING
+
+    from btgym import BTgymEnv, MultiDiscreteEnv, PortfolioEnv, BTgymDataset, BTgymBaseStrategy
+
+    env_kwargs = dict(port=port, data_port=port + 1, render_enabled=False, log_level=WARNING)
+    strategy_kwargs = dict(
+        start_cash=2000,
+        commission=0.0001,
+        leverage=10.0,
+        drawdown_call=10,
+        target_call=10,
+        skip_frame=skip_frame,
+    )
+    engine = bt.Cerebro()
+
+    if scenario in ['base', 'casual_conv']:
+        dataset = BTgymDataset(
+            filename=DATA_FILENAME,
+            episode_duration={'days': 0, 'hours': 23, 'minutes': 40},
+            start_00=False,
+            time_gap={'hours': 10},
+        )
+        if scenario == 'base':
+            strategy_class = BTgymBaseStrategy
+            strategy_kwargs['state_shape'] = {
+                'raw': spaces.Box(low=-100, high=100, shape=(time_dim, 4), dtype=np.float32)
+            }
+
+        else:
+            from btgym.research.casual_conv.strategy import CasualConvStrategy_0
+            strategy_class = CasualConvStrategy_0
+            strategy_kwargs['state_ext_scale'] = np.linspace(3e3, 1e3, num=strategy_class.num_features)
+            time_dim = strategy_class.time_dim
+
+        engine.addstrategy(strategy_class, order_size=2000, **strategy_kwargs)
+
+        return BTgymEnv(dataset=dataset, engine=engine, **env_kwargs), time_dim
+
+    elif scenario in ['multi_discrete', 'portfolio']:
+        from btgym.research.casual_conv.strategy import CasualConvStrategyMulti
+
+        names = ['USD', 'GBP', 'JPY', 'CHF']
+        strategy_kwargs.update(
+            cash_name='EUR',
+            state_ext_scale={name: np.linspace(1, 2, num=16) for name in names},
+            cwt_signal_scale=4e3,
+            cwt_lower_bound=4.0,
+            cwt_upper_bound=90.0,
+        )
+        if scenario == 'multi_discrete':
+            env_class = MultiDiscreteEnv
+            strategy_kwargs.update(asset_names={'USD', 'CHF'}, order_size={'USD': 1000, 'CHF': 1000})
+
+        else:
+            env_class = PortfolioEnv
+            strategy_kwargs.update(asset_names=set(names))
+
+        engine.addstrategy(CasualConvStrategyMulti, **strategy_kwargs)
+
+        return env_class(dataset=make_multi_dataset(names), engine=engine, **env_kwargs), \
+            CasualConvStrategyMulti.time_dim
+
+    elif scenario == 'pair_spread':
+        from btgym.research.model_based.strategy import PairSpreadStrategy_0
+
+        engine.addstrategy(PairSpreadStrategy_0, cash_name='EUR', asset_names={'SPREAD'}, **strategy_kwargs)
+
+        return MultiDiscreteEnv(dataset=make_multi_dataset(['X', 'Y']), engine=engine, **env_kwargs), \
+            PairSpreadStrategy_0.time_dim
+
+    else:
+        raise ValueError('Unknown scenario: {}'.format(scenario))
+
+
+def run_trial(scenario, skip_frame, time_dim, num_steps, num_episodes, port):
+    """
+    Runs `num_episodes` episodes of at most `num_steps` random action steps each.
+
+    Returns:
+        dictionary of results
+    """
+    start = time.time()
+    env, time_dim = make_env(scenario, skip_frame, time_dim, port)
+    make_seconds = time.time() - start
+
+    reset_seconds = []
+    step_seconds = 0
+    steps = 0
+    try:
+        for episode in range(num_episodes):
+            start = time.time()
+            env.reset()
+            reset_seconds.append(time.time() - start)
+
+            start = time.time()
+            for i in range(num_steps):
+                _, _, done, _ = env.step(env.action_space.sample())
+                steps += 1
+                if done:
+                    break
+            step_seconds += time.time() - start
+
+    finally:
+        env.close()
+
+    reset_seconds.sort()
+    return dict(
+        scenario=scenario,
+        env=type(env).__name__,
+        strategy=env.engine.strats[0][0][0].__name__,
+        skip_frame=skip_frame,
+        time_dim=time_dim,
+        num_steps=steps,
+        make_seconds=make_seconds,
+        reset_seconds=reset_seconds[len(reset_seconds) // 2],
+        env_steps_per_sec=steps / step_seconds,
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Environment throughput benchmark.')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--skip-frame', type=int, nargs='+', default=[1, 10], help='strategy skip_frame values')
+    parser.add_argument('--time-dim', type=int, nargs='+', default=[4, 128], help='observation time dimension values')
+    parser.add_argument('--steps', type=int, default=200, help='max. number of steps per episode')
+    parser.add_argument('--episodes', type=int, default=5, help='number of episodes')
+    parser.add_argument('--port', type=int, default=12400, help='first port to use')
+    args = parser.parse_args(args)
+
+    results = []
+    port = args.port
+    for scenario in args.scenarios:
+        # Strategies with fixed observation shape run once per skip_frame value:
+        time_dims = args.time_dim if scenario in TIME_DIM_SCENARIOS else [None]
+        for skip_frame in args.skip_frame:
+            for time_dim in time_dims:
+                try:
+                    result = run_isolated(run_trial, (scenario, skip_frame, time_dim, args.steps, args.episodes, port))
+
+                except RuntimeError as e:
+                    result = dict(scenario=scenario, skip_frame=skip_frame, time_dim=time_dim, error=str(e))
+
+                # Do not reuse ports possibly left in TIME_WAIT:
+                port += 2
+                results.append(result)
+                if 'error' in result:
+                    print('{scenario} skip_frame: {skip_frame}, time_dim: {time_dim}: failed with {error}'.format(
+                        **result
+                    ))
+
+                else:
+                    print(
+                        '{scenario} ({env}, {strategy}) skip_frame: {skip_frame}, time_dim: {time_dim}, '
+                        'env steps/s: {env_steps_per_sec:.1f}, reset: {reset_seconds:.3f}s, '
+                        'make: {make_seconds:.3f}s'.format(**result)
+                    )
+                sys.stdout.flush()
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
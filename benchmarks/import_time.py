@@ -0,0 +1,102 @@
+"""
+Import time benchmark.
+
+Imports every given module in fresh interpreter, same way spawned server, data server and renderer processes do,
+measures wall time and lists heavy dependencies pulled in along the way.
+
+Usage:
+    python benchmarks/import_time.py --modules btgym btgym.server btgym.dataserver --repeat 5
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+DEFAULT_MODULES = [
+    'btgym',
+    'btgym.server',
+    'btgym.dataserver',
+    'btgym.rendering',
+    'btgym.envs.base',
+    'btgym.algorithms',
+]
+
+HEAVY_MODULES = ['gym', 'zmq', 'pandas', 'backtrader', 'matplotlib', 'tensorflow']
+
+# Keys identifying configuration and metrics with +1 if higher is better, -1 otherwise, see benchmarks/suite.py:
+CONFIG_KEYS = ('module',)
+METRICS = {'median_seconds': -1}
+
+PROBE = """
+import sys, time, json
+start = time.time()
+import {module}
+elapsed = time.time() - start
+print(json.dumps(dict(seconds=elapsed, loaded=[name for name in {heavy} if name in sys.modules])))
+"""
+
+
+def time_import(module, repeat):
+    """
+    Imports `module` in `repeat` fresh interpreters.
+
+    Returns:
+        dictionary of results
+    """
+    env = dict(os.environ)
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    env['PYTHONPATH'] = os.pathsep.join([root] + [path for path in [env.get('PYTHONPATH')] if path])
+
+    timings = []
+    loaded = []
+    for i in range(repeat):
+        process = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+        )
+        if process.returncode != 0:
+            return dict(module=module, error=process.stderr.decode().strip().split('\n')[-1])
+
+        result = json.loads(process.stdout.decode().strip().split('\n')[-1])
+        timings.append(result['seconds'])
+        loaded = result['loaded']
+
+    timings.sort()
+    return dict(
+        module=module,
+        median_seconds=timings[len(timings) // 2],
+        min_seconds=timings[0],
+        loaded=loaded,
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Import time benchmark.')
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES, help='modules to import')
+    parser.add_argument('--repeat', type=int, default=5, help='number of fresh interpreters per module')
+    args = parser.parse_args(args)
+
+    results = []
+    for module in args.modules:
+        result = time_import(module, args.repeat)
+        results.append(result)
+        if 'error' in result:
+            print('{module}: failed with {error}'.format(**result))
+
+        else:
+            print(
+                '{module}: median {median_seconds:.3f}s, min {min_seconds:.3f}s, loaded: {}'.format(
+                    ', '.join(result['loaded']) or '-', **result
+                )
+            )
+        sys.stdout.flush()
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
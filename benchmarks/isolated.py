@@ -0,0 +1,48 @@
+"""
+Runs benchmark trials in fresh processes.
+"""
+import traceback
+import multiprocessing
+
+
+def _target(connection, function, args):
+    try:
+        connection.send((True, function(*args)))
+
+    except Exception as e:
+        traceback.print_exc()
+        connection.send((False, repr(e)))
+
+    finally:
+        connection.close()
+
+
+def run_isolated(function, args=()):
+    """
+    Calls `function(*args)` in spawned non-daemonic process, so trial can start its own
+    server, data server and tf.train.Server processes and release all of them on exit.
+
+    Returns:
+        function return value
+
+    Raises:
+        RuntimeError if trial failed
+    """
+    context = multiprocessing.get_context('spawn')
+    parent_connection, child_connection = context.Pipe(duplex=False)
+    process = context.Process(target=_target, args=(child_connection, function, args))
+    process.start()
+    child_connection.close()
+    try:
+        ok, result = parent_connection.recv()
+
+    except EOFError:
+        # Died without reporting back:
+        process.join()
+        ok, result = False, 'trial process exited with code {}'.format(process.exitcode)
+
+    process.join()
+    if not ok:
+        raise RuntimeError(result)
+
+    return result
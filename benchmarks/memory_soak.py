@@ -0,0 +1,187 @@
+"""
+Memory soak test.
+
+Runs single headless environment for many episodes of random actions and tracks resident memory usage
+of server and data_server processes as reported by `env.get_stat()`. Memory measured after `--warmup`
+episodes is taken as baseline; test fails if either process grows beyond `--threshold` megabytes from it.
+Runs in its own process; when used as script exits with code 1 on failure.
+
+Pass `--trace` to enable tracemalloc in both server processes: failed report then lists source lines
+with largest allocated memory growth (expect considerably slower episodes).
+
+Usage:
+    python benchmarks/memory_soak.py --episodes 2000 --steps 100 --threshold 50
+    python benchmarks/memory_soak.py --episodes 200 --steps 20 --trace
+"""
+import os
+import sys
+import time
+import argparse
+
+from isolated import run_isolated
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'data')
+DATA_FILENAME = os.path.join(DATA_PATH, 'DAT_ASCII_EURUSD_M1_201703.csv')
+
+PROCESSES = ('server', 'data_server')
+
+# Keys identifying configuration and metrics with +1 if higher is better, -1 otherwise, see benchmarks/suite.py:
+CONFIG_KEYS = ('num_episodes', 'num_steps', 'trace')
+METRICS = {'server_rss_growth': -1, 'data_server_rss_growth': -1}
+
+
+def make_env(port, trace):
+    """
+    Returns:
+        environment instance with rendering disabled.
+    """
+    import numpy as np
+    import backtrader as bt
+    from gym import spaces
+    from logbook import WARNING
+
+    from btgym import BTgymEnv, BTgymDataset, BTgymBaseStrategy
+
+    engine = bt.Cerebro()
+    engine.addstrategy(
+        BTgymBaseStrategy,
+        state_shape={'raw': spaces.Box(low=-100, high=100, shape=(30, 4), dtype=np.float32)},
+        start_cash=2000,
+        commission=0.0001,
+        leverage=10.0,
+        order_size=2000,
+        drawdown_call=10,
+        target_call=10,
+        skip_frame=10,
+    )
+    dataset = BTgymDataset(
+        filename=DATA_FILENAME,
+        episode_duration={'days': 0, 'hours': 23, 'minutes': 40},
+        start_00=False,
+        time_gap={'hours': 10},
+    )
+    return BTgymEnv(
+        dataset=dataset,
+        engine=engine,
+        port=port,
+        data_port=port + 1,
+        render_enabled=False,
+        trace_memory=trace,
+        log_level=WARNING,
+    )
+
+
+def run_trial(num_episodes, num_steps, warmup, interval, trace, port):
+    """
+    Runs `num_episodes` episodes of at most `num_steps` random action steps each,
+    samples memory statistic every `interval` episodes.
+
+    Returns:
+        dictionary of results
+    """
+    env = make_env(port, trace)
+    samples = []
+    last = {}
+    start = time.time()
+    try:
+        for episode in range(1, num_episodes + 1):
+            env.reset()
+            for i in range(num_steps):
+                _, _, done, _ = env.step(env.action_space.sample())
+                if done:
+                    break
+
+            if episode == warmup or episode % interval == 0 or episode == num_episodes:
+                stat = env.get_stat()
+                last = {name: stat['memory' if name == 'server' else 'data_server_memory'] for name in PROCESSES}
+                if episode == warmup:
+                    baseline = {name: last[name]['rss'] for name in PROCESSES}
+
+                samples.append(dict(episode=episode, **{name: last[name]['rss'] for name in PROCESSES}))
+                print(
+                    'episode {}: '.format(episode) +
+                    ', '.join(
+                        '{} rss: {:.1f}MB ({:+.3f}MB/unit)'.format(name, last[name]['rss'], last[name]['rss_growth_rate'])
+                        for name in PROCESSES
+                    )
+                )
+                sys.stdout.flush()
+
+    finally:
+        env.close()
+
+    result = dict(
+        num_episodes=num_episodes,
+        num_steps=num_steps,
+        trace=trace,
+        seconds=time.time() - start,
+        samples=samples,
+    )
+    for name in PROCESSES:
+        result[name + '_rss'] = last[name]['rss']
+        result[name + '_rss_growth'] = last[name]['rss'] - baseline[name]
+        result[name + '_rss_growth_rate'] = last[name]['rss_growth_rate']
+        if trace:
+            result[name + '_top_growth'] = last[name].get('top_growth', [])
+
+    return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Memory soak test.')
+    parser.add_argument('--episodes', type=int, default=2000, help='number of episodes')
+    parser.add_argument('--steps', type=int, default=100, help='max. number of steps per episode')
+    parser.add_argument('--warmup', type=int, default=20, help='number of episodes to run before taking baseline')
+    parser.add_argument('--interval', type=int, default=100, help='sample memory every that many episodes')
+    parser.add_argument('--threshold', type=float, default=50.0, help='max. allowed RSS growth per process, MB')
+    parser.add_argument('--trace', action='store_true', help='enable tracemalloc in server processes')
+    parser.add_argument('--port', type=int, default=12600, help='first port to use')
+    args = parser.parse_args(args)
+
+    warmup = min(args.warmup, args.episodes)
+    try:
+        result = run_isolated(
+            run_trial,
+            (args.episodes, args.steps, warmup, args.interval, args.trace, args.port)
+        )
+
+    except RuntimeError as e:
+        result = dict(num_episodes=args.episodes, num_steps=args.steps, trace=args.trace, error=str(e))
+        print('failed with {}'.format(e))
+        return [result]
+
+    failed = []
+    for name in PROCESSES:
+        print(
+            '{}: rss: {:.1f}MB, growth after warmup: {:+.1f}MB, recent growth rate: {:+.4f}MB/unit'.format(
+                name,
+                result[name + '_rss'],
+                result[name + '_rss_growth'],
+                result[name + '_rss_growth_rate'],
+            )
+        )
+        if result[name + '_rss_growth'] > args.threshold:
+            failed.append(name)
+
+        for entry in result.get(name + '_top_growth', []):
+            print('    {size_growth:+.3f}MB, {count_growth:+d} blocks: {location}'.format(**entry))
+
+    result['threshold'] = args.threshold
+    result['passed'] = not failed
+    print(
+        '{} episodes in {:.1f}s: {}'.format(
+            args.episodes,
+            result['seconds'],
+            'FAILED, memory growth exceeds {}MB: {}'.format(args.threshold, ', '.join(failed)) if failed else 'passed'
+        )
+    )
+    sys.stdout.flush()
+
+    return [result]
+
+
+if __name__ == '__main__':
+    results = main()
+    if not all([result.get('passed', False) for result in results]):
+        sys.exit(1)
@@ -0,0 +1,220 @@
+"""
+Benchmark suite.
+
+Runs chosen benchmarks and writes all results along with run metadata to single JSON file;
+compares two such files to track performance regressions between versions.
+Results are matched by benchmark configuration keys, every metric change is reported relative to baseline,
+change beyond tolerance in the wrong direction counts as regression and makes `compare` exit with code 1.
+
+Benchmarks:
+    import:         benchmarks/import_time.py
+    env:            benchmarks/env_throughput.py
+    data_server:    benchmarks/data_server_throughput.py
+    trainer:        benchmarks/trainer_throughput.py
+    memory:         benchmarks/memory_soak.py
+
+Usage:
+    python benchmarks/suite.py run --benchmarks env data_server --quick --output new.json
+    python benchmarks/suite.py run --benchmarks trainer --args trainer "--num-envs 1 4 --steps 50" --output new.json
+    python benchmarks/suite.py compare baseline.json new.json --tolerance 0.1
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import argparse
+import platform
+import importlib
+import subprocess
+
+from collections import OrderedDict
+
+
+BENCHMARKS = OrderedDict(
+    [
+        ('import', 'import_time'),
+        ('env', 'env_throughput'),
+        ('data_server', 'data_server_throughput'),
+        ('trainer', 'trainer_throughput'),
+        ('memory', 'memory_soak'),
+    ]
+)
+
+# Short runs for smoke-testing and CI:
+QUICK_ARGS = {
+    'import': ['--repeat', '3'],
+    'env': ['--skip-frame', '10', '--steps', '50', '--episodes', '2'],
+    'data_server': ['--samples', '20'],
+    'trainer': ['--num-envs', '1', '--prefetch', '0', '--steps', '20', '--warmup', '2'],
+    'memory': ['--episodes', '50', '--steps', '20', '--warmup', '10', '--interval', '10'],
+}
+
+
+def get_metadata():
+    """
+    Returns:
+        dictionary describing benchmarked version and host.
+    """
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return dict(
+        timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        commit=commit,
+        host=socket.gethostname(),
+        platform=platform.platform(),
+        python=platform.python_version(),
+        argv=sys.argv[1:],
+    )
+
+
+def run(names, quick=False, extra_args=None, output=None):
+    """
+    Runs benchmarks.
+
+    Args:
+        names:          list of benchmark names
+        quick:          bool, use short runs
+        extra_args:     dictionary of {benchmark_name: command line args string}, passed to benchmark
+        output:         JSON filename to write results to or None
+
+    Returns:
+        dictionary of results
+    """
+    report = dict(metadata=get_metadata(), benchmarks=OrderedDict())
+    for name in names:
+        args = list(QUICK_ARGS[name]) if quick else []
+        if extra_args is not None and name in extra_args:
+            args += shlex.split(extra_args[name])
+
+        print('\n{}: {}'.format(name, ' '.join(args)))
+        sys.stdout.flush()
+
+        module = importlib.import_module(BENCHMARKS[name])
+        report['benchmarks'][name] = module.main(args)
+
+        if output is not None:
+            # Keep what is done so far:
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    return report
+
+
+def compare(baseline, current, tolerance=0.1):
+    """
+    Compares two benchmark reports.
+
+    Args:
+        baseline:       dictionary of results to compare against
+        current:        dictionary of results
+        tolerance:      relative metric change to tolerate
+
+    Returns:
+        list of dictionaries, one per metric present in both reports
+    """
+    comparison = []
+    for name, results in current['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+
+        module = importlib.import_module(BENCHMARKS[name])
+        baseline_results = {
+            tuple(result.get(key) for key in module.CONFIG_KEYS): result
+            for result in baseline['benchmarks'][name] if 'error' not in result
+        }
+        for result in results:
+            config = tuple(result.get(key) for key in module.CONFIG_KEYS)
+            if 'error' in result or config not in baseline_results:
+                continue
+
+            for metric, direction in module.METRICS.items():
+                old_value = baseline_results[config].get(metric)
+                new_value = result.get(metric)
+                if old_value is None or new_value is None or old_value == 0:
+                    continue
+
+                # Positive is improvement:
+                change = direction * (new_value - old_value) / abs(old_value)
+                comparison.append(
+                    dict(
+                        benchmark=name,
+                        config=dict(zip(module.CONFIG_KEYS, config)),
+                        metric=metric,
+                        baseline=old_value,
+                        current=new_value,
+                        change=change,
+                        regression=change < -tolerance,
+                    )
+                )
+
+    return comparison
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark suite.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS.keys()), default=list(BENCHMARKS.keys()))
+    run_parser.add_argument('--quick', action='store_true', help='short runs')
+    run_parser.add_argument(
+        '--args',
+        nargs=2,
+        action='append',
+        metavar=('BENCHMARK', 'ARGS'),
+        default=[],
+        help='command line args string to pass to benchmark, can be repeated'
+    )
+    run_parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write results to')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('baseline', help='JSON results file to compare against')
+    compare_parser.add_argument('current', help='JSON results file to compare')
+    compare_parser.add_argument('--tolerance', type=float, default=0.1, help='relative metric change to tolerate')
+
+    args = parser.parse_args(args)
+
+    if args.command == 'run':
+        report = run(args.benchmarks, quick=args.quick, extra_args=dict(args.args), output=args.output)
+        print('\nresults written to: {}'.format(args.output))
+        return report
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    with open(args.current) as f:
+        current = json.load(f)
+
+    print('baseline: {}'.format(baseline['metadata']))
+    print('current: {}\n'.format(current['metadata']))
+
+    comparison = compare(baseline, current, args.tolerance)
+    for entry in comparison:
+        print(
+            '{mark} {benchmark} {config_str} {metric}: {baseline:.4g} -> {current:.4g} ({change:+.1%})'.format(
+                mark='REGRESSION' if entry['regression'] else '          ',
+                config_str=', '.join('{}={}'.format(key, value) for key, value in entry['config'].items()),
+                **entry
+            )
+        )
+    num_regressions = sum([entry['regression'] for entry in comparison])
+    print('\n{} metrics compared, {} regressions.'.format(len(comparison), num_regressions))
+
+    return comparison
+
+
+if __name__ == '__main__':
+    result = main()
+    if isinstance(result, list) and any([entry['regression'] for entry in result]):
+        sys.exit(1)
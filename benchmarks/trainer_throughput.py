@@ -0,0 +1,210 @@
+"""
+Trainer step throughput benchmark.
+
+Runs single-worker training cluster in-process for every combination of number of environments per worker
+and number of prefetched batches, measures trainer steps per second and environment steps per second.
+Every configuration runs on CPU in its own process since tf.train.Server instances can not be shut down.
+Requires TensorFlow 1.x (trainers use tf.contrib); if it is not installed every configuration is reported
+as failed without being started.
+
+Usage:
+    python benchmarks/trainer_throughput.py --trainer a3c unreal --num-envs 1 4 8 --prefetch 0 2 --steps 100
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import importlib.util
+
+from logbook import WARNING
+
+from isolated import run_isolated
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'data')
+
+# Keys identifying configuration and metrics with +1 if higher is better, -1 otherwise, see benchmarks/suite.py:
+CONFIG_KEYS = ('trainer', 'num_envs', 'prefetch_batches')
+METRICS = {'train_steps_per_sec': 1, 'env_steps_per_sec': 1}
+
+
+def run_trial(num_envs, prefetch_batches, num_steps, num_warmup_steps, trainer_name, port):
+    """
+    Sets up training cluster of single parameter server and single worker running `num_envs` environments,
+    times `num_steps` trainer steps after `num_warmup_steps` ones.
+
+    Returns:
+        dictionary of results
+    """
+    # Benchmark runs on CPU:
+    os.environ['CUDA_VISIBLE_DEVICES'] = ''
+
+    import numpy as np
+    import backtrader as bt
+    import tensorflow as tf
+
+    from btgym import BTgymEnv, BTgymDataset
+    from btgym.algorithms import A3C, Unreal
+    from btgym.algorithms.policy import AacStackedRL2Policy
+    from btgym.research.strategy_gen_4 import DevStrat_4_11
+
+    cluster_spec = {
+        'ps': ['127.0.0.1:{}'.format(port)],
+        'worker': ['127.0.0.1:{}'.format(port + 1)],
+    }
+    cluster = tf.train.ClusterSpec(cluster_spec).as_cluster_def()
+    ps_server = tf.train.Server(
+        cluster,
+        job_name='ps',
+        task_index=0,
+        config=tf.ConfigProto(device_filters=['/job:ps'])
+    )
+    worker_server = tf.train.Server(
+        cluster,
+        job_name='worker',
+        task_index=0,
+        config=tf.ConfigProto(intra_op_parallelism_threads=4, inter_op_parallelism_threads=4)
+    )
+    engine = bt.Cerebro()
+    engine.addstrategy(
+        DevStrat_4_11,
+        start_cash=2000,
+        commission=0.0001,
+        leverage=10.0,
+        order_size=2000,
+        drawdown_call=10,
+        target_call=10,
+        skip_frame=10,
+        gamma=0.99,
+        reward_scale=7,
+        state_ext_scale=np.linspace(3e3, 1e3, num=5)
+    )
+    dataset = BTgymDataset(
+        filename=os.path.join(DATA_PATH, 'DAT_ASCII_EURUSD_M1_201703.csv'),
+        episode_duration={'days': 0, 'hours': 23, 'minutes': 40},
+        start_00=False,
+        time_gap={'hours': 10},
+    )
+    env_list = []
+    try:
+        for i in range(num_envs):
+            env_list.append(
+                BTgymEnv(
+                    dataset=dataset,
+                    engine=engine,
+                    port=port + 2 + i,
+                    data_port=port + 2 + num_envs,
+                    data_master=i == 0,
+                    render_enabled=False,
+                    task=0.01 * i,
+                    log_level=WARNING,
+                )
+            )
+        trainer_class = {'a3c': A3C, 'unreal': Unreal}[trainer_name]
+        trainer = trainer_class(
+            env=env_list,
+            task=0,
+            policy_config=dict(
+                class_ref=AacStackedRL2Policy,
+                kwargs={'lstm_layers': (256, 256), 'lstm_2_init_period': 60}
+            ),
+            log_level=WARNING,
+            cluster_spec=cluster_spec,
+            random_seed=0,
+            opt_learn_rate=1e-4,
+            rollout_length=20,
+            time_flat=True,
+            model_summary_freq=10 ** 6,
+            episode_summary_freq=10 ** 6,
+            env_render_freq=10 ** 6,
+            prefetch_batches=prefetch_batches,
+        )
+        with tf.Session(worker_server.target) as sess, sess.as_default():
+            sess.run(tf.global_variables_initializer())
+            summary_writer = tf.summary.FileWriter(tempfile.mkdtemp())
+            trainer.start(sess, summary_writer)
+
+            for i in range(num_warmup_steps):
+                trainer.process(sess)
+
+            start = time.time()
+            for i in range(num_steps):
+                trainer.process(sess)
+            elapsed = time.time() - start
+
+    finally:
+        for env in env_list:
+            env.close()
+
+    return dict(
+        trainer=trainer_name,
+        num_envs=num_envs,
+        prefetch_batches=prefetch_batches,
+        num_steps=num_steps,
+        seconds=elapsed,
+        train_steps_per_sec=num_steps / elapsed,
+        env_steps_per_sec=num_steps * num_envs * trainer.rollout_length / elapsed,
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Trainer step throughput benchmark.')
+    parser.add_argument('--num-envs', type=int, nargs='+', default=[1, 4, 8], help='environments per worker')
+    parser.add_argument('--prefetch', type=int, nargs='+', default=[0, 2], help='number of batches to prefetch')
+    parser.add_argument('--steps', type=int, default=100, help='number of timed train steps')
+    parser.add_argument('--warmup', type=int, default=10, help='number of train steps to skip')
+    parser.add_argument('--trainer', nargs='+', choices=['a3c', 'unreal'], default=['a3c', 'unreal'])
+    parser.add_argument('--port', type=int, default=12300, help='first port to use')
+    args = parser.parse_args(args)
+
+    # Do not spawn trial processes just to see every one of them fail on import:
+    missing = None
+    if importlib.util.find_spec('tensorflow') is None:
+        missing = 'tensorflow is not installed'
+        print('{}, no configuration can run.'.format(missing))
+
+    results = []
+    port = args.port
+    for trainer_name in args.trainer:
+        for num_envs in args.num_envs:
+            for prefetch_batches in args.prefetch:
+                try:
+                    if missing is not None:
+                        raise RuntimeError(missing)
+
+                    result = run_isolated(
+                        run_trial,
+                        (num_envs, prefetch_batches, args.steps, args.warmup, trainer_name, port)
+                    )
+
+                except RuntimeError as e:
+                    result = dict(
+                        trainer=trainer_name,
+                        num_envs=num_envs,
+                        prefetch_batches=prefetch_batches,
+                        error=str(e),
+                    )
+
+                # Do not reuse ports possibly left in TIME_WAIT:
+                port += num_envs + 3
+                results.append(result)
+                if 'error' in result:
+                    print('{trainer} num_envs: {num_envs}, prefetch: {prefetch_batches}: failed with {error}'.format(
+                        **result
+                    ))
+
+                else:
+                    print(
+                        '{trainer} num_envs: {num_envs}, prefetch: {prefetch_batches}, '
+                        'train steps/s: {train_steps_per_sec:.2f}, env steps/s: {env_steps_per_sec:.1f}'.format(
+                            **result
+                        )
+                    )
+                sys.stdout.flush()
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -19,16 +19,30 @@
 
 from gym.envs.registration import register
 
-from .spaces import DictSpace, ActionDictSpace
-from .strategy import BTgymBaseStrategy
-from .server import BTgymServer
-from .datafeed import BTgymDataset, BTgymRandomDataDomain, BTgymSequentialDataDomain
-from .datafeed import DataSampleConfig, EnvResetConfig
-from .dataserver import BTgymDataFeedServer
-from .rendering import BTgymRendering
-from .envs.base import BTgymEnv
-from btgym.envs.multidiscrete import MultiDiscreteEnv
-from btgym.envs.portfolio import PortfolioEnv
+from ._lazy import lazy_attributes
+
+# Spawned server, data server and renderer processes import only what they use:
+__getattr__, __dir__ = lazy_attributes(
+    globals(),
+    {
+        'DictSpace': 'btgym.spaces',
+        'ActionDictSpace': 'btgym.spaces',
+        'BTgymBaseStrategy': 'btgym.strategy',
+        'BTgymServer': 'btgym.server',
+        'BTgymServerPool': 'btgym.server_pool',
+        'BTgymEnvSupervisor': 'btgym.supervisor',
+        'BTgymDataset': 'btgym.datafeed',
+        'BTgymRandomDataDomain': 'btgym.datafeed',
+        'BTgymSequentialDataDomain': 'btgym.datafeed',
+        'DataSampleConfig': 'btgym.datafeed',
+        'EnvResetConfig': 'btgym.datafeed',
+        'BTgymDataFeedServer': 'btgym.dataserver',
+        'BTgymRendering': 'btgym.rendering',
+        'BTgymEnv': 'btgym.envs.base',
+        'MultiDiscreteEnv': 'btgym.envs.multidiscrete',
+        'PortfolioEnv': 'btgym.envs.portfolio',
+    }
+)
 
 register(
     id='backtrader-v0000',
@@ -0,0 +1,61 @@
+###############################################################################
+#
+# Copyright (C) 2017 Andrew Muzikin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import sys
+import importlib
+import importlib.util
+
+
+def lazy_attributes(module_globals, attributes):
+    """
+    Makes module-level `__getattr__()` and `__dir__()` (PEP 562) importing given attributes on first access,
+    so importing package does not pull in heavy dependencies of every its submodule.
+    With Python < 3.7 all attributes are imported at once.
+
+    Args:
+        module_globals:     globals() of package __init__ module
+        attributes:         dictionary of {attribute_name: absolute_module_name}
+
+    Returns:
+        __getattr__, __dir__ functions to set in package namespace
+    """
+    def __getattr__(name):
+        try:
+            value = getattr(importlib.import_module(attributes[name]), name)
+
+        except KeyError:
+            # Not imported yet submodule, as eager package imports used to provide:
+            submodule_name = '{}.{}'.format(module_globals['__name__'], name)
+            if '__path__' not in module_globals or importlib.util.find_spec(submodule_name) is None:
+                raise AttributeError('module {!r} has no attribute {!r}'.format(module_globals['__name__'], name))
+
+            value = importlib.import_module(submodule_name)
+
+        # Next access goes straight to module dict:
+        module_globals[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(module_globals.keys()) | set(attributes.keys()))
+
+    if sys.version_info < (3, 7):
+        for name in attributes.keys():
+            __getattr__(name)
+
+    return __getattr__, __dir__
@@ -17,10 +17,23 @@
 #
 ###############################################################################
 
-from btgym.algorithms.runner.threadrunner import RunnerThread
-from .aac import BaseAAC, Unreal, A3C, PPO
-from .envs import AtariRescale42x42
-from btgym.algorithms.launcher.base import Launcher
-from .policy import BaseAacPolicy, Aac1dPolicy, StackedLstmPolicy, AacStackedRL2Policy
-from .worker import Worker
+from btgym._lazy import lazy_attributes
 
+# Nothing, including tensorflow, is imported until used:
+__getattr__, __dir__ = lazy_attributes(
+    globals(),
+    {
+        'RunnerThread': 'btgym.algorithms.runner.threadrunner',
+        'BaseAAC': 'btgym.algorithms.aac',
+        'Unreal': 'btgym.algorithms.aac',
+        'A3C': 'btgym.algorithms.aac',
+        'PPO': 'btgym.algorithms.aac',
+        'AtariRescale42x42': 'btgym.algorithms.envs',
+        'Launcher': 'btgym.algorithms.launcher.base',
+        'BaseAacPolicy': 'btgym.algorithms.policy',
+        'Aac1dPolicy': 'btgym.algorithms.policy',
+        'StackedLstmPolicy': 'btgym.algorithms.policy',
+        'AacStackedRL2Policy': 'btgym.algorithms.policy',
+        'Worker': 'btgym.algorithms.worker',
+    }
+)
@@ -26,8 +26,9 @@ import tensorflow as tf
 from logbook import Logger, StreamHandler
 
 from btgym.algorithms.memory import Memory
-from btgym.algorithms.rollout import make_data_getter
-from btgym.algorithms.runner import BaseEnvRunnerFn, RunnerThread
+from btgym.algorithms.rollout import make_data_getter, process_rollouts
+from btgym.algorithms.runner import BaseEnvRunnerFn, RunnerThread, BatchRunnerThread, PrefetchThread, SummaryThread
+from btgym.algorithms.runner.synchro import BatchSynchroRunner
 from btgym.algorithms.math_utils import log_uniform
 from btgym.algorithms.nn.losses import value_fn_loss_def, rp_loss_def, pc_loss_def, aac_loss_def, ppo_loss_def
 from btgym.algorithms.utils import feed_dict_rnn_context, feed_dict_from_nested, batch_stack
@@ -85,6 +86,7 @@ class BaseAAC(object):
                  model_summary_freq=100,  # every i`th algorithm iteration
                  test_mode=False,  # gym_atari test mode
                  replay_memory_size=2000,
+                 replay_memory_class_ref=Memory,
                  replay_batch_size=None,
                  replay_rollout_length=None,
                  use_off_policy_aac=False,
@@ -101,6 +103,7 @@ class BaseAAC(object):
                  clip_epsilon=0.1,
                  num_epochs=1,
                  pi_prime_update_period=1,
+                 prefetch_batches=0,
                  global_step_op=None,
                  global_episode_op=None,
                  inc_episode_op=None,
@@ -148,6 +151,7 @@ class BaseAAC(object):
             model_summary_freq:     int, write model summary for every i'th train step
             test_mode:              bool, True: Atari, False: BTGym
             replay_memory_size:     int, in number of experiences
+            replay_memory_class_ref: class, Memory (rebalanced replay) or PrioritizedMemory (sum-tree replay)
             replay_batch_size:      int, mini-batch size for off-policy training, def = 1
             replay_rollout_length:  int off-policy rollout length by def. equals on_policy_rollout_length
             use_off_policy_aac:     bool, use full AAC off-policy loss instead of Value-replay
@@ -164,6 +168,8 @@ class BaseAAC(object):
             clip_epsilon:           scalar, PPO: surrogate L^clip epsilon
             num_epochs:             int, num. of SGD runs for every train step, val. > 1 should be used with caution.
             pi_prime_update_period: int, PPO: pi to pi_old update period in number of train steps, def: 1
+            prefetch_batches:       int, number of train batches to get and process ahead in background thread,
+                                    overlapping data collection and processing with train steps; 0 - no prefetching
             global_step_op:         external tf.variable holding global step counter
             global_episode_op:      external tf.variable holding global episode counter
             inc_episode_op:         external tf.op incrementing global step counter
@@ -314,6 +320,7 @@ class BaseAAC(object):
             self.vr_lambda = log_uniform(vr_lambda, 1)
             self.gamma_pc = gamma_pc
             self.replay_memory_size = replay_memory_size
+            self.replay_memory_class_ref = replay_memory_class_ref
 
             if replay_rollout_length is not None:
                 self.replay_rollout_length = replay_rollout_length
@@ -335,6 +342,11 @@ class BaseAAC(object):
             self.num_epochs = num_epochs
             self.pi_prime_update_period = pi_prime_update_period
 
+            # Pipelined training:
+            self.prefetch_batches = prefetch_batches
+            self.prefetch_thread = None
+            self.summary_thread = None
+
             # On/off switchers for off-policy training and auxiliary tasks:
             self.use_off_policy_aac = use_off_policy_aac
             self.use_reward_prediction = use_reward_prediction
@@ -348,6 +360,10 @@ class BaseAAC(object):
             self.use_local_memory = _use_local_memory
             self.use_memory = (self.use_any_aux_tasks or self.use_off_policy_aac) and not self.use_local_memory
 
+            # Prioritized replay memory gets priorities of sampled sequences updated with reward prediction errors:
+            self.use_priority_update = self.use_memory and self.use_reward_prediction and \
+                hasattr(self.replay_memory_class_ref, 'update_priorities')
+
             self.use_target_policy = _use_target_policy
             self.use_global_network = _use_global_network
 
@@ -400,6 +416,9 @@ class BaseAAC(object):
             self.grads = None
             self.summary_writer = None
             self.local_steps = 0
+            # Step counters values as fetched along with last train step:
+            self.last_global_step = None
+            self.last_global_episode = None
 
             # Start building graphs:
             self.log.debug('started building graphs...')
@@ -472,7 +491,7 @@ class BaseAAC(object):
                     self.runners = self._make_runners(policy=pi)
 
                     # Make rollouts provider[s] for async runners:
-                    if self.runner_config['class_ref'] == RunnerThread:
+                    if issubclass(self.runner_config['class_ref'], RunnerThread):
                         # Make rollouts provider[s] for async threaded runners:
                         self.data_getter = [make_data_getter(runner.queue) for runner in self.runners]
                     else:
@@ -597,6 +616,12 @@ class BaseAAC(object):
                 loss = loss + self.rp_lambda * rp_loss
                 model_summaries += rp_summaries
 
+                # Per-sample reward prediction error, used to update replay memory priorities:
+                pi.rp_sample_loss = tf.nn.softmax_cross_entropy_with_logits_v2(
+                    labels=pi.rp_target,
+                    logits=pi.rp_logits
+                )
+
         return loss, model_summaries
 
     def _make_train_op(self, pi, pi_prime, pi_global):
@@ -750,7 +775,7 @@ class BaseAAC(object):
         # Replay memory_config:
         if self.use_memory:
             memory_config = dict(
-                class_ref=Memory,
+                class_ref=self.replay_memory_class_ref,
                 kwargs=dict(
                     history_size=self.replay_memory_size,
                     max_sample_size=self.replay_rollout_length,
@@ -769,7 +794,14 @@ class BaseAAC(object):
         # we run the policy before we get full rollout, run train step and update the parameters.
         runners = []
         task = 0  # Runners will have [worker_task][env_count] id's
-        for env in self.env_list:
+        if issubclass(self.runner_config['class_ref'], (BatchRunnerThread, BatchSynchroRunner)):
+            # Single runner drives all environments:
+            env_list = [self.env_list]
+
+        else:
+            env_list = self.env_list
+
+        for env in env_list:
             kwargs=dict(
                 env=env,
                 policy=policy,
@@ -890,14 +922,45 @@ class BaseAAC(object):
     def get_data(self, **kwargs):
         """
         Collect rollouts from every environment.
+        Thread-runners with environment being recovered after failure are skipped, unless all of them are.
 
         Returns:
             dictionary of lists of data streams collected from every runner
         """
-        data_streams = [get_it(**kwargs) for get_it in self.data_getter]
+        data_getter = [
+            get_it for runner, get_it in zip(self.runners, self.data_getter) if self._runner_is_healthy(runner)
+        ]
+        if len(data_getter) == 0:
+            data_getter = self.data_getter
+
+        elif len(data_getter) < len(self.data_getter):
+            self.log.info('skipping {} failed runner(s).'.format(len(self.data_getter) - len(data_getter)))
+
+        data_streams = []
+        for get_it in data_getter:
+            data = get_it(**kwargs)
+            if isinstance(data, list):
+                # Batched runner provides data from several environments at once:
+                data_streams += data
+
+            else:
+                data_streams.append(data)
 
         return {key: [stream[key] for stream in data_streams] for key in data_streams[0].keys()}
 
+    @staticmethod
+    def _runner_is_healthy(runner):
+        """
+        Returns:
+            False if any of thread-runner environments has failed and is not recovered yet.
+        """
+        if not hasattr(runner, 'queue'):
+            # In-thread runners can't be skipped:
+            return True
+
+        env_list = runner.env if isinstance(runner.env, list) else [runner.env]
+        return all([getattr(env, 'is_healthy', True) for env in env_list])
+
     def get_sample_config(self, _new_trial=True, **kwargs):
         """
         WARNING: _new_trial=True is quick fix, TODO: fix it properly!
@@ -972,6 +1035,21 @@ class BaseAAC(object):
             # Start thread_runners:
             self._start_runners(sess, summary_writer, **kwargs)
 
+            if self.prefetch_batches > 0:
+                # Start preparing train batches in background:
+                self.prefetch_thread = PrefetchThread(
+                    batch_fn=self._get_train_batch,
+                    queue_size=self.prefetch_batches,
+                    task=self.task,
+                    log_level=self.log_level,
+                )
+                self.prefetch_thread.start_prefetch(sess)
+
+            if self.summary_writer is not None:
+                # Write summaries in background:
+                self.summary_thread = SummaryThread(task=self.task, log_level=self.log_level)
+                self.summary_thread.start_writing(sess, self.summary_writer)
+
         except Exception as e:
             msg = 'start() exception occurred' + \
                 '\n\nPress `Ctrl-C` or jupyter:[Kernel]->[Interrupt] for clean exit.\n'
@@ -1066,15 +1144,14 @@ class BaseAAC(object):
             single batch data
 
         """
-        batch = batch_stack(
-            [
-                r.process(
-                    gamma=self.model_gamma,
-                    gae_lambda=self.model_gae_lambda,
-                    size=self.rollout_length,
-                    time_flat=self.time_flat,
-                ) for r in rollouts
-            ]
+        # Returns and advantages are computed for all rollouts at once,
+        # rollouts get padded while stacked, saving intermediate copies:
+        batch = process_rollouts(
+            rollouts,
+            gamma=self.model_gamma,
+            gae_lambda=self.model_gae_lambda,
+            size=self.rollout_length,
+            time_flat=self.time_flat,
         )
         return batch
 
@@ -1221,9 +1298,57 @@ class BaseAAC(object):
 
         return self._get_main_feeder(sess, on_policy_batch, off_policy_batch, rp_batch, is_train, pi, pi_prime)
 
+    @staticmethod
+    def _average_stats(stats):
+        """
+        Averages episode statistics collected by env runners.
+
+        Args:
+            stats:  list of dictionaries of episode statistics or None's
+
+        Returns:
+            dictionary of averaged values or None if there is no statistics
+        """
+        stats = [stat for stat in stats if stat is not None]
+        if len(stats) == 0:
+            return None
+
+        keys = []
+        for stat in stats:
+            keys += [key for key in stat.keys() if key not in keys]
+
+        return {key: np.mean(np.asarray([stat[key] for stat in stats if key in stat]), axis=0) for key in keys}
+
+    def _write_summary(self, sess, step, summary=None, fetches=None, feed_dict=None):
+        """
+        Passes summary to background writer if it runs, evaluates and writes it at once otherwise.
+
+        Args:
+            sess:           tf session obj.
+            step:           int, global step or episode number to write summary at
+            summary:        tf.Summary or its serialized string
+            fetches:        summary op to evaluate if `summary` is None
+            feed_dict:      feed dictionary for `fetches`
+        """
+        if self.summary_thread is not None:
+            if feed_dict is not None:
+                # Arrays can be views of buffers reused meanwhile, e.g. rendered images of matplotlib canvas:
+                feed_dict = {
+                    key: value.copy() if isinstance(value, np.ndarray) else value for key, value in feed_dict.items()
+                }
+            self.summary_thread.add(step, summary=summary, fetches=fetches, feed_dict=feed_dict)
+
+        else:
+            if summary is None:
+                summary = sess.run(fetches, feed_dict)
+
+            self.summary_writer.add_summary(summary, step)
+
     def process_summary(self, sess, data, model_data=None, step=None, episode=None):
         """
         Fetches and writes summary data from `data` and `model_data`.
+        Summary ops evaluation and writing take place in background thread once trainer has been started.
+
         Args:
             sess:               tf summary obj.
             data(dict):         thread_runner rollouts and metadata
@@ -1232,89 +1357,110 @@ class BaseAAC(object):
             episode:            int, global episode number or None
         """
         if step is None:
-            step = sess.run(self.global_step)
+            step = self.last_global_step
 
         if episode is None:
-            episode = sess.run(self.global_episode)
-        # Every worker writes train episode summaries:
-        ep_summary_feeder = {}
-
-        # Look for train episode summaries from all env runners:
-
-        # self.log.warning('data+ep_summary: {}'.format( data['ep_summary']))
-
-        for stat in data['ep_summary']:
-            if stat is not None:
-                for key in stat.keys():
-                    if key in ep_summary_feeder.keys():
-                        ep_summary_feeder[key] += [stat[key]]
-                    else:
-                        ep_summary_feeder[key] = [stat[key]]
-
-        # Average values among thread_runners, if any, and write episode summary:
-
-        # self.log.warning('ep_summary_feeder: {}'.format(ep_summary_feeder))
-
-        if ep_summary_feeder != {}:
-            ep_summary_feed_dict = {
-                self.ep_summary[key]: np.average(list) for key, list in ep_summary_feeder.items()
-            }
-
+            episode = self.last_global_episode
+
+        if step is None or episode is None:
+            # No counters fetched with train step yet:
+            fetched_step, fetched_episode = sess.run([self.global_step, self.global_episode])
+            step = fetched_step if step is None else step
+            episode = fetched_episode if episode is None else episode
+
+        # Every worker writes train episode summaries,
+        # average values among thread_runners, if any:
+        ep_stat = self._average_stats(data['ep_summary'])
+        if ep_stat is not None:
             if self.test_mode:
                 # Atari:
-                fetched_episode_stat = sess.run(self.ep_summary['atari_stat_op'], ep_summary_feed_dict)
+                stat_op = self.ep_summary['atari_stat_op']
 
             else:
                 # BTGym
-                fetched_episode_stat = sess.run(self.ep_summary['btgym_stat_op'], ep_summary_feed_dict)
+                stat_op = self.ep_summary['btgym_stat_op']
 
-            self.summary_writer.add_summary(fetched_episode_stat, episode)
-            # self.summary_writer.flush()
+            self._write_summary(
+                sess,
+                episode,
+                fetches=stat_op,
+                feed_dict={self.ep_summary[key]: value for key, value in ep_stat.items()}
+            )
 
         # Every worker writes test episode  summaries:
-        test_ep_summary_feeder = {}
+        test_ep_stat = self._average_stats(data['test_ep_summary'])
+        if test_ep_stat is not None:
+            self._write_summary(
+                sess,
+                episode,
+                fetches=self.ep_summary['test_btgym_stat_op'],
+                feed_dict={self.ep_summary[key]: value for key, value in test_ep_stat.items()}
+            )
 
-        # Look for test episode summaries:
+        # Look for renderings (chief worker only, always 0-numbered environment in a list):
+        if self.task == 0:
+            if data['render_summary'][0] is not None:
+                render_feed_dict = {
+                    self.ep_summary[key]: pic for key, pic in data['render_summary'][0].items()
+                }
+                self._write_summary(sess, episode, fetches=self.ep_summary['render_op'], feed_dict=render_feed_dict)
 
-        # self.log.warning('data+test_ep_summary: {}'.format(data['test_ep_summary']))
+        # Every worker writes model summaries:
+        if model_data is not None:
+            self._write_summary(sess, step, summary=model_data)
 
-        for stat in data['test_ep_summary']:
-            if stat is not None:
-                for key in stat.keys():
-                    if key in test_ep_summary_feeder.keys():
-                        test_ep_summary_feeder[key] += [stat[key]]
-                    else:
-                        test_ep_summary_feeder[key] = [stat[key]]
+        if self.summary_thread is None:
+            self.summary_writer.flush()
 
-        # Average values among thread_runners, if any, and write episode summary:
+    def _get_train_batch(self, sess):
+        """
+        Collects data from thread runners and, if it is train data, composes train step feed dictionary.
+        Either called by train step itself or runs in background thread, see `prefetch_batches` arg.
+        Note that data processing should not rely on current policy parameters when run in background.
 
-        # self.log.warning('test_ep_summary_feeder: {}'.format(test_ep_summary_feeder))
+        Args:
+            sess (tensorflow.Session):   tf session obj.
 
-        if test_ep_summary_feeder != {}:
-            test_ep_summary_feed_dict = {
-                self.ep_summary[key]: np.average(list) for key, list in test_ep_summary_feeder.items()
-            }
-            fetched_test_episode_stat = sess.run(self.ep_summary['test_btgym_stat_op'], test_ep_summary_feed_dict)
-            self.summary_writer.add_summary(fetched_test_episode_stat, episode)
+        Returns:
+            tuple of (data dictionary, is_train flag, feed dictionary or None for test data)
+        """
+        data = self.get_data()
 
-        # Look for renderings (chief worker only, always 0-numbered environment in a list):
-        if self.task == 0:
-            if data['render_summary'][0] is not None:
+        # Test or train: if at least one on-policy rollout from parallel runners is test one -
+        # set learn rate to zero for entire minibatch. Doh.
+        try:
+            is_train = not np.asarray([env['state']['metadata']['type'] for env in data['on_policy']]).any()
 
-                #self.log.warning('data[render_summary]: {}'.format(data['render_summary']))
-                #self.log.warning('self.ep_summary: {}'.format(self.ep_summary))
+        except KeyError:
+            is_train = True
 
-                render_feed_dict = {
-                    self.ep_summary[key]: pic for key, pic in data['render_summary'][0].items()
-                }
-                renderings = sess.run(self.ep_summary['render_op'], render_feed_dict)
-                self.summary_writer.add_summary(renderings, episode)
-                self.summary_writer.flush()
+        self.log.debug(
+            'Got rollout episode. type: {}, trial_type: {}, is_train: {}'.format(
+                np.asarray([env['state']['metadata']['type'] for env in data['on_policy']]).any(),
+                np.asarray([env['state']['metadata']['trial_type'] for env in data['on_policy']]).any(),
+                is_train
+            )
+        )
+        if is_train:
+            feed_dict = self.process_data(sess, data, is_train, self.local_network, self.local_network_prime)
 
-        # Every worker writes train episode summaries:
-        if model_data is not None:
-            self.summary_writer.add_summary(tf.Summary.FromString(model_data), step)
-        self.summary_writer.flush()
+        else:
+            feed_dict = None
+
+        return data, is_train, feed_dict
+
+    @staticmethod
+    def _update_priorities(rollouts, priorities):
+        """
+        Sets priorities of replay memory sequences sampled with `sample_priority()`.
+
+        Args:
+            rollouts:       list of sampled rollouts, as in `off_policy_rp` data stream
+            priorities:     array of new priority values, one per rollout
+        """
+        for rollout, priority in zip(rollouts, priorities):
+            if getattr(rollout, 'memory_index', None) is not None:
+                rollout.memory.update_priorities(rollout.memory_index, priority)
 
     def process(self, sess, **kwargs):
         """
@@ -1344,34 +1490,21 @@ class BaseAAC(object):
         # Quick wrap to get direct traceback from this trainer if something goes wrong:
         try:
             # Collect data from child thread runners:
-            data = self.get_data()
+            if self.prefetch_thread is not None:
+                # Already processed in background:
+                data, is_train, feed_dict = self.prefetch_thread.get()
+
+            else:
+                data, is_train, feed_dict = self._get_train_batch(sess)
 
             # Copy weights from local policy to local target policy:
             if self.use_target_policy and self.local_steps % self.pi_prime_update_period == 0:
                 sess.run(self.sync_pi_prime)
 
-            # Test or train: if at least one on-policy rollout from parallel runners is test one -
-            # set learn rate to zero for entire minibatch. Doh.
-            try:
-                is_train = not np.asarray([env['state']['metadata']['type'] for env in data['on_policy']]).any()
-
-            except KeyError:
-                is_train = True
-
-            self.log.debug(
-                'Got rollout episode. type: {}, trial_type: {}, is_train: {}'.format(
-                    np.asarray([env['state']['metadata']['type'] for env in data['on_policy']]).any(),
-                    np.asarray([env['state']['metadata']['trial_type'] for env in data['on_policy']]).any(),
-                    is_train
-                )
-            )
-
             if is_train:
                 # If there is no any test rollouts  - do a train step:
                 sess.run(self.sync_pi)  # only sync at train time
 
-                feed_dict = self.process_data(sess, data, is_train, self.local_network, self.local_network_prime)
-
                 # Say `No` to redundant summaries:
                 wirte_model_summary =\
                     self.local_steps % self.model_summary_freq == 0
@@ -1379,10 +1512,14 @@ class BaseAAC(object):
                 #fetches = [self.train_op, self.local_network.debug]  # include policy debug shapes
                 fetches = [self.train_op]
 
+                # Step counters are fetched along with train op to save extra session calls for summaries:
                 if wirte_model_summary:
-                    fetches_last = fetches + [self.model_summary_op, self.inc_step]
+                    fetches_last = fetches + [self.model_summary_op, self.inc_step, self.global_episode]
                 else:
-                    fetches_last = fetches + [self.inc_step]
+                    fetches_last = fetches + [self.inc_step, self.global_episode]
+
+                if self.use_priority_update:
+                    fetches_last = [self.local_network.rp_sample_loss] + fetches_last
 
                 # Do a number of SGD train epochs:
                 # When doing more than one epoch, we actually use only last summary:
@@ -1390,13 +1527,17 @@ class BaseAAC(object):
                     fetched = sess.run(fetches, feed_dict=feed_dict)
 
                 fetched = sess.run(fetches_last, feed_dict=feed_dict)
+                self.last_global_step, self.last_global_episode = fetched[-2:]
 
                 if wirte_model_summary:
-                    model_summary = fetched[-2]
+                    model_summary = fetched[-3]
 
                 else:
                     model_summary = None
 
+                if self.use_priority_update:
+                    self._update_priorities(data['off_policy_rp'], fetched[0])
+
                 self.local_steps += 1  # only update on train steps
 
             else:
@@ -1476,6 +1617,7 @@ class Unreal(BaseAAC):
             model_summary_freq:     int, write model summary for every i'th train step
             test_mode:              bool, True: Atari, False: BTGym
             replay_memory_size:     int, in number of experiences
+            replay_memory_class_ref: class, Memory (rebalanced replay) or PrioritizedMemory (sum-tree replay)
             replay_batch_size:      int, mini-batch size for off-policy training, def = 1
             replay_rollout_length:  int off-policy rollout length by def. equals on_policy_rollout_length
             use_off_policy_aac:     bool, use full AAC off-policy loss instead of Value-replay
@@ -1492,6 +1634,8 @@ class Unreal(BaseAAC):
             clip_epsilon:           scalar, PPO: surrogate L^clip epsilon
             num_epochs:             int, num. of SGD runs for every train step, val. > 1 should be used with caution.
             pi_prime_update_period: int, PPO: pi to pi_old update period in number of train steps, def: 1
+            prefetch_batches:       int, number of train batches to get and process ahead in background thread,
+                                    overlapping data collection and processing with train steps; 0 - no prefetching
             _use_target_policy:     bool, PPO: use target policy (aka pi_old), delayed by `pi_prime_update_period` delay
 
         Note:
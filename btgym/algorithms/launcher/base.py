@@ -27,14 +27,20 @@ from logbook import Logger, StreamHandler, WARNING, NOTICE, INFO, DEBUG
 import time
 import psutil
 import glob
+import shutil
 from subprocess import PIPE
 import signal
 import numpy as np
 import copy
+import zmq
+
+import tensorflow as tf
 
 from btgym.algorithms.worker import Worker
 from btgym.algorithms.aac import A3C
 from btgym.algorithms.policy import BaseAacPolicy
+from btgym.dataserver import BTgymDataFeedServer
+from btgym.supervisor import BTgymProcessWatchdog, release_heartbeat_address
 
 import sys
 sys.path.insert(0,'..')
@@ -58,6 +64,7 @@ class Launcher():
                  test_mode=False,
                  purge_previous=1,
                  render_last_env=True,
+                 shared_data_server=True,
                  log_level=None,
 
                  verbose=0):
@@ -78,6 +85,10 @@ class Launcher():
             render_last_env:            bool, if True and there is more than one environment specified for each worker,
                                         only allows rendering for last environment in a list;
                                         allows rendering for all environments of a chief worker otherwise;
+            shared_data_server (bool):  if True - launcher starts single data_server before any worker and all
+                                        environments on this host connect to it as data slaves; launcher
+                                        restarts it if it exits or hangs; if False - first environment
+                                        of chief worker launches and owns data_server.
             verbose (int):              verbosity mode, {0 - WARNING, 1 - INFO, 2 - DEBUG}.
             log_level (int):            logbook level {DEBUG=10, INFO=11, NOTICE=12, WARNING=13},
                                         overrides `verbose` arg.
@@ -133,6 +144,10 @@ class Launcher():
         self.verbose = verbose
         self.save_secs = save_secs
         self.render_last_env = render_last_env
+        self.shared_data_server = shared_data_server and not test_mode
+        self.dataset = None
+        self.data_server = None
+        self.data_server_watchdog = None
 
         if max_env_steps is not None:
             self.max_env_steps = max_env_steps
@@ -199,6 +214,8 @@ class Launcher():
 
         # Configure workers:
         self.workers_config_list = self._make_workers_spec()
+        if self.shared_data_server:
+            self._make_data_slaves()
 
         # Ensure data_server port is clear:
         self.clear_port(self.env_config['kwargs']['data_port'])
@@ -268,6 +285,90 @@ class Launcher():
 
         return workers_config_list
 
+    def _make_data_slaves(self):
+        """
+        Takes dataset away from data_master environment configuration and makes every environment data slave
+        of shared data_server.
+        """
+        for worker_config in self.workers_config_list:
+            if worker_config['job_name'] in 'worker':
+                env_kwargs = worker_config['env_config']['kwargs']
+                dataset = env_kwargs.pop('dataset', None)
+                if dataset is not None:
+                    self.dataset = dataset
+                env_kwargs['data_master'] = False
+
+        assert self.dataset is not None, 'Dataset instance should be provided to use shared data_server.'
+
+    def _start_data_server(self, timeout=60):
+        """
+        Starts shared data_server process and gets dataset ready to provide data.
+
+        Args:
+            timeout:    seconds to wait for data_server to respond
+        """
+        env_kwargs = self.env_config['kwargs']
+        data_port = env_kwargs['data_port']
+        network_address = env_kwargs.get('data_network_address', 'tcp://127.0.0.1:') + str(data_port)
+        self.clear_port(data_port)
+        self.data_server = BTgymDataFeedServer(
+            dataset=self.dataset,
+            network_address=network_address,
+            log_level=self.log_level,
+            task='shared',
+            trace_memory=env_kwargs.get('trace_memory', False),
+        )
+        self.data_server.daemon = False
+        self.data_server.start()
+
+        # REQ socket holds request until server binds, load dataset and reset it:
+        context = zmq.Context()
+        socket = context.socket(zmq.REQ)
+        socket.setsockopt(zmq.RCVTIMEO, timeout * 1000)
+        socket.setsockopt(zmq.SNDTIMEO, timeout * 1000)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.connect(network_address)
+        try:
+            for message in [{'ctrl': '_reset_data', 'kwargs': {}}, {'ctrl': '_get_info'}]:
+                socket.send_pyobj(message)
+                response = socket.recv_pyobj()
+
+        except zmq.ZMQError as e:
+            self._stop_data_server()
+            raise ConnectionError('Shared data_server @{} unreachable: {}'.format(network_address, e))
+
+        finally:
+            context.destroy()
+
+        if not response['dataset_is_ready']:
+            self._stop_data_server()
+            raise ConnectionError('Shared data_server @{} failed to reset dataset.'.format(network_address))
+
+        self.log.notice('shared data_server started @{}, PID: {}'.format(network_address, response['pid']))
+
+    def _stop_data_server(self):
+        """
+        Stops shared data_server process, if any.
+        """
+        if self.data_server is not None:
+            self.data_server.terminate()
+            self.data_server.join(timeout=1)
+            if self.data_server.is_alive():
+                # E.g. stopped process does not handle SIGTERM:
+                os.kill(self.data_server.pid, signal.SIGKILL)
+                self.data_server.join()
+
+            release_heartbeat_address(self.data_server.pid)
+            self.log.notice('shared data_server stopped.')
+            self.data_server = None
+
+    def _restart_data_server(self):
+        """
+        Replaces failed shared data_server with new one; data slave environments recover by reconnecting.
+        """
+        self._stop_data_server()
+        self._start_data_server()
+
     def _make_cluster_spec(self, config):
         """
         Composes cluster specification dictionary.
@@ -355,6 +456,17 @@ class Launcher():
             stop_worker([chief_worker])
             stop_worker(p_servers_list)
 
+        # Load data once for all workers:
+        if self.shared_data_server:
+            self._start_data_server()
+            self.data_server_watchdog = BTgymProcessWatchdog(
+                get_process=lambda: self.data_server,
+                restart=self._restart_data_server,
+                log_level=self.log_level,
+                name='shared data_server',
+            )
+            self.data_server_watchdog.start()
+
         # Start workers:
         for worker_config in self.workers_config_list:
             # Make:
@@ -365,8 +477,9 @@ class Launcher():
 
             if worker.job_name in 'worker':
                 # Allow data-master to launch datafeed_server:
-                if worker_config['env_config']['kwargs']['data_master']:
-                    time.sleep(5)
+                if worker.task == 0:
+                    if worker_config['env_config']['kwargs']['data_master']:
+                        time.sleep(5)
                     chief_worker = worker
 
                 else:
@@ -399,35 +512,76 @@ class Launcher():
             ps.join()
             self.log.notice('parameter_server_{} has joined.'.format(ps.task))
 
+        if self.data_server_watchdog is not None:
+            self.data_server_watchdog.stop()
+
+        self._stop_data_server()
+
         # TODO: close tensorboard
         # TODO: maybe export TB summaries accumulators links
 
         self.log.notice('Launcher closed.')
 
-    def export_checkpoint(self, save_path):
+    def export_checkpoint(self, save_path, timeout=60):
         """
         Helper function: copies last saved checkpoint files to specified location;
         usually to serve as pre-trained model.
+        Since chief worker writes and rotates checkpoints in background, only checkpoint files referred by
+        checkpoint state are copied and copying is repeated if newer checkpoint appears meanwhile;
+        state file gets written last, so target never points to incomplete checkpoint.
 
         Args:
             save_path:  path to copy checkpoint files to;
+            timeout:    seconds to keep trying to get consistent copy;
 
         """
         source = self.cluster_config['log_dir'] + self.cluster_config['log_ckpt_subdir']
         target = save_path
+        state_filename = os.path.join(source, 'checkpoint')
 
         assert os.path.exists(source), 'Source dir not found: {}'.format(source)
+        assert os.path.exists(state_filename), 'No checkpoint found in: {}'.format(source)
 
         if not os.path.exists(target):
             os.makedirs(target)
             self.log.notice('target dir created: {}'.format(target))
 
-        else:
-            old_files = glob.glob(target + '/*')
-            p = psutil.Popen(['rm', '-R', ] + old_files, stdout=PIPE, stderr=PIPE)
-            self.log.notice('target dir purged.')
+        start = time.time()
+        while True:
+            # Purge target:
+            for filename in glob.glob(target + '/*'):
+                if os.path.isdir(filename):
+                    shutil.rmtree(filename)
+
+                else:
+                    os.remove(filename)
+
+            with open(state_filename, 'rb') as f:
+                state = f.read()
+
+            checkpoint_path = tf.train.get_checkpoint_state(source).model_checkpoint_path
+            prefix = os.path.join(source, os.path.basename(checkpoint_path))
+            try:
+                for filename in glob.glob(prefix + '.*'):
+                    shutil.copy2(filename, target)
+
+                with open(state_filename, 'rb') as f:
+                    consistent = f.read() == state
+
+            except FileNotFoundError:
+                # Checkpoint has been rotated while copying:
+                consistent = False
+
+            if consistent:
+                break
+
+            if time.time() - start > timeout:
+                raise TimeoutError('Failed to get consistent checkpoint copy from: {}'.format(source))
+
+            self.log.debug('checkpoint has been updated while copying, retrying...')
 
-        p = os.popen('cp -R ' + source + '/* ' + target)
+        with open(os.path.join(target, 'checkpoint'), 'wb') as f:
+            f.write(state)
 
         self.log.notice('copied to: {}'.format(target))
 
@@ -10,6 +10,68 @@ def discount(x, gamma):
     return scipy.signal.lfilter([1], [1, -gamma], x[::-1], axis=0)[::-1]
 
 
+def batch_discounted_returns(rewards, values, bootstrap_values, gamma, gae_lambda=1.0, time_steps=None, terminal=None):
+    """
+    Computes discounted returns and GAE advantages for batch of trajectories at once,
+    same as discount() does for every single trajectory.
+    Every row is reversed in time up to its own length, so single lfilter pass along time axis
+    serves entire batch.
+
+    Args:
+        rewards:            array of shape [batch_size, max_time]
+        values:             value estimates, array of shape [batch_size, max_time]
+        bootstrap_values:   values of states following last frame of every row, array of shape [batch_size]
+        gamma:              discount factor
+        gae_lambda:         GAE lambda
+        time_steps:         real length of every row, array of shape [batch_size]; if None - all rows are full.
+        terminal:           bool array of shape [batch_size], rows ended with terminal state get zero bootstrap value
+
+    Returns:
+        returns, advantages as float arrays of shape [batch_size, max_time], entries beyond row length are zeroes.
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    batch_size, max_time = rewards.shape
+    bootstrap_values = np.reshape(np.asarray(bootstrap_values, dtype=np.float64), batch_size)
+
+    if terminal is not None:
+        bootstrap_values = np.where(np.reshape(terminal, batch_size), 0.0, bootstrap_values)
+
+    if time_steps is None:
+        time_steps = np.full(batch_size, max_time)
+
+    else:
+        time_steps = np.reshape(np.asarray(time_steps, dtype=np.int64), batch_size)
+
+    rows = np.arange(batch_size)[:, None]
+    steps = np.arange(max_time)[None, :]
+    valid = steps < time_steps[:, None]
+    # Position of every frame in reversed row, self-inverse within row length:
+    reverse = np.maximum(time_steps[:, None] - 1 - steps, 0)
+
+    # V(s_t+1) with bootstrap value following last valid frame:
+    next_values = np.zeros((batch_size, max_time + 1))
+    next_values[:, :max_time] = values
+    next_values[np.arange(batch_size), time_steps] = bootstrap_values
+    delta = rewards + gamma * next_values[:, 1:] - values
+
+    # Returns; bootstrap value comes first in reversed time:
+    reversed_rewards = np.zeros((batch_size, max_time + 1))
+    reversed_rewards[:, 0] = bootstrap_values
+    reversed_rewards[:, 1:] = np.where(valid, rewards[rows, reverse], 0.0)
+    reversed_returns = scipy.signal.lfilter([1], [1, -gamma], reversed_rewards, axis=1)[:, 1:]
+
+    # This formula for the advantage is (16) from "Generalized Advantage Estimation" paper:
+    # https://arxiv.org/abs/1506.02438
+    reversed_delta = np.where(valid, delta[rows, reverse], 0.0)
+    reversed_advantages = scipy.signal.lfilter([1], [1, -gamma * gae_lambda], reversed_delta, axis=1)
+
+    returns = np.where(valid, reversed_returns[rows, reverse], 0.0)
+    advantages = np.where(valid, reversed_advantages[rows, reverse], 0.0)
+
+    return returns, advantages
+
+
 def log_uniform(lo_hi, size):
     """
     Samples from log-uniform distribution in range specified by `lo_hi`.
@@ -4,16 +4,20 @@
 
 from logbook import Logger, StreamHandler, WARNING
 import sys
+import threading
 
 import numpy as np
-from collections import deque
-from btgym.algorithms.rollout import Rollout
+from btgym.algorithms.rollout import Rollout, make_buffers, flatten_buffers, write_to_buffers, write_row, select_from_struct
 
 
 class Memory(object):
     """
     Replay memory with rebalanced replay based on reward value.
 
+    Experiences are kept in struct-of-arrays fashion: every leaf of [nested] experience frame structure
+    is stored in its own preallocated numpy ring buffer of `history_size` rows, allocated on first frame added.
+    All frames are expected to share same structure, leaf shapes and types.
+
     Note:
         must be filled up before calling sampling methods.
     """
@@ -30,8 +34,7 @@ class Memory(object):
             task:                   parent worker id;
             reward_threshold:       if |experience.reward| > reward_threshold: experience is saved as 'prioritized';
         """
-        self._history_size = history_size
-        self._frames = deque(maxlen=history_size)
+        self._history_size = int(history_size)
         self.reward_threshold = reward_threshold
         self.max_sample_size = int(max_sample_size)
         self.priority_sample_size = int(priority_sample_size)
@@ -41,11 +44,21 @@ class Memory(object):
         StreamHandler(sys.stdout).push_application()
         self.log = Logger('ReplayMemory_{}'.format(self.task), level=self.log_level)
         self.use_priority_sampling = use_priority_sampling
-        # Indices for non-priority frames:
-        self._zero_reward_indices = deque()
-        # Indices for priority frames:
-        self._non_zero_reward_indices = deque()
-        self._top_frame_index = 0
+
+        # Ring buffers, allocated on first frame added:
+        self._buffers = None
+        self._leaves = None
+        # Physical index of oldest frame stored and number of frames stored:
+        self._head = 0
+        self._size = 0
+
+        # Terminal flags and priority marks are kept apart from frame buffers for fast index lookups:
+        self._terminal = np.zeros(self._history_size, dtype=bool)
+        self._priority = np.zeros(self._history_size, dtype=bool)
+
+        # Physical indices of zero and non-zero reward frames, cached until memory changes:
+        self._zero_reward_indices = None
+        self._non_zero_reward_indices = None
 
         if use_priority_sampling:
             self.sample_priority = self._sample_priority
@@ -53,6 +66,84 @@ class Memory(object):
         else:
             self.sample_priority = self._sample_dummy
 
+    def _gather(self, buffers, indices):
+        """
+        Reads rows with given physical `indices` from `buffers`.
+
+        Returns:
+            [nested] structure of lists of values, as of Rollout.
+        """
+        if isinstance(buffers, dict):
+            return {key: self._gather(buffer, indices) for key, buffer in buffers.items()}
+
+        elif isinstance(buffers, tuple):
+            return tuple([self._gather(buffer, indices) for buffer in buffers])
+
+        else:
+            return list(buffers[indices])
+
+    def _physical(self, logical_index):
+        return (self._head + logical_index) % self._history_size
+
+    def _append_rows(self, struct, terminal, reward, num_rows):
+        """
+        Writes `num_rows` of batched [nested] frame values to ring buffers, overwriting oldest frames if full.
+        """
+        if num_rows > self._history_size:
+            # Only most recent frames fit in:
+            skip = num_rows - self._history_size
+            struct = select_from_struct(struct, slice(skip, None))
+            terminal = terminal[skip:]
+            reward = reward[skip:]
+            num_rows = self._history_size
+
+        if self._buffers is None:
+            self._buffers = make_buffers(select_from_struct(struct, 0), self._history_size)
+            self._leaves = flatten_buffers(self._buffers)
+
+        indices = self._physical(self._size + np.arange(num_rows))
+        write_to_buffers(self._buffers, struct, indices)
+        self._terminal[indices] = terminal
+        self._priority[indices] = np.abs(reward) > self.reward_threshold
+
+        overflow = max(self._size + num_rows - self._history_size, 0)
+        self._head = (self._head + overflow) % self._history_size
+        self._size = min(self._size + num_rows, self._history_size)
+
+        self._frames_added(indices, overflow)
+
+    def _frames_added(self, indices, num_dropped):
+        """
+        Called every time new frames are written to memory.
+
+        Args:
+            indices:        int or array, physical indices of frames added
+            num_dropped:    number of oldest frames overwritten
+        """
+        # Invalidate cached indices:
+        self._zero_reward_indices = None
+        self._non_zero_reward_indices = None
+
+    def _as_batch(self, struct):
+        """
+        Stacks [nested] structure of lists of values, as of Rollout, to structure of arrays.
+        """
+        if isinstance(struct, dict):
+            return {key: self._as_batch(value) for key, value in struct.items()}
+
+        elif isinstance(struct, tuple):
+            return tuple([self._as_batch(value) for value in struct])
+
+        else:
+            return np.asarray(struct)
+
+    def _last_frame_terminal(self):
+        return self._size > 0 and self._terminal[self._physical(self._size - 1)]
+
+    def _last_frame_position(self):
+        index = self._physical(self._size - 1)
+        return {key: buffer[index] for key, buffer in self._buffers['position'].items()}
+
     def add(self, frame):
         """
         Appends single experience frame to memory.
@@ -60,39 +151,28 @@ class Memory(object):
         Args:
             frame:  dictionary of values.
         """
-        if frame['terminal'] and len(self._frames) > 0 and self._frames[-1]['terminal']:
+        if frame['terminal'] and self._last_frame_terminal():
             # Discard if terminal frame continues
             self.log.warning("Memory_{}: Sequential terminal frame encountered. Discarded.".format(self.task))
-            self.log.warning('{} -- {}'.format(self._frames[-1]['position'], frame['position']))
+            self.log.warning('{} -- {}'.format(self._last_frame_position(), frame['position']))
             return
 
-        frame_index = self._top_frame_index + len(self._frames)
-        was_full = self.is_full()
+        if self._buffers is None:
+            self._buffers = make_buffers(frame, self._history_size)
+            self._leaves = flatten_buffers(self._buffers)
 
-        # Append frame:
-        self._frames.append(frame)
+        index = self._physical(self._size)
+        write_row(self._leaves, frame, index)
+        self._terminal[index] = frame['terminal']
+        self._priority[index] = abs(frame['reward']) > self.reward_threshold
 
-        # Decide and append index:
-        if frame_index >= self.max_sample_size - 1:
-            if abs(frame['reward']) <= self.reward_threshold:
-                self._zero_reward_indices.append(frame_index)
-
-            else:
-                self._non_zero_reward_indices.append(frame_index)
+        if self._size < self._history_size:
+            self._size += 1
+            self._frames_added(index, 0)
 
-        if was_full:
-            # Decide from which index to discard:
-            self._top_frame_index += 1
-
-            cut_frame_index = self._top_frame_index + self.max_sample_size - 1
-            # Cut frame if its index is lower than cut_frame_index:
-            if len(self._zero_reward_indices) > 0 and \
-                            self._zero_reward_indices[0] < cut_frame_index:
-                self._zero_reward_indices.popleft()
-
-            if len(self._non_zero_reward_indices) > 0 and \
-                            self._non_zero_reward_indices[0] < cut_frame_index:
-                self._non_zero_reward_indices.popleft()
+        else:
+            self._head = (self._head + 1) % self._history_size
+            self._frames_added(index, 1)
 
     def add_rollout(self, rollout):
         """
@@ -102,26 +182,54 @@ class Memory(object):
             rollout:    `Rollout` instance.
         """
         # Check if current rollout is direct extension of last stored frame sequence:
-        if len(self._frames) > 0 and not self._frames[-1]['terminal']:
+        if self._size > 0 and not self._last_frame_terminal():
+            position = self._last_frame_position()
             # E.g. check if it is same local episode and successive frame order:
-            if self._frames[-1]['position']['episode'] == rollout['position']['episode'][0] and \
-                    self._frames[-1]['position']['step'] + 1 == rollout['position']['step'][0]:
+            if position['episode'] == rollout['position']['episode'][0] and \
+                    position['step'] + 1 == rollout['position']['step'][0]:
                 # Means it is ok to just extend previously stored episode
                 pass
             else:
                 # Means part or tail of previously recorded episode is somehow lost,
                 # so we need to mark stored episode as 'ended':
-                self._frames[-1]['terminal'] = True
-                self.log.warning('{} changed to terminal'.format(self._frames[-1]['position']))
+                self._end_episode()
+                self.log.warning('{} changed to terminal'.format(position))
                 # If we get a lot of such messages it is an indication something is going wrong.
-        # Add experiences one by one:
-        # TODO: pain-slow.
-        for i in range(len(rollout['terminal'])):
-            frame = rollout.get_frame(i)
-            self.add(frame)
+
+        # Add all experiences at once:
+        batch = self._as_batch({key: rollout[key] for key in rollout.keys()})
+        terminal = batch['terminal'].astype(bool)
+
+        # Discard terminal frames following terminal ones:
+        previous_terminal = np.concatenate([[self._last_frame_terminal()], terminal[:-1]])
+        keep = ~(terminal & previous_terminal)
+        if not keep.all():
+            self.log.warning(
+                "Memory_{}: {} sequential terminal frame(s) encountered. Discarded.".format(self.task, (~keep).sum())
+            )
+            batch = select_from_struct(batch, keep)
+            terminal = terminal[keep]
+
+        if terminal.shape[0] > 0:
+            self._append_rows(batch, terminal, batch['reward'], terminal.shape[0])
+
+    def end_episode(self):
+        """
+        Marks last stored frame as terminal, so frames of interrupted episode are never sampled
+        as continued by frames added next.
+        """
+        self._end_episode()
+
+    def _end_episode(self):
+        if self._size > 0 and not self._last_frame_terminal():
+            index = self._physical(self._size - 1)
+            self._terminal[index] = True
+            self._buffers['terminal'][index] = True
+            self._zero_reward_indices = None
+            self._non_zero_reward_indices = None
 
     def is_full(self):
-        return len(self._frames) >= self._history_size
+        return self._size >= self._history_size
 
     def fill(self):
         """
@@ -141,6 +249,22 @@ class Memory(object):
         else:
             raise AttributeError('Rollout_provider is None, can not fill memory.')
 
+    def _make_rollout(self, logical_indices):
+        """
+        Composes Rollout of stored frames.
+
+        Args:
+            logical_indices:    array of frames indices relative to oldest frame stored.
+
+        Returns:
+            instance of Rollout.
+        """
+        sampled_rollout = Rollout()
+        sampled_rollout.update(self._gather(self._buffers, self._physical(logical_indices)))
+        sampled_rollout.size = len(logical_indices)
+
+        return sampled_rollout
+
     def sample_uniform(self, sequence_size):
         """
         Uniformly samples sequence of successive frames of size `sequence_size` or less (~off-policy rollout).
@@ -150,20 +274,44 @@ class Memory(object):
         Returns:
             instance of Rollout of size <= sequence_size.
         """
+        if not self.is_full():
+            raise IndexError('Memory_{}: can not sample from memory not filled yet.'.format(self.task))
+
         start_pos = np.random.randint(0, self._history_size - sequence_size - 1)
         # Shift by one if hit terminal frame:
-        if self._frames[start_pos]['terminal']:
+        if self._terminal[self._physical(start_pos)]:
             start_pos += 1  # assuming that there are no successive terminal frames.
 
-        sampled_rollout = Rollout()
+        indices = start_pos + np.arange(sequence_size)
+        terminal = self._terminal[self._physical(indices)]
+        if terminal.any():
+            # it's ok to return less than `sequence_size` frames if `terminal` frame encountered:
+            indices = indices[:np.argmax(terminal) + 1]
 
-        for i in range(sequence_size):
-            frame = self._frames[start_pos + i]
-            sampled_rollout.add(frame)
-            if frame['terminal']:
-                break  # it's ok to return less than `sequence_size` frames if `terminal` frame encountered.
+        return self._make_rollout(indices)
 
-        return sampled_rollout
+    def _update_priority_indices(self):
+        """
+        Splits physical indices of stored frames into zero and non-zero reward ones.
+        """
+        self._zero_reward_indices = np.flatnonzero(~self._priority[:self._size])
+        self._non_zero_reward_indices = np.flatnonzero(self._priority[:self._size])
+
+    def _sample_end_index(self, from_zero):
+        """
+        Uniformly samples logical index of frame from zero or non-zero reward frames,
+        such as it can end sequence of `max_sample_size`.
+        """
+        if from_zero:
+            indices = self._zero_reward_indices
+
+        else:
+            indices = self._non_zero_reward_indices
+
+        while True:
+            index = (indices[np.random.randint(len(indices))] - self._head) % self._history_size
+            if index >= self.max_sample_size - 1:
+                return index
 
     def _sample_priority(self, size=None, exact_size=False, skewness=2, sample_attempts=100):
         """
@@ -188,68 +336,327 @@ class Memory(object):
         if size > self.max_sample_size:
             size = self.max_sample_size
 
+        if self._zero_reward_indices is None:
+            self._update_priority_indices()
+
+        # Frames those can not end sequence are excluded:
+        head_priority = self._priority[self._physical(np.arange(min(self.max_sample_size - 1, self._size)))]
+        num_non_zero = len(self._non_zero_reward_indices) - head_priority.sum()
+        num_zero = len(self._zero_reward_indices) - (~head_priority).sum()
+
         # Toss skewed coin:
         if np.random.randint(int(skewness)) == 0:
             from_zero = False
         else:
             from_zero = True
 
-        if len(self._zero_reward_indices) == 0:
+        if num_zero + num_non_zero == 0:
+            raise IndexError(
+                'Memory_{}: no frames to sample sequence of size {} from, memory is not filled yet.'.format(
+                    self.task,
+                    self.max_sample_size
+                )
+            )
+
+        if num_zero == 0:
             # zero rewards container was empty
             from_zero = False
-        elif len(self._non_zero_reward_indices) == 0:
+        elif num_non_zero == 0:
             # non zero rewards container was empty
             from_zero = True
 
+        offsets = np.arange(size) - size + 1
+
         # Try to sample sequence of given length from one episode.
         # Take maximum of 'sample_attempts', if no luck
         # (e.g too short episodes and/or too big sampling size) ->
         # return inconsistent sample and issue warning.
-        check_sequence = True
         for attempt in range(sample_attempts):
-            if from_zero:
-                index = np.random.randint(len(self._zero_reward_indices))
-                end_frame_index = self._zero_reward_indices[index]
-
-            else:
-                index = np.random.randint(len(self._non_zero_reward_indices))
-                end_frame_index = self._non_zero_reward_indices[index]
+            indices = self._sample_end_index(from_zero) + offsets
 
-            start_frame_index = end_frame_index - size + 1
-            raw_start_frame_index = start_frame_index - self._top_frame_index
-
-            sampled_rollout = Rollout()
-            is_full = True
             if attempt == sample_attempts - 1:
-                check_sequence = False
                 self.log.warning(
                     'Memory_{}: failed to sample {} successive frames, sampled as is.'.format(self.task, size)
                 )
+                break
 
-            for i in range(size - 1):
-                frame = self._frames[raw_start_frame_index + i]
-                sampled_rollout.add(frame)
-                if check_sequence:
-                    if frame['terminal']:
-                        if exact_size:
-                            is_full = False
-                        #print('attempt:', attempt)
-                        #print('frame.terminal:', frame['terminal'])
-                        break
             # Last frame can be terminal anyway:
-            frame = self._frames[raw_start_frame_index + size - 1]
-            sampled_rollout.add(frame)
+            terminal = self._terminal[self._physical(indices[:-1])]
+            if terminal.any():
+                if exact_size:
+                    continue
 
-            if is_full:
-                break
+                # Cut sequence at first terminal frame, keep last one:
+                cut = np.argmax(terminal) + 1
+                indices = np.concatenate([indices[:cut], indices[-1:]])
 
-        return sampled_rollout
+            break
+
+        return self._make_rollout(indices)
 
     @staticmethod
     def _sample_dummy(**kwargs):
         return None
 
 
+class SumTree(object):
+    """
+    Binary tree of non-negative priorities, each internal node holding sum of its children.
+    Supports O(log n) batched priority updates and sampling of leaf indices proportionally to priorities.
+    Tree is stored as flat array with root at index 1 and `capacity` leaves padded to power of two.
+    """
+    def __init__(self, capacity):
+        """
+
+        Args:
+            capacity:   number of leaves
+        """
+        self.capacity = int(capacity)
+        self._depth = int(np.ceil(np.log2(max(self.capacity, 1))))
+        self._leaf_offset = 2 ** self._depth
+        self._tree = np.zeros(2 * self._leaf_offset)
+
+    def total(self):
+        """
+        Returns:
+            sum of all priorities
+        """
+        return self._tree[1]
+
+    def get(self, indices):
+        """
+        Returns:
+            priorities of leaves with given indices
+        """
+        return self._tree[np.asarray(indices) + self._leaf_offset]
+
+    def update(self, indices, priorities):
+        """
+        Sets priorities of leaves with given indices and updates sums up to the root.
+
+        Args:
+            indices:        int or array of leaf indices
+            priorities:     float or array of non-negative priority values
+        """
+        if np.ndim(indices) == 0:
+            # Frequent single leaf update:
+            tree = self._tree
+            node = int(indices) + self._leaf_offset
+            tree[node] = priorities
+            node //= 2
+            while node > 0:
+                tree[node] = tree[2 * node] + tree[2 * node + 1]
+                node //= 2
+
+        else:
+            nodes = np.asarray(indices) + self._leaf_offset
+            self._tree[nodes] = priorities
+            for level in range(self._depth):
+                nodes = np.unique(nodes // 2)
+                self._tree[nodes] = self._tree[2 * nodes] + self._tree[2 * nodes + 1]
+
+    def find(self, values):
+        """
+        Finds leaves such as prefix sums of priorities up to these leaves cover given values.
+        Leaves of zero priority are never returned as long as total priority is positive.
+
+        Args:
+            values:     array of floats in [0, total)
+
+        Returns:
+            array of leaf indices
+        """
+        values = np.array(values, dtype=np.float64, ndmin=1)
+        if values.shape[0] == 1:
+            # Frequent single value search:
+            tree = self._tree
+            value = float(values[0])
+            node = 1
+            for level in range(self._depth):
+                left = tree[2 * node]
+                if value >= left and tree[2 * node + 1] > 0:
+                    value -= left
+                    node = 2 * node + 1
+
+                else:
+                    node = 2 * node
+
+            return np.asarray([node - self._leaf_offset])
+
+        nodes = np.ones(values.shape[0], dtype=np.int64)
+        for level in range(self._depth):
+            left = self._tree[2 * nodes]
+            go_right = (values >= left) & (self._tree[2 * nodes + 1] > 0)
+            values = np.where(go_right, values - left, values)
+            nodes = 2 * nodes + go_right
+
+        return nodes - self._leaf_offset
+
+    def sample(self, size=1):
+        """
+        Samples leaf indices with probabilities proportional to priorities, stratified over `size` equal segments.
+
+        Args:
+            size:   number of indices to sample
+
+        Returns:
+            array of leaf indices
+        """
+        segment = self.total() / size
+        return self.find((np.arange(size) + np.random.uniform(size=size)) * segment)
+
+
+class PrioritizedMemory(Memory):
+    """
+    Replay memory with prioritized replay based on sum-tree over sequence end frames.
+
+    Every stored frame is assigned priority, by default derived from its reward magnitude;
+    priorities can be updated in batch (e.g. with TD-errors after train step) via `update_priorities()`,
+    which is safe to call from trainer thread while runner thread keeps adding and sampling frames.
+    Frames which can not end continuous sequence of `priority_sample_size`
+    (i.e. having `terminal` frames among preceding ones or too close to oldest frame stored)
+    are kept masked out of the tree, so sampling never needs re-sampling attempts.
+    """
+    def __init__(self, history_size, max_sample_size, priority_sample_size, alpha=0.6, priority_eps=1e-3, **kwargs):
+        """
+
+        Args:
+            history_size:           number of experiences stored;
+            max_sample_size:        maximum allowed sample size (e.g. off-policy rollout length);
+            priority_sample_size:   sample size of priority_sample() method
+            alpha:                  float >=0, priority exponent, 0 stands for uniform sampling;
+            priority_eps:           small positive value added to priorities so no frame is left out;
+            kwargs:                 see Memory() args.
+        """
+        super(PrioritizedMemory, self).__init__(history_size, max_sample_size, priority_sample_size, **kwargs)
+        self.alpha = alpha
+        self.priority_eps = priority_eps
+
+        self._tree = SumTree(self._history_size)
+        # Priorities regardless of being able to end sequence, and valid sequence ends mask:
+        self._sequence_priority = np.zeros(self._history_size)
+        self._valid = np.zeros(self._history_size, dtype=bool)
+        # Total number of frames ever added, used to tell sampled frames ids:
+        self._num_added = 0
+        # Guards tree and priorities against concurrent updates from trainer:
+        self._lock = threading.Lock()
+
+    def _to_priority(self, values):
+        return (np.abs(values) + self.priority_eps) ** self.alpha
+
+    def add(self, frame):
+        with self._lock:
+            super(PrioritizedMemory, self).add(frame)
+
+    def add_rollout(self, rollout):
+        with self._lock:
+            super(PrioritizedMemory, self).add_rollout(rollout)
+
+    def end_episode(self):
+        with self._lock:
+            super(PrioritizedMemory, self).end_episode()
+
+    def _frames_added(self, indices, num_dropped):
+        super(PrioritizedMemory, self)._frames_added(indices, num_dropped)
+        if np.ndim(indices) == 0:
+            self._frame_added(indices, num_dropped)
+            return
+
+        num_rows = indices.shape[0]
+        self._num_added += num_rows
+        self._sequence_priority[indices] = self._to_priority(self._buffers['reward'][indices])
+
+        # Valid end of sequence has no terminal frames among `priority_sample_size` - 1 preceding ones:
+        interior = self.priority_sample_size - 1
+        first = self._size - num_rows
+        start = max(first - interior, 0)
+        num_terminal = np.concatenate(
+            [[0], np.cumsum(self._terminal[self._physical(np.arange(start, self._size - 1))])]
+        )
+        ends = np.arange(first, self._size)
+        valid = ends >= interior
+        valid[valid] = num_terminal[ends[valid] - start] == num_terminal[ends[valid] - interior - start]
+
+        # Frames got too close to oldest frame stored can no longer end sequence:
+        if num_dropped > 0 and interior > 0:
+            expired = self._physical(np.arange(max(interior - num_dropped, 0), min(interior, first)))
+            indices = np.concatenate([expired, indices])
+            valid = np.concatenate([np.zeros(expired.shape[0], dtype=bool), valid])
+
+        self._valid[indices] = valid
+        self._tree.update(indices, self._sequence_priority[indices] * valid)
+
+    def _frame_added(self, index, num_dropped):
+        """
+        Same as _frames_added() for single frame.
+        """
+        self._num_added += 1
+        self._sequence_priority[index] = self._to_priority(self._buffers['reward'][index])
+
+        interior = self.priority_sample_size - 1
+        end = self._size - 1
+        valid = end >= interior and not self._terminal[self._physical(np.arange(end - interior, end))].any()
+        self._valid[index] = valid
+        self._tree.update(index, self._sequence_priority[index] * valid)
+
+        if num_dropped > 0 and interior > 0:
+            expired = self._physical(interior - 1)
+            self._valid[expired] = False
+            self._tree.update(expired, 0.0)
+
+    def _sample_priority(self, size=None, exact_size=False, skewness=None, sample_attempts=None):
+        """
+        Samples sequence of successive frames with probability proportional to priority of last frame.
+        Sampled sequences never contain `terminal` frames except last one.
+
+        Args:
+            size:               sample size, must be <= self.priority_sample_size;
+            exact_size:         not used, sample is always of exact size;
+            skewness:           not used;
+            sample_attempts:    not used.
+
+        Returns:
+            instance of Rollout() with `memory_index` attribute holding id of last sampled frame
+            and `memory` attribute referring to this instance, to be used with update_priorities().
+        """
+        if size is None or size > self.priority_sample_size:
+            size = self.priority_sample_size
+
+        if self._tree.total() <= 0:
+            raise IndexError(
+                'Memory_{}: no frames to sample sequence of size {} from, memory is not filled yet.'.format(
+                    self.task,
+                    self.priority_sample_size
+                )
+            )
+
+        with self._lock:
+            end_index = (self._tree.sample()[0] - self._head) % self._history_size
+
+        sampled_rollout = self._make_rollout(end_index + np.arange(size) - size + 1)
+        sampled_rollout.memory_index = self._num_added - self._size + end_index
+        sampled_rollout.memory = self
+
+        return sampled_rollout
+
+    def update_priorities(self, memory_index, priorities):
+        """
+        Sets priorities of previously sampled sequences; frames already discarded from memory are ignored.
+
+        Args:
+            memory_index:   int or array of `memory_index` values of sampled rollouts
+            priorities:     float or array of new priority values, e.g. TD-errors, same size as `memory_index`
+        """
+        memory_index = np.atleast_1d(memory_index)
+        priorities = np.broadcast_to(np.asarray(priorities, dtype=np.float64), memory_index.shape)
+        with self._lock:
+            oldest = self._num_added - self._size
+            stored = memory_index >= oldest
+            indices = self._physical(memory_index[stored] - oldest)
+            self._sequence_priority[indices] = self._to_priority(priorities[stored])
+            self._tree.update(indices, self._sequence_priority[indices] * self._valid[indices])
+
+
 class _DummyMemory:
 
     def __init__(self):
@@ -259,6 +666,10 @@ class _DummyMemory:
     def add(frame):
         return None
 
+    @staticmethod
+    def end_episode():
+        return None
+
     @staticmethod
     def sample_uniform(**kwargs):
         return None
@@ -72,10 +72,21 @@ class BaseAacPolicy(object):
         self.aux_estimate = aux_estimate
         self.callback = {}
 
-        # Placeholders for obs. state input:
-        self.on_state_in = nested_placeholders(self.ob_space.shape, batch_dim=None, name='on_policy_state_in')
-        self.off_state_in = nested_placeholders(self.ob_space.shape, batch_dim=None, name='off_policy_state_in_pl')
-        self.rp_state_in = nested_placeholders(self.ob_space.shape, batch_dim=None, name='rp_state_in')
+        # Placeholders for obs. state input, dtypes follow observation space:
+        state_dtypes = nested_state_dtypes(self.ob_space.dtypes)
+        self.on_state_in = nested_placeholders(
+            self.ob_space.shape, batch_dim=None, name='on_policy_state_in', dtype=state_dtypes
+        )
+        self.off_state_in = nested_placeholders(
+            self.ob_space.shape, batch_dim=None, name='off_policy_state_in_pl', dtype=state_dtypes
+        )
+        self.rp_state_in = nested_placeholders(
+            self.ob_space.shape, batch_dim=None, name='rp_state_in', dtype=state_dtypes
+        )
+        # Half-precision inputs are cast to float32 in-graph:
+        on_state_x = nested_cast(self.on_state_in)
+        off_state_x = nested_cast(self.off_state_in)
+        rp_state_x = nested_cast(self.rp_state_in)
 
         # Placeholders for previous step action[multi-categorical vector encoding]  and reward [scalar]:
         self.on_last_a_in = tf.placeholder(
@@ -111,7 +122,7 @@ class BaseAacPolicy(object):
             )
         # Base on-policy AAC network:
         # Conv. layers:
-        on_aac_x = conv_2d_network(self.on_state_in['external'], self.ob_space.shape['external'], ac_space, **kwargs)
+        on_aac_x = conv_2d_network(on_state_x['external'], self.ob_space.shape['external'], ac_space, **kwargs)
 
         # Reshape rnn inputs for  batch training as [rnn_batch_dim, rnn_time_dim, flattened_depth]:
         x_shape_dynamic = tf.shape(on_aac_x)
@@ -136,9 +147,9 @@ class BaseAacPolicy(object):
         on_stage2_input = [on_aac_x, on_last_action_in, on_r_in]
 
         if 'internal' in list(self.on_state_in.keys()):
-            x_int_shape_static = self.on_state_in['internal'].get_shape().as_list()
+            x_int_shape_static = on_state_x['internal'].get_shape().as_list()
             x_int = tf.reshape(
-                self.on_state_in['internal'],
+                on_state_x['internal'],
                 [self.on_batch_size, max_seq_len, np.prod(x_int_shape_static[1:])]
             )
             on_stage2_input.append(x_int)
@@ -164,7 +175,7 @@ class BaseAacPolicy(object):
         [self.on_logits, self.on_vf, self.on_sample] = dense_aac_network(on_x_lstm_out, self.ac_space.one_hot_depth)
 
         # Off-policy AAC network (shared):
-        off_aac_x = conv_2d_network(self.off_state_in['external'], self.ob_space.shape['external'], ac_space, reuse=True, **kwargs)
+        off_aac_x = conv_2d_network(off_state_x['external'], self.ob_space.shape['external'], ac_space, reuse=True, **kwargs)
 
         # Reshape rnn inputs for  batch training as [rnn_batch_dim, rnn_time_dim, flattened_depth]:
         x_shape_dynamic = tf.shape(off_aac_x)
@@ -182,9 +193,9 @@ class BaseAacPolicy(object):
         off_stage2_input = [off_aac_x, off_action_in, off_r_in]
 
         if 'internal' in list(self.off_state_in.keys()):
-            x_int_shape_static = self.off_state_in['internal'].get_shape().as_list()
+            x_int_shape_static = off_state_x['internal'].get_shape().as_list()
             off_x_int = tf.reshape(
-                self.off_state_in['internal'],
+                off_state_x['internal'],
                 [self.off_batch_size, max_seq_len, np.prod(x_int_shape_static[1:])]
             )
             off_stage2_input.append(off_x_int)
@@ -242,7 +253,7 @@ class BaseAacPolicy(object):
         self.rp_batch_size = tf.placeholder(tf.int32, name='rp_batch_size')
 
         # Shared conv. output:
-        rp_x = conv_2d_network(self.rp_state_in['external'], self.ob_space.shape['external'], ac_space, reuse=True, **kwargs)
+        rp_x = conv_2d_network(rp_state_x['external'], self.ob_space.shape['external'], ac_space, reuse=True, **kwargs)
 
         # Flatten batch-wise:
         rp_x_shape_static = rp_x.get_shape().as_list()
@@ -293,52 +304,105 @@ class BaseAacPolicy(object):
             Action as dictionary of several action encodings, actions logits, V-fn value, output RNN state
         """
         try:
-            sess = tf.get_default_session()
-            feeder = {pl: value for pl, value in zip(self.on_lstm_state_pl_flatten, flatten_nested(lstm_state))}
-            feeder.update(feed_dict_from_nested(self.on_state_in, observation, expand_batch=True))
-            feeder.update(
-                {
-                    self.on_last_a_in: last_action,
-                    self.on_last_reward_in: last_reward,
-                    self.on_batch_size: 1,
-                    self.on_time_length: 1,
-                    self.train_phase: False
-                }
+            run = self._get_callable(
+                'act',
+                [self.on_logits, self.on_vf, self.on_lstm_state_out],
+                self._get_on_policy_feed_list,
+                lambda: self._get_on_policy_structure(observation, lstm_state)
+            )
+            logits, value, context = run(
+                *flatten_nested(lstm_state),
+                *[[leaf] for leaf in flatten_nested(observation)],
+                last_action,
+                last_reward,
+                1,
+                1,
+                False
             )
-            logits, value, context = sess.run([self.on_logits, self.on_vf, self.on_lstm_state_out], feeder)
             logits = logits[0, ...]
-            if self.ac_space.is_discrete:
-                if deterministic:
-                    sample = softmax(logits)
+            action_pack = self._sample_action(logits, deterministic)
+
+        except Exception as e:
+            print(e)
+            raise e
+
+        return action_pack, logits, value, context
+
+    def act_batch(self, observations, lstm_states, last_actions, last_rewards, deterministic=False):
+        """
+        Emits actions for several environments at once, evaluating policy in single session call.
+
+        Args:
+            observations:   list of dictionaries containing single observation, one per environment
+            lstm_states:    list of lstm context values, one per environment
+            last_actions:   list of encoded action values from previous step
+            last_rewards:   list of reward values from previous step
+            deterministic:  bool, it True - act deterministically,
+                            use random sampling otherwise (default)
 
-                else:
-                    # Use multinomial to get sample (discrete):
-                    sample = np.random.multinomial(1, softmax(logits))
+        Returns:
+            list of actions as dictionaries of several action encodings, actions logits of size [num_envs, ...],
+            list of V-fn values, list of output RNN states; i-th entry of every list relates to i-th environment and
+            is same as act() returns for that environment.
+        """
+        batch_size = len(observations)
+        run = self._get_callable(
+            'act',
+            [self.on_logits, self.on_vf, self.on_lstm_state_out],
+            self._get_on_policy_feed_list,
+            lambda: self._get_on_policy_structure(observations[0], lstm_states[0])
+        )
+        logits, value, context = run(
+            *rnn_context_stack(lstm_states),
+            *flatten_nested(nested_stack(observations)),
+            np.stack(last_actions, axis=0),
+            np.stack(last_rewards, axis=0),
+            batch_size,
+            1,
+            False
+        )
+        action_packs = [self._sample_action(logits[i, ...], deterministic) for i in range(batch_size)]
+        values = [value[i:i + 1] for i in range(batch_size)]
 
-                # print('ploicy_determ: {}, logits: {}, sample: {}'.format(deterministic, logits, sample))
+        return action_packs, logits, values, rnn_context_split(context)
 
-                sample = self.ac_space._cat_to_vec(np.argmax(sample))
+    def _sample_action(self, logits, deterministic=False):
+        """
+        Samples action given single-step policy logits.
 
-                # print('policy_sample_vector: ', sample)
+        Returns:
+            action as dictionary of several action encodings
+        """
+        if self.ac_space.is_discrete:
+            if deterministic:
+                sample = softmax(logits)
 
             else:
-                # Use DP to get sample (continuous):
-                sample = sample_dp(logits, alpha=self.action_dp_alpha)
-
-            # Get all needed action encodings:
-            action = self.ac_space._vec_to_action(sample)
-            one_hot = self.ac_space._vec_to_one_hot(sample)
-            action_pack = {
-                'environment': action,
-                'encoded': self.ac_space.encode(action),
-                'one_hot': one_hot,
+                # Use multinomial to get sample (discrete):
+                sample = np.random.multinomial(1, softmax(logits))
+
+            # Get all needed action encodings straight from category, sampled action needs no checks:
+            cat = np.argmax(sample)
+
+            return {
+                'environment': self.ac_space._vec_to_action(self.ac_space._cat_to_vec(cat), check=False),
+                'encoded': self.ac_space._cat_to_binary(cat),
+                'one_hot': self.ac_space._cat_to_one_hot(cat),
             }
-            # print('action_pack: ', action_pack)
-        except Exception as e:
-            print(e)
-            raise e
 
-        return action_pack, logits, value, context
+        else:
+            # Use DP to get sample (continuous):
+            sample = sample_dp(logits, alpha=self.action_dp_alpha)
+
+        # Get all needed action encodings:
+        action = self.ac_space._vec_to_action(sample)
+        one_hot = self.ac_space._vec_to_one_hot(sample)
+
+        return {
+            'environment': action,
+            'encoded': self.ac_space.encode(action),
+            'one_hot': one_hot,
+        }
 
     def get_value(self, observation, lstm_state, last_action, last_reward):
         """
@@ -353,20 +417,22 @@ class BaseAacPolicy(object):
         Returns:
             V-function value
         """
-        sess = tf.get_default_session()
-        feeder = feed_dict_rnn_context(self.on_lstm_state_pl_flatten, lstm_state)
-        feeder.update(feed_dict_from_nested(self.on_state_in, observation, expand_batch=True))
-        feeder.update(
-            {
-                self.on_last_a_in: last_action,
-                self.on_last_reward_in: last_reward,
-                self.on_batch_size: 1,
-                self.on_time_length: 1,
-                self.train_phase: False
-            }
+        run = self._get_callable(
+            'get_value',
+            self.on_vf,
+            self._get_on_policy_feed_list,
+            lambda: self._get_on_policy_structure(observation, lstm_state)
         )
 
-        return sess.run(self.on_vf, feeder)[0]
+        return run(
+            *flatten_nested(lstm_state),
+            *[[leaf] for leaf in flatten_nested(observation)],
+            last_action,
+            last_reward,
+            1,
+            1,
+            False
+        )[0]
 
     def get_pc_target(self, state, last_state, **kwargs):
         """
@@ -380,10 +446,70 @@ class BaseAacPolicy(object):
         Returns:
             Estimated absolute difference between two subsampled states.
         """
+        run = self._get_callable(
+            'get_pc_target',
+            self.pc_target,
+            lambda: [self.pc_change_state_in, self.pc_change_last_state_in]
+        )
+
+        return run(state['external'], last_state['external'])[0,...,0]
+
+    def _get_on_policy_feed_list(self):
+        """
+        Returns:
+            flat list of placeholders fed by act() and get_value(), in order values are passed in
+        """
+        return list(self.on_lstm_state_pl_flatten) + flatten_nested(self.on_state_in) + [
+            self.on_last_a_in,
+            self.on_last_reward_in,
+            self.on_batch_size,
+            self.on_time_length,
+            self.train_phase,
+        ]
+
+    def _get_on_policy_structure(self, observation, lstm_state):
+        """
+        Returns:
+            list of pairs of [nested] placeholders and single environment values fed by act() and get_value(),
+            expected to be of same structure
+        """
+        return [
+            (self.on_state_in, observation),
+            (list(self.on_lstm_state_pl_flatten), flatten_nested(lstm_state)),
+        ]
+
+    def _get_callable(self, name, fetches, get_feed_list, get_structure=None):
+        """
+        Returns callable running `fetches` in default session, made once per session by `Session.make_callable()`;
+        saves feed dictionary composition and fetches parsing on every call.
+
+        Args:
+            name:           str, callable cache key
+            fetches:        [nested] structure of tensors to run
+            get_feed_list:  callable returning flat list of placeholders to feed, in order of callable arguments
+            get_structure:  callable returning list of pairs of [nested] placeholders and values, if given,
+                            values are checked to match placeholders structure once, when callable is made,
+                            as values are passed positionally and mismatched ones won't be caught by session
+
+        Returns:
+            callable accepting values to feed as positional arguments
+        """
         sess = tf.get_default_session()
-        feeder = {self.pc_change_state_in: state['external'], self.pc_change_last_state_in: last_state['external']}
+        try:
+            callables = self._session_callables
+
+        except AttributeError:
+            # Not all subclasses call base __init__():
+            callables = self._session_callables = {}
+
+        if name not in callables or callables[name][0] is not sess:
+            if get_structure is not None:
+                for placeholders, values in get_structure():
+                    assert_same_structure(placeholders, values, check_types=True)
+
+            callables[name] = (sess, sess.make_callable(fetches, feed_list=get_feed_list()))
 
-        return sess.run(self.pc_target, feeder)[0,...,0]
+        return callables[name][1]
 
     @staticmethod
     def get_sample_config(*args, **kwargs):
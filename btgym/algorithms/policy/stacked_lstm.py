@@ -87,10 +87,21 @@ class StackedLstmPolicy(BaseAacPolicy):
 
         self.debug = {}
 
-        # Placeholders for obs. state input:
-        self.on_state_in = nested_placeholders(self.ob_space.shape, batch_dim=None, name='on_policy_state_in')
-        self.off_state_in = nested_placeholders(self.ob_space.shape, batch_dim=None, name='off_policy_state_in_pl')
-        self.rp_state_in = nested_placeholders(self.ob_space.shape, batch_dim=None, name='rp_state_in')
+        # Placeholders for obs. state input, dtypes follow observation space:
+        state_dtypes = nested_state_dtypes(self.ob_space.dtypes)
+        self.on_state_in = nested_placeholders(
+            self.ob_space.shape, batch_dim=None, name='on_policy_state_in', dtype=state_dtypes
+        )
+        self.off_state_in = nested_placeholders(
+            self.ob_space.shape, batch_dim=None, name='off_policy_state_in_pl', dtype=state_dtypes
+        )
+        self.rp_state_in = nested_placeholders(
+            self.ob_space.shape, batch_dim=None, name='rp_state_in', dtype=state_dtypes
+        )
+        # Half-precision inputs are cast to float32 in-graph:
+        on_state_x = nested_cast(self.on_state_in)
+        off_state_x = nested_cast(self.off_state_in)
+        rp_state_x = nested_cast(self.rp_state_in)
 
         # Placeholders for previous step action[multi-categorical vector encoding]  and reward [scalar]:
         self.on_last_a_in = tf.placeholder(
@@ -155,7 +166,7 @@ class StackedLstmPolicy(BaseAacPolicy):
         # [jointly] encode every stream within mode:
         self.on_aac_x_encoded = {}
         for key in self.modes_to_encode:
-            if isinstance(self.on_state_in[key], dict):  # got dictionary of data streams
+            if isinstance(on_state_x[key], dict):  # got dictionary of data streams
                 if self.share_encoder_params:
                     layer_name_template = 'encoded_{}_shared'
                 else:
@@ -171,7 +182,7 @@ class StackedLstmPolicy(BaseAacPolicy):
                             **kwargs
                         )
                     )
-                    for name, stream in self.on_state_in[key].items()
+                    for name, stream in on_state_x[key].items()
                 }
                 encoded_mode = tf.concat(
                     list(encoded_streams.values()),
@@ -182,7 +193,7 @@ class StackedLstmPolicy(BaseAacPolicy):
                 # Got single data stream:
                 encoded_mode = tf.layers.flatten(
                     self.state_encoder_class_ref(
-                        x=self.on_state_in[key],
+                        x=on_state_x[key],
                         ob_space=self.ob_space.shape[key],
                         ac_space=self.ac_space,
                         name='encoded_{}'.format(key),
@@ -224,7 +235,7 @@ class StackedLstmPolicy(BaseAacPolicy):
         #     if self.encode_internal_state:
         #         # Use convolution encoder:
         #         on_x_internal = self.state_encoder_class_ref(
-        #             x=self.on_state_in['internal'],
+        #             x=on_state_x['internal'],
         #             ob_space=self.ob_space.shape['internal'],
         #             ac_space=self.ac_space,
         #             name='encoded_internal',
@@ -237,9 +248,9 @@ class StackedLstmPolicy(BaseAacPolicy):
         #
         #     else:
         #         # Feed as is:
-        #         x_int_shape_static = self.on_state_in['internal'].get_shape().as_list()
+        #         x_int_shape_static = on_state_x['internal'].get_shape().as_list()
         #         on_x_internal = tf.reshape(
-        #             self.on_state_in['internal'],
+        #             on_state_x['internal'],
         #             [self.on_batch_size, max_seq_len, np.prod(x_int_shape_static[1:])]
         #         )
         #         self.debug['on_state_internal_encoded'] = on_x_internal
@@ -262,9 +273,9 @@ class StackedLstmPolicy(BaseAacPolicy):
 
         # Prepare datetime index if any:
         if 'datetime' in list(self.on_state_in.keys()):
-            x_dt_shape_static = self.on_state_in['datetime'].get_shape().as_list()
+            x_dt_shape_static = on_state_x['datetime'].get_shape().as_list()
             on_x_dt = tf.reshape(
-                self.on_state_in['datetime'],
+                on_state_x['datetime'],
                 [self.on_batch_size, max_seq_len, np.prod(x_dt_shape_static[1:])]
             )
             on_x_dt = [on_x_dt]
@@ -384,7 +395,7 @@ class StackedLstmPolicy(BaseAacPolicy):
 
         self.off_aac_x_encoded = {}
         for key in self.modes_to_encode:
-            if isinstance(self.off_state_in[key], dict):  # got dictionary of data streams
+            if isinstance(off_state_x[key], dict):  # got dictionary of data streams
                 if self.share_encoder_params:
                     layer_name_template = 'encoded_{}_shared'
                 else:
@@ -400,7 +411,7 @@ class StackedLstmPolicy(BaseAacPolicy):
                             **kwargs
                         )
                     )
-                    for name, stream in self.off_state_in[key].items()
+                    for name, stream in off_state_x[key].items()
                 }
                 encoded_mode = tf.concat(
                     list(encoded_streams.values()),
@@ -411,7 +422,7 @@ class StackedLstmPolicy(BaseAacPolicy):
                 # Got single data stream:
                 encoded_mode = tf.layers.flatten(
                     self.state_encoder_class_ref(
-                        x=self.off_state_in[key],
+                        x=off_state_x[key],
                         ob_space=self.ob_space.shape[key],
                         ac_space=self.ac_space,
                         name='encoded_{}'.format(key),
@@ -443,7 +454,7 @@ class StackedLstmPolicy(BaseAacPolicy):
         #     if self.encode_internal_state:
         #         # Use convolution encoder:
         #         off_x_internal = self.state_encoder_class_ref(
-        #             x=self.off_state_in['internal'],
+        #             x=off_state_x['internal'],
         #             ob_space=self.ob_space.shape['internal'],
         #             ac_space=self.ac_space,
         #             name='encoded_internal',
@@ -455,9 +466,9 @@ class StackedLstmPolicy(BaseAacPolicy):
         #             tf.reshape(off_x_internal, [self.off_batch_size, max_seq_len, np.prod(x_int_shape_static[1:])])
         #         ]
         #     else:
-        #         x_int_shape_static = self.off_state_in['internal'].get_shape().as_list()
+        #         x_int_shape_static = off_state_x['internal'].get_shape().as_list()
         #         off_x_internal = tf.reshape(
-        #             self.off_state_in['internal'],
+        #             off_state_x['internal'],
         #             [self.off_batch_size, max_seq_len, np.prod(x_int_shape_static[1:])]
         #         )
         #         off_x_internal = [off_x_internal]
@@ -477,9 +488,9 @@ class StackedLstmPolicy(BaseAacPolicy):
         off_x_internal = [off_x_internal]
 
         if 'datetime' in list(self.off_state_in.keys()):
-            x_dt_shape_static = self.off_state_in['datetime'].get_shape().as_list()
+            x_dt_shape_static = off_state_x['datetime'].get_shape().as_list()
             off_x_dt = tf.reshape(
-                self.off_state_in['datetime'],
+                off_state_x['datetime'],
                 [self.off_batch_size, max_seq_len, np.prod(x_dt_shape_static[1:])]
             )
             off_x_dt = [off_x_dt]
@@ -608,7 +619,7 @@ class StackedLstmPolicy(BaseAacPolicy):
         rp_x = {}
         for key in self.rp_state_in.keys():
             if 'external' in key:
-                if isinstance(self.rp_state_in[key], dict):  # got dictionary of data streams
+                if isinstance(rp_state_x[key], dict):  # got dictionary of data streams
                     if self.share_encoder_params:
                         layer_name_template = 'encoded_{}_shared'
                     else:
@@ -624,7 +635,7 @@ class StackedLstmPolicy(BaseAacPolicy):
                                 **kwargs
                             )
                         )
-                        for name, stream in self.rp_state_in[key].items()
+                        for name, stream in rp_state_x[key].items()
                     }
                     encoded_mode = tf.concat(
                         list(encoded_streams.values()),
@@ -635,7 +646,7 @@ class StackedLstmPolicy(BaseAacPolicy):
                     # Got single data stream:
                     encoded_mode = tf.layers.flatten(
                         self.state_encoder_class_ref(
-                            x=self.rp_state_in[key],
+                            x=rp_state_x[key],
                             ob_space=self.ob_space.shape,
                             ac_space=self.ac_space,
                             name='encoded_{}'.format(key),
@@ -6,11 +6,12 @@
 # https://arxiv.org/abs/1611.05397
 
 
+import copy
 import numpy as np
 
 from tensorflow.contrib.rnn import LSTMStateTuple
-from btgym.algorithms.math_utils import discount
-from btgym.algorithms.utils import batch_pad
+from btgym.algorithms.math_utils import discount, batch_discounted_returns
+from btgym.algorithms.utils import batch_pad, batch_assemble
 
 
 # Info:
@@ -35,6 +36,167 @@ def make_data_getter(queue):
     return pull_rollout_from_queue
 
 
+def make_buffers(struct, size):
+    """
+    Makes [nested] structure of zero-filled arrays, one per leaf of given experience frame.
+    All tuples, including rnn states, are kept as plain tuples, same way Rollout does.
+
+    Args:
+        struct:     [nested] dictionary of values, template of single experience frame
+        size:       number of rows to allocate
+
+    Returns:
+        [nested] structure of arrays of shape [size, leaf_shape]
+    """
+    if isinstance(struct, dict):
+        return {key: make_buffers(value, size) for key, value in struct.items()}
+
+    elif isinstance(struct, tuple):
+        return tuple([make_buffers(value, size) for value in struct])
+
+    else:
+        value = np.asarray(struct)
+        if value.dtype.kind in 'OUS':
+            return np.empty((size,) + value.shape, dtype=object)
+
+        return np.zeros((size,) + value.shape, dtype=value.dtype)
+
+
+def write_to_buffers(buffers, struct, index):
+    """
+    Writes [nested] structure of values or batched values to buffers made by `make_buffers()`, in place.
+
+    Args:
+        buffers:    [nested] structure of arrays
+        struct:     [nested] structure of values of same layout
+        index:      int, slice or array of row indices to write to
+    """
+    if isinstance(buffers, dict):
+        for key, buffer in buffers.items():
+            write_to_buffers(buffer, struct[key], index)
+
+    elif isinstance(buffers, tuple):
+        for buffer, value in zip(buffers, struct):
+            write_to_buffers(buffer, value, index)
+
+    else:
+        buffers[index] = struct
+
+
+def flatten_buffers(buffers, _path=()):
+    """
+    Lists every leaf array of [nested] structure made by `make_buffers()` along with sequence of keys leading to it.
+    Used for fast row-by-row writes with `write_row()`.
+
+    Returns:
+        list of tuples (keys_path, array)
+    """
+    if isinstance(buffers, dict):
+        return sum([flatten_buffers(buffer, _path + (key,)) for key, buffer in buffers.items()], [])
+
+    elif isinstance(buffers, tuple):
+        return sum([flatten_buffers(buffer, _path + (i,)) for i, buffer in enumerate(buffers)], [])
+
+    else:
+        return [(_path, buffers)]
+
+
+def write_row(leaves, struct, index):
+    """
+    Writes [nested] structure of values to single row of flattened buffers, in place.
+
+    Args:
+        leaves:     list of (keys_path, array) as returned by `flatten_buffers()`
+        struct:     [nested] structure of values
+        index:      int, row to write to
+    """
+    for path, buffer in leaves:
+        value = struct
+        for key in path:
+            value = value[key]
+        buffer[index] = value
+
+
+def select_from_struct(struct, index):
+    """
+    Indexes every leaf of [nested] structure of arrays.
+
+    Args:
+        struct:     [nested] structure of arrays
+        index:      int, slice or array of indices
+
+    Returns:
+        [nested] structure of same layout
+    """
+    if isinstance(struct, dict):
+        return {key: select_from_struct(value, index) for key, value in struct.items()}
+
+    elif isinstance(struct, tuple):
+        return tuple([select_from_struct(value, index) for value in struct])
+
+    else:
+        return struct[index]
+
+
+def process_rollouts(rollouts, gamma, gae_lambda=1.0, size=None, time_flat=False):
+    """
+    Processes list of rollouts into single batch, same as stacking results of Rollout.process() does,
+    but computes returns and advantages for all rollouts by single batch_discounted_returns() call.
+
+    Args:
+        rollouts:       list of Rollout or ColumnarRollout instances
+        gamma:          discount factor
+        gae_lambda:     GAE lambda
+        size:           if given and time_flat=False, pads every rollout with zeroes along `time' dim. to exact 'size'.
+        time_flat:      reduce time dimension to 1 step by stacking all experiences along batch dimension.
+
+    Returns:
+        batch as [nested] dictionary of np.arrays, tuples and LSTMStateTuples.
+    """
+    if len(rollouts) == 1:
+        # Nothing to batch, per-rollout discount() is cheaper:
+        return batch_assemble(
+            [rollouts[0].process(gamma, gae_lambda, size=None, time_flat=time_flat)],
+            to_size=None if time_flat or size is None else max(size, len(rollouts[0]['reward'])),
+        )
+
+    lengths = np.asarray([len(rollout['reward']) for rollout in rollouts])
+    max_time = lengths.max() if size is None or time_flat else max(lengths.max(), size)
+    rewards = np.zeros((len(rollouts), max_time))
+    values = np.zeros((len(rollouts), max_time))
+    bootstrap_values = np.zeros(len(rollouts))
+
+    for i, rollout in enumerate(rollouts):
+        rewards[i, :lengths[i]] = np.reshape(rollout['reward'], (lengths[i], -1))[:, 0]
+        values[i, :lengths[i]] = np.reshape(rollout['value'], (lengths[i], -1))[:, 0]
+        bootstrap_values[i] = rollout['r'][-1][0]  # bootstrapped V_next or 0 if terminal
+
+    returns, advantages = batch_discounted_returns(
+        rewards,
+        values,
+        bootstrap_values,
+        gamma=gamma,
+        gae_lambda=gae_lambda,
+        time_steps=lengths,
+    )
+    batch = batch_assemble(
+        [rollout.process(gamma, gae_lambda, size=None, time_flat=time_flat, _returns=False) for rollout in rollouts],
+        to_size=None if time_flat else max_time,
+    )
+    if time_flat:
+        # Rows are stacked back to back:
+        valid = np.arange(max_time)[None, :] < lengths[:, None]
+        batch['r'] = returns[valid]
+        batch['advantage'] = advantages[valid]
+
+    else:
+        # Every row padded to `max_time`, padded entries are zeroes:
+        batch['r'] = returns.reshape(-1)
+        batch['advantage'] = advantages.reshape(-1)
+
+    return batch
+
+
 class Rollout(dict):
     """
     Experience rollout as [nested] dictionary of lists of ndarrays, tuples and rnn states.
@@ -102,7 +264,7 @@ class Rollout(dict):
         for frame in sample:
             self.add(frame)
 
-    def process(self, gamma, gae_lambda=1.0, size=None, time_flat=False):
+    def process(self, gamma, gae_lambda=1.0, size=None, time_flat=False, _returns=True):
         """
         Converts single-trajectory rollout of experiences to dictionary of ready-to-feed arrays.
         Computes rollout returns and the advantages.
@@ -113,6 +275,7 @@ class Rollout(dict):
             gae_lambda:     GAE lambda
             size:           if given and time_flat=False, pads outputs with zeroes along `time' dim. to exact 'size'.
             time_flat:      reduce time dimension to 1 step by stacking all experiences along batch dimension.
+            _returns:       if False, leaves `r` and `advantage` entries zero, used by process_rollouts().
 
         Returns:
             batch as [nested] dictionary of np.arrays, tuples and LSTMStateTuples. of size:
@@ -137,17 +300,23 @@ class Rollout(dict):
         #print('batch_context:')
         #self._check_it(batch['context'])
 
-        # Total accumulated empirical return:
-        rewards = np.asarray(self['reward'])
-        rollout_r = self['r'][-1][0]  # bootstrapped V_next or 0 if terminal
-        vpred_t = np.asarray(self['value'] + [rollout_r])
-        rewards_plus_v = np.asarray(self['reward'] + [rollout_r])
-        batch['r'] = discount(rewards_plus_v, gamma)[:-1]
+        if _returns:
+            # Total accumulated empirical return:
+            rewards = np.asarray(self['reward'])
+            rollout_r = self['r'][-1][0]  # bootstrapped V_next or 0 if terminal
+            vpred_t = np.asarray(self['value'] + [rollout_r])
+            rewards_plus_v = np.asarray(self['reward'] + [rollout_r])
+            batch['r'] = discount(rewards_plus_v, gamma)[:-1]
+
+            # This formula for the advantage is (16) from "Generalized Advantage Estimation" paper:
+            # https://arxiv.org/abs/1506.02438
+            delta_t = rewards + gamma * vpred_t[1:] - vpred_t[:-1]
+            batch['advantage'] = discount(delta_t, gamma * gae_lambda)
 
-        # This formula for the advantage is (16) from "Generalized Advantage Estimation" paper:
-        # https://arxiv.org/abs/1506.02438
-        delta_t = rewards + gamma * vpred_t[1:] - vpred_t[:-1]
-        batch['advantage'] = discount(delta_t, gamma * gae_lambda)
+        else:
+            # Placeholders to be filled by process_rollouts():
+            batch['r'] = np.zeros(len(self['reward']))
+            batch['advantage'] = np.zeros(len(self['reward']))
 
         # Shape it out:
         if time_flat:
@@ -294,3 +463,175 @@ class Rollout(dict):
                 print('length: {}, type: {}, shape of element: {}\n'.format(len(_struct), type(_struct[0]), _struct[0].shape))
             except:
                 print('length: {}, type: {}\n'.format(len(_struct), type(_struct[0])))
+
+
+class ColumnarRollout(Rollout):
+    """
+    Experience rollout as [nested] dictionary of preallocated arrays.
+
+    Arrays of `size` rows are allocated once, on first experience added, and every next experience is written
+    in place; rollout entries are views of filled rows. Processed batch holds views of same arrays,
+    with no padding copies made if rollout is shorter than `size`. Grows on demand.
+    """
+
+    def __init__(self, size):
+        """
+
+        Args:
+            size:   int, expected rollout length, usually `rollout_length`
+        """
+        super(ColumnarRollout, self).__init__()
+        self.capacity = max(int(size), 1)
+        self.buffers = None
+        self._leaves = None
+        self._views_size = 0
+
+    def _update_views(self):
+        """
+        Refreshes rollout entries to be views of filled rows, if rollout has changed since.
+        """
+        if self._views_size != self.size:
+            self._views_size = self.size
+            self.update(select_from_struct(self.buffers, slice(0, self.size)))
+
+    def __iter__(self):
+        self._update_views()
+        return super(ColumnarRollout, self).__iter__()
+
+    def __getitem__(self, key):
+        self._update_views()
+        return super(ColumnarRollout, self).__getitem__(key)
+
+    def get(self, key, default=None):
+        self._update_views()
+        return super(ColumnarRollout, self).get(key, default)
+
+    def items(self):
+        self._update_views()
+        return super(ColumnarRollout, self).items()
+
+    def values(self):
+        self._update_views()
+        return super(ColumnarRollout, self).values()
+
+    def add(self, values, _struct=None):
+        """
+        Adds single experience frame to rollout.
+
+        Args:
+            values:    [nested] dictionary of values.
+        """
+        if self.buffers is None:
+            self.buffers = make_buffers(values, self.capacity)
+            self._leaves = flatten_buffers(self.buffers)
+            self.update(select_from_struct(self.buffers, slice(0, 0)))
+
+        elif self.size == self.capacity:
+            grown = make_buffers(self.get_frame(0), 2 * self.capacity)
+            write_to_buffers(grown, self.buffers, slice(0, self.capacity))
+            self.buffers = grown
+            self._leaves = flatten_buffers(self.buffers)
+            self.capacity *= 2
+
+        write_row(self._leaves, values, self.size)
+        self.size += 1
+
+    def pop_frame(self, idx, _struct=None):
+        """
+        Pops single experience from rollout.
+
+        Args:
+            idx:    experience position
+
+        Returns:
+            frame as [nested] dictionary
+        """
+        idx = range(self.size)[idx]
+        frame = copy.deepcopy(self.get_frame(idx))
+        # Shift following experiences and zero-out vacant row:
+        write_to_buffers(
+            self.buffers,
+            select_from_struct(self.buffers, slice(idx + 1, self.size)),
+            slice(idx, self.size - 1)
+        )
+        write_to_buffers(self.buffers, make_buffers(frame, 1), slice(self.size - 1, self.size))
+        self.size -= 1
+
+        return frame
+
+    def _pad_one_hot(self, size):
+        """
+        Sets unfilled rows of one-hot encoded entries to zero-category, as batch_pad() does.
+        """
+        for key in ['action', 'last_action_reward']:
+            if key in self.buffers and isinstance(self.buffers[key], np.ndarray):
+                self.buffers[key][self.size:size, 0, ...] = 1
+
+    def process(self, gamma, gae_lambda=1.0, size=None, time_flat=False, _returns=True):
+        """
+        Converts single-trajectory rollout of experiences to dictionary of ready-to-feed arrays.
+        Computes rollout returns and the advantages.
+        Pads with zeroes to desired length, if size arg is given.
+
+        Args:
+            gamma:          discount factor
+            gae_lambda:     GAE lambda
+            size:           if given and time_flat=False, pads outputs with zeroes along `time' dim. to exact 'size'.
+            time_flat:      reduce time dimension to 1 step by stacking all experiences along batch dimension.
+            _returns:       if False, leaves `r` and `advantage` entries zero, used by process_rollouts().
+
+        Returns:
+            batch as [nested] dictionary of np.arrays, tuples and LSTMStateTuples, same as Rollout.process() does;
+            entries are views of rollout arrays.
+        """
+        length = self.size
+        if size is not None and not time_flat and length != size and size <= self.capacity:
+            # Unfilled rows are zeroes already:
+            self._pad_one_hot(size)
+            rows = size
+
+        else:
+            rows = length
+
+        batch = select_from_struct(
+            {key: self.buffers[key] for key in self.buffers.keys() - {'context', 'reward', 'r', 'value', 'position'}},
+            slice(0, rows)
+        )
+        if time_flat:
+            batch['context'] = select_from_struct(self['context'], (slice(None), 0))  # LSTM state for every frame
+
+        else:
+            batch['context'] = self.get_frame(0)['context']  # just get rollout initial LSTM state
+
+        r = np.zeros(rows)
+        advantage = np.zeros(rows)
+        if _returns:
+            # Total accumulated empirical return:
+            rewards = np.reshape(self['reward'], (length, -1))[:, 0]
+            rollout_r = self['r'][-1][0]  # bootstrapped V_next or 0 if terminal
+            vpred_t = np.append(np.reshape(self['value'], (length, -1))[:, 0], rollout_r)
+            rewards_plus_v = np.append(rewards, rollout_r)
+            r[:length] = discount(rewards_plus_v, gamma)[:-1]
+
+            # This formula for the advantage is (16) from "Generalized Advantage Estimation" paper:
+            # https://arxiv.org/abs/1506.02438
+            delta_t = rewards + gamma * vpred_t[1:] - vpred_t[:-1]
+            advantage[:length] = discount(delta_t, gamma * gae_lambda)
+
+        batch['r'] = r
+        batch['advantage'] = advantage
+
+        # Shape it out:
+        if time_flat:
+            batch['batch_size'] = length  # time length turned batch size
+            batch['time_steps'] = np.ones(batch['batch_size'])
+
+        else:
+            batch['time_steps'] = length  # real non-padded time length
+            batch['batch_size'] = 1  # want rollout as a trajectory
+
+        if size is not None and not time_flat and rows != size:
+            # Rollout has grown beyond expected size:
+            batch = batch_pad(batch, to_size=size)
+
+        return batch
@@ -1,6 +1,6 @@
 import numpy as np
 
-from btgym.algorithms.rollout import Rollout
+from btgym.algorithms.rollout import ColumnarRollout
 from btgym.algorithms.memory import _DummyMemory
 
 
@@ -17,6 +17,7 @@ def BaseEnvRunnerFn(
     ep_summary,
     memory_config,
     log,
+    memory=None,
     **kwargs
 ):
     """
@@ -36,16 +37,18 @@ def BaseEnvRunnerFn(
         ep_summary:             dict of tf.summary op and placeholders
         memory_config:          replay memory configuration dictionary
         log:                    logbook logger
+        memory:                 replay memory instance to fill, made from `memory_config` if not given
 
     Yelds:
         collected data as dictionary of on_policy, off_policy rollouts and episode statistics.
     """
     try:
-        if memory_config is not None:
-            memory = memory_config['class_ref'](**memory_config['kwargs'])
+        if memory is None:
+            if memory_config is not None:
+                memory = memory_config['class_ref'](**memory_config['kwargs'])
 
-        else:
-            memory = _DummyMemory()
+            else:
+                memory = _DummyMemory()
 
         if not atari_test:
             # Pass sample config to environment:
@@ -74,7 +77,7 @@ def BaseEnvRunnerFn(
 
         while True:
             terminal_end = False
-            rollout = Rollout()
+            rollout = ColumnarRollout(rollout_length)
 
             action, _, value_, context = policy.act(
                 last_state,
@@ -0,0 +1,277 @@
+import numpy as np
+
+from btgym.algorithms.rollout import ColumnarRollout
+from btgym.algorithms.memory import _DummyMemory
+
+
+def BatchEnvRunnerFn(
+    sess,
+    env,
+    policy,
+    task,
+    rollout_length,
+    summary_writer,
+    episode_summary_freq,
+    env_render_freq,
+    atari_test,
+    ep_summary,
+    memory_config,
+    log,
+    memory=None,
+    **kwargs
+):
+    """
+    Runtime logic of the thread runner driving several environments in lock-step.
+    Same as BaseEnvRunnerFn does for single environment, but policy is evaluated for all environments
+    by single `policy.act_batch()` call per step. Every environment keeps its own episode, rollout
+    and replay memory; environment finished its rollout (either by reaching `rollout_length`
+    or by episode termination) waits for others to finish theirs.
+
+    Args:
+        env:                    list of environment instances
+        policy:                 policy instance
+        task:                   int
+        rollout_length:         int
+        episode_summary_freq:   int
+        env_render_freq:        int
+        atari_test:             bool, Atari or BTGyn
+        ep_summary:             dict of tf.summary op and placeholders
+        memory_config:          replay memory configuration dictionary
+        log:                    logbook logger
+        memory:                 list of replay memory instances to fill, one per environment,
+                                made from `memory_config` if not given
+
+    Yelds:
+        list of collected data dictionaries, one per environment, each same as BaseEnvRunnerFn yields.
+    """
+    try:
+        env_list = env
+        num_envs = len(env_list)
+
+        def reset(env):
+            if not atari_test:
+                # Pass sample config to environment:
+                return env.reset(**policy.get_sample_config())
+
+            else:
+                return env.reset()
+
+        def is_test_experience(experience):
+            try:
+                # Was it test (`type` in metadata is not zero)?
+                return bool(not atari_test and experience['state']['metadata']['type'])
+
+            except KeyError:
+                return False
+
+        if memory is None:
+            memory = []
+            for env in env_list:
+                if memory_config is not None:
+                    memory.append(memory_config['class_ref'](**memory_config['kwargs']))
+
+                else:
+                    memory.append(_DummyMemory())
+
+        runner = []
+        for env in env_list:
+            last_state = reset(env)
+            runner.append(
+                dict(
+                    last_state=last_state,
+                    last_context=policy.get_initial_features(state=last_state),
+                    last_action=env.action_space.encode(env.get_initial_action()),
+                    last_reward=np.asarray(0.0),
+                    length=0,
+                    local_episode=0,
+                    reward_sum=0,
+                    # Summary averages accumulators:
+                    total_r=[],
+                    cpu_time=[],
+                    final_value=[],
+                    total_steps=[],
+                    total_steps_atari=[],
+                    ep_stat=None,
+                    test_ep_stat=None,
+                    render_stat=None,
+                )
+            )
+
+        while True:
+            rollout = [ColumnarRollout(rollout_length) for env in env_list]
+            last_experience = [None] * num_envs
+            terminal_end = [False] * num_envs
+
+            for roll_step in range(rollout_length):
+                active = [i for i in range(num_envs) if not terminal_end[i]]
+                if len(active) == 0:
+                    break
+
+                actions, _, values, contexts = policy.act_batch(
+                    [runner[i]['last_state'] for i in active],
+                    [runner[i]['last_context'] for i in active],
+                    [runner[i]['last_action'] for i in active],
+                    [runner[i]['last_reward'] for i in active],
+                )
+
+                for action, value_, context, i in zip(actions, values, contexts, active):
+                    env = env_list[i]
+                    r = runner[i]
+                    last_state = r['last_state']
+                    state, reward, terminal, info = env.step(action['environment'])
+
+                    # Partially collect next experience:
+                    experience = {
+                        'position': {'episode': r['local_episode'], 'step': r['length']},
+                        'state': last_state,
+                        'action': action['one_hot'],
+                        'reward': reward,
+                        'value': value_,
+                        'terminal': terminal,
+                        'context': r['last_context'],
+                        'last_action': r['last_action'],
+                        'last_reward': r['last_reward'],
+                    }
+                    # Execute user-defined callbacks to policy, if any:
+                    for key, callback in policy.callback.items():
+                        experience[key] = callback(
+                            sess=sess,
+                            env=env,
+                            policy=policy,
+                            task=task,
+                            action=action,
+                            state=state,
+                            last_state=last_state,
+                            reward=reward,
+                            terminal=terminal,
+                            info=info,
+                            context=context,
+                            experience=experience,
+                        )
+
+                    if last_experience[i] is not None:
+                        # Bootstrap to complete and push previous experience:
+                        last_experience[i]['r'] = value_
+                        rollout[i].add(last_experience[i])
+                        memory[i].add(last_experience[i])
+
+                    # Housekeeping:
+                    r['length'] += 1
+                    r['reward_sum'] += reward
+                    r['last_state'] = state
+                    r['last_context'] = context
+                    r['last_action'] = action['encoded']
+                    r['last_reward'] = reward
+                    last_experience[i] = experience
+
+                    if terminal:
+                        # Finished episode within last taken step:
+                        terminal_end[i] = True
+                        # Accumulate values for averaging:
+                        r['total_r'] += [r['reward_sum']]
+                        r['total_steps_atari'] += [r['length']]
+                        if not atari_test:
+                            episode_stat = env.get_stat()  # get episode statistic
+                            last_i = info[-1]  # pull most recent info
+                            r['cpu_time'] += [episode_stat['runtime'].total_seconds()]
+                            r['final_value'] += [last_i['broker_value']]
+                            r['total_steps'] += [episode_stat['length']]
+
+                        # Episode statistics:
+                        if is_test_experience({'state': state}):
+                            r['test_ep_stat'] = dict(
+                                total_r=r['total_r'][-1],
+                                final_value=r['final_value'][-1],
+                                steps=r['total_steps'][-1]
+                            )
+                        else:
+                            if r['local_episode'] % episode_summary_freq == 0:
+                                if not atari_test:
+                                    # BTgym:
+                                    r['ep_stat'] = dict(
+                                        total_r=np.average(r['total_r']),
+                                        cpu_time=np.average(r['cpu_time']),
+                                        final_value=np.average(r['final_value']),
+                                        steps=np.average(r['total_steps'])
+                                    )
+                                else:
+                                    # Atari:
+                                    r['ep_stat'] = dict(
+                                        total_r=np.average(r['total_r']),
+                                        steps=np.average(r['total_steps_atari'])
+                                    )
+                                for key in ['total_r', 'cpu_time', 'final_value', 'total_steps', 'total_steps_atari']:
+                                    r[key] = []
+
+                        if task == 0 and i == 0 and r['local_episode'] % env_render_freq == 0:
+                            if not atari_test:
+                                # Render environment (chief worker first env only, and not in atari_test mode):
+                                r['render_stat'] = {
+                                    mode: env.render(mode)[None, :] for mode in env.render_modes
+                                }
+                            else:
+                                # Atari:
+                                r['render_stat'] = dict(render_atari=state['external'][None, :] * 255)
+
+                        # New episode:
+                        r['last_state'] = reset(env)
+                        r['last_context'] = policy.get_initial_features(state=r['last_state'], context=context)
+                        r['length'] = 0
+                        r['reward_sum'] = 0
+                        r['last_action'] = env.action_space.encode(env.get_initial_action())
+                        r['last_reward'] = np.asarray(0.0)
+
+                        # Increment global and local episode counts:
+                        sess.run(policy.inc_episode)
+                        r['local_episode'] += 1
+
+            # After rolling `rollout_length` or less (if got `terminal`)
+            # complete final experiences of the rollouts:
+            for i in range(num_envs):
+                r = runner[i]
+                if not terminal_end[i]:
+                    # Bootstrap:
+                    last_experience[i]['r'] = np.asarray(
+                        [
+                            policy.get_value(
+                                r['last_state'],
+                                r['last_context'],
+                                r['last_action'][None, ...],
+                                r['last_reward'][None, ...]
+                            )
+                        ]
+                    )
+
+                else:
+                    last_experience[i]['r'] = np.asarray([0.0])
+
+                rollout[i].add(last_experience[i])
+
+                # Only training rollouts are added to replay memory:
+                if not is_test_experience(last_experience[i]):
+                    memory[i].add(last_experience[i])
+
+            # Once we have enough experience and memories can be sampled, yield it,
+            # and have the ThreadRunner place it on a queue:
+            if all([m.is_full() for m in memory]):
+                data = []
+                for i in range(num_envs):
+                    data.append(
+                        dict(
+                            on_policy=rollout[i],
+                            off_policy=memory[i].sample_uniform(sequence_size=rollout_length),
+                            off_policy_rp=memory[i].sample_priority(exact_size=True),
+                            ep_summary=runner[i]['ep_stat'],
+                            test_ep_summary=runner[i]['test_ep_stat'],
+                            render_summary=runner[i]['render_stat'],
+                        )
+                    )
+                    runner[i]['ep_stat'] = None
+                    runner[i]['test_ep_stat'] = None
+                    runner[i]['render_stat'] = None
+
+                yield data
+
+    except Exception as e:
+        log.exception(e)
+        raise e
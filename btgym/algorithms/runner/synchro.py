@@ -2,11 +2,12 @@ import numpy as np
 from logbook import Logger, StreamHandler, WARNING
 import sys
 import time
+import copy
 
-from btgym.algorithms.rollout import Rollout
+from btgym.algorithms.rollout import ColumnarRollout
 from btgym.algorithms.memory import _DummyMemory
 from btgym.algorithms.math_utils import softmax
-from btgym.algorithms.utils import is_subdict
+from btgym.algorithms.utils import is_subdict, batch_assemble
 
 
 class BaseSynchroRunner():
@@ -158,6 +159,11 @@ class BaseSynchroRunner():
         # Episode accumulators:
         self.ep_accum = None
 
+        # Current rollout:
+        self.rollout = None
+        self.current_rollout_length = rollout_length
+        self.rollout_summaries = None
+
         self.log.debug('__init__() done.')
 
     def sleep(self):
@@ -310,6 +316,18 @@ class BaseSynchroRunner():
             reward[None, ...],
             self.is_test and self.test_deterministic,  # deterministic actions for test episode
         )
+        return self.make_experience(policy, state, context, action, reward, next_action, logits, value, next_context)
+
+    def make_experience(self, policy, state, context, action, reward, next_action, logits, value, next_context):
+        """
+        Makes environment step given policy output and composes single experience (possibly terminal).
+
+        Returns:
+            incomplete experience as dictionary (misses bootstrapped R value),
+            next_state,
+            next, policy RNN context
+            action_reward
+        """
         self.ep_accum['logits'].append(logits)
         self.ep_accum['value'].append(value)
         self.ep_accum['context'].append(next_context)
@@ -454,16 +472,65 @@ class BaseSynchroRunner():
         if policy is None:
             policy = self.policy
 
+        self.begin_rollout(
+            policy=policy,
+            policy_sync_op=policy_sync_op,
+            init_context=init_context,
+            data_sample_config=data_sample_config,
+            rollout_length=rollout_length,
+            force_new_episode=force_new_episode
+        )
+
+        # Collect single rollout:
+        while self.is_collecting():
+            if self.pre_experience['terminal']:
+                # Episode has been just finished,
+                # need to complete and push last experience and update all episode summaries
+                self.finish_episode()
+
+            else:
+                experience, self.state, self.context, self.last_action, self.last_reward = self.get_experience(
+                    policy=policy,
+                    policy_sync_op=policy_sync_op,
+                    state=self.state,
+                    context=self.context,
+                    action=self.last_action,
+                    reward=self.last_reward
+                )
+                # Complete previous experience by bootstrapping V from next one:
+                self.pre_experience['r'] = experience['value']
+                self.push_experience(experience)
+
+        return self.end_rollout(policy)
+
+    def begin_rollout(
+            self,
+            policy,
+            policy_sync_op=None,
+            init_context=None,
+            data_sample_config=None,
+            rollout_length=None,
+            force_new_episode=False
+    ):
+        """
+        Prepares to collect new rollout, starts new episode if needed.
+
+        Args:
+            see get_data()
+        """
         if init_context is None:
             init_context = self.context
 
         if rollout_length is None:
             rollout_length = self.rollout_length
 
-        rollout = Rollout()
-        train_ep_summary = None
-        test_ep_summary = None
-        render_ep_summary = None
+        self.rollout = ColumnarRollout(rollout_length)
+        self.current_rollout_length = rollout_length
+        self.rollout_summaries = dict(
+            ep_summary=None,
+            test_ep_summary=None,
+            render_summary=None,
+        )
 
         if self.terminal_end or force_new_episode:
             # Start new episode:
@@ -481,55 +548,63 @@ class BaseSynchroRunner():
 
         # NOTE: self.terminal_end is set actual via get_init_experience() method
 
-        # Collect single rollout:
-        while rollout.size < rollout_length - 1 and not self.terminal_end:
-            if self.pre_experience['terminal']:
-                # Episode has been just finished,
-                # need to complete and push last experience and update all episode summaries
-                self.pre_experience['r'] = np.asarray([0.0])
-                experience = None
-                self.state = None
-                self.context = None
-                self.last_action = None
-                self.last_reward = None
-
-                self.terminal_end = True
-                train_ep_summary = self.get_train_stat(self.is_test)
-                test_ep_summary = self.get_test_stat(self.is_test)
-                render_ep_summary = self.get_ep_render(self.is_test)
-
-                # self.log.debug(
-                #     'terminal, train_summary: {}, test_summary: {}'.format(train_ep_summary, test_ep_summary)
-                # )
+    def is_collecting(self):
+        """
+        Returns:
+            True if current rollout is yet to be continued.
+        """
+        return self.rollout.size < self.current_rollout_length - 1 and not self.terminal_end
 
-            else:
-                experience, self.state, self.context, self.last_action, self.last_reward = self.get_experience(
-                    policy=policy,
-                    policy_sync_op=policy_sync_op,
-                    state=self.state,
-                    context=self.context,
-                    action=self.last_action,
-                    reward=self.last_reward
-                )
-                # Complete previous experience by bootstrapping V from next one:
-                self.pre_experience['r'] = experience['value']
+    def push_experience(self, experience):
+        """
+        Pushes completed previous experience to rollout and replay memory and moves one step forward.
 
-            # Push:
-            rollout.add(self.pre_experience)
+        Args:
+            experience:     next incomplete experience or None
+        """
+        self.rollout.add(self.pre_experience)
 
-            # Where are you coming from?
-            # self.is_test is updated by self.get_init_experience()
+        # Where are you coming from?
+        # self.is_test is updated by self.get_init_experience()
 
-            # Only training rollouts are added to replay memory:
-            if not self.is_test:
-                self.memory.add(self.pre_experience)
+        # Only training rollouts are added to replay memory:
+        if not self.is_test:
+            self.memory.add(self.pre_experience)
 
-            self.reward_sum += self.pre_experience['reward']
+        self.reward_sum += self.pre_experience['reward']
 
-            # Move one step froward:
-            self.pre_experience = experience
+        # Move one step froward:
+        self.pre_experience = experience
 
-        # Done collecting rollout, either got termination of episode or not:
+    def finish_episode(self):
+        """
+        Completes and pushes last experience of just finished episode, updates all episode summaries.
+        """
+        self.pre_experience['r'] = np.asarray([0.0])
+        self.state = None
+        self.context = None
+        self.last_action = None
+        self.last_reward = None
+
+        self.terminal_end = True
+        self.rollout_summaries = dict(
+            ep_summary=self.get_train_stat(self.is_test),
+            test_ep_summary=self.get_test_stat(self.is_test),
+            render_summary=self.get_ep_render(self.is_test),
+        )
+
+        # self.log.debug(
+        #     'terminal, train_summary: {}, test_summary: {}'.format(train_ep_summary, test_ep_summary)
+        # )
+        self.push_experience(None)
+
+    def end_rollout(self, policy):
+        """
+        Completes rollout, either got termination of episode or not.
+
+        Returns:
+            data dictionary
+        """
         if not self.terminal_end:
             # Bootstrap:
             self.pre_experience['r'] = np.asarray(
@@ -542,7 +617,7 @@ class BaseSynchroRunner():
                     )
                 ]
             )
-            rollout.add(self.pre_experience)
+            self.rollout.add(self.pre_experience)
             if not self.is_test:
                 self.memory.add(self.pre_experience)
 
@@ -550,15 +625,22 @@ class BaseSynchroRunner():
         # self.log.warning('rollout.size: {}'.format(rollout.size))
         # self.log.warning('rollout.is_test: {}'.format(self.is_test))
 
+        # Replay memory can only be sampled once filled (see .start()):
+        if self.memory.is_full():
+            off_policy = self.memory.sample_uniform(sequence_size=self.current_rollout_length)
+            off_policy_rp = self.memory.sample_priority(exact_size=True)
+
+        else:
+            off_policy = None
+            off_policy_rp = None
+
         data = dict(
-            on_policy=rollout,
+            on_policy=self.rollout,
             terminal=self.terminal_end,
-            off_policy=self.memory.sample_uniform(sequence_size=rollout_length),
-            off_policy_rp=self.memory.sample_priority(exact_size=True),
-            ep_summary=train_ep_summary,
-            test_ep_summary=test_ep_summary,
-            render_summary=render_ep_summary,
+            off_policy=off_policy,
+            off_policy_rp=off_policy_rp,
             is_test=self.is_test,
+            **self.rollout_summaries
         )
         return data
 
@@ -771,3 +853,281 @@ class VerboseSynchroRunner(BaseSynchroRunner):
 
 
 
+
+
+class BatchSynchroRunner():
+    """
+    Synchronous runner driving several environments in lock-step.
+    Every environment is served by its own instance of `BaseSynchroRunner` holding episode state, statistics and
+    replay memory, while policy is evaluated for all environments by single `policy.act_batch()` call per step.
+    Episodes of different environments are started and finished independently.
+
+    Exposes same `get_data()` and `get_batch()` interface as `BaseSynchroRunner` does, except that
+    `get_data()` returns list of data dictionaries, one per environment, and `get_batch()` also returns
+    collected rollouts stacked as single batch.
+    """
+
+    def __init__(self, env, task, runner_class_ref=BaseSynchroRunner, name='batch_synchro', **kwargs):
+        """
+
+        Args:
+            env:                list of BTgym environment instances
+            task:               int, runner task id
+            runner_class_ref:   single environment synchro runner class
+            name:               str, name scope
+            **kwargs:           see BaseSynchroRunner
+        """
+        if not isinstance(env, (list, tuple)):
+            env = [env]
+
+        self.env = env
+        self.task = task
+        self.name = name
+        self.runners = [
+            runner_class_ref(env=env_i, task=task + 0.01 * i, name='{}_{}'.format(name, i), **kwargs)
+            for i, env_i in enumerate(env)
+        ]
+        self.num_envs = len(self.runners)
+        self.policy = self.runners[0].policy
+        self.rollout_length = self.runners[0].rollout_length
+        self.memory_config = self.runners[0].memory_config
+        self.log = self.runners[0].log
+
+        self.sess = None
+        self.summary_writer = None
+
+    @property
+    def context(self):
+        return [runner.context for runner in self.runners]
+
+    def start_runner(self, sess, summary_writer, **kwargs):
+        """
+        Legacy wrapper.
+        """
+        self.start(sess, summary_writer, **kwargs)
+
+    def start(self, sess, summary_writer, init_context=None, data_sample_config=None):
+        """
+        Executes initial sequence; fills initial replay memories if any.
+        """
+        assert self.policy is not None, 'Initial policy not specified'
+        self.sess = sess
+        self.summary_writer = summary_writer
+
+        for runner in self.runners:
+            runner.sess = sess
+            runner.summary_writer = summary_writer
+            runner.pre_experience, runner.state, runner.context, runner.last_action, runner.last_reward = \
+                runner.get_init_experience(
+                    policy=self.policy,
+                    init_context=init_context,
+                    data_sample_config=data_sample_config
+                )
+
+        if self.memory_config is not None:
+            while not all([runner.memory.is_full() for runner in self.runners]):
+                # collect some rollouts to fill memory:
+                _ = self.get_data()
+            self.log.notice('Memory filled')
+        self.log.notice('started collecting data.')
+
+    def _act(self, policy, runners):
+        """
+        Makes single step of every runner given, using single policy call per group of train and test runners.
+        """
+        for deterministic in [False, True]:
+            group = [
+                runner for runner in runners if (runner.is_test and runner.test_deterministic) == deterministic
+            ]
+            if len(group) == 0:
+                continue
+
+            actions, logits, values, contexts = policy.act_batch(
+                [runner.state for runner in group],
+                [runner.context for runner in group],
+                [runner.last_action for runner in group],
+                [runner.last_reward for runner in group],
+                deterministic,
+            )
+            for runner, action, logits_i, value, context in zip(group, actions, logits, values, contexts):
+                experience, runner.state, runner.context, runner.last_action, runner.last_reward = \
+                    runner.make_experience(
+                        policy,
+                        runner.state,
+                        runner.context,
+                        runner.last_action,
+                        runner.last_reward,
+                        action,
+                        logits_i,
+                        value,
+                        context,
+                    )
+                # Complete previous experience by bootstrapping V from next one:
+                runner.pre_experience['r'] = experience['value']
+                runner.push_experience(experience)
+
+    def get_data(
+            self,
+            policy=None,
+            policy_sync_op=None,
+            init_context=None,
+            data_sample_config=None,
+            rollout_length=None,
+            force_new_episode=False
+    ):
+        """
+        Collects single trajectory rollout from every environment and bunch of summaries using specified policy.
+        Updates episodes statistics and replay memories.
+
+        Args:
+            data_sample_config:     configuration dictionary of type `btgym.datafeed.base.EnvResetConfig`
+                                    or list of those, one per environment
+            see BaseSynchroRunner.get_data() for other args
+
+        Returns:
+                list of data dictionaries, one per environment
+        """
+        if policy is None:
+            policy = self.policy
+
+        if rollout_length is None:
+            rollout_length = self.rollout_length
+
+        if not isinstance(data_sample_config, (list, tuple)):
+            data_sample_config = [data_sample_config] * self.num_envs
+
+        # New episodes are started in runners order:
+        for runner, sample_config in zip(self.runners, data_sample_config):
+            runner.begin_rollout(
+                policy=policy,
+                policy_sync_op=policy_sync_op,
+                init_context=init_context,
+                data_sample_config=sample_config,
+                rollout_length=rollout_length,
+                force_new_episode=force_new_episode
+            )
+
+        # Collect rollouts in lock-step:
+        while True:
+            collecting = [runner for runner in self.runners if runner.is_collecting()]
+            if len(collecting) == 0:
+                break
+
+            to_act = []
+            for runner in collecting:
+                if runner.pre_experience['terminal']:
+                    runner.finish_episode()
+
+                else:
+                    to_act.append(runner)
+
+            if len(to_act) > 0:
+                # Update policy once for all environments:
+                if policy_sync_op is not None:
+                    self.sess.run(policy_sync_op)
+
+                self._act(policy, to_act)
+
+        return [runner.end_rollout(policy) for runner in self.runners]
+
+    def get_batch(
+            self,
+            size,
+            policy=None,
+            policy_sync_op=None,
+            require_terminal=True,
+            same_trial=True,
+            init_context=None,
+            data_sample_config=None
+    ):
+        """
+        Collects 'size' or more rollouts under specified policy, `num_envs` rollouts at a time, and returns them
+        both as list and as single batch of [num_envs * num_rounds, rollout_length] shape, ordered by environment,
+        so every `num_rounds` successive rows are consecutive rollouts of same environment.
+
+        With `same_trial=True` trial is sampled once, by first environment, and every other one is pinned to it
+        by resetting with `trial_config['get_new'] = False`; this requires environments to share single
+        data_server (one data_master, others data slaves), as worker environments do.
+
+        Args:
+            see BaseSynchroRunner.get_batch()
+
+        Returns:
+            dict containing:
+            'data' key holding list of data dictionaries, ordered as 'batch' rows;
+            'batch' key holding on-policy rollouts stacked and zero-padded to `rollout_length` along time dim.,
+            every row starting with its initial context, 'time_steps' holding real rollout lengths;
+            'terminal_context' key holding list of terminal output contexts.
+            If 'require_terminal = True, this list is guarantied to hold at least one element.
+        """
+        if same_trial:
+            assert isinstance(data_sample_config, dict),\
+                'get_batch(same_trial=True) expected `data_sample_config` dict., got: {}'.format(data_sample_config)
+            pinned_config = copy.deepcopy(data_sample_config)
+            pinned_config['trial_config']['get_new'] = False
+            sample_config = [data_sample_config] + [pinned_config] * (self.num_envs - 1)
+
+        else:
+            sample_config = data_sample_config
+
+        env_batch = [[] for _ in self.runners]
+        terminal_context = []
+        got_terminal = not require_terminal
+        force_new_episode = True
+        num_rounds = 0
+
+        while not (num_rounds * self.num_envs >= size and got_terminal):
+            round_data = self.get_data(
+                policy=policy,
+                policy_sync_op=policy_sync_op,
+                init_context=init_context,
+                data_sample_config=sample_config,
+                force_new_episode=force_new_episode
+            )
+            if force_new_episode and same_trial:
+                # sample new episodes from same trial only:
+                data_sample_config['trial_config']['get_new'] = False
+                sample_config = data_sample_config
+
+            force_new_episode = False
+            num_rounds += 1
+
+            for runner, rollouts, rollout_data in zip(self.runners, env_batch, round_data):
+                rollouts.append(rollout_data)
+                if rollout_data['terminal']:
+                    terminal_context.append(runner.context)
+                    got_terminal = True
+
+        batch = [rollout_data for rollouts in env_batch for rollout_data in rollouts]
+        data = dict(
+            data=batch,
+            batch=self.stack_rollouts([rollout_data['on_policy'] for rollout_data in batch]),
+            terminal_context=terminal_context,
+        )
+        return data
+
+    def stack_rollouts(self, rollouts):
+        """
+        Stacks raw rollouts along batch dimension, zero-padding every one to `rollout_length` along time dimension.
+
+        Args:
+            rollouts:   list of ColumnarRollout instances
+
+        Returns:
+            dictionary of arrays of [len(rollouts) * rollout_length, ...] shape, 'context' entry holding initial
+            context of every rollout, 'time_steps' entry holding real rollout lengths and 'batch_size' entry.
+        """
+        to_size = max([self.rollout_length] + [len(rollout['reward']) for rollout in rollouts])
+        batch = batch_assemble(
+            [
+                dict(
+                    {key: value for key, value in rollout.items() if key != 'context'},
+                    context=rollout.get_frame(0)['context'],
+                    time_steps=len(rollout['reward']),
+                    batch_size=1,
+                )
+                for rollout in rollouts
+            ],
+            to_size=to_size,
+        )
+        return batch
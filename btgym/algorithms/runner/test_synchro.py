@@ -0,0 +1,153 @@
+import unittest
+import numpy as np
+
+from .synchro import BaseSynchroRunner, BatchSynchroRunner
+
+
+class SharedDataServer:
+    """Stands for data_server shared by all environments: keeps last sampled trial"""
+
+    def __init__(self):
+        self.num_trials = 0
+
+
+class FakeEnv:
+    """Episodes of fixed length from trial of shared data server"""
+
+    def __init__(self, data_server, episode_length):
+        self.data_server = data_server
+        self.episode_length = episode_length
+        self.trial = None
+        self.steps = 0
+
+    def reset(self, **kwargs):
+        if kwargs['trial_config']['get_new'] or self.data_server.num_trials == 0:
+            self.data_server.num_trials += 1
+
+        self.trial = self.data_server.num_trials
+        self.steps = 0
+        return np.asarray([self.trial], dtype=np.float32)
+
+    def step(self, action):
+        self.steps += 1
+        return np.asarray([self.trial], dtype=np.float32), 1.0, self.steps >= self.episode_length, [{}]
+
+
+class FakePolicy:
+
+    def act_batch(self, states, contexts, actions, rewards, deterministic):
+        size = len(states)
+        return [np.asarray([1.0, 0.0])] * size, [None] * size, [0.5] * size, contexts
+
+    def get_value(self, *args):
+        return 0.5
+
+
+class FakeRunner(BaseSynchroRunner):
+    """Does not touch session and environment statistics"""
+
+    def get_init_experience(self, policy, policy_sync_op=None, init_context=None, data_sample_config=None):
+        self.local_episode += 1
+        self.length = 0
+        self.is_test = False
+        state = self.env.reset(**data_sample_config)
+        self.terminal_end = False
+        experience = self.make_experience(
+            policy, state, (np.zeros([1, 2]),), np.zeros(2), np.asarray(0.0), np.asarray([1.0, 0.0]), None, 0.5,
+            (np.zeros([1, 2]),)
+        )
+        self.terminal_end = experience[0]['terminal']
+        return experience
+
+    def make_experience(self, policy, state, context, action, reward, next_action, logits, value, next_context):
+        next_state, next_reward, terminal, _ = self.env.step(next_action)
+        experience = {
+            'position': {'episode': self.local_episode, 'step': self.length},
+            'state': state,
+            'action': next_action,
+            'reward': next_reward,
+            'value': value,
+            'terminal': terminal,
+            'context': tuple([c + self.length for c in context]),
+            'last_action': action,
+            'last_reward': reward,
+            'r': None,
+        }
+        self.length += 1
+        return experience, next_state, next_context, next_action, np.asarray(next_reward)
+
+    def finish_episode(self):
+        self.get_train_stat = self.get_test_stat = self.get_ep_render = lambda is_test: None
+        super(FakeRunner, self).finish_episode()
+
+
+def make_runner(num_envs, rollout_length, episode_length):
+    data_server = SharedDataServer()
+    runner = BatchSynchroRunner(
+        env=[FakeEnv(data_server, episode_length) for _ in range(num_envs)],
+        task=0,
+        runner_class_ref=FakeRunner,
+        policy=FakePolicy(),
+        rollout_length=rollout_length,
+        episode_summary_freq=1,
+        env_render_freq=1,
+        ep_summary=None,
+    )
+    runner.sess = None
+    return runner, data_server
+
+
+def sample_config(get_new=True):
+    return dict(episode_config=dict(get_new=True), trial_config=dict(get_new=get_new))
+
+
+class BatchSynchroRunnerTest(unittest.TestCase):
+    """Testing lock-step batch collection"""
+
+    def test_same_trial(self):
+        runner, data_server = make_runner(num_envs=3, rollout_length=4, episode_length=6)
+        config = sample_config()
+        batch = runner.get_batch(size=5, same_trial=True, data_sample_config=config)
+        self.assertEqual(data_server.num_trials, 1)
+        self.assertEqual([env.trial for env in runner.env], [1, 1, 1])
+        self.assertFalse(config['trial_config']['get_new'])
+
+        # Next batch samples new trial again:
+        batch = runner.get_batch(size=5, same_trial=True, data_sample_config=sample_config())
+        self.assertEqual(data_server.num_trials, 2)
+        self.assertEqual([env.trial for env in runner.env], [2, 2, 2])
+        np.testing.assert_array_equal(np.unique(batch['batch']['state']), [0, 2])
+
+    def test_new_trial_per_env(self):
+        runner, data_server = make_runner(num_envs=3, rollout_length=4, episode_length=6)
+        runner.get_batch(size=3, same_trial=False, data_sample_config=sample_config())
+        self.assertEqual([env.trial for env in runner.env], [1, 2, 3])
+
+    def test_batch(self):
+        num_envs, rollout_length = 2, 4
+        runner, _ = make_runner(num_envs, rollout_length, episode_length=5)
+        batch = runner.get_batch(size=4, require_terminal=True, same_trial=True, data_sample_config=sample_config())
+        # Two rounds of 4 and 2 steps, rows ordered by environment:
+        self.assertEqual(len(batch['data']), 4)
+        self.assertEqual(len(batch['terminal_context']), num_envs)
+        self.assertEqual([data['terminal'] for data in batch['data']], [False, True, False, True])
+        self.assertEqual(batch['batch']['batch_size'], 4)
+        np.testing.assert_array_equal(batch['batch']['time_steps'], [4, 2, 4, 2])
+        self.assertEqual(batch['batch']['reward'].shape, (4 * rollout_length,))
+        self.assertEqual(batch['batch']['state'].shape, (4 * rollout_length, 1))
+        self.assertEqual(batch['batch']['context'][0].shape, (4, 2))
+
+        for i, data in enumerate(batch['data']):
+            rows = slice(i * rollout_length, (i + 1) * rollout_length)
+            length = len(data['on_policy']['reward'])
+            np.testing.assert_array_equal(batch['batch']['reward'][rows][:length], data['on_policy']['reward'])
+            np.testing.assert_array_equal(batch['batch']['reward'][rows][length:], 0)
+            np.testing.assert_array_equal(
+                batch['batch']['position']['step'][rows][:length],
+                data['on_policy']['position']['step']
+            )
+            np.testing.assert_array_equal(batch['batch']['context'][0][i], data['on_policy']['context'][0][0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
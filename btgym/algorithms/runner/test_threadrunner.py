@@ -0,0 +1,246 @@
+import time
+import unittest
+import threading
+import contextlib
+
+from .threadrunner import RunnerThread, PrefetchThread, SummaryThread
+
+
+class ScriptedEnv:
+    """Stands for environment failed by supervisor verdict after given number of steps"""
+
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.steps = 0
+        self.num_recovered = 0
+        self.abort_request = threading.Event()
+
+    @property
+    def is_healthy(self):
+        return not self.abort_request.is_set()
+
+    def step(self):
+        self.steps += 1
+        if self.steps == self.fail_after:
+            # Supervisor aborts pending request:
+            self.abort_request.set()
+            raise ConnectionError('.step(): server unreachable with status: <receive_aborted>.')
+
+        return self.steps
+
+    def recover(self):
+        self.num_recovered += 1
+        self.abort_request.clear()
+
+
+class RecordingMemory:
+    """Keeps steps added and counts episodes ended"""
+
+    def __init__(self):
+        self.steps = []
+        self.num_ended = 0
+
+    def add(self, step):
+        self.steps.append(step)
+
+    def end_episode(self):
+        self.num_ended += 1
+
+
+def runner_fn(sess, env, *args, memory=None):
+    while True:
+        step = env.step()
+        memory.add(step)
+        yield step
+
+
+def make_runner(env):
+    runner = RunnerThread(
+        env=env,
+        policy=None,
+        task=0,
+        rollout_length=1,
+        episode_summary_freq=1,
+        env_render_freq=1,
+        test=False,
+        ep_summary=None,
+        runner_fn_ref=runner_fn,
+        memory_config=dict(class_ref=RecordingMemory, kwargs={}),
+    )
+    runner.sess = None
+    return runner
+
+
+class RunnerThreadTest(unittest.TestCase):
+    """Testing thread runner recovery"""
+
+    def test_recovers_env_aborted_mid_rollout(self):
+        env = ScriptedEnv(fail_after=3)
+        runner = make_runner(env)
+        thread = threading.Thread(target=runner._run, daemon=True)
+        thread.start()
+        data = [runner.queue.get(timeout=5) for _ in range(4)]
+
+        self.assertEqual(data, [1, 2, 4, 5])
+        self.assertEqual(env.num_recovered, 1)
+        self.assertTrue(env.is_healthy)
+
+        # Restarted provider keeps filling same memory, interrupted episode gets ended:
+        self.assertEqual(runner.memory.steps[:4], [1, 2, 4, 5])
+        self.assertEqual(runner.memory.num_ended, 1)
+
+    def test_raises_if_env_is_healthy(self):
+        env = ScriptedEnv(fail_after=None)
+        runner = make_runner(env)
+
+        def failing_fn(sess, env, *args, **kwargs):
+            yield env.step()
+            raise ValueError('policy failure')
+
+        runner.runner_fn_ref = failing_fn
+        with self.assertRaises(ValueError):
+            runner._run()
+
+        self.assertEqual(env.num_recovered, 0)
+
+
+
+class FakeSession:
+
+    def as_default(self):
+        return contextlib.nullcontext()
+
+
+class PrefetchThreadTest(unittest.TestCase):
+    """Testing background batch preparation"""
+
+    def make_thread(self, batch_fn, queue_size=2):
+        thread = PrefetchThread(batch_fn, queue_size=queue_size)
+        thread.start_prefetch(FakeSession())
+        return thread
+
+    def test_items_in_order(self):
+        counter = iter(range(100))
+        thread = self.make_thread(lambda sess: next(counter))
+        self.assertEqual([thread.get() for _ in range(5)], list(range(5)))
+        thread.stop()
+        self.assertFalse(thread.is_alive())
+
+    def test_exception_reraised(self):
+        def batch_fn(sess, counter=iter(range(2))):
+            try:
+                return next(counter)
+
+            except StopIteration:
+                raise ValueError('runner failed')
+
+        thread = self.make_thread(batch_fn)
+        # Items prepared before failure come first:
+        self.assertEqual([thread.get(), thread.get()], [0, 1])
+        with self.assertRaises(ValueError):
+            thread.get()
+
+    def test_waits_for_slow_consumer(self):
+        counter = iter(range(100))
+        thread = self.make_thread(lambda sess: next(counter), queue_size=1)
+        # Producer is blocked on full queue for longer than single put attempt:
+        time.sleep(2.5)
+        self.assertTrue(thread.is_alive())
+        self.assertIsNone(thread.exception)
+        self.assertEqual([thread.get() for _ in range(3)], [0, 1, 2])
+        thread.stop()
+
+    def test_stop_blocked_producer(self):
+        thread = self.make_thread(lambda sess: 0, queue_size=1)
+        time.sleep(0.2)
+        started = time.time()
+        thread.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.time() - started, 2.0)
+
+        # Nothing more is coming:
+        thread.queue.get_nowait()
+        with self.assertRaises(RuntimeError):
+            thread.get()
+
+
+
+class FakeWriter:
+    """Keeps summaries written, blocks while `hold` is set"""
+
+    def __init__(self):
+        self.written = []
+        self.num_flushed = 0
+        self.hold = threading.Event()
+        self.released = threading.Event()
+
+    def add_summary(self, summary, step):
+        if self.hold.is_set():
+            self.released.wait()
+        self.written.append((step, summary))
+
+    def flush(self):
+        self.num_flushed += 1
+
+
+class SummarySession(FakeSession):
+
+    def run(self, fetches, feed_dict=None):
+        return fetches.format(**feed_dict)
+
+
+class SummaryThreadTest(unittest.TestCase):
+    """Testing background summary writes"""
+
+    def make_thread(self, queue_size=100):
+        writer = FakeWriter()
+        thread = SummaryThread(queue_size=queue_size)
+        thread.start_writing(SummarySession(), writer)
+        return thread, writer
+
+    def test_queued_written_on_stop(self):
+        thread, writer = self.make_thread()
+        for step in range(5):
+            thread.add(step, summary='summary_{}'.format(step))
+        thread.add(5, fetches='op_{value}', feed_dict={'value': 5})
+        thread.stop()
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(writer.written, [(step, 'summary_{}'.format(step)) for step in range(5)] + [(5, 'op_5')])
+        self.assertGreater(writer.num_flushed, 0)
+
+    def test_full_queue_dropped(self):
+        thread, writer = self.make_thread(queue_size=2)
+        writer.hold.set()
+        thread.add(0, summary='held')
+        time.sleep(0.2)
+        for step in range(1, 5):
+            thread.add(step, summary='queued')
+        self.assertEqual(thread.dropped, 2)
+        writer.released.set()
+        thread.stop()
+        self.assertEqual([step for step, _ in writer.written], [0, 1, 2])
+
+    def test_stop_stuck_writer(self):
+        thread, writer = self.make_thread(queue_size=2)
+        writer.hold.set()
+        thread.add(0, summary='summary')
+        time.sleep(0.2)
+        for step in range(1, 3):
+            thread.add(step, summary='summary')
+
+        # Queue is full and writer is stuck, stop still returns:
+        started = time.time()
+        thread.stop(timeout=0.5)
+        self.assertLess(time.time() - started, 2.0)
+        self.assertTrue(thread.is_alive())
+
+        # Writer drains queue and exits once released:
+        writer.released.set()
+        thread.join(5.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(writer.written), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,8 @@ import sys
 import six.moves.queue as queue
 import threading
 
-from btgym.algorithms.runner import BaseEnvRunnerFn
+from btgym.algorithms.runner import BaseEnvRunnerFn, BatchEnvRunnerFn
+from btgym.algorithms.memory import _DummyMemory
 
 
 class RunnerThread(threading.Thread):
@@ -70,6 +71,8 @@ class RunnerThread(threading.Thread):
         self.test = test
         self.ep_summary = ep_summary
         self.memory_config = memory_config
+        # Replay memory outlives rollout provider, so it needs no refill once provider is restarted:
+        self.memory = None
         self.log_level = log_level
         StreamHandler(sys.stdout).push_application()
         self.log = Logger('ThreadRunner_{}'.format(self.task), level=self.log_level)
@@ -96,8 +99,24 @@ class RunnerThread(threading.Thread):
             self.log.exception(msg)
             raise RuntimeError
 
-    def _run(self):
-        rollout_provider = self.runner_fn_ref(
+    def _make_memory(self):
+        if self.memory_config is not None:
+            return self.memory_config['class_ref'](**self.memory_config['kwargs'])
+
+        else:
+            return _DummyMemory()
+
+    def _end_episodes(self):
+        """
+        Marks episodes interrupted by environment failure as ended in replay memory.
+        """
+        self.memory.end_episode()
+
+    def _make_rollout_provider(self):
+        if self.memory is None:
+            self.memory = self._make_memory()
+
+        return self.runner_fn_ref(
             self.sess,
             self.env,
             self.policy,
@@ -109,12 +128,252 @@ class RunnerThread(threading.Thread):
             self.test,
             self.ep_summary,
             self.memory_config,
-            self.log
+            self.log,
+            memory=self.memory,
         )
+
+    def _recover_envs(self):
+        """
+        Recovers environments failed by supervisor verdict, if any.
+
+        Returns:
+            True if there was something to recover, False otherwise.
+        """
+        env_list = self.env if isinstance(self.env, list) else [self.env]
+        failed_envs = [env for env in env_list if not getattr(env, 'is_healthy', True)]
+        for env in failed_envs:
+            env.recover()
+
+        return len(failed_envs) > 0
+
+    def _run(self):
+        rollout_provider = self._make_rollout_provider()
         while True:
+            try:
+                data = next(rollout_provider)
+
+            except Exception:
+                # Runner function gives up on environment failure; start over if supervisor has caught it:
+                if not self._recover_envs():
+                    raise
+                self._end_episodes()
+                rollout_provider = self._make_rollout_provider()
+                continue
+
             # the timeout variable exists because apparently, if one worker dies, the other workers
             # won't die with it, unless the timeout is set to some large number.  This is an empirical
             # observation.
 
-            self.queue.put(next(rollout_provider), timeout=600.0)
+            self.queue.put(data, timeout=600.0)
+
+
+class BatchRunnerThread(RunnerThread):
+    """
+    Thread-runner driving all environments of the worker in lock-step, with policy evaluated for
+    all environments at once. Puts lists of per-environment data dictionaries to the queue.
+    """
+    def __init__(self, env, runner_fn_ref=BatchEnvRunnerFn, **kwargs):
+        """
+
+        Args:
+            env:                    list of environment instances
+            runner_fn_ref:          callable defining runner execution logic
+            **kwargs:               see RunnerThread
+        """
+        super(BatchRunnerThread, self).__init__(env=env, runner_fn_ref=runner_fn_ref, **kwargs)
+
+    def _make_memory(self):
+        return [super(BatchRunnerThread, self)._make_memory() for _ in self.env]
+
+    def _end_episodes(self):
+        for memory in self.memory:
+            memory.end_episode()
+
+
+class PrefetchThread(threading.Thread):
+    """
+    Background stage of pipelined trainer: keeps calling `batch_fn` and queues its results
+    ahead of time, so data collection and train batch processing overlap with train steps.
+    Waits for as long as trainer does not need next item; exception raised by `batch_fn` is kept
+    and re-raised by get() once items prepared before are consumed.
+    """
+    def __init__(self, batch_fn, queue_size=1, task=0, log_level=WARNING):
+        """
+
+        Args:
+            batch_fn:       callable, accepting tf session and returning next item to train on
+            queue_size:     int, number of items to prepare ahead
+            task:           int, parent worker id
+            log_level:      int, logbook.level
+        """
+        threading.Thread.__init__(self)
+        self.queue = queue.Queue(queue_size)
+        self.batch_fn = batch_fn
+        self.daemon = True
+        self.sess = None
+        self.exception = None
+        self.stop_event = threading.Event()
+        self.task = task
+        self.log_level = log_level
+        StreamHandler(sys.stdout).push_application()
+        self.log = Logger('PrefetchThread_{}'.format(self.task), level=self.log_level)
+
+    def start_prefetch(self, sess):
+        self.sess = sess
+        self.start()
+
+    def _put(self, item):
+        """
+        Queues item, blocking until there is free slot or thread is asked to stop.
+
+        Returns:
+            False if stopped before item has been queued, True otherwise.
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=1.0)
+                return True
+
+            except queue.Full:
+                pass
+
+        return False
+
+    def run(self):
+        try:
+            with self.sess.as_default():
+                while not self.stop_event.is_set():
+                    if not self._put(self.batch_fn(self.sess)):
+                        break
+
+        except Exception as e:
+            self.log.exception('RunTime exception occurred.')
+            # Let consumer know:
+            self.exception = e
+
+    def get(self):
+        """
+        Returns:
+            next prepared item; re-raises exception occurred in background thread, if any.
+        """
+        while True:
+            try:
+                return self.queue.get(timeout=1.0)
+
+            except queue.Empty:
+                if self.exception is not None:
+                    raise self.exception
+
+                if not self.is_alive():
+                    raise RuntimeError('PrefetchThread_{} has stopped, no more items to get.'.format(self.task))
+
+    def stop(self, timeout=10.0):
+        """
+        Stops preparing items; waits for item being prepared for at most `timeout` seconds.
+        """
+        self.stop_event.set()
+        self.join(timeout)
+        if self.is_alive():
+            self.log.warning('failed to stop in {} sec., left running.'.format(timeout))
+
+
+class SummaryThread(threading.Thread):
+    """
+    Background stage of trainer summaries: evaluates queued summary ops and writes resulting summaries
+    in batches with single flush, so neither summary ops nor event file writes hold train step.
+    """
+    def __init__(self, queue_size=100, task=0, log_level=WARNING):
+        """
+
+        Args:
+            queue_size:     int, max. number of summaries waiting to be written, new ones are dropped if exceeded
+            task:           int, parent worker id
+            log_level:      int, logbook.level
+        """
+        threading.Thread.__init__(self)
+        self.queue = queue.Queue(queue_size)
+        self.daemon = True
+        self.sess = None
+        self.summary_writer = None
+        self.dropped = 0
+        self.stop_event = threading.Event()
+        self.task = task
+        self.log_level = log_level
+        StreamHandler(sys.stdout).push_application()
+        self.log = Logger('SummaryThread_{}'.format(self.task), level=self.log_level)
+
+    def start_writing(self, sess, summary_writer):
+        self.sess = sess
+        self.summary_writer = summary_writer
+        self.start()
+
+    def add(self, step, summary=None, fetches=None, feed_dict=None):
+        """
+        Queues summary to write, never blocks.
+
+        Args:
+            step:           int, global step or episode number to write summary at
+            summary:        tf.Summary or its serialized string
+            fetches:        summary op to evaluate if `summary` is None
+            feed_dict:      feed dictionary for `fetches`
+        """
+        try:
+            self.queue.put_nowait((step, summary, fetches, feed_dict))
+
+        except queue.Full:
+            self.dropped += 1
+            self.log.debug('summary writer is lagging behind, {} summaries dropped so far.'.format(self.dropped))
+
+    def run(self):
+        with self.sess.as_default():
+            while True:
+                try:
+                    items = [self.queue.get(timeout=1.0)]
+
+                except queue.Empty:
+                    if self.stop_event.is_set():
+                        # Everything queued is written:
+                        self.summary_writer.flush()
+                        return
+
+                    continue
+
+                while True:
+                    try:
+                        items.append(self.queue.get_nowait())
+
+                    except queue.Empty:
+                        break
+
+                for item in items:
+                    if item is None:
+                        self.summary_writer.flush()
+                        return
+
+                    step, summary, fetches, feed_dict = item
+                    try:
+                        if summary is None:
+                            summary = self.sess.run(fetches, feed_dict)
+
+                        self.summary_writer.add_summary(summary, step)
+
+                    except Exception as e:
+                        self.log.exception('failed to write summary.')
+
+                self.summary_writer.flush()
+
+    def stop(self, timeout=10.0):
+        """
+        Writes queued summaries and stops thread; waits for at most `timeout` seconds.
+        """
+        self.stop_event.set()
+        try:
+            self.queue.put_nowait(None)
+
+        except queue.Full:
+            # Writer stops once queue is drained:
+            pass
 
+        self.join(timeout)
+        if self.is_alive():
+            self.log.warning('failed to write queued summaries in {} sec., left running.'.format(timeout))
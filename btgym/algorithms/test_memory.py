@@ -0,0 +1,249 @@
+import unittest
+import numpy as np
+
+from .memory import Memory, SumTree, PrioritizedMemory
+from .rollout import Rollout
+
+
+def make_frame(step, reward=0.0, terminal=False, episode=0):
+    return dict(
+        position={'episode': episode, 'step': step},
+        state={'external': np.full([2, 3], step, dtype=np.float32)},
+        action=np.asarray([1.0, 0.0]),
+        reward=reward,
+        terminal=terminal,
+    )
+
+
+def make_rollout(steps, episode=0, rewards=None, terminals=()):
+    rollout = Rollout()
+    for i, step in enumerate(steps):
+        rollout.add(
+            make_frame(
+                step,
+                reward=0.0 if rewards is None else rewards[i],
+                terminal=step in terminals,
+                episode=episode,
+            )
+        )
+    return rollout
+
+
+class MemoryTest(unittest.TestCase):
+    """Testing ring buffer replay memory"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.memory = Memory(history_size=10, max_sample_size=4, priority_sample_size=3, use_priority_sampling=True)
+
+    def stored_steps(self, memory=None):
+        memory = memory or self.memory
+        return list(memory._make_rollout(np.arange(memory._size))['position']['step'])
+
+    def stored(self, buffer, memory=None):
+        memory = memory or self.memory
+        return buffer[memory._physical(np.arange(memory._size))]
+
+    def test_ring_buffer(self):
+        for step in range(7):
+            self.memory.add(make_frame(step))
+
+        self.assertFalse(self.memory.is_full())
+        self.assertEqual(self.stored_steps(), list(range(7)))
+
+        for step in range(7, 23):
+            self.memory.add(make_frame(step))
+
+        # Only most recent frames are kept, oldest first:
+        self.assertTrue(self.memory.is_full())
+        self.assertEqual(self.stored_steps(), list(range(13, 23)))
+        self.assertEqual(self.memory._head, 3)
+
+        states = np.asarray(self.memory._make_rollout(np.arange(10))['state']['external'])
+        np.testing.assert_array_equal(states[:, 0, 0], np.arange(13, 23))
+        self.assertEqual(states.dtype, np.float32)
+
+    def test_add_rollout(self):
+        reference = Memory(history_size=10, max_sample_size=4, priority_sample_size=3)
+        for step in range(3):
+            self.memory.add(make_frame(step))
+            reference.add(make_frame(step))
+
+        # Batch of frames wraps over buffer end, same as if added one by one:
+        self.memory.add_rollout(make_rollout(range(3, 16), rewards=np.arange(3, 16) % 2))
+        for step in range(3, 16):
+            reference.add(make_frame(step, reward=step % 2))
+
+        self.assertEqual(self.stored_steps(), list(range(6, 16)))
+        self.assertEqual(self.stored_steps(), self.stored_steps(reference))
+        # Physical layouts differ, compare oldest first:
+        np.testing.assert_array_equal(self.stored(self.memory._priority), self.stored(reference._priority, reference))
+        np.testing.assert_array_equal(self.stored(self.memory._terminal), self.stored(reference._terminal, reference))
+
+        # Rollout longer than memory:
+        self.memory.add_rollout(make_rollout(range(16, 40)))
+        self.assertEqual(self.stored_steps(), list(range(30, 40)))
+
+    def test_episode_continuation(self):
+        self.memory.add_rollout(make_rollout(range(5)))
+        self.assertFalse(self.memory._last_frame_terminal())
+
+        # Next rollout does not continue stored episode, so it gets marked as ended:
+        self.memory.add_rollout(make_rollout(range(5), episode=1))
+        self.assertTrue(self.memory._terminal[self.memory._physical(4)])
+        self.assertFalse(self.memory._last_frame_terminal())
+
+    def test_end_episode(self):
+        self.memory.end_episode()
+        self.assertEqual(self.memory._size, 0)
+
+        for step in range(3):
+            self.memory.add(make_frame(step))
+
+        # Interrupted episode is ended, next frame starts new one:
+        self.memory.end_episode()
+        self.assertTrue(self.memory._last_frame_terminal())
+        self.assertTrue(self.memory._buffers['terminal'][self.memory._physical(2)])
+        self.memory.add(make_frame(0, episode=1))
+        self.assertEqual(list(self.stored(self.memory._terminal)), [False, False, True, False])
+
+    def test_sequential_terminal_discarded(self):
+        self.memory.add(make_frame(0, terminal=True))
+        self.memory.add(make_frame(1, terminal=True))
+        self.assertEqual(self.stored_steps(), [0])
+
+        self.memory.add_rollout(make_rollout(range(2, 6), terminals=(2, 3, 5)))
+        self.assertEqual(self.stored_steps(), [0, 4, 5])
+
+    def test_sample_uniform(self):
+        with self.assertRaises(IndexError):
+            self.memory.sample_uniform(sequence_size=4)
+
+        self.memory.add_rollout(make_rollout(range(10), terminals=(5,)))
+        for _ in range(50):
+            steps = self.memory.sample_uniform(sequence_size=4)['position']['step']
+            self.assertTrue(1 <= len(steps) <= 4)
+            np.testing.assert_array_equal(np.diff(steps), 1)
+            # Sequences end at terminal frame:
+            self.assertFalse(5 in steps[:-1])
+
+    def test_sample_priority(self):
+        rewards = np.zeros(10)
+        rewards[[4, 8]] = 1.0
+        self.memory.add_rollout(make_rollout(range(10), rewards=rewards))
+        last_rewards = []
+        for _ in range(400):
+            rollout = self.memory.sample_priority(exact_size=True)
+            steps = rollout['position']['step']
+            self.assertEqual(len(steps), 3)
+            np.testing.assert_array_equal(np.diff(steps), 1)
+            # Sequence can not end before `max_sample_size` frames are stored:
+            self.assertGreaterEqual(steps[-1], 3)
+            last_rewards.append(rollout['reward'][-1])
+
+        # Rebalanced: half of sequences end with non-zero reward:
+        self.assertAlmostEqual(np.mean(last_rewards), .5, delta=.1)
+
+
+class SumTreeTest(unittest.TestCase):
+    """Testing sum-tree priorities bookkeeping and sampling"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.capacity = 11
+        self.priorities = np.random.uniform(size=self.capacity)
+        self.tree = SumTree(self.capacity)
+        self.tree.update(np.arange(self.capacity), self.priorities)
+
+    def test_total(self):
+        self.assertAlmostEqual(self.tree.total(), self.priorities.sum())
+        np.testing.assert_allclose(self.tree.get(np.arange(self.capacity)), self.priorities)
+
+    def test_single_and_batch_update(self):
+        self.tree.update(3, 5.0)
+        self.tree.update(np.asarray([0, 10]), np.asarray([0.0, 2.0]))
+        self.priorities[[3, 0, 10]] = [5.0, 0.0, 2.0]
+        self.assertAlmostEqual(self.tree.total(), self.priorities.sum())
+
+        # Same sums no matter how leaves are updated:
+        other = SumTree(self.capacity)
+        for index, priority in enumerate(self.priorities):
+            other.update(index, priority)
+
+        np.testing.assert_allclose(other._tree, self.tree._tree)
+
+    def test_find(self):
+        bounds = np.cumsum(self.priorities)
+        values = np.random.uniform(high=self.tree.total(), size=100)
+        np.testing.assert_array_equal(self.tree.find(values), np.searchsorted(bounds, values, side='right'))
+        np.testing.assert_array_equal(
+            [self.tree.find([value])[0] for value in values],
+            np.searchsorted(bounds, values, side='right')
+        )
+
+    def test_sample_proportional(self):
+        self.tree.update(np.arange(self.capacity), np.zeros(self.capacity))
+        self.tree.update(np.asarray([2, 7]), np.asarray([1.0, 3.0]))
+        counts = np.bincount(
+            np.concatenate([self.tree.sample(size=100) for _ in range(100)]),
+            minlength=self.capacity
+        )
+        # Zero priority leaves are never sampled:
+        self.assertEqual(counts.sum(), counts[2] + counts[7])
+        self.assertAlmostEqual(counts[7] / counts.sum(), 0.75, delta=0.01)
+
+
+class PrioritizedMemoryTest(unittest.TestCase):
+    """Testing priority updates of sampled sequences"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.memory = PrioritizedMemory(
+            history_size=20,
+            max_sample_size=5,
+            priority_sample_size=3,
+            use_priority_sampling=True,
+            alpha=1.0,
+        )
+        for step in range(20):
+            self.memory.add(make_frame(step))
+
+    def test_sampled_sequence(self):
+        rollout = self.memory.sample_priority(exact_size=True)
+        steps = rollout['position']['step']
+        self.assertEqual(len(steps), 3)
+        np.testing.assert_array_equal(np.diff(steps), [1, 1])
+        self.assertEqual(rollout.memory_index, steps[-1])
+        self.assertIs(rollout.memory, self.memory)
+
+    def test_update_priorities(self):
+        self.memory.update_priorities(np.arange(20), np.zeros(20))
+        self.memory.update_priorities(np.asarray([7]), np.asarray([10.0]))
+        for _ in range(10):
+            rollout = self.memory.sample_priority(exact_size=True)
+            self.assertEqual(rollout.memory_index, 7)
+            self.assertEqual(rollout['position']['step'][-1], 7)
+
+    def test_invalid_ends_stay_masked(self):
+        # First frames can not end full sequence, whatever priority they get:
+        self.memory.update_priorities(np.arange(20), np.zeros(20))
+        self.memory.update_priorities(np.asarray([0, 1]), np.asarray([10.0, 10.0]))
+        self.assertAlmostEqual(self.memory._tree.total(), 18 * self.memory.priority_eps)
+
+    def test_discarded_frames_ignored(self):
+        rollout = self.memory.sample_priority(exact_size=True)
+        for step in range(20, 40):
+            self.memory.add(make_frame(step))
+
+        total = self.memory._tree.total()
+        self.memory.update_priorities(rollout.memory_index, 100.0)
+        self.assertAlmostEqual(self.memory._tree.total(), total)
+
+        # Ids keep counting frames ever added:
+        self.memory.update_priorities(np.arange(20, 40), np.zeros(20))
+        self.memory.update_priorities(35, 100.0)
+        self.assertEqual(self.memory.sample_priority(exact_size=True).memory_index, 35)
+
+
+if __name__ == '__main__':
+    unittest.main()
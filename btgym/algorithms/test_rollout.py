@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+from tensorflow.contrib.rnn import LSTMStateTuple
+
+from .rollout import Rollout, ColumnarRollout, process_rollouts
+from .utils import batch_stack
+
+
+def make_frame(step, terminal=False):
+    action = np.zeros(3)
+    action[step % 3] = 1
+    return dict(
+        position={'episode': 0, 'step': step},
+        state={'external': np.full([4, 1, 2], step, dtype=np.float32), 'metadata': {'type': np.asarray(0)}},
+        action=action,
+        last_action_reward=np.concatenate([action, [step * .1]]),
+        reward=np.sin(step),
+        value=np.cos(step),
+        r=np.asarray([0.0 if terminal else .5]),
+        terminal=terminal,
+        context=LSTMStateTuple(c=np.full([1, 5], step, dtype=np.float32), h=np.full([1, 5], -step, dtype=np.float32)),
+    )
+
+
+def make_rollouts(length, size, first_step=0):
+    rollout = Rollout()
+    columnar = ColumnarRollout(size)
+    for step in range(first_step, first_step + length):
+        frame = make_frame(step, terminal=step == first_step + length - 1)
+        rollout.add(frame)
+        columnar.add(frame)
+
+    return rollout, columnar
+
+
+class ColumnarRolloutTest(unittest.TestCase):
+    """Testing ColumnarRollout gives same results as Rollout"""
+
+    def assert_same(self, x, y, path=''):
+        if isinstance(x, dict):
+            self.assertEqual(set(x.keys()), set(y.keys()), path)
+            for key in x.keys():
+                self.assert_same(x[key], y[key], path + '/' + key)
+
+        elif isinstance(x, tuple):
+            self.assertEqual(len(x), len(y), path)
+            for i, (value_x, value_y) in enumerate(zip(x, y)):
+                self.assert_same(value_x, value_y, path + '/' + str(i))
+
+        else:
+            np.testing.assert_allclose(np.asarray(x), np.asarray(y), rtol=1e-10, err_msg=path)
+            self.assertEqual(np.shape(x), np.shape(y), path)
+
+    def test_entries(self):
+        rollout, columnar = make_rollouts(5, 8)
+        self.assertEqual(columnar.size, 5)
+        self.assertEqual(set(columnar.keys()), set(rollout.keys()))
+        self.assert_same(rollout.get_frame(3), columnar.get_frame(3))
+        np.testing.assert_array_equal(columnar['state']['external'][:, 0, 0, 0], np.arange(5))
+
+    def test_process(self):
+        for length, size in [(8, 8), (5, 8), (11, 4)]:
+            rollout, columnar = make_rollouts(length, size)
+            self.assert_same(rollout.process(gamma=.9, gae_lambda=.95), columnar.process(gamma=.9, gae_lambda=.95))
+            self.assert_same(
+                rollout.process(gamma=.9, size=max(length, size)),
+                columnar.process(gamma=.9, size=max(length, size)),
+            )
+            self.assert_same(rollout.process(gamma=.9, time_flat=True), columnar.process(gamma=.9, time_flat=True))
+
+    def test_process_rollouts(self):
+        pairs = [make_rollouts(length, 8, first_step=length) for length in [8, 3, 6]]
+        for time_flat in [False, True]:
+            expected = batch_stack(
+                [rollout.process(gamma=.9, size=8, time_flat=time_flat) for rollout, _ in pairs]
+            )
+            self.assert_same(
+                expected,
+                process_rollouts([columnar for _, columnar in pairs], gamma=.9, size=8, time_flat=time_flat)
+            )
+
+    def test_pop_frame(self):
+        rollout, columnar = make_rollouts(6, 6)
+        self.assert_same(rollout.pop_frame(-1), columnar.pop_frame(-1))
+        self.assert_same(rollout.pop_frame(2), columnar.pop_frame(2))
+        self.assertEqual(columnar.size, 4)
+        np.testing.assert_array_equal(columnar['position']['step'], [0, 1, 3, 4])
+        self.assert_same(rollout.process(gamma=.9, size=6), columnar.process(gamma=.9, size=6))
+
+    def test_process_rp(self):
+        rollout, columnar = make_rollouts(4, 4)
+        self.assert_same(rollout.process_rp(.1), columnar.process_rp(.1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+
+from .utils import batch_pad, batch_assemble
+
+
+def make_batch(size, dtype):
+    return {
+        'state': {'external': np.ones([size, 3, 2], dtype=dtype)},
+        'action': np.tile(np.asarray([[0, 1]], dtype=np.float32), [size, 1]),
+        'time_steps': size,
+        'batch_size': 1,
+    }
+
+
+class BatchPaddingTest(unittest.TestCase):
+    """Testing batch padding keeps array dtypes"""
+
+    def test_batch_pad(self):
+        for dtype in [np.float16, np.float32, np.int32]:
+            padded = batch_pad(make_batch(3, dtype), 5)
+            self.assertEqual(padded['state']['external'].dtype, dtype)
+            self.assertEqual(padded['state']['external'].shape, (5, 3, 2))
+            np.testing.assert_array_equal(padded['state']['external'][3:], 0)
+
+            # One-hot padding of actions:
+            np.testing.assert_array_equal(padded['action'][3:], [[1, 0], [1, 0]])
+
+    def test_batch_assemble(self):
+        batch = batch_assemble([make_batch(3, np.float16), make_batch(5, np.float16)], to_size=5)
+        self.assertEqual(batch['state']['external'].dtype, np.float16)
+        self.assertEqual(batch['state']['external'].shape, (10, 3, 2))
+        np.testing.assert_array_equal(batch['state']['external'][3:5], 0)
+        np.testing.assert_array_equal(batch['action'][3:5], [[1, 0], [1, 0]])
+        self.assertEqual(batch['batch_size'], 2)
+
+        # Same as padding rollouts one by one:
+        padded = batch_pad(make_batch(3, np.float16), 5)
+        np.testing.assert_array_equal(batch['state']['external'][:5], padded['state']['external'])
+
+
+if __name__ == '__main__':
+    unittest.main()
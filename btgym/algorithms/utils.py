@@ -3,6 +3,7 @@ import numpy as np
 import tensorflow as tf
 from tensorflow.python.util.nest import flatten as flatten_nested
 from tensorflow.python.util.nest import assert_same_structure
+from tensorflow.python.util.nest import pack_sequence_as
 from tensorflow.contrib.rnn import LSTMStateTuple
 
 from gym.spaces import Discrete, Dict
@@ -33,7 +34,7 @@ def rnn_placeholders(state):
         return tuple(structure)
 
 
-def nested_placeholders(ob_space, batch_dim=None, name='nested'):
+def nested_placeholders(ob_space, batch_dim=None, name='nested', dtype=tf.float32):
     """
     Given nested observation space as dictionary of shape tuples,
     returns nested state batch-wise placeholders.
@@ -42,17 +43,64 @@ def nested_placeholders(ob_space, batch_dim=None, name='nested'):
         ob_space:   [nested] dict of shapes
         name:       name scope
         batch_dim:  batch dimension
+        dtype:      tf.DType or [nested] dict of those, matching `ob_space` structure
     Returns:
         nested dictionary of placeholders
     """
     if isinstance(ob_space, dict):
-        out = {key: nested_placeholders(value, batch_dim, name + '_' + key) for key, value in ob_space.items()}
+        out = {
+            key: nested_placeholders(
+                value,
+                batch_dim,
+                name + '_' + key,
+                dtype[key] if isinstance(dtype, dict) else dtype
+            ) for key, value in ob_space.items()
+        }
         return out
     else:
-        out = tf.placeholder(tf.float32, [batch_dim] + list(ob_space), name + '_pl')
+        out = tf.placeholder(dtype, [batch_dim] + list(ob_space), name + '_pl')
         return out
 
 
+def nested_state_dtypes(ob_dtypes):
+    """
+    Given nested observation space numpy dtypes, returns matching placeholders dtypes:
+    half-precision states are fed as is (to be cast in-graph), any other state is fed as float32.
+
+    Args:
+        ob_dtypes:  [nested] dict of numpy dtypes, e.g. btgym.spaces.DictSpace.dtypes
+
+    Returns:
+        [nested] dict of tf.DType
+    """
+    if isinstance(ob_dtypes, dict):
+        return {key: nested_state_dtypes(value) for key, value in ob_dtypes.items()}
+
+    elif ob_dtypes == np.float16:
+        return tf.float16
+
+    else:
+        return tf.float32
+
+
+def nested_cast(x, dtype=tf.float32):
+    """
+    Casts every tensor of nested dictionary to given dtype; tensors of same dtype are passed through.
+
+    Args:
+        x:      [nested] dict of tensors
+        dtype:  tf.DType
+
+    Returns:
+        [nested] dict of tensors
+    """
+    if isinstance(x, dict):
+        return {key: nested_cast(value, dtype) for key, value in x.items()}
+
+    else:
+        return tf.cast(x, dtype)
+
+
 def nested_discrete_gym_shape(ac_space):
     """
     Given instance of gym.spaces.Dict holding base  gym.spaces.Discrete,
@@ -137,6 +185,66 @@ def feed_dict_rnn_context(placeholders, values):
     return {key: value for key, value in zip(placeholders, flatten_nested(values))}
 
 
+def nested_stack(struct_list):
+    """
+    Stacks values of same [nested] structure along new batch dimension, e.g. single observations from
+    several environments.
+
+    Args:
+        struct_list:    list of [nested] dictionaries, tuples or arrays of same structure
+
+    Returns:
+        [nested] structure of stacked arrays
+    """
+    master = struct_list[0]
+
+    if isinstance(master, dict):
+        return {key: nested_stack([struct[key] for struct in struct_list]) for key in master.keys()}
+
+    elif isinstance(master, LSTMStateTuple):
+        return LSTMStateTuple(
+            c=nested_stack([struct[0] for struct in struct_list]),
+            h=nested_stack([struct[1] for struct in struct_list])
+        )
+
+    elif isinstance(master, tuple):
+        return tuple([nested_stack([struct[i] for struct in struct_list]) for i in range(len(master))])
+
+    else:
+        return np.stack(struct_list, axis=0)
+
+
+def rnn_context_stack(contexts):
+    """
+    Concatenates several single-batch [multilayer] RNN states along batch dimension.
+
+    Args:
+        contexts:   list of nested RNN states of batch size 1
+
+    Returns:
+        flat list of arrays, ready to zip with flat RNN state placeholders
+    """
+    flat_contexts = [flatten_nested(context) for context in contexts]
+    return [np.concatenate(values, axis=0) for values in zip(*flat_contexts)]
+
+
+def rnn_context_split(context):
+    """
+    Splits batched [multilayer] RNN state into single-batch states.
+
+    Args:
+        context:    nested RNN state of batch size K
+
+    Returns:
+        list of K nested RNN states of batch size 1
+    """
+    flat_context = flatten_nested(context)
+    return [
+        pack_sequence_as(context, [value[i:i + 1] for value in flat_context])
+        for i in range(flat_context[0].shape[0])
+    ]
+
+
 def as_array(struct):
     """
     Given a dictionary of lists or tuples returns dictionary of np.arrays of same structure.
@@ -201,6 +309,76 @@ def batch_stack(dict_list, _top=True):
     return batch
 
 
+def batch_assemble(batch_list, to_size=None, _top=True, _one_hot=False):
+    """
+    Stacks values of given processed rollouts along batch dimension, same as batch_stack() does,
+    zero-padding every rollout to `to_size` along the way, same as batch_pad() does.
+    Every resulting array is allocated once and filled in place, so no intermediate padded copies are made.
+
+    Args:
+        batch_list:     list of processed rollouts, not padded
+        to_size:        if given, pad every rollout to this size
+
+    Returns:
+        dictionary of stacked arrays.
+    """
+    master = batch_list[0]
+
+    if isinstance(master, dict):
+        batch = {}
+        for key in master.keys():
+            # Mind one-hot action encoding:
+            batch[key] = batch_assemble(
+                [value[key] for value in batch_list],
+                to_size,
+                False,
+                key in ['action', 'last_action_reward']
+            )
+
+    elif isinstance(master, LSTMStateTuple):
+        # Tuples are never padded:
+        c = batch_assemble([state[0] for state in batch_list], None, False)
+        h = batch_assemble([state[1] for state in batch_list], None, False)
+        batch = LSTMStateTuple(c=c, h=h)
+
+    elif isinstance(master, tuple):
+        batch = tuple(
+            [batch_assemble([struct[i] for struct in batch_list], None, False) for i in range(len(master))]
+        )
+
+    elif isinstance(master, np.ndarray) and master.ndim > 0:
+        sizes = [value.shape[0] for value in batch_list]
+        dtypes = [value.dtype for value in batch_list]
+        if to_size is None:
+            rows = sizes
+
+        else:
+            assert max(sizes) <= to_size, \
+                'Padded batch size must be greater than initial, got: {}, {}'.format(to_size, max(sizes))
+            rows = [to_size] * len(batch_list)
+
+        batch = np.zeros((sum(rows),) + master.shape[1:], dtype=np.result_type(*dtypes))
+        start = 0
+        for value, size, num_rows in zip(batch_list, sizes, rows):
+            batch[start: start + size] = value
+            if _one_hot and size < num_rows:
+                batch[start + size: start + num_rows, 0, ...] = 1
+            start += num_rows
+
+    else:
+        try:
+            batch = np.concatenate(batch_list, axis=0)
+
+        except ValueError:
+            batch = np.stack(batch_list, axis=0)
+
+    if _top:
+        # Mind shape inference:
+        batch['batch_size'] = batch['batch_size'].sum()
+
+    return batch
+
+
 def batch_gather(batch_dict, indices, _top=True):
     """
     Gathers experiences from processed batch according to specified indices.
@@ -266,10 +444,10 @@ def batch_pad(batch, to_size, _one_hot=False):
         assert shape[0] < to_size, \
             'Padded batch size must be greater than initial, got: {}, {}'.format(to_size, shape[0])
 
-        pad = np.zeros((to_size - shape[0],) + shape[1:])
+        padded_batch = np.zeros((to_size,) + shape[1:], dtype=batch.dtype)
+        padded_batch[:shape[0]] = batch
         if _one_hot:
-            pad[:, 0, ...] = 1
-        padded_batch = np.concatenate([batch, pad], axis=0)
+            padded_batch[shape[0]:, 0, ...] = 1
 
     else:
         # Hit tuple, scalar or something else:
@@ -10,7 +10,10 @@ from logbook import Logger, StreamHandler
 import sys
 import os
 import random
+import queue
+import threading
 import multiprocessing
+import concurrent.futures
 import datetime
 
 import tensorflow as tf
@@ -45,6 +48,107 @@ class FastSaver(tf.train.Saver):
         )
 
 
+class AsyncSaver:
+    """
+    Saves model checkpoints off the training loop.
+
+    Saved variables are fetched to host memory with single sess.run() call, while checkpoint files get written
+    and rotated by background thread holding its own graph of variable copies, session and FastSaver.
+    Checkpoint state file is updated only after all checkpoint data files are written,
+    so state file never points to partially written checkpoint.
+    """
+
+    def __init__(self, var_list, log=None, **kwargs):
+        """
+        Args:
+            var_list:       list of variables to save
+            log:            logbook.Logger instance
+            **kwargs:       tf.train.Saver kwargs, e.g. `max_to_keep`, `save_relative_paths`
+        """
+        self.var_list = list(var_list)
+        self.log = log
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.placeholders = [
+                tf.placeholder(var.dtype.base_dtype, shape=var.shape, name='value_{}'.format(i))
+                for i, var in enumerate(self.var_list)
+            ]
+            # Copies get initialized with values being saved, checkpoint keeps original variable names:
+            copies = [
+                tf.Variable(value, trainable=False, name='copy_{}'.format(i))
+                for i, value in enumerate(self.placeholders)
+            ]
+            self.assign_op = tf.variables_initializer(copies)
+            self.saver = FastSaver(
+                var_list={var.op.name: copy for var, copy in zip(self.var_list, copies)},
+                **kwargs
+            )
+        self.session = tf.Session(graph=self.graph, config=tf.ConfigProto(device_count={'GPU': 0}))
+        self.queue = queue.Queue()
+        self.saving = threading.Event()
+        self.thread = threading.Thread(target=self._write, name='AsyncSaver', daemon=True)
+        self.thread.start()
+
+    @property
+    def is_saving(self):
+        """
+        True if previous checkpoint is still being written.
+        """
+        return self.saving.is_set()
+
+    def save(self, sess, save_path, global_step=None, callback=None):
+        """
+        Takes snapshot of variables and schedules checkpoint writing.
+        Does nothing if previous checkpoint is still being written.
+
+        Args:
+            sess:           tf.Session obj.
+            save_path:      checkpoint files prefix
+            global_step:    int, appended to save_path to create the checkpoint filenames
+            callback:       callable, called from background thread with checkpoint path as argument
+                            when checkpoint is written
+
+        Returns:
+            True if checkpoint has been scheduled, False otherwise.
+        """
+        if self.saving.is_set():
+            return False
+
+        values = sess.run(self.var_list)
+        self.saving.set()
+        self.queue.put((values, save_path, global_step, callback))
+
+        return True
+
+    def _write(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                break
+
+            values, save_path, global_step, callback = task
+            try:
+                self.session.run(self.assign_op, feed_dict=dict(zip(self.placeholders, values)))
+                checkpoint_path = self.saver.save(self.session, save_path, global_step=global_step)
+                if callback is not None:
+                    callback(checkpoint_path)
+
+            except Exception:
+                if self.log is not None:
+                    self.log.exception('failed to write checkpoint to: {}'.format(save_path))
+
+            finally:
+                self.saving.clear()
+
+    def close(self):
+        """
+        Waits for pending checkpoint to be written, stops background thread.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.session.close()
+
+
 class Worker(multiprocessing.Process):
     """
     Distributed tf worker class.
@@ -52,6 +156,9 @@ class Worker(multiprocessing.Process):
     Sets up environment, trainer and starts training process in supervised session.
     """
     env_list = None
+    server_pool = None
+    env_supervisor = None
+    async_saver = None
 
     def __init__(self,
                  env_config,
@@ -135,6 +242,60 @@ class Worker(multiprocessing.Process):
         self.config = None
         self.saver = None
 
+    def _make_server_pool(self):
+        """
+        Starts pool to launch environment server processes from,
+        preloads environment and strategy modules along with default ones.
+
+        Returns:
+            started BTgymServerPool instance
+        """
+        from btgym.server_pool import BTgymServerPool, DEFAULT_PRELOAD
+
+        preload = list(DEFAULT_PRELOAD) + [self.env_class.__module__]
+        if self.env_kwargs.get('strategy', None) is not None:
+            preload.append(self.env_kwargs['strategy'].__module__)
+
+        if self.env_kwargs.get('engine', None) is not None:
+            preload += [strategy[0][0].__module__ for strategy in self.env_kwargs['engine'].strats]
+
+        server_pool = BTgymServerPool(
+            preload=[name for i, name in enumerate(preload) if name not in preload[:i]],
+            log_level=self.log_level,
+            task=self.task,
+        )
+        server_pool.start()
+        self.log.debug('server pool started.')
+
+        return server_pool
+
+    def _make_env(self, env_config, env_kwargs):
+        """
+        Makes single BTgym environment.
+
+        Args:
+            env_config:     dictionary of environment-specific kwargs: port, data_port, data_master etc.
+            env_kwargs:     kwargs shared by all environments of the worker
+
+        Returns:
+            environment instance
+        """
+        self.log.debug(
+            'setting env at port_{} is data_master: {}'.format(env_config['port'], env_config['data_master'])
+        )
+        try:
+            env = self.env_class(**env_config, **env_kwargs)
+            self.log.info(
+                'set BTGym environment {} @ port:{}, data_port:{}'.format(
+                    env_config['task'], env_config['port'], env_config['data_port']
+                )
+            )
+            return env
+
+        except Exception as e:
+            self.log.exception('failed to make BTGym environment at port_{}.'.format(env_config['port']))
+            raise e
+
     def _restore_model_params(self, sess, save_path):
         """
         Restores model parameters from specified location.
@@ -166,20 +327,29 @@ class Worker(multiprocessing.Process):
 
         return True
 
-    def _save_model_params(self, sess, global_step):
+    def _save_model_params(self, sess, global_step, callback=None):
         """
         Saves model checkpoint to predefined location.
+        If AsyncSaver has been configured, only takes variables snapshot, files are written in background.
 
         Args:
             sess:           tf.Session obj.
             global_step:    global step number is appended to save_path to create the checkpoint filenames
+            callback:       callable, called with checkpoint path as argument when checkpoint is written
+
+        Returns:
+            True if checkpoint has been saved or scheduled, False if previous one is still being written.
         """
+        save_path = self.current_ckpt_dir + '/model_parameters'
+        if self.async_saver is not None:
+            return self.async_saver.save(sess, save_path, global_step=global_step, callback=callback)
+
         assert self.saver is not None, 'FastSaver has not been configured.'
-        self.saver.save(
-            sess,
-            save_path=self.current_ckpt_dir + '/model_parameters',
-            global_step=global_step
-        )
+        checkpoint_path = self.saver.save(sess, save_path=save_path, global_step=global_step)
+        if callback is not None:
+            callback(checkpoint_path)
+
+        return True
 
     def run(self):
         """Worker runtime body.
@@ -209,6 +379,10 @@ class Worker(multiprocessing.Process):
                 server.join()
 
             else:
+                if not self.test_mode:
+                    # Fork server pool before tf.train.Server spins up its threads:
+                    self.server_pool = self._make_server_pool()
+
                 server = tf.train.Server(
                     cluster,
                     job_name='worker',
@@ -224,7 +398,6 @@ class Worker(multiprocessing.Process):
                 # Making as many environments as many entries in env_config `port` list:
                 # TODO: Hacky-II: only one example over all parallel environments can be data-master [and renderer]
                 # TODO: measure data_server lags, maybe launch several instances
-                self.env_list = []
                 env_kwargs = self.env_kwargs.copy()
                 env_kwargs['log_level'] = self.log_level
                 port_list = env_kwargs.pop('port')
@@ -250,40 +423,46 @@ class Worker(multiprocessing.Process):
                 else:
                     task_id = 0
 
+                env_configs = []
                 for port, data_port, is_render, is_master in zip(port_list, data_port_list, render_list, data_master_list):
-                    # Get random seed for environments:
-                    env_kwargs['random_seed'] = random.randint(0, 2 ** 30)
-
-                    if not self.test_mode:
-                        # Assume BTgym env. class:
-                        self.log.debug('setting env at port_{} is data_master: {}'.format(port, data_master))
-                        self.log.debug('env_kwargs:')
-                        for k, v in env_kwargs.items():
-                            self.log.debug('{}: {}'.format(k, v))
-                        try:
-                            self.env_list.append(
-                                self.env_class(
-                                    port=port,
-                                    data_port=data_port,
-                                    data_master=is_master,
-                                    render_enabled=is_render,
-                                    task=self.task + task_id,
-                                    **env_kwargs
-                                )
+                    env_configs.append(
+                        dict(
+                            port=port,
+                            data_port=data_port,
+                            data_master=is_master,
+                            render_enabled=is_render,
+                            task=self.task + task_id,
+                            # Get random seed for environments:
+                            random_seed=random.randint(0, 2 ** 30),
+                        )
+                    )
+                    task_id += 0.01
+
+                if not self.test_mode:
+                    # Assume BTgym env. class:
+                    self.log.debug('env_kwargs:')
+                    for k, v in env_kwargs.items():
+                        self.log.debug('{}: {}'.format(k, v))
+
+                    env_kwargs['server_pool'] = self.server_pool
+
+                    # Data_master goes first since others connect to its data_server; the rest start at once:
+                    self.env_list = [self._make_env(env_configs[0], env_kwargs)]
+                    if len(env_configs) > 1:
+                        with concurrent.futures.ThreadPoolExecutor(max_workers=len(env_configs) - 1) as executor:
+                            self.env_list += list(
+                                executor.map(lambda config: self._make_env(config, env_kwargs), env_configs[1:])
                             )
-                            data_master = False
-                            self.log.info('set BTGym environment {} @ port:{}, data_port:{}'.
-                                          format(self.task + task_id, port, data_port))
-                            task_id += 0.01
 
-                        except Exception as e:
-                            self.log.exception(
-                                'failed to make BTGym environment at port_{}.'.format(port)
-                            )
-                            raise e
+                    # Watch environments health:
+                    from btgym.supervisor import BTgymEnvSupervisor
+                    self.env_supervisor = BTgymEnvSupervisor(self.env_list, log_level=self.log_level, task=self.task)
+                    self.env_supervisor.start()
 
-                    else:
-                        # Assume atari testing:
+                else:
+                    # Assume atari testing:
+                    self.env_list = []
+                    for config in env_configs:
                         try:
                             self.env_list.append(self.env_class(env_kwargs['gym_id']))
                             self.log.debug('set Gyn/Atari environment.')
@@ -331,6 +510,13 @@ class Worker(multiprocessing.Process):
                 #     self.log.warning(v)
 
                 self.saver = FastSaver(var_list=variables_to_save, max_to_keep=1, save_relative_paths=True)
+                if self.is_chief:
+                    self.async_saver = AsyncSaver(
+                        var_list=variables_to_save,
+                        log=self.log,
+                        max_to_keep=1,
+                        save_relative_paths=True
+                    )
 
                 self.config = tf.ConfigProto(device_filters=["/job:ps", "/job:worker/task:{}/cpu:0".format(self.task)])
 
@@ -381,21 +567,42 @@ class Worker(multiprocessing.Process):
 
                         time_delta = datetime.datetime.now() - last_saved_time
                         if self.is_chief and time_delta.total_seconds() > self.save_secs:
-                            self._save_model_params(sess, global_step)
                             train_speed = (global_step - last_saved_step) / (time_delta.total_seconds() + 1)
-                            self.log.notice(
-                                'env. step: {}; cluster speed: {:.0f} step/sec; checkpoint saved.'.format(
-                                    global_step,
-                                    train_speed
+
+                            def on_saved(checkpoint_path, step=global_step, speed=train_speed):
+                                self.log.notice(
+                                    'env. step: {}; cluster speed: {:.0f} step/sec; checkpoint saved.'.format(
+                                        step,
+                                        speed
+                                    )
                                 )
-                            )
-                            last_saved_time = datetime.datetime.now()
-                            last_saved_step = global_step
+
+                            # Retry on next step if previous checkpoint is still being written:
+                            if self._save_model_params(sess, global_step, callback=on_saved):
+                                last_saved_time = datetime.datetime.now()
+                                last_saved_step = global_step
+
+                    if getattr(trainer, 'prefetch_thread', None) is not None:
+                        trainer.prefetch_thread.stop()
+
+                    if getattr(trainer, 'summary_thread', None) is not None:
+                        # Write down queued summaries while session is still open:
+                        trainer.summary_thread.stop()
+
+                # Let pending checkpoint be written:
+                if self.async_saver is not None:
+                    self.async_saver.close()
 
                 # Ask for all the services to stop:
+                if self.env_supervisor is not None:
+                    self.env_supervisor.stop()
+
                 for env in self.env_list:
                     env.close()
 
+                if self.server_pool is not None:
+                    self.server_pool.close()
+
                 self.log.notice('reached {} steps, exiting.'.format(global_step))
 
         except Exception as e:
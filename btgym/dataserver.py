@@ -23,6 +23,8 @@ import zmq
 import datetime
 
 from .datafeed import DataSampleConfig
+from .memory_tracker import MemoryTracker
+from .supervisor import BTgymHeartbeat
 
 
 class BTgymDataFeedServer(multiprocessing.Process):
@@ -34,7 +36,7 @@ class BTgymDataFeedServer(multiprocessing.Process):
     process = None
     dataset_stat = None
 
-    def __init__(self, dataset=None, network_address=None, log_level=None, task=0):
+    def __init__(self, dataset=None, network_address=None, log_level=None, task=0, trace_memory=False):
         """
         Configures data server instance.
 
@@ -43,6 +45,7 @@ class BTgymDataFeedServer(multiprocessing.Process):
             network_address:    ...to bind to.
             log_level:          int, logbook.level
             task:               id
+            trace_memory:       bool, keep tracemalloc snapshots to report lines allocating growing memory
         """
         super(BTgymDataFeedServer, self).__init__()
 
@@ -54,6 +57,9 @@ class BTgymDataFeedServer(multiprocessing.Process):
         self.network_address = network_address
         self.default_sample_config = copy.deepcopy(DataSampleConfig)
         self.broadcast_message = None
+        self.trace_memory = trace_memory
+        self.memory_tracker = None
+        self.heartbeat = None
 
         self.debug_pre_sample_fails = 0
         self.debug_pre_sample_attempts = 0
@@ -115,6 +121,10 @@ class BTgymDataFeedServer(multiprocessing.Process):
         self.process = multiprocessing.current_process()
         self.log.info('PID: {}'.format(self.process.pid))
 
+        # Answer supervisor pings:
+        self.heartbeat = BTgymHeartbeat()
+        self.heartbeat.start()
+
         # Set up a comm. channel for server as ZMQ socket:
         context = zmq.Context()
         socket = context.socket(zmq.REP)
@@ -130,6 +140,10 @@ class BTgymDataFeedServer(multiprocessing.Process):
         # Describe dataset:
         self.dataset_stat = self.dataset.describe()
 
+        # Per-sample memory usage:
+        self.memory_tracker = MemoryTracker(trace=self.trace_memory)
+        self.memory_tracker.start()
+
         # Main loop:
         while True:
             # Stick here until receive any request:
@@ -143,6 +157,7 @@ class BTgymDataFeedServer(multiprocessing.Process):
                     # send last run statistic, release comm channel and exit:
                     message = {'ctrl': 'Exiting.'}
                     self.log.info(str(message))
+                    self.heartbeat.close()
                     socket.send_pyobj(message)
                     socket.close()
                     context.destroy()
@@ -184,6 +199,7 @@ class BTgymDataFeedServer(multiprocessing.Process):
                                 'timestamp': self.dataset.global_timestamp,
                             }
                         )
+                        self.memory_tracker.update()
 
                     else:
                         message = {'ctrl': 'Dataset not ready, waiting for control key <_reset_data>'}
@@ -204,6 +220,10 @@ class BTgymDataFeedServer(multiprocessing.Process):
                     )
                     socket.send_pyobj(info_dict)
 
+                # Send memory usage statistic:
+                elif service_input['ctrl'] == '_getstat':
+                    socket.send_pyobj({'memory': self.memory_tracker.get_stat()})
+
                 # Set global time:
                 elif service_input['ctrl'] == '_set_broadcast_message':
                     if self.dataset.global_timestamp != 0 and self.dataset.global_timestamp > service_input['timestamp']:
@@ -245,7 +265,7 @@ class BTgymDataFeedServer(multiprocessing.Process):
                     message = {
                         'ctrl':
                             'waiting for control keys:  <_reset_data>, <_get_data>, ' +
-                            '<_get_info>, <_stop>, <_get_global_time>, <_get_broadcast_message>'
+                            '<_get_info>, <_getstat>, <_stop>, <_get_global_time>, <_get_broadcast_message>'
                     }
                     self.log.debug('Sent: ' + str(message))
                     socket.send_pyobj(message)  # pairs any other input
@@ -23,6 +23,9 @@ import time
 import zmq
 import os
 import copy
+import pickle
+import signal
+import threading
 import numpy as np
 import gym
 from gym import spaces
@@ -36,6 +39,7 @@ from btgym import DictSpace, ActionDictSpace
 from btgym.datafeed.multi import BTgymMultiData
 
 from btgym.rendering import BTgymNullRendering
+from btgym.supervisor import release_heartbeat_address
 
 ############################## OpenAI Gym Environment  ##############################
 
@@ -63,6 +67,7 @@ class BTgymEnv(gym.Env):
 
     # Strategy:
     strategy = None  # strategy to use if no <engine> class been passed.
+    metadata_space = None  # set if strategy sends compactly encoded metadata, see _make_observation_space().
 
     # Server and network:
     server = None  # Server process.
@@ -73,6 +78,15 @@ class BTgymEnv(gym.Env):
     ctrl_actions = ('_done', '_reset', '_stop', '_getstat', '_render')  # server control messages.
     server_response = None
 
+    server_pool = None  # BTgymServerPool instance to launch server processes from, if any.
+
+    trace_memory = False  # keep tracemalloc snapshots in server processes, see get_stat()['memory'].
+
+    # Health watch, see btgym.supervisor.BTgymEnvSupervisor:
+    abort_request = None  # threading.Event, set by supervisor to abort pending request to failed server.
+    request_started = None  # time pending server request has been sent, None if there is none.
+    request_latency = None  # moving average of server response time, seconds.
+
     # Connection timeout:
     connect_timeout = 60  # server connection timeout in seconds.
     #connect_timeout_step = 0.01  # time between retries in seconds.
@@ -120,6 +134,11 @@ class BTgymEnv(gym.Env):
             data_network_address=`tcp://127.0.0.1:` (str):  data_server address.
             data_port=4999 (int):                           network port to use for server -- data_server communication.
             connect_timeout=60 (int):                       server connection timeout in seconds.
+            server_pool=None (btgym.BTgymServerPool):       started pool to launch server and data_server processes from;
+                                                            if None - processes are started directly.
+            trace_memory=False (bool):                      report source lines allocating growing memory
+                                                            in server and data_server memory statistic;
+                                                            slows down both processes.
             render_enabled=True (bool):                     enable rendering for this environment;
             render_modes=['human', 'episode'] (list):       `episode` - plotted episode results;
                                                             `human` - raw_state observation.
@@ -419,7 +438,7 @@ class BTgymEnv(gym.Env):
                                  self.dataset_stat.loc['max', self.dataset_columns].max()))
 
         # Set observation space shape from engine/strategy parameters:
-        self.observation_space = DictSpace(self.params['strategy']['state_shape'])
+        self.observation_space = self._make_observation_space()
 
         self.log.debug('Obs. shape: {}'.format(self.observation_space.spaces))
         #self.log.debug('Obs. min:\n{}\nmax:\n{}'.format(self.observation_space.low, self.observation_space.high))
@@ -439,6 +458,44 @@ class BTgymEnv(gym.Env):
 
         self.log.info('Environment is ready.')
 
+    def _make_observation_space(self):
+        """
+        Defines observation space from strategy `state_shape` parameter
+        w.r.t. strategy `state_dtype` and `compact_metadata` settings.
+
+        Returns:
+            instance of DictSpace
+        """
+        observation_space = DictSpace(self.params['strategy']['state_shape'])
+
+        state_dtype = self.params['strategy'].get('state_dtype', None)
+        if state_dtype is not None:
+            observation_space = observation_space.cast(state_dtype, exclude=('metadata',))
+
+        # Metadata is decoded back from flat vector upon receiving:
+        if self.params['strategy'].get('compact_metadata', False):
+            self.metadata_space = observation_space.spaces['metadata']
+
+        else:
+            self.metadata_space = None
+
+        return observation_space
+
+    def _decode_response(self, response):
+        """
+        Restores compactly encoded parts of environment response.
+
+        Args:
+            response:   environment response as <o, r, d, i> tuple
+
+        Returns:
+            environment response
+        """
+        if self.metadata_space is not None and isinstance(response, tuple):
+            response[0]['metadata'] = self.metadata_space.unpack(response[0]['metadata'])
+
+        return response
+
     def _seed(self, seed=None):
         """
         Sets env. random seed.
@@ -450,13 +507,14 @@ class BTgymEnv(gym.Env):
         np.random.seed(self.random_seed)
 
     @staticmethod
-    def _comm_with_timeout( socket, message,):
+    def _comm_with_timeout( socket, message, abort=None):
         """
         Exchanges messages via socket, timeout sensitive.
 
         Args:
             socket: zmq connected socket to communicate via;
             message: message to send;
+            abort: threading.Event, stop waiting for response as soon as it is set, optional;
 
         Note:
             socket zmq.RCVTIMEO and zmq.SNDTIMEO should be set to some finite number of milliseconds.
@@ -484,6 +542,17 @@ class BTgymEnv(gym.Env):
 
         start = time.time()
         try:
+            if abort is not None:
+                timeout = socket.getsockopt(zmq.RCVTIMEO) / 1000
+                while not socket.poll(100):
+                    if abort.is_set():
+                        response['status'] = 'receive_aborted'
+                        return response
+
+                    if 0 <= timeout < time.time() - start:
+                        response['status'] = 'receive_failed_due_to_connect_timeout'
+                        return response
+
             response['message'] = socket.recv_pyobj()
             response['time'] = time.time() - start
 
@@ -519,8 +588,13 @@ class BTgymEnv(gym.Env):
         self.socket.setsockopt(zmq.SNDTIMEO, self.connect_timeout * 1000)
         self.socket.connect(self.network_address)
 
+        if self.abort_request is None:
+            self.abort_request = threading.Event()
+        self.request_started = None
+
         # Configure and start server:
-        self.server = BTgymServer(
+        self.server = self._launch_process(
+            BTgymServer,
             cerebro=self.engine,
             render=self.renderer,
             network_address=self.network_address,
@@ -528,11 +602,9 @@ class BTgymEnv(gym.Env):
             connect_timeout=self.connect_timeout,
             log_level=self.log_level,
             task=self.task,
+            trace_memory=self.trace_memory,
         )
-        self.server.daemon = False
-        self.server.start()
-        # Wait for server to startup:
-        time.sleep(1)
+        # No need to wait for server to startup: REQ socket holds ping until server binds.
 
         # Check connection:
         self.log.info('Server started, pinging {} ...'.format(self.network_address))
@@ -552,6 +624,43 @@ class BTgymEnv(gym.Env):
 
         self._closed = False
 
+    def _launch_process(self, process_class, **kwargs):
+        """
+        Starts server or data_server process, uses server pool if one has been set.
+
+        Args:
+            process_class:  BTgymServer or BTgymDataFeedServer class
+            kwargs:         process_class constructor kwargs
+
+        Returns:
+            started process or BTgymPooledProcess handle
+        """
+        if self.server_pool is not None:
+            try:
+                return self.server_pool.launch(process_class, **kwargs)
+
+            except (pickle.PicklingError, AttributeError, TypeError) as e:
+                self.log.warning(
+                    'Failed to launch {} from server pool, starting it directly. Reason: {}'.format(
+                        process_class.__name__, e
+                    )
+                )
+
+            except (RuntimeError, EOFError, BrokenPipeError) as e:
+                # Pool process is gone, no use asking it again:
+                self.log.warning(
+                    'Server pool failed, starting {} and further processes directly. Reason: {}'.format(
+                        process_class.__name__, repr(e)
+                    )
+                )
+                self.server_pool = None
+
+        process = process_class(**kwargs)
+        process.daemon = False
+        process.start()
+
+        return process
+
     def _stop_server(self):
         """
         Stops BT server process, releases network resources.
@@ -595,8 +704,13 @@ class BTgymEnv(gym.Env):
             attempt = 0
 
             while 'ctrl' not in self.server_response:
-                self.socket.send_pyobj({'ctrl': '_done'})
-                self.server_response = self.socket.recv_pyobj()
+                response = self._request({'ctrl': '_done'})
+                if not response['status'] in 'ok':
+                    self.log.error('Server unreachable with status: <{}>.'.format(response['status']))
+                    self.server_response = response['status']
+                    return False
+
+                self.server_response = response['message']
                 attempt += 1
                 self.log.debug('FORCE CONTROL MODE attempt: {}.\nResponse: {}'.format(attempt, self.server_response))
 
@@ -716,10 +830,7 @@ class BTgymEnv(gym.Env):
             self._start_server()
 
         if self._force_control_mode():
-            self.server_response = self._comm_with_timeout(
-                socket=self.socket,
-                message={'ctrl': '_reset', 'kwargs': kwargs}
-            )
+            self.server_response = self._request({'ctrl': '_reset', 'kwargs': kwargs})
             # Get initial environment response:
             self.env_response = self.step(self.get_initial_action())
 
@@ -762,7 +873,7 @@ class BTgymEnv(gym.Env):
 
         else:
             msg = 'Something went wrong. env.reset() can not get response from server.'
-            self.log.exception(msg)
+            self.log.error(msg)
             raise ChildProcessError(msg)
 
     def step(self, action):
@@ -823,19 +934,66 @@ class BTgymEnv(gym.Env):
         # Send action (as dict of strings) to backtrader engine, receive environment response:
         action_as_dict = {key: self.server_actions[key][value] for key, value in action.items()}
         #print('step: ', action, action_as_dict)
-        env_response = self._comm_with_timeout(
-            socket=self.socket,
-            message={'action': action_as_dict}
-        )
+        env_response = self._request({'action': action_as_dict})
         if not env_response['status'] in 'ok':
             msg = '.step(): server unreachable with status: <{}>.'.format(env_response['status'])
             self.log.error(msg)
             raise ConnectionError(msg)
 
-        self.env_response = env_response ['message']
+        self.env_response = self._decode_response(env_response['message'])
 
         return self.env_response
 
+    def _request(self, message):
+        """
+        Exchanges messages with server, keeps track of pending request and server response time;
+        can be aborted by supervisor.
+        """
+        self.request_started = time.time()
+        response = self._comm_with_timeout(socket=self.socket, message=message, abort=self.abort_request)
+        self.request_started = None
+        if response['status'] in 'ok':
+            if self.request_latency is None:
+                self.request_latency = response['time']
+
+            else:
+                self.request_latency = 0.99 * self.request_latency + 0.01 * response['time']
+
+        return response
+
+    @property
+    def is_healthy(self):
+        """
+        False if supervisor has found environment failed and it has not been recovered yet.
+        """
+        return self.abort_request is None or not self.abort_request.is_set()
+
+    def recover(self):
+        """
+        Restarts server process without talking to it, along with data_server if latter has exited;
+        running episode is lost. Intended for environments failed by supervisor verdict.
+        """
+        self.log.warning('Recovering environment...')
+        if self.server is not None:
+            if self.server.is_alive():
+                self.server.terminate()
+                self.server.join(timeout=1)
+                if self.server.is_alive():
+                    # Frozen process ignores SIGTERM:
+                    os.kill(self.server.pid, signal.SIGKILL)
+                    self.server.join()
+            release_heartbeat_address(self.server.pid)
+
+        if self.data_master and (self.data_server is None or not self.data_server.is_alive()):
+            if self.data_server is not None:
+                self.data_server.join()
+                release_heartbeat_address(self.data_server.pid)
+            self._start_data_server()
+
+        self._start_server()
+        self.abort_request.clear()
+        self.log.warning('Environment recovered.')
+
     def close(self):
         """
         Implementation of OpenAI Gym env.close method.
@@ -850,16 +1008,49 @@ class BTgymEnv(gym.Env):
         """
         Returns last run episode statistics.
 
+        Statistics include `memory` and `data_server_memory` entries: server and data_server processes
+        resident memory usage in megabytes, its growth since process start and per episode (per sample
+        for data_server); `data_server_memory` is None unless this environment is data_master.
+
         Note:
             when invoked, forces running episode to terminate.
         """
         if self._force_control_mode():
-            self.socket.send_pyobj({'ctrl': '_getstat'})
-            return self.socket.recv_pyobj()
+            response = self._request({'ctrl': '_getstat'})
+            if not response['status'] in 'ok':
+                msg = '.get_stat(): server unreachable with status: <{}>.'.format(response['status'])
+                self.log.error(msg)
+                raise ConnectionError(msg)
+
+            stat = response['message']
+            if isinstance(stat, dict):
+                stat['data_server_memory'] = self._get_data_server_memory_stat()
+
+            return stat
 
         else:
             return self.server_response
 
+    def _get_data_server_memory_stat(self):
+        """
+        Returns:
+            data_server memory statistic, None if this environment is not data_master or data_server is unreachable.
+        """
+        if not self.data_master or self.data_socket is None:
+            return None
+
+        self.data_server_response = self._comm_with_timeout(
+            socket=self.data_socket,
+            message={'ctrl': '_getstat'}
+        )
+        if self.data_server_response['status'] in 'ok':
+            return self.data_server_response['message'].get('memory', None)
+
+        else:
+            self.log.warning('Data_server memory statistic request failed with status: <{}>.'.
+                             format(self.data_server_response['status']))
+            return None
+
     def render(self, mode='other_mode', close=False):
         """
         Implementation of OpenAI Gym env.render method.
@@ -940,16 +1131,14 @@ class BTgymEnv(gym.Env):
             os.system(cmd)
 
             # Configure and start server:
-            self.data_server = BTgymDataFeedServer(
+            self.data_server = self._launch_process(
+                BTgymDataFeedServer,
                 dataset=self.dataset,
                 network_address=self.data_network_address,
                 log_level=self.log_level,
-                task=self.task
+                task=self.task,
+                trace_memory=self.trace_memory,
             )
-            self.data_server.daemon = False
-            self.data_server.start()
-            # Wait for server to startup
-            time.sleep(1)
 
         # Set up client channel:
         self.data_context = zmq.Context()
@@ -354,7 +354,7 @@ class MultiDiscreteEnv(BTgymEnv):
                                  self.dataset_stat.loc['max', self.dataset_columns].max()))
 
         # Set observation space shape from engine/strategy parameters:
-        self.observation_space = DictSpace(self.params['strategy']['state_shape'])
+        self.observation_space = self._make_observation_space()
 
         self.log.debug('Obs. shape: {}'.format(self.observation_space.spaces))
 
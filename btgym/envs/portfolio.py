@@ -405,7 +405,7 @@ class PortfolioEnv(BTgymEnv):
                                  self.dataset_stat.loc['max', self.dataset_columns].max()))
 
         # Set observation space shape from engine/strategy parameters:
-        self.observation_space = DictSpace(self.params['strategy']['state_shape'])
+        self.observation_space = self._make_observation_space()
 
         self.log.debug('Obs. shape: {}'.format(self.observation_space.spaces))
 
@@ -476,6 +476,6 @@ class PortfolioEnv(BTgymEnv):
             self.log.error(msg)
             raise ConnectionError(msg)
 
-        self.env_response = env_response['message']
+        self.env_response = self._decode_response(env_response['message'])
 
         return self.env_response
@@ -0,0 +1,132 @@
+###############################################################################
+#
+# Copyright (C) 2017 Andrew Muzikin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import os
+import tracemalloc
+
+from collections import deque
+
+import numpy as np
+import psutil
+
+
+MB = 1024 ** 2
+
+
+class MemoryTracker:
+    """
+    Tracks memory usage of current process over repeated work units, e.g. episodes or data samples.
+
+    Records resident set size (RSS) after every unit and estimates its growth rate over recent units;
+    optionally keeps tracemalloc snapshots to point at source lines allocating growing memory.
+    Tracing slows down every Python allocation, thus is disabled by default.
+    """
+
+    def __init__(self, trace=False, trace_frames=1, trace_top=10, window=100):
+        """
+        Args:
+            trace:          bool, enable tracemalloc snapshots
+            trace_frames:   int, number of traceback frames to keep for every traced allocation
+            trace_top:      int, number of source locations with largest memory growth to report
+            window:         int, number of recent units to estimate RSS growth rate over
+        """
+        self.trace = trace
+        self.trace_frames = trace_frames
+        self.trace_top = trace_top
+        self.process = psutil.Process(os.getpid())
+        self.history = deque(maxlen=window)
+        self.units = 0
+        self.start_rss = None
+        self.peak_rss = 0
+        self.first_snapshot = None
+        self.last_snapshot = None
+
+    def start(self):
+        """
+        Takes initial measurements, should be called from within tracked process.
+        """
+        self.process = psutil.Process(os.getpid())
+        self.start_rss = self.process.memory_info().rss
+        self.peak_rss = self.start_rss
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+            self.first_snapshot = self._snapshot()
+
+    def _snapshot(self):
+        # Do not count tracemalloc own allocations:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+
+    def update(self):
+        """
+        Records measurements after another unit of work is done.
+        """
+        if self.start_rss is None:
+            self.start()
+
+        rss = self.process.memory_info().rss
+        self.peak_rss = max(self.peak_rss, rss)
+        self.units += 1
+        self.history.append((self.units, rss))
+        if self.trace:
+            self.last_snapshot = self._snapshot()
+
+    def growth_rate(self):
+        """
+        Returns:
+            RSS growth in bytes per unit as least squares slope over recent units, 0 if there is not enough data.
+        """
+        if len(self.history) < 2:
+            return 0.0
+
+        units, rss = np.asarray(self.history, dtype=np.float64).T
+        return float(np.polyfit(units, rss, 1)[0])
+
+    def get_stat(self):
+        """
+        Returns:
+            dictionary of memory statistics, sizes are in megabytes.
+        """
+        rss = self.process.memory_info().rss
+        start_rss = self.start_rss if self.start_rss is not None else rss
+        stat = dict(
+            pid=self.process.pid,
+            units=self.units,
+            rss=rss / MB,
+            start_rss=start_rss / MB,
+            peak_rss=max(self.peak_rss, rss) / MB,
+            rss_growth=(rss - start_rss) / MB,
+            rss_growth_rate=self.growth_rate() / MB,
+        )
+        if self.trace and self.last_snapshot is not None:
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            stat['traced'] = traced / MB
+            stat['traced_peak'] = traced_peak / MB
+            stat['top_growth'] = [
+                dict(
+                    location=str(diff.traceback),
+                    size_growth=diff.size_diff / MB,
+                    count_growth=diff.count_diff,
+                )
+                for diff in self.last_snapshot.compare_to(self.first_snapshot, 'lineno')[:self.trace_top]
+            ]
+
+        return stat
@@ -17,7 +17,7 @@
 #
 ###############################################################################
 
-from .plotter import DrawCerebro
+from .plotter import DrawCerebro, EpisodeRenderer, snapshot_strategy
 
 from .renderer import BTgymRendering, BTgymNullRendering
 
@@ -16,33 +16,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 ###############################################################################
+import os
+import time
 import bisect
 import datetime
 import multiprocessing
+import queue
 import numpy as np
-from backtrader.plot import Plot_OldSync
+from collections import OrderedDict
 
+from btgym._lazy import lazy_attributes
 
-class BTgymPlotter(Plot_OldSync):
-    """Hacky way to get cerebro.plot() renderings.
-    Overrides default backtrader plotter behaviour.
-    """
-
-    def __init__(self, **kwargs):
-        """
-        pass
-        """
-        super(BTgymPlotter, self).__init__(**kwargs)
-
-    def savefig(self, fig, filename, width=16, height=9, dpi=300, tight=True,):
-        """
-        We neither need picture to appear in <stdout> nor file to be written to disk (slow).
-        Just set params and return `fig` to be converted to rgb array.
-        """
-        fig.set_size_inches(width, height)
-        fig.set_dpi(dpi)
-        fig.set_tight_layout(tight)
-        fig.canvas.draw()
+# Backtrader plotting imports matplotlib, only DrawCerebro needs it:
+__getattr__, __dir__ = lazy_attributes(globals(), {'BTgymPlotter': 'btgym.rendering.bt_plotter'})
 
 
 class DrawCerebro(multiprocessing.Process):
@@ -50,6 +36,8 @@ class DrawCerebro(multiprocessing.Process):
     """
     def __init__(self, cerebro, width, height, dpi, result_pipe, use=None, rowsmajor=1):
         super(DrawCerebro, self).__init__()
+        from .bt_plotter import BTgymPlotter
+
         self.result_pipe = result_pipe
         self.cerebro = cerebro
         self.plotter = BTgymPlotter()
@@ -90,3 +78,174 @@ class DrawCerebro(multiprocessing.Process):
                                'Hint: check storage consumption or use: render_enabled=False')
         return None
 
+
+
+def _line_values(line):
+    """
+    Copies values of backtrader line buffer to numpy array.
+    """
+    return np.frombuffer(line.array, dtype=np.float64)[:len(line)].copy()
+
+
+def snapshot_strategy(strategy):
+    """
+    Copies minimal data needed to plot finished episode: close prices for every data feed and lines of
+    every plotted observer and indicator, as plain numpy arrays. Lines backtrader plots
+    over the data (e.g. buy/sell markers, moving averages) are attached to price panel of the data line belongs to.
+
+    Args:
+        strategy:   backtrader strategy instance after cerebro.run() finished
+
+    Returns:
+        list of panels, each as dictionary of `name`, `lines` and `markers` entries;
+        `lines` and `markers` are dictionaries of {line_name: (values, marker)}
+    """
+    panels = []
+    data_panels = dict()
+    for data in strategy.datas:
+        if not data.plotinfo.plot:
+            continue
+        panel = dict(name=data._name or 'data', lines=OrderedDict(close=(_line_values(data.close), None)))
+        panels.append(panel)
+        data_panels[id(data)] = panel
+
+    for item in strategy.getobservers() + strategy.getindicators():
+        if not item.plotinfo.plot:
+            continue
+
+        name = item.plotinfo.plotname or type(item).__name__
+        if item.plotinfo.subplot or len(data_panels) == 0:
+            panel = dict(name=name, lines=OrderedDict())
+            panels.append(panel)
+
+        else:
+            panel = data_panels.get(id(getattr(item, 'data', None)), panels[0])
+
+        for alias, line in zip(item.lines.getlinealiases(), item.lines):
+            line_info = getattr(item.plotlines, alias, None)
+            if getattr(line_info, '_plotskip', False):
+                continue
+            panel['lines']['{}.{}'.format(name, alias) if panel['name'] != name else alias] = (
+                _line_values(line),
+                getattr(line_info, 'marker', None)
+            )
+
+    return panels
+
+
+class EpisodeRenderer(multiprocessing.Process):
+    """
+    Persistent background process drawing episode snapshots made by snapshot_strategy().
+    Keeps matplotlib out of environment server process; single instance serves all episode renderings.
+    Exits when parent process is gone.
+    """
+    def __init__(self, width, height, dpi, plotstyle=None, rowsmajor=1, queue_size=1):
+        """
+
+        Args:
+            width:          figure width, in.
+            height:         figure height, in.
+            dpi:            figure dpi
+            plotstyle:      matplotlib style name
+            rowsmajor:      relative height of price panels
+            queue_size:     max. number of pending snapshots
+        """
+        super(EpisodeRenderer, self).__init__()
+        self.daemon = True
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.plotstyle = plotstyle
+        self.rowsmajor = rowsmajor
+        self.parent_pid = os.getpid()
+        self.snapshot_queue = multiprocessing.Queue(maxsize=queue_size)
+        self.out_pipe, self.in_pipe = multiprocessing.Pipe(duplex=False)
+        self.request_id = 0
+
+    def draw(self, snapshot, timeout=60):
+        """
+        Sends snapshot to renderer process and waits for rendering.
+
+        Args:
+            snapshot:   list of panels as returned by snapshot_strategy()
+            timeout:    seconds to wait
+
+        Returns:
+            rgb array or None if renderer is busy or failed to respond in time.
+        """
+        # Results are tagged, so one of previously timed-out request is never taken for this one:
+        self.request_id += 1
+        try:
+            self.snapshot_queue.put((self.request_id, snapshot), timeout=timeout)
+
+        except queue.Full:
+            return None
+
+        deadline = time.time() + timeout
+        while self.out_pipe.poll(max(deadline - time.time(), 0)):
+            request_id, rgb_array = self.out_pipe.recv()
+            if request_id == self.request_id:
+                return rgb_array
+
+        return None
+
+    def run(self):
+        import matplotlib
+        matplotlib.use('Agg', force=True)
+        import matplotlib.style
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        if self.plotstyle is not None:
+            try:
+                matplotlib.style.use(self.plotstyle)
+
+            except (OSError, ValueError):
+                pass
+
+        while True:
+            try:
+                request_id, snapshot = self.snapshot_queue.get(timeout=1)
+
+            except queue.Empty:
+                if os.getppid() != self.parent_pid:
+                    # Orphaned:
+                    return None
+                continue
+
+            try:
+                rgb_array = self.draw_snapshot(snapshot, Figure, FigureCanvasAgg)
+
+            except Exception:
+                rgb_array = None
+
+            self.in_pipe.send((request_id, rgb_array))
+
+    def draw_snapshot(self, snapshot, figure_class, canvas_class):
+        """
+        Plots every panel of snapshot in its own row, sharing time axis.
+
+        Returns:
+            rgb array
+        """
+        # Price panels are `rowsmajor` times higher:
+        height_ratios = [self.rowsmajor if 'close' in panel['lines'] else 1 for panel in snapshot]
+
+        fig = figure_class(figsize=(self.width, self.height), dpi=self.dpi)
+        canvas = canvas_class(fig)
+        axes = fig.subplots(len(snapshot), 1, sharex=True, squeeze=False, gridspec_kw={'height_ratios': height_ratios})
+        for ax, panel in zip(axes[:, 0], snapshot):
+            for name, (values, marker) in panel['lines'].items():
+                if marker is None:
+                    ax.plot(values, label=name, linewidth=1)
+
+                else:
+                    ax.plot(values, label=name, marker=marker, linestyle='')
+            ax.set_title(panel['name'], fontsize='small', loc='left')
+            ax.legend(loc='upper left', fontsize='x-small')
+            ax.grid(True)
+
+        fig.tight_layout()
+        canvas.draw()
+
+        return np.asarray(canvas.buffer_rgba())[..., :3].copy()
@@ -21,7 +21,7 @@ import sys
 import numpy as np
 
 #from .plotter import BTgymPlotter
-from .plotter import DrawCerebro
+from .plotter import snapshot_strategy, EpisodeRenderer
 
 class BTgymRendering():
     """
@@ -95,11 +95,15 @@ class BTgymRendering():
         StreamHandler(sys.stdout).push_application()
         self.log = Logger('BTgymRenderer', level=self.log_level)
 
-        #from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-        #self.FigureCanvas = FigureCanvas
-
         self.plt = None  # Will set it inside server process when calling initialize_pyplot().
 
+        # Figures are made once per mode and redrawn in place:
+        self.figures = dict()
+
+        # Episode is rendered on demand from data snapshot, by background process started on first request:
+        self.episode_snapshot = None
+        self.episode_renderer = None
+
         #self.plotter = BTgymPlotter() # Modified bt.Cerebro() plotter, to get episode renderings.
 
         # Set empty plugs for each render mode:
@@ -113,17 +117,33 @@ class BTgymRendering():
         [Supposed to be done inside already running server process]
         """
         if not self.ready:
-            from multiprocessing import Pipe
-            self.out_pipe, self.in_pipe = Pipe()
-
             if self.plt is None:
                 import matplotlib
                 matplotlib.use(self.plt_backend, force=True)
                 import matplotlib.pyplot as plt
 
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+
             self.plt = plt
+            self.Figure = Figure
+            self.FigureCanvas = FigureCanvas
             self.ready = True
 
+    def __getstate__(self):
+        """
+        Drops pyplot module, figures and episode renderer process handle, which can't be pickled,
+        so renderer can be sent to server process started by pool; it gets initialized there anew.
+        """
+        state = self.__dict__.copy()
+        state.pop('Figure', None)
+        state.pop('FigureCanvas', None)
+        state['plt'] = None
+        state['figures'] = dict()
+        state['episode_renderer'] = None
+        state['ready'] = False
+        return state
+
     def to_string(self, dictionary, excluded=[]):
         """
         Converts given dictionary to more-or-less good looking `text block` string.
@@ -131,7 +151,7 @@ class BTgymRendering():
         text = ''
         for k, v in dictionary.items():
             if k not in excluded:
-                if type(v) in [float]:
+                if isinstance(v, (float, np.floating)):
                     v = '{:.4f}'.format(v)
                 text += '{}: {}\n'.format(k, v)
         return text[:-1]
@@ -207,8 +227,8 @@ class BTgymRendering():
 
         Logic:
             - If `cerebro` arg is received:
-                render entire episode, using built-in backtrader plotting feature,
-                update stored `episode` image.
+                keep snapshot of finished episode data; actual `episode` image is rendered
+                only when `episode` mode is requested.
 
             - If `step_to_render' arg is received:
                 - if mode = 'raw_state':
@@ -229,8 +249,14 @@ class BTgymRendering():
             mode_list = [mode_list]
 
         if cerebro is not None:
-            self.rgb_dict['episode'] = self.draw_episode(cerebro)
-            self.log.debug('Episode rendering done.')
+            try:
+                self.episode_snapshot = snapshot_strategy(cerebro.runstrats[0][0])
+                self.log.debug('Episode snapshot done.')
+
+            except Exception as e:
+                # Just keep previous rendering:
+                self.log.warning('Episode snapshot failed: {}'.format(e))
+
             # Try to render given episode:
             #try:
                 # Get picture of entire episode:
@@ -272,6 +298,7 @@ class BTgymRendering():
                                                                  box_text=box_text,
                                                                  ylabel=self.render_ylabel,
                                                                  xlabel=self.render_xlabel,
+                                                                 key=mode,
                                                                  )
                     else:
                         self.rgb_dict[mode] = self.draw_plot(agent_state,
@@ -280,6 +307,7 @@ class BTgymRendering():
                                                                 box_text=box_text,
                                                                 ylabel=self.render_ylabel,
                                                                 xlabel=self.render_xlabel,
+                                                                key=mode,
                                                                 )
 
                 if 'human' in mode:
@@ -292,6 +320,7 @@ class BTgymRendering():
                                                             ylabel='Price',
                                                             xlabel=self.render_xlabel,
                                                             line_labels=['Open', 'High', 'Low', 'Close'],
+                                                            key='human',
                                                             )
             if send_img:
                 return self.rgb_dict
@@ -299,6 +328,9 @@ class BTgymRendering():
         else:
             # this case is for internal use only;
             # now `mode` supposed to contain several modes, let's return dictionary of arrays:
+            if 'episode' in mode_list and self.episode_snapshot is not None:
+                self.rgb_dict['episode'] = self.draw_episode()
+
             return_dict = dict()
             for entry in mode_list:
                 if entry in self.rgb_dict.keys():
@@ -310,10 +342,12 @@ class BTgymRendering():
 
             return return_dict
 
-    def draw_plot(self, data, figsize=(10,6), title='', box_text='', xlabel='X', ylabel='Y', line_labels=None):
+    def draw_plot(self, data, figsize=(10,6), title='', box_text='', xlabel='X', ylabel='Y', line_labels=None,
+                  key=None):
         """
         Visualises environment state as 2d line plot.
         Retrurns image as rgb_array.
+        Figure is made once for every `key` and layout, following calls update its lines in place.
 
         Args:
             data:           np.array of shape [num_values, num_lines]
@@ -323,9 +357,11 @@ class BTgymRendering():
             xlabel:
             ylabel:
             line_labels:    iterable holding line legends as str
+            key:            optional figure name, e.g. render mode
 
         Returns:
-                rgb image as np.array of size [with, height, 3]
+                rgb image as np.array of size [with, height, 3]; it is a view of figure canvas
+                valid until next call with same key and layout.
         """
         if line_labels is None:
             # If got no labels - make it numbers:
@@ -338,129 +374,150 @@ class BTgymRendering():
             assert len(line_labels) == data.shape[-1], \
                 'Expected `line_labels` kwarg consist of {} names, got: {}'. format(data.shape[-1], line_labels)
 
-        fig = self.plt.figure(figsize=figsize, dpi=self.render_dpi, )
-        #ax = fig.add_subplot(111)
-
-        self.plt.style.use(self.render_plotstyle)
-        self.plt.title(title)
-
-        # Plot x axis as reversed time-step embedding:
-        xticks = np.linspace(data.shape[0] - 1, 0, int(data.shape[0]), dtype=int)
-        self.plt.xticks(xticks.tolist(), (- xticks[::-1]).tolist(), visible=False)
-
-        # Set every 5th tick label visible:
-        for tick in self.plt.xticks()[1][::5]:
-            tick.set_visible(True)
-
-        self.plt.xlabel(xlabel)
-        self.plt.ylabel(ylabel)
-        self.plt.grid(True)
-
-        # Switch off antialiasing:
-        #self.plt.setp([ax.get_xticklines() + ax.get_yticklines() + ax.get_xgridlines() + ax.get_ygridlines()],antialiased=False)
-        #self.plt.rcParams['text.antialiased']=False
+        figure_key = ('plot', key, tuple(figsize), tuple(line_labels), xlabel, ylabel)
+        figure = self.figures.get(figure_key)
 
-        # Add Info box:
-        self.plt.text(0, data.min(), box_text, **self.render_boxtext)
+        if figure is None:
+            with self.plt.style.context(self.render_plotstyle):
+                figure = self._make_figure(figsize, xlabel, ylabel)
+                ax = figure['ax']
+                ax.grid(True)
+                # Add Info box:
+                figure['text'] = ax.text(0, 0, '', **self.render_boxtext)
+                figure['lines'] = [ax.plot(data[:, line], label=label)[0] for line, label in enumerate(line_labels)]
+                ax.legend()
+            self.figures[figure_key] = figure
 
-        for line, label in enumerate(line_labels):
-            self.plt.plot(data[:, line], label=label)
-        self.plt.legend()
-        self.plt.tight_layout()
-
-        fig.canvas.draw()
-
-        # Save it to a numpy array:
-        rgb_array = np.fromstring(fig.canvas.tostring_rgb(), dtype=np.uint8, sep='')
+        else:
+            x = np.arange(data.shape[0])
+            for line, artist in enumerate(figure['lines']):
+                artist.set_data(x, data[:, line])
 
-        # Clean up:
-        self.plt.close(fig)
-        #self.plt.gcf().clear()
+        ax = figure['ax']
+        figure['title'].set_text(title)
+        figure['text'].set_text(box_text)
+        figure['text'].set_position((0, data.min()))
+        ax.relim()
+        ax.autoscale_view()
 
-        return rgb_array.reshape(fig.canvas.get_width_height()[::-1] + (3,))
+        return self._draw_figure(figure, data.shape[0])
 
-    def draw_image(self, data, figsize=(12,6), title='', box_text='', xlabel='X', ylabel='Y', line_labels=None):
+    def draw_image(self, data, figsize=(12,6), title='', box_text='', xlabel='X', ylabel='Y', line_labels=None,
+                   key=None):
         """
         Visualises environment state as image.
-        Returns rgb_array.
+        Returns rgb_array, a view of figure canvas valid until next call with same key and layout.
+        Figure is made once for every `key` and layout, following calls update its image in place.
         """
-        fig = self.plt.figure(figsize=figsize, dpi=self.render_dpi, )
-        #ax = fig.add_subplot(111)
+        figure_key = ('image', key, tuple(figsize), xlabel, ylabel)
+        figure = self.figures.get(figure_key)
+
+        if figure is None:
+            with self.plt.style.context(self.render_plotstyle):
+                figure = self._make_figure(figsize, xlabel, ylabel)
+                ax = figure['ax']
+                ax.grid(False)
+                # Add Info box:
+                figure['text'] = ax.text(0, 0, '', **self.render_boxtext)
+                figure['image'] = ax.imshow(data.T, aspect='auto', cmap=self.render_cmap)
+                figure['fig'].colorbar(figure['image'], ax=ax, use_gridspec=True)
+            self.figures[figure_key] = figure
 
-        self.plt.style.use(self.render_plotstyle)
-        self.plt.title(title)
+        else:
+            figure['image'].set_data(data.T)
+            figure['image'].set_clim(data.min(), data.max())
 
-        # Plot x axis as reversed time-step embedding:
-        xticks = np.linspace(data.shape[0] - 1, 0, int(data.shape[0]), dtype=int)
-        self.plt.xticks(xticks.tolist(), (- xticks[::-1]).tolist(), visible=False)
+        if figure.get('shape') != data.shape:
+            extent = (-0.5, data.shape[0] - 0.5, data.shape[1] - 0.5, -0.5)
+            figure['image'].set_extent(extent)
+            figure['ax'].set_xlim(extent[:2])
+            figure['ax'].set_ylim(extent[2:])
+            figure['shape'] = data.shape
 
-        # Set every 5th tick label visible:
-        for tick in self.plt.xticks()[1][::5]:
-            tick.set_visible(True)
+        figure['title'].set_text(title)
+        figure['text'].set_text(box_text)
+        figure['text'].set_position((0, data.shape[1] - 1))
 
-        #self.plt.yticks(visible=False)
+        return self._draw_figure(figure, data.shape[0])
 
-        self.plt.xlabel(xlabel)
-        self.plt.ylabel(ylabel)
-        self.plt.grid(False)
+    def _make_figure(self, figsize, xlabel, ylabel):
+        """
+        Makes figure with single axes, not managed by pyplot.
 
-        # Switch off antialiasing:
-        # self.plt.setp([ax.get_xticklines() + ax.get_yticklines() + ax.get_xgridlines() + ax.get_ygridlines()],antialiased=False)
-        # self.plt.rcParams['text.antialiased']=False
-        #self.log.warning('render_data_shape:{}'.format(data.shape))
+        Returns:
+            dictionary of figure, canvas and artists
+        """
+        fig = self.Figure(figsize=figsize, dpi=self.render_dpi)
+        canvas = self.FigureCanvas(fig)
+        ax = fig.add_subplot(111)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
 
-        # Add Info box:
-        self.plt.text(0, data.shape[1] - 1, box_text, **self.render_boxtext)
+        return dict(fig=fig, canvas=canvas, ax=ax, title=ax.set_title(''), length=None)
 
-        im = self.plt.imshow(data.T, aspect='auto', cmap=self.render_cmap)
-        self.plt.colorbar(im, use_gridspec=True)
+    def _draw_figure(self, figure, length):
+        """
+        Sets time axis ticks for data `length` if changed, draws figure.
 
-        self.plt.tight_layout()
+        Returns:
+            rgb image as view of figure canvas buffer
+        """
+        if figure['length'] != length:
+            # Plot x axis as reversed time-step embedding:
+            ax = figure['ax']
+            xticks = np.linspace(length - 1, 0, int(length), dtype=int)
+            ax.set_xticks(xticks.tolist())
 
-        fig.canvas.draw()
+            # Set every 5th tick label visible:
+            ax.set_xticklabels(
+                [str(label) if i % 5 == 0 else '' for i, label in enumerate((- xticks[::-1]).tolist())]
+            )
 
-        # Save it to a numpy array:
-        rgb_array = np.fromstring(fig.canvas.tostring_rgb(), dtype=np.uint8, sep='')
+            figure['fig'].tight_layout()
+            figure['length'] = length
 
-        # Clean up:
-        self.plt.close(fig)
-        #self.plt.gcf().clear()
+        canvas = figure['canvas']
+        canvas.draw()
+        width, height = canvas.get_width_height()
 
-        #ax.cla()
-        return rgb_array.reshape(fig.canvas.get_width_height()[::-1] + (3,))
+        return np.frombuffer(canvas.buffer_rgba(), dtype=np.uint8).reshape(height, width, 4)[..., :3]
 
-    def draw_episode(self, cerebro):
+    def draw_episode(self, cerebro=None):
         """
-        Hacky way to render episode.
-        Due to backtrader/matplotlib memory leaks have to encapsulate it in separate process.
-        Strange but reliable. PID's are driving crazy.
+        Renders last episode snapshot.
+        Due to backtrader/matplotlib memory leaks drawing is encapsulated in separate process,
+        which is started once and kept running.
 
         Args:
-            cerebro instance
+            cerebro:    if given, finished episode cerebro instance to snapshot first
 
         Returns:
             rgb array.
         """
-        draw_process = DrawCerebro(cerebro=cerebro,
-                                   width=self.render_size_episode[0],
-                                   height=self.render_size_episode[1],
-                                   dpi=self.render_dpi,
-                                   result_pipe=self.in_pipe,
-                                   rowsmajor=self.render_rowsmajor_episode,
-                                   )
-
-        draw_process.start()
-        #print('Plotter PID: {}'.format(draw_process.pid))
-        try:
-            rgb_array = self.out_pipe.recv()
-
-            draw_process.terminate()
-            draw_process.join()
+        if cerebro is not None:
+            self.episode_snapshot = snapshot_strategy(cerebro.runstrats[0][0])
+
+        if self.episode_snapshot is None:
+            return self.rgb_dict.get('episode', self.rgb_empty())
+
+        if self.episode_renderer is None or not self.episode_renderer.is_alive():
+            self.episode_renderer = EpisodeRenderer(
+                width=self.render_size_episode[0],
+                height=self.render_size_episode[1],
+                dpi=self.render_dpi,
+                plotstyle=self.render_plotstyle,
+                rowsmajor=self.render_rowsmajor_episode,
+            )
+            self.episode_renderer.start()
+
+        rgb_array = self.episode_renderer.draw(self.episode_snapshot)
+        if rgb_array is None:
+            self.log.warning('Episode rendering failed.')
+            return self.rgb_empty()
 
-            return rgb_array
+        self.episode_snapshot = None
 
-        except:
-            return self.rgb_empty()
+        return rgb_array
 
 
 class BTgymNullRendering():
@@ -0,0 +1,37 @@
+import pickle
+import unittest
+import numpy as np
+
+from .renderer import BTgymRendering
+
+
+class BTgymRenderingTest(unittest.TestCase):
+    """Testing initialized renderer can be sent to other process"""
+
+    def test_pickle(self):
+        renderer = BTgymRendering(['human'])
+        renderer.initialize_pyplot()
+        expected = renderer.draw_plot(np.random.rand(10, 2), key='human')
+        self.assertTrue(renderer.ready)
+        self.assertEqual(len(renderer.figures), 1)
+
+        restored = pickle.loads(pickle.dumps(renderer))
+        self.assertFalse(restored.ready)
+        self.assertIsNone(restored.plt)
+        self.assertIsNone(restored.episode_renderer)
+        self.assertEqual(restored.figures, {})
+        self.assertFalse(hasattr(restored, 'Figure'))
+        self.assertEqual(restored.render_modes, ['human'])
+
+        # Original is left intact:
+        self.assertTrue(renderer.ready)
+        self.assertEqual(len(renderer.figures), 1)
+
+        # Restored one gets initialized anew:
+        restored.initialize_pyplot()
+        self.assertTrue(restored.ready)
+        self.assertEqual(restored.draw_plot(np.random.rand(10, 2), key='human').shape, expected.shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,6 +20,7 @@ def MetaEnvRunnerFn(
         memory_config,
         log,
         aux_summaries=('action_prob', 'value_fn', 'lstm_1_h', 'lstm_2_h'),
+        memory=None,
 ):
     """
     Meta-learning loop runtime logic of the thread runner.
@@ -36,15 +37,17 @@ def MetaEnvRunnerFn(
         memory_config:          replay memory configuration dictionary
         log:                    logbook logger
         aux_summaries:          list of str, additional summaries to compute
+        memory:                 replay memory instance to fill, made from `memory_config` if not given
 
     Yelds:
         collected data as dictionary of on_policy, off_policy rollouts, episode statistics and summaries.
     """
-    if memory_config is not None:
-        memory = memory_config['class_ref'](**memory_config['kwargs'])
+    if memory is None:
+        if memory_config is not None:
+            memory = memory_config['class_ref'](**memory_config['kwargs'])
 
-    else:
-        memory = _DummyMemory()
+        else:
+            memory = _DummyMemory()
 
     # We want test data runner to be master:
 
@@ -1,6 +1,101 @@
 import numpy as np
 
-from btgym.algorithms.utils import batch_stack, batch_gather
+from tensorflow.contrib.rnn import LSTMStateTuple
+from btgym.algorithms.utils import batch_gather
+
+
+class BatchBuffer:
+    """
+    Growable buffer of processed batches stacked along batch dimension, same way batch_stack() does.
+    Every leaf of [nested] batch is kept in array of amortized doubling capacity,
+    so adding data copies new experiences only instead of re-stacking entire buffer.
+    """
+
+    def __init__(self):
+        self.template = None
+        self.leaves = None
+        self.sizes = None
+        self.batch_size = 0
+
+    def reset(self):
+        """
+        Clears buffer, keeps allocated arrays.
+        """
+        if self.sizes is not None:
+            self.sizes = [0] * len(self.sizes)
+        self.batch_size = 0
+
+    def _flatten(self, template, struct, leaves):
+        if isinstance(template, dict):
+            for key, value in template.items():
+                self._flatten(value, struct[key], leaves)
+
+        elif isinstance(template, tuple):
+            for value, struct_value in zip(template, struct):
+                self._flatten(value, struct_value, leaves)
+
+        else:
+            value = np.asarray(struct)
+            leaves.append(value[None, ...] if value.ndim == 0 else value)
+
+        return leaves
+
+    def _pack(self, template, leaves):
+        if isinstance(template, dict):
+            return {key: self._pack(value, leaves) for key, value in template.items()}
+
+        elif isinstance(template, LSTMStateTuple):
+            return LSTMStateTuple(c=self._pack(template[0], leaves), h=self._pack(template[1], leaves))
+
+        elif isinstance(template, tuple):
+            return tuple([self._pack(value, leaves) for value in template])
+
+        else:
+            return next(leaves)
+
+    def add(self, batch):
+        """
+        Appends processed batch to buffer.
+
+        Args:
+            batch:  processed batch as dictionary of np.arrays, tuples and LSTMStateTuples
+        """
+        if self.template is None:
+            self.template = {key: value for key, value in batch.items() if key != 'batch_size'}
+            self.leaves = [
+                np.zeros((0,) + value.shape[1:], dtype=value.dtype)
+                for value in self._flatten(self.template, batch, [])
+            ]
+            self.sizes = [0] * len(self.leaves)
+
+        for i, value in enumerate(self._flatten(self.template, batch, [])):
+            buffer = self.leaves[i]
+            size = self.sizes[i]
+            new_size = size + value.shape[0]
+            dtype = np.result_type(buffer.dtype, value.dtype)
+            if new_size > buffer.shape[0] or dtype != buffer.dtype:
+                # Grow:
+                new_buffer = np.zeros((max(2 * buffer.shape[0], new_size),) + buffer.shape[1:], dtype=dtype)
+                new_buffer[:size] = buffer[:size]
+                self.leaves[i] = buffer = new_buffer
+
+            buffer[size: new_size] = value
+            self.sizes[i] = new_size
+
+        self.batch_size += np.asarray(batch['batch_size']).sum()
+
+    def get(self):
+        """
+        Returns:
+            batch of all data added, entries are views of buffer arrays.
+        """
+        if self.template is None:
+            return None
+
+        batch = self._pack(self.template, iter([leaf[:size] for leaf, size in zip(self.leaves, self.sizes)]))
+        batch['batch_size'] = self.batch_size
+
+        return batch
 
 
 class LocalMemory:
@@ -12,6 +107,7 @@ class LocalMemory:
         self.on_batch = None
         self.off_batch = None
         self.rp_batch = None
+        self.buffers = dict(on=BatchBuffer(), off=BatchBuffer(), rp=BatchBuffer())
 
     def reset(self):
         """
@@ -20,6 +116,8 @@ class LocalMemory:
         self.on_batch = None
         self.off_batch = None
         self.rp_batch = None
+        for buffer in self.buffers.values():
+            buffer.reset()
 
     def add_batch(self, on_policy_batch, off_policy_batch, rp_batch):
         """
@@ -28,23 +126,17 @@ class LocalMemory:
         Args:
             data:
         """
-        if self.on_batch is None:
-            self.on_batch = on_policy_batch
+        if on_policy_batch is not None:
+            self.buffers['on'].add(on_policy_batch)
+            self.on_batch = self.buffers['on'].get()
 
-        else:
-            self.on_batch = batch_stack([self.on_batch, on_policy_batch])
-
-        if self.off_batch is None:
-            self.off_batch = off_policy_batch
+        if off_policy_batch is not None:
+            self.buffers['off'].add(off_policy_batch)
+            self.off_batch = self.buffers['off'].get()
 
-        else:
-            self.off_batch = batch_stack([self.off_batch, off_policy_batch])
-
-        if self.rp_batch is None:
-            self.rp_batch = rp_batch
-
-        else:
-            self.rp_batch = batch_stack([self.rp_batch, rp_batch])
+        if rp_batch is not None:
+            self.buffers['rp'].add(rp_batch)
+            self.rp_batch = self.buffers['rp'].get()
 
     def sample(self, sample_size):
         """
@@ -97,12 +189,14 @@ class LocalMemory2:
 
     def __init__(self):
         self.batch = None
+        self.buffer = BatchBuffer()
 
     def reset(self):
         """
         Clears memory.
         """
         self.batch = None
+        self.buffer.reset()
 
     def add_batch(self, on_policy_batch, **kwargs):
         """
@@ -111,11 +205,9 @@ class LocalMemory2:
         Args:
             data:
         """
-        if self.batch is None:
-            self.batch = on_policy_batch
-
-        else:
-            self.batch = batch_stack([self.batch, on_policy_batch])
+        if on_policy_batch is not None:
+            self.buffer.add(on_policy_batch)
+            self.batch = self.buffer.get()
 
     def sample(self, sample_size):
         """
@@ -141,4 +233,3 @@ class LocalMemory2:
             'off_policy_batch': off_policy_batch,
             'rp_batch': None
         }
-
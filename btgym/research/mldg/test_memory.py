@@ -0,0 +1,129 @@
+import unittest
+import numpy as np
+from tensorflow.contrib.rnn import LSTMStateTuple
+
+from btgym.algorithms.rollout import Rollout
+from btgym.algorithms.utils import batch_stack
+from .memory import BatchBuffer, LocalMemory
+
+
+def make_rollout(length, first_step=0):
+    rollout = Rollout()
+    for step in range(first_step, first_step + length):
+        action = np.zeros(3)
+        action[step % 3] = 1
+        rollout.add(
+            dict(
+                position={'episode': 0, 'step': step},
+                state={
+                    'external': np.full([4, 1, 2], step, dtype=np.float32),
+                    'metadata': {'type': np.asarray(step % 2), 'trial_num': np.asarray(step // 4)},
+                },
+                action=action,
+                last_action_reward=np.concatenate([action, [step * .1]]),
+                reward=np.sin(step),
+                value=np.cos(step),
+                r=np.asarray([0.0 if step == first_step + length - 1 else .5]),
+                terminal=step == first_step + length - 1,
+                context=tuple(
+                    [
+                        LSTMStateTuple(c=np.full([1, size], step, dtype=np.float32), h=np.full([1, size], -step))
+                        for size in [5, 3]
+                    ]
+                ),
+            )
+        )
+    return rollout
+
+
+def make_batches(lengths, time_flat, first_step=0):
+    return [
+        make_rollout(length, first_step + 10 * i).process(gamma=.9, time_flat=time_flat)
+        for i, length in enumerate(lengths)
+    ]
+
+
+class BatchBufferTest(unittest.TestCase):
+    """Testing BatchBuffer gives same batch as batch_stack() does"""
+
+    def assert_same(self, x, y, path=''):
+        if isinstance(x, dict):
+            self.assertEqual(set(x.keys()), set(y.keys()), path)
+            for key in x.keys():
+                self.assert_same(x[key], y[key], path + '/' + key)
+
+        elif isinstance(x, tuple):
+            self.assertEqual(type(x), type(y), path)
+            self.assertEqual(len(x), len(y), path)
+            for i, (value_x, value_y) in enumerate(zip(x, y)):
+                self.assert_same(value_x, value_y, path + '/' + str(i))
+
+        else:
+            np.testing.assert_array_equal(np.asarray(x), np.asarray(y), err_msg=path)
+            self.assertEqual(np.shape(x), np.shape(y), path)
+            self.assertEqual(np.asarray(x).dtype, np.asarray(y).dtype, path)
+
+    def test_ragged(self):
+        for time_flat in [False, True]:
+            batches = make_batches([5, 1, 8, 3, 12, 2], time_flat)
+            buffer = BatchBuffer()
+            for i, batch in enumerate(batches):
+                buffer.add(batch)
+                self.assert_same(batch_stack(batches[:i + 1]), buffer.get(), 'time_flat={}'.format(time_flat))
+
+    def test_stacked_batches(self):
+        # Batches added can be stacked already:
+        batches = make_batches([4, 7, 2, 9], time_flat=True)
+        buffer = BatchBuffer()
+        buffer.add(batch_stack(batches[:3]))
+        buffer.add(batches[3])
+        self.assert_same(batch_stack(batches), buffer.get())
+
+    def test_reuse(self):
+        buffer = BatchBuffer()
+        first = make_batches([6, 3], time_flat=True)
+        for batch in first:
+            buffer.add(batch)
+        capacity = [leaf.shape[0] for leaf in buffer.leaves]
+
+        # Smaller data fits into arrays allocated:
+        buffer.reset()
+        self.assertEqual(buffer.batch_size, 0)
+        second = make_batches([2, 4], time_flat=True, first_step=100)
+        for batch in second:
+            buffer.add(batch)
+        self.assert_same(batch_stack(second), buffer.get())
+        self.assertEqual([leaf.shape[0] for leaf in buffer.leaves], capacity)
+
+        # Bigger one gets arrays grown:
+        buffer.reset()
+        third = make_batches([11, 1, 13], time_flat=True, first_step=200)
+        for batch in third:
+            buffer.add(batch)
+        self.assert_same(batch_stack(third), buffer.get())
+
+    def test_empty(self):
+        self.assertIsNone(BatchBuffer().get())
+
+    def test_local_memory(self):
+        # Same as re-stacking memory content on every add:
+        memory = LocalMemory()
+        on_batches = make_batches([3, 5, 2], time_flat=True)
+        rp_batches = make_batches([4, 4, 4], time_flat=True, first_step=50)
+        expected = None
+        for on_batch, rp_batch in zip(on_batches, rp_batches):
+            memory.add_batch(on_batch, None, rp_batch)
+            expected = on_batch if expected is None else batch_stack([expected, on_batch])
+
+        self.assert_same(expected, memory.on_batch)
+        self.assert_same(batch_stack(rp_batches), memory.rp_batch)
+        self.assertIsNone(memory.off_batch)
+
+        memory.reset()
+        self.assertIsNone(memory.on_batch)
+        memory.add_batch(on_batches[0], None, None)
+        self.assert_same(on_batches[0], memory.on_batch)
+
+
+if __name__ == '__main__':
+    unittest.main()
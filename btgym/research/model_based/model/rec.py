@@ -5,6 +5,7 @@
 import numpy as np
 from scipy.linalg import toeplitz
 from scipy.stats import t as student_t
+from scipy.stats import norm as normal
 import copy
 from collections import namedtuple
 
@@ -449,6 +450,137 @@ class Zscore:
         return self.mean, self.variance
 
 
+class StreamingZscore:
+    """
+    Single-step specialisation of Zscore estimator intended for per-bar use inside strategy loop:
+    mean and variance are updated in-place with the same exponentially decayed (Finch) recursion,
+    normalisation interval bounds are computed via precomputed standard normal quantile,
+    so no scipy distribution objects get created on every update.
+
+    Note:
+        arrays returned by get_state(), reset() and update() are internal buffers
+        and get overwritten by next update; copy them if values should be kept.
+    """
+
+    def __init__(self, dim, alpha, interval=.99):
+        """
+
+        Args:
+            dim:        observation dimensionality
+            alpha:      float, decaying factor in [0, 1]
+            interval:   float in ]0, 1[, probability mass of symmetric normalisation interval
+        """
+        self.dim = dim
+        if alpha is None:
+            self.alpha = 1
+            self.is_decayed = False
+        else:
+            self.alpha = alpha
+            self.is_decayed = True
+
+        self.interval = interval
+        # Two-sided standard normal quantile, computed once:
+        self.z = float(normal.ppf(.5 + interval / 2))
+
+        self.mean = None
+        self.variance = None
+        self.dx = np.zeros(self.dim)
+        self.num_obs = 0
+
+    def get_state(self):
+        """
+        Convenience wrapper.
+
+        Returns:
+            current state as instance of ZscoreState tuple
+        """
+        return ZscoreState(
+            mean=self.mean,
+            variance=self.variance,
+        )
+
+    def reset(self, init_x):
+        """
+        Resets statistics estimates.
+
+        Args:
+            init_x:  np.array of initial observations of size [dim, num_init_observations]
+
+        Returns:
+            initial dimension-wise mean and variance estimates of sizes [dim], [dim]
+        """
+        if init_x is None:
+            self.mean = np.zeros(self.dim)
+            self.variance = np.ones(self.dim) * 1e-8
+            self.num_obs = 1
+            if not self.is_decayed:
+                self.alpha = 1
+
+        else:
+            assert init_x.shape[0] == self.dim
+            self.mean = init_x.mean(axis=-1).astype(np.float64)
+            self.variance = init_x.var(axis=-1).astype(np.float64)
+            self.num_obs = init_x.shape[-1]
+
+            if not self.is_decayed:
+                self.alpha = 1 / (self.num_obs - 1)
+
+        self.dx.fill(0)
+
+        return self.mean, self.variance
+
+    def update(self, x):
+        """
+        Updates statistics estimates.
+
+        Args:
+            x: scalar or np.array of shape [dim] (single observation) or [dim, num_updating_points]
+
+        Returns:
+            current dimension-wise mean and variance estimates of sizes [dim], [dim]
+        """
+        x = np.asarray(x)
+        if x.ndim <= 1:
+            self._step(x)
+
+        else:
+            assert x.ndim == 2 and x.shape[0] == self.dim
+            for i in range(x.shape[-1]):
+                self._step(x[:, i])
+
+        return self.mean, self.variance
+
+    def _step(self, x):
+        self.num_obs += 1
+        if not self.is_decayed:
+            self.alpha = 1 / (self.num_obs - 1)
+
+        np.subtract(x, self.mean, out=self.dx)
+
+        # m_k = m_k-1 + alpha * dx:
+        self.mean += self.alpha * self.dx
+
+        # S_k = (1 - alpha) * (S_k-1 + alpha * dx**2):
+        self.variance += self.alpha * self.dx ** 2
+        self.variance *= 1 - self.alpha
+
+    def get_interval(self, min_variance=1e-8):
+        """
+        Returns symmetric normal normalisation interval for first dimension.
+
+        Args:
+            min_variance:   float, variance estimate is clipped from below at this value
+
+        Returns:
+            mean, variance, interval lower bound, interval upper bound as python floats
+        """
+        mean = float(self.mean[0])
+        variance = max(float(self.variance[0]), min_variance)
+        half_width = self.z * variance ** .5
+
+        return mean, variance, mean - half_width, mean + half_width
+
+
 CovarianceState = namedtuple('CovarianceState', ['covariance', 'mean', 'variance'])
 
 
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+from scipy.stats import norm
+
+from .rec import Zscore, StreamingZscore
+
+
+class StreamingZscoreTest(unittest.TestCase):
+    """Testing StreamingZscore against Zscore estimates"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.dim = 2
+        self.init_x = np.random.normal(loc=1.0, scale=2.0, size=[self.dim, 30])
+        self.x = np.random.normal(loc=-1.0, scale=.5, size=[self.dim, 200])
+
+    def assert_same_estimates(self, alpha, chunk_size):
+        reference = Zscore(self.dim, alpha)
+        streaming = StreamingZscore(self.dim, alpha)
+        reference.reset(self.init_x)
+        streaming.reset(self.init_x)
+
+        for i in range(0, self.x.shape[-1], chunk_size):
+            mean, variance = reference.update(self.x[:, i: i + chunk_size])
+            if chunk_size == 1:
+                streaming.update(self.x[:, i])
+
+            else:
+                streaming.update(self.x[:, i: i + chunk_size])
+
+            np.testing.assert_allclose(streaming.mean, mean, rtol=1e-10)
+            np.testing.assert_allclose(streaming.variance, variance, rtol=1e-10)
+
+        self.assertEqual(streaming.num_obs, reference.num_obs)
+
+    def test_decayed_single_steps(self):
+        self.assert_same_estimates(alpha=.05, chunk_size=1)
+
+    def test_decayed_chunks(self):
+        self.assert_same_estimates(alpha=.05, chunk_size=7)
+
+    def test_not_decayed(self):
+        self.assert_same_estimates(alpha=None, chunk_size=1)
+
+    def test_empty_reset(self):
+        reference = Zscore(self.dim, .1)
+        streaming = StreamingZscore(self.dim, .1)
+        reference.reset(None)
+        streaming.reset(None)
+        for i in range(20):
+            reference.update(self.x[:, i: i + 1])
+            streaming.update(self.x[:, i])
+
+        np.testing.assert_allclose(streaming.mean, reference.mean, rtol=1e-10)
+        np.testing.assert_allclose(streaming.variance, reference.variance, rtol=1e-10)
+
+    def test_interval(self):
+        streaming = StreamingZscore(self.dim, .05, interval=.95)
+        streaming.reset(self.init_x)
+        streaming.update(self.x)
+        mean, variance, low, high = streaming.get_interval()
+        expected_low, expected_high = norm.interval(.95, loc=streaming.mean[0], scale=streaming.variance[0] ** .5)
+
+        self.assertAlmostEqual(mean, streaming.mean[0])
+        self.assertAlmostEqual(low, expected_low)
+        self.assertAlmostEqual(high, expected_high)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,13 +4,13 @@ from gym import spaces
 from btgym import DictSpace
 
 import numpy as np
-from scipy import stats
 from pykalman import KalmanFilter
 
-from btgym.research.strategy_gen_6.base import BaseStrategy6, Zscore, NormalisationState
+from btgym.research.strategy_gen_6.base import BaseStrategy6, NormalisationState
 from btgym.research.strategy_gen_6.utils import SpreadSizer, SpreadConstructor, CumSumReward
 from btgym.research.model_based.model.bivariate import BivariatePriceModel
 from btgym.research.model_based.model.utils import cov2corr, log_stat2stat
+from btgym.research.model_based.model.rec import StreamingZscore
 
 
 class PairSpreadStrategy_0(BaseStrategy6):
@@ -178,8 +178,13 @@ class PairSpreadStrategy_0(BaseStrategy6):
 
         self.log.debug('startegy got broadcast_msg: <<{}>>'.format(self.p.broadcast_message))
 
-        # Track original prices statistics, let base self.norm_stat_tracker track spread (=stat_asset) itself:
-        self.norm_stat_tracker_2 = Zscore(2, self.p.norm_alpha_2)
+        # Per-step normalisation trackers; base self.norm_stat_tracker tracks spread (=stat_asset) itself,
+        # self.norm_stat_tracker_2 tracks original prices statistics:
+        self.norm_stat_tracker = StreamingZscore(1, alpha=self.p.norm_alpha)
+        self.norm_stat_tracker_2 = StreamingZscore(2, alpha=self.p.norm_alpha_2)
+
+        # Preallocated buffer for last prices update:
+        self.last_prices = np.zeros(2)
 
         # Synthetic spread order size estimator:
         self.spread_sizer = SpreadSizer(
@@ -275,29 +280,21 @@ class PairSpreadStrategy_0(BaseStrategy6):
             instance of NormalisationState tuple
         """
         # Update synth. spread rolling normalizers:
-        x_upd = np.stack(
-            [
-                np.asarray(self.datas[0].get(size=1)),
-                np.asarray(self.datas[1].get(size=1))
-            ],
-            axis=0
-        )
-        _ = self.norm_stat_tracker_2.update(x_upd)
+        self.last_prices[0] = self.datas[0][0]
+        self.last_prices[1] = self.datas[1][0]
+        self.norm_stat_tracker_2.update(self.last_prices)
 
         # ...and use [normalised] spread rolling mean and variance to estimate NormalisationState
         # used to normalize all broker statistics and reward:
-        spread_data = np.asarray(self.stat_asset.get(size=1))
-
-        mean, var = self.norm_stat_tracker.update(spread_data[None, :])
-        var = np.clip(var, 1e-8, None)
+        self.norm_stat_tracker.update(self.stat_asset[0])
 
         # Use 99% N(stat_data_mean, stat_data_std) intervals as normalisation interval:
-        intervals = stats.norm.interval(.99, mean, var ** .5)
+        mean, var, low_interval, up_interval = self.norm_stat_tracker.get_interval()
         self.normalisation_state = NormalisationState(
-            mean=float(mean),
-            variance=float(var),
-            low_interval=intervals[0][0],
-            up_interval=intervals[1][0]
+            mean=mean,
+            variance=var,
+            low_interval=low_interval,
+            up_interval=up_interval
         )
         return self.normalisation_state
 
@@ -984,40 +981,6 @@ class SSAStrategy_0(PairSpreadStrategy_0):
         #     )
         # )
 
-    def get_normalisation(self):
-        """
-        Estimates current normalisation constants, updates `normalisation_state` attr.
-
-        Returns:
-            instance of NormalisationState tuple
-        """
-        # Update synth. spread rolling normalizers:
-        x_upd = np.stack(
-            [
-                np.asarray(self.datas[0].get(size=1)),
-                np.asarray(self.datas[1].get(size=1))
-            ],
-            axis=0
-        )
-        _ = self.norm_stat_tracker_2.update(x_upd)
-
-        # ...and use [normalised] spread rolling mean and variance to estimate NormalisationState
-        # used to normalize all broker statistics and reward:
-        spread_data = np.asarray(self.stat_asset.get(size=1))
-
-        mean, var = self.norm_stat_tracker.update(spread_data[None, :])
-        var = np.clip(var, 1e-8, None)
-
-        # Use 99% N(stat_data_mean, stat_data_std) intervals as normalisation interval:
-        intervals = stats.norm.interval(.99, mean, var ** .5)
-        self.normalisation_state = NormalisationState(
-            mean=float(mean),
-            variance=float(var),
-            low_interval=intervals[0][0],
-            up_interval=intervals[1][0]
-        )
-        return self.normalisation_state
-
     def get_external_state(self):
         return dict(
             ssa=self.get_external_ssa_state(),
@@ -30,6 +30,8 @@ from datetime import timedelta
 
 import backtrader as bt
 from .datafeed import DataSampleConfig, EnvResetConfig
+from .memory_tracker import MemoryTracker
+from .supervisor import BTgymHeartbeat
 from .strategy.observers import NormPnL, Position, Reward
 
 ###################### BT Server in-episode communocation method ##############
@@ -71,8 +73,14 @@ class _BTgymAnalyzer(bt.Analyzer):
         except:
             pass
 
+        # Strategy step information is either kept by strategy itself as columnar log
+        # or collected here as list of per-step dictionaries:
+        self.info_log = getattr(self.strategy, 'info_log', None)
         self.info_list = []
 
+        # If only latest step info is sent, skipped frames need not to be logged at all:
+        self.log_skipped_frames = self.info_log is None or self.info_log.mode != 'last'
+
     def prenext(self):
         pass
 
@@ -102,7 +110,11 @@ class _BTgymAnalyzer(bt.Analyzer):
         reward = self.strategy.get_reward()
         # Send response as <o, r, d, i> tuple (Gym convention),
         # opt to send entire info_list or just latest part:
-        info = [self.info_list[-1]]
+        if self.info_log is not None:
+            info = [self.info_log.get_record()]
+
+        else:
+            info = [self.info_list[-1]]
         self.socket.send_pyobj((state, reward, is_done, info))
 
         # Increment global time by sending timestamp to data_server, if authorized;
@@ -124,7 +136,12 @@ class _BTgymAnalyzer(bt.Analyzer):
         # Back up step information for rendering.
         # It pays when using skip-frames: will'll get future state otherwise.
 
-        self.step_to_render = ({'human': raw_state}, state, reward, is_done, self.info_list)
+        if self.info_log is not None:
+            self.step_to_render = ({'human': raw_state}, state, reward, is_done, info)
+            self.info_log.rewind()
+
+        else:
+            self.step_to_render = ({'human': raw_state}, state, reward, is_done, self.info_list)
 
         # Reset info:
         self.info_list = []
@@ -138,8 +155,18 @@ class _BTgymAnalyzer(bt.Analyzer):
         # We'll do it every step:
         # If it's time to leave:
         is_done = self.strategy._get_done()
+
+        # Within skip_frame loop, fast-forward:
+        if self.strategy.iteration % self.strategy.p.skip_frame != 0 and not is_done:
+            self.next_skipped()
+            return
+
         # Collect step info:
-        self.info_list.append(self.strategy.get_info())
+        if self.info_log is not None:
+            self.strategy.update_info_log()
+
+        else:
+            self.info_list.append(self.strategy.get_info())
         # Put agent on hold:
         self.strategy.action = self.strategy.p.initial_portfolio_action
         # Trick to avoid excessive orders emitting during skip_frame loop:
@@ -219,6 +246,28 @@ class _BTgymAnalyzer(bt.Analyzer):
         self.strategy.iteration += 1
         self.strategy.broker_message = '-'
 
+    def next_skipped(self):
+        """
+        Skipped frame routine: no communication is done here, so only bookkeeping
+        required to compose next environment response is performed.
+        """
+        # Collect step info only if it is going to be sent:
+        if self.log_skipped_frames:
+            if self.info_log is not None:
+                self.strategy.update_info_log()
+
+            else:
+                self.info_list.append(self.strategy.get_info())
+
+        # Put agent on hold, once per skip_frame loop:
+        if '_skip_this' not in self.strategy.action:
+            self.strategy.action = self.strategy.p.initial_portfolio_action
+            self.strategy.action['_skip_this'] = True
+
+        # Strategy housekeeping:
+        self.strategy.iteration += 1
+        self.strategy.broker_message = '-'
+
     ##############################  BTgym Server Main  ##############################
 
 
@@ -231,7 +280,7 @@ class BTgymServer(multiprocessing.Process):
 
         dict(action=<control action, type=str>,), where control action is:
         '_reset' - rewinds backtrader engine and runs new episode;
-        '_getstat' - retrieve episode results and statistics;
+        '_getstat' - retrieve episode results and statistics, including server memory usage;
         '_stop' - server shut-down.
 
     Control mode OUT::
@@ -266,6 +315,7 @@ class BTgymServer(multiprocessing.Process):
         connect_timeout=90,
         log_level=None,
         task=0,
+        trace_memory=False,
     ):
         """
 
@@ -276,6 +326,7 @@ class BTgymServer(multiprocessing.Process):
             data_network_address:   data communication, str
             connect_timeout:        seconds, int
             log_level:              int, logbook.level
+            trace_memory:           bool, keep tracemalloc snapshots to report lines allocating growing memory
         """
 
         super(BTgymServer, self).__init__()
@@ -294,6 +345,10 @@ class BTgymServer(multiprocessing.Process):
         self.trial_stat = None
         self.dataset_stat = None
 
+        self.trace_memory = trace_memory
+        self.memory_tracker = None
+        self.heartbeat = None
+
     @staticmethod
     def _comm_with_timeout(socket, message):
         """
@@ -383,6 +438,7 @@ class BTgymServer(multiprocessing.Process):
             # Ready or not?
             try:
                 assert 'Dataset not ready' in data_server_response['message']['ctrl']
+                self.heartbeat.waiting = True
                 if wait <= self.wait_for_data_reset:
                     pause = random.random() * 2
                     time.sleep(pause)
@@ -401,6 +457,8 @@ class BTgymServer(multiprocessing.Process):
 
             except (AssertionError, KeyError) as e:
                 break
+
+        self.heartbeat.waiting = False
         # Get trial instance:
         trial_sample = data_server_response['message']['sample']
         trial_stat = trial_sample.describe()
@@ -493,6 +551,14 @@ class BTgymServer(multiprocessing.Process):
         self.process = multiprocessing.current_process()
         self.log.info('PID: {}'.format(self.process.pid))
 
+        # Per-episode memory usage:
+        self.memory_tracker = MemoryTracker(trace=self.trace_memory)
+        self.memory_tracker.start()
+
+        # Answer supervisor pings:
+        self.heartbeat = BTgymHeartbeat()
+        self.heartbeat.start()
+
         # Runtime Housekeeping:
         cerebro = None
         episode_result = dict()
@@ -561,6 +627,7 @@ class BTgymServer(multiprocessing.Process):
                         # send last run statistic, release comm channel and exit:
                         message = 'Exiting.'
                         self.log.info(message)
+                        self.heartbeat.close()
                         self.socket.send_pyobj(message)
                         self.socket.close()
                         self.context.destroy()
@@ -575,6 +642,7 @@ class BTgymServer(multiprocessing.Process):
 
                     # Retrieve statistic:
                     elif service_input['ctrl'] == '_getstat':
+                        episode_result['memory'] = self.memory_tracker.get_stat()
                         self.socket.send_pyobj(episode_result)
                         self.log.debug('Episode statistic sent.')
 
@@ -733,6 +801,7 @@ class BTgymServer(multiprocessing.Process):
                 episode_result[name] = episode.analyzers.getbyname(name).get_analysis()
 
             gc.collect()
+            self.memory_tracker.update()
 
         # Just in case -- we actually shouldn't get there except by some error:
         return None
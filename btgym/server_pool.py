@@ -0,0 +1,290 @@
+###############################################################################
+#
+# Copyright (C) 2017 Andrew Muzikin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import os
+import sys
+import time
+import signal
+import importlib
+import threading
+import traceback
+import multiprocessing
+
+from logbook import Logger, StreamHandler, WARNING
+
+
+DEFAULT_PRELOAD = (
+    'numpy',
+    'zmq',
+    'backtrader',
+    'btgym.server',
+    'btgym.dataserver',
+    'btgym.datafeed',
+    'btgym.strategy',
+)
+
+
+def _exitcode(status):
+    """
+    Converts os.waitpid() status to multiprocessing-style exit code.
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+
+    return os.WEXITSTATUS(status)
+
+
+def _orphan_exitcode(pid):
+    """
+    Checks server process left over by failed pool process, which can no longer tell its exit code.
+
+    Returns:
+        None if process is still running, -SIGTERM otherwise.
+    """
+    try:
+        os.kill(pid, 0)
+
+    except ProcessLookupError:
+        return -signal.SIGTERM
+
+    try:
+        # Orphaned process can remain zombie if nobody reaps it:
+        with open('/proc/{}/stat'.format(pid)) as f:
+            if f.read().rsplit(')', 1)[-1].split()[0] == 'Z':
+                return -signal.SIGTERM
+
+    except (OSError, IndexError):
+        pass
+
+    return None
+
+
+def _zygote(connection, preload, parent_pid):
+    """
+    Server pool process body: imports heavy modules once and forks ready-to-run server processes on request.
+
+    Args:
+        connection:     multiprocessing.Connection to receive requests from and send responses to
+        preload:        iterable of module names to import before serving requests
+        parent_pid:     pid of process owning the pool, pool exits as soon as it gets orphaned
+    """
+    for name in preload:
+        importlib.import_module(name)
+
+    children = set()
+    exitcodes = dict()
+
+    def reap():
+        for pid in list(children):
+            try:
+                finished_pid, status = os.waitpid(pid, os.WNOHANG)
+
+            except ChildProcessError:
+                finished_pid, status = pid, 0
+
+            if finished_pid != 0:
+                children.discard(pid)
+                exitcodes[pid] = _exitcode(status)
+
+    def shutdown(*args):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+
+            except ProcessLookupError:
+                pass
+
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+
+    while os.getppid() == parent_pid:
+        if not connection.poll(1):
+            reap()
+            continue
+
+        try:
+            request, args = connection.recv()
+
+        except EOFError:
+            break
+
+        reap()
+        if request == 'launch':
+            process_class, kwargs = args
+            pid = os.fork()
+            if pid == 0:
+                # Server process, same steps as multiprocessing fork start method does:
+                code = 1
+                try:
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    connection.close()
+                    process = process_class(**kwargs)
+                    process.daemon = False
+                    code = process._bootstrap()
+
+                except BaseException:
+                    traceback.print_exc()
+
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os._exit(code)
+
+            children.add(pid)
+            connection.send(pid)
+
+        elif request == 'status':
+            connection.send(exitcodes.get(args, None if args in children else 0))
+
+        else:
+            connection.send(None)
+
+    shutdown()
+
+
+class BTgymPooledProcess:
+    """
+    Handle of server process launched by BTgymServerPool,
+    supports the part of multiprocessing.Process interface environment uses to manage servers.
+    """
+
+    def __init__(self, pool, pid):
+        self.pool = pool
+        self.pid = pid
+
+    @property
+    def exitcode(self):
+        return self.pool.status(self.pid)
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def terminate(self):
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+
+        except ProcessLookupError:
+            pass
+
+    def join(self, timeout=None):
+        start = time.time()
+        while self.exitcode is None:
+            if timeout is not None and time.time() - start > timeout:
+                break
+            time.sleep(0.01)
+
+
+class BTgymServerPool:
+    """
+    Pool launching BTgym server and data server processes on request.
+
+    Pool process gets forked from owning process before it runs any heavy initialisation (e.g. tf.train.Server),
+    imports backtrader, numpy, strategy and other modules once and forks ready-to-serve server instances
+    from itself, so starting or restarting server costs single fork() instead of creating process from scratch.
+    Server process class and its kwargs are sent to pool process, so both should be picklable.
+
+    Note:
+        Relies on `fork` start method, thus POSIX only.
+    """
+
+    def __init__(self, preload=DEFAULT_PRELOAD, log_level=None, task=0):
+        """
+        Args:
+            preload:        iterable of module names to import in pool process, e.g. custom strategy modules
+            log_level:      int, logbook.level
+            task:           id
+        """
+        self.preload = tuple(preload)
+        self.task = task
+        if log_level is None:
+            log_level = WARNING
+        StreamHandler(sys.stdout).push_application()
+        self.log = Logger('BTgymServerPool_{}'.format(task), level=log_level)
+        self.process = None
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts pool process.
+        """
+        context = multiprocessing.get_context('fork')
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_zygote,
+            args=(child_connection, self.preload, os.getpid()),
+            name='BTgymServerPool_{}'.format(self.task),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.log.debug('Started with PID: {}'.format(self.process.pid))
+
+    def _request(self, request, args):
+        if self.process is None or not self.process.is_alive():
+            raise RuntimeError('Server pool is not running. Hint: forgot to call start()?')
+
+        with self.lock:
+            self.connection.send((request, args))
+            return self.connection.recv()
+
+    def launch(self, process_class, **kwargs):
+        """
+        Forks new server process.
+
+        Args:
+            process_class:  multiprocessing.Process subclass, e.g. BTgymServer or BTgymDataFeedServer
+            kwargs:         process_class constructor kwargs
+
+        Returns:
+            BTgymPooledProcess instance
+        """
+        pid = self._request('launch', (process_class, kwargs))
+        self.log.debug('Launched {} with PID: {}'.format(process_class.__name__, pid))
+
+        return BTgymPooledProcess(self, pid)
+
+    def status(self, pid):
+        """
+        Returns:
+            exit code of server process with given pid or None if it is still running.
+        """
+        if self.process is None:
+            # Pool terminates all its servers on exit:
+            return -signal.SIGTERM
+
+        if not self.process.is_alive():
+            return _orphan_exitcode(pid)
+
+        try:
+            return self._request('status', pid)
+
+        except (EOFError, BrokenPipeError):
+            return _orphan_exitcode(pid)
+
+    def close(self):
+        """
+        Terminates pool process along with all server processes it has launched.
+        """
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.connection.close()
+            self.process = None
@@ -24,7 +24,7 @@ from collections import OrderedDict
 from itertools import product
 from math import log2, ceil
 
-from numpy import asarray, squeeze, zeros
+from numpy import asarray, squeeze, zeros, arange, dot, concatenate, float64, dtype as np_dtype, issubdtype, floating
 
 
 class DictSpace(spaces.Dict):
@@ -41,10 +41,94 @@ class DictSpace(spaces.Dict):
         """
         super(DictSpace, self).__init__(spaces_dict)
         self._shape = self._get_shape()
+        self.dtypes = self._get_dtypes()
 
     def _get_shape(self):
         return OrderedDict([(k, space.shape) for k, space in self.spaces.items()])
 
+    def _get_dtypes(self):
+        return OrderedDict(
+            [(k, space.dtypes if isinstance(space, DictSpace) else space.dtype) for k, space in self.spaces.items()]
+        )
+
+    def cast(self, dtype, exclude=()):
+        """
+        Returns copy of this space with all floating-point Box subspaces redefined with given dtype.
+
+        Args:
+            dtype:      numpy floating dtype or its name, e.g. 'float32'
+            exclude:    iterable of top-level keys to keep as is
+
+        Returns:
+            instance of DictSpace
+        """
+        dtype = np_dtype(dtype)
+        spaces_dict = OrderedDict()
+        for key, space in self.spaces.items():
+            if key in exclude:
+                spaces_dict[key] = space
+
+            elif isinstance(space, DictSpace):
+                spaces_dict[key] = space.cast(dtype)
+
+            elif isinstance(space, spaces.Box) and issubdtype(space.dtype, floating):
+                spaces_dict[key] = spaces.Box(
+                    low=space.low.astype(float64),
+                    high=space.high.astype(float64),
+                    dtype=dtype
+                )
+
+            else:
+                spaces_dict[key] = space
+
+        return DictSpace(spaces_dict)
+
+    def pack(self, x):
+        """
+        Compact encoding: packs [nested] dictionary of values from this space into single flat float64 vector.
+        Intended for transporting small heterogeneous dictionaries such as episode metadata.
+        Note that integer values are exactly representable only up to 2**53.
+
+        Args:
+            x:  [nested] dictionary of values from this space
+
+        Returns:
+            1D numpy array of float64
+        """
+        return concatenate(
+            [
+                space.pack(x[key]) if isinstance(space, DictSpace) else asarray(x[key], dtype=float64).ravel()
+                for key, space in self.spaces.items()
+            ]
+        )
+
+    def unpack(self, vector):
+        """
+        Inverse of pack(): recovers [nested] dictionary of values, each cast to dtype of corresponding subspace.
+
+        Args:
+            vector:     1D array as returned by pack()
+
+        Returns:
+            [nested] dictionary of numpy arrays
+        """
+        return self._unpack(vector, 0)[0]
+
+    def _unpack(self, vector, offset):
+        x = OrderedDict()
+        for key, space in self.spaces.items():
+            if isinstance(space, DictSpace):
+                x[key], offset = space._unpack(vector, offset)
+
+            else:
+                size = 1
+                for dim in space.shape:
+                    size *= dim
+                x[key] = asarray(vector[offset: offset + size], dtype=space.dtype).reshape(space.shape)
+                offset += size
+
+        return x, offset
+
 
 class ActionDictSpace(DictSpace):
     """
@@ -79,6 +163,12 @@ class ActionDictSpace(DictSpace):
             self.cardinality = len(list(self.lookup_table.keys()))
             self.encoded_depth = ceil(log2(self.cardinality))
             self.one_hot_depth = self.cardinality
+
+            # Encoding tables; lookup table enumerates cartesian product in lexicographic order,
+            # so category is action vector read as mixed-radix number with first asset as most significant digit:
+            self._cat_table = asarray(list(self.lookup_table.values())).reshape(self.cardinality, len(self.assets))
+            self._bit_weights = 2 ** arange(max(self.encoded_depth, 1) - 1, -1, -1)
+            self._binary_table = (arange(self.cardinality)[:, None] // self._bit_weights % 2).astype('float')
             spaces_dict = {key: spaces.Discrete(self.tensor_shape[-1]) for key in self.assets}
 
             self.encode_method = self._action_to_binary
@@ -171,19 +261,40 @@ class ActionDictSpace(DictSpace):
         raise NotImplementedError
 
     def _to_one_hot(self, action):
-        cat = self._vec_to_cat(self._action_to_vec(action))
-        one_hot = zeros(self.one_hot_depth)
-        one_hot[cat] = 1
-        return squeeze(one_hot)
+        return self._cat_to_one_hot(self._vec_to_cat(self._action_to_vec(action)))
 
     def _vec_to_one_hot(self, vec):
         if self.cardinality is None:
             return vec
 
         else:
-            one_hot = zeros(self.one_hot_depth)
-            one_hot[self._vec_to_cat(vec)] = 1
-            return squeeze(one_hot)
+            return self._cat_to_one_hot(self._vec_to_cat(vec))
+
+    def _cat_to_one_hot(self, category):
+        """
+        Given integer as categorical encoding returns its one-hot encoding.
+
+        Args:
+            category:   int, encoding
+
+        Returns:
+            1D numpy array of floats
+        """
+        one_hot = zeros(self.one_hot_depth)
+        one_hot[category] = 1
+        return squeeze(one_hot)
+
+    def _cat_to_binary(self, category):
+        """
+        Given integer as categorical encoding returns its binary encoding.
+
+        Args:
+            category:   int, encoding
+
+        Returns:
+            1D numpy array of floats in [0, 1]
+        """
+        return self._binary_table[category].copy()
 
     @staticmethod
     def _make_lookup_table(base_actions, num_assets):
@@ -210,10 +321,7 @@ class ActionDictSpace(DictSpace):
         Returns:
             1D numpy array of floats in [0, 1]
         """
-        cat = self._vec_to_cat(self._action_to_vec(action))
-        bit_string = format(cat, 'b').zfill(self.encoded_depth)
-        bit_array = asarray(list(bit_string), dtype='float')
-        return bit_array
+        return self._cat_to_binary(self._vec_to_cat(self._action_to_vec(action)))
 
     def _binary_to_action(self, binary_code):
         """
@@ -227,23 +335,21 @@ class ActionDictSpace(DictSpace):
         """
         assert len(binary_code.shape) <= 1, \
             'Only 1D code vectors are supported, got array of shape: {}'.format(binary_code.shape)
-        bit_string = ''
-        for bit in list(binary_code.astype(int)):
-            bit_string += str(bit)
-        cat = int(bit_string, 2)
-        return self._vec_to_action(self._cat_to_vec(cat))
+        cat = int(dot(binary_code.astype(int), 2 ** arange(binary_code.shape[0] - 1, -1, -1)))
+        return self._vec_to_action(self._cat_to_vec(cat), check=False)
 
-    def _action_to_vec(self, action):
+    def _action_to_vec(self, action, check=True):
         """
         Given action returns its vector encoding.
 
         Args:
             action:     action from this space (shallow dictionary)
+            check:      if False, skips checking action belongs to this space
 
         Returns:
             numpy array
         """
-        assert self.contains(action), 'Action {} does not belongs to this space'.format(action)
+        assert not check or self.contains(action), 'Action {} does not belongs to this space'.format(action)
 
         if self.is_discrete:
             return asarray([action[key] for key in self.assets])
@@ -252,12 +358,14 @@ class ActionDictSpace(DictSpace):
 
             return asarray([action[key] for key in self.assets])[..., 0]
 
-    def _vec_to_action(self, vector):
+    def _vec_to_action(self, vector, check=True):
         """
         Given vector encoding of an action returns action from this space.
 
         Args:
             vector:     iterable of scalars
+            check:      if False, skips checking resulting action belongs to this space,
+                        e.g. when vector comes from lookup table
 
         Returns:
             action as shallow dictionary of scalars
@@ -270,7 +378,8 @@ class ActionDictSpace(DictSpace):
         else:
             action = OrderedDict([(asset, value) for asset, value in zip(self.assets, vector)])
 
-        assert self.contains(action), 'Vector {} can not be converted to action of this space'.format(vector)
+        assert not check or self.contains(action), \
+            'Vector {} can not be converted to action of this space'.format(vector)
         return action
 
     def _vec_to_cat(self, action):
@@ -289,10 +398,18 @@ class ActionDictSpace(DictSpace):
         """
         assert self.lookup_table is not None, 'Lookup table not defined for base {}'.format(self.base_space)
 
-        for key, value in self.lookup_table.items():
-            if list(value) == list(action):
-                return key
-        raise ValueError('Action vector {} is not in lookup table of this space.'.format(action))
+        # Horner scheme for mixed-radix number:
+        num_base_actions = len(self.base_actions)
+        cat = 0
+        if len(action) != len(self.assets):
+            raise ValueError('Action vector {} is not in lookup table of this space.'.format(action))
+
+        for value in action:
+            if not 0 <= value < num_base_actions or value != int(value):
+                raise ValueError('Action vector {} is not in lookup table of this space.'.format(action))
+            cat = cat * num_base_actions + int(value)
+
+        return cat
 
     def _cat_to_vec(self, category):
         """
@@ -311,12 +428,11 @@ class ActionDictSpace(DictSpace):
 
         """
         assert self.lookup_table is not None, 'Lookup table not defined for base {}'.format(self.base_space)
-        try:
-            return asarray(self.lookup_table[category])
-
-        except KeyError:
+        if not 0 <= category < self.cardinality or category != int(category):
             raise ValueError('Category {} does not match action space.'.format(category))
 
+        return self._cat_table[int(category)].copy()
+
 
 class __DictSpace(Space):
     """
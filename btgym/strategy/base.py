@@ -26,7 +26,8 @@ from btgym import DictSpace
 import numpy as np
 from collections import deque
 
-from btgym.strategy.utils import norm_value, decayed_result, exp_scale
+from btgym.strategy.utils import norm_value, decayed_result, exp_scale, cast_float
+from btgym.strategy.info import StepInfoLog, bt_num2timestamp, timestamp2datetime
 
 
 ############################## Base BTgymStrategy Class ###################
@@ -140,6 +141,9 @@ class BTgymBaseStrategy(bt.Strategy):
         order_size=None,
         initial_action=None,
         initial_portfolio_action=None,
+        info_mode='last',
+        state_dtype=None,
+        compact_metadata=False,
     )
 
     def __init__(self, **kwargs):
@@ -167,6 +171,14 @@ class BTgymBaseStrategy(bt.Strategy):
                     skip_frame:         number of environment steps to skip before returning next response,
                                         e.g. if set to 10 -- agent will interact with environment every 10th step;
                                         every other step agent action is assumed to be 'hold'.
+                    info_mode:          str, how step information collected over `skip_frame` window is reported:
+                                        'last', 'window' or 'aggregate', see btgym.strategy.info.StepInfoLog;
+                                        None - use legacy list of per-step get_info() dictionaries.
+                    state_dtype:        floating dtype all observation state modes except `metadata` are cast to,
+                                        e.g. np.float32 halves observation size; np.float16 is intended for
+                                        transport only; None - keep dtypes as composed by get_[mode]_state();
+                    compact_metadata:   bool, if True - `metadata` state is transported as single flat vector
+                                        and decoded back to dictionary by environment, see DictSpace.pack().
 
                 Default values are::
 
@@ -183,6 +195,9 @@ class BTgymBaseStrategy(bt.Strategy):
                     portfolio_actions=('hold', 'buy', 'sell', 'close')
                     skip_frame=1
                     order_size=None
+                    info_mode='last'
+                    state_dtype=None
+                    compact_metadata=False
         """
         try:
             self.time_dim = self.p.state_shape['raw'].shape[0]
@@ -364,7 +379,31 @@ class BTgymBaseStrategy(bt.Strategy):
             self.next_process_fn = self._next_discrete
 
             # Do not repeat action for discrete:
-            self.num_action_repeats = 0 
+            self.num_action_repeats = 0
+
+        # Observation state precision and metadata encoding:
+        self.state_dtype = None if self.p.state_dtype is None else np.dtype(self.p.state_dtype)
+        if self.p.compact_metadata:
+            assert isinstance(self.p.state_shape.get('metadata', None), DictSpace), \
+                'Compact metadata encoding requires `metadata` state_shape be instance of DictSpace'
+            self.metadata_space = self.p.state_shape['metadata']
+
+        else:
+            self.metadata_space = None
+
+        # Columnar step information log, filled in place every step by update_info_log();
+        # fall back to per-step get_info() dictionaries if get_info() is overridden or explicitly asked:
+        if self.p.info_mode is not None and type(self).get_info is BTgymBaseStrategy.get_info:
+            self.action_codes = {name: code for code, name in enumerate(self.p.portfolio_actions or ())}
+            self.info_log = StepInfoLog(
+                fields=self.get_info_fields(),
+                capacity=self.p.skip_frame,
+                mode=self.p.info_mode,
+                decoders=self.get_info_decoders(),
+            )
+
+        else:
+            self.info_log = None
 
     def prenext(self):
         self.update_broker_stat()
@@ -673,6 +712,14 @@ class BTgymBaseStrategy(bt.Strategy):
         #     'datetime': self.get_datetime_state(),
         #     'metadata': self.get_metadata_state(),
         # }
+        if self.state_dtype is not None:
+            for key, value in self.state.items():
+                if key != 'metadata':
+                    self.state[key] = cast_float(value, self.state_dtype)
+
+        if self.metadata_space is not None:
+            self.state['metadata'] = self.metadata_space.pack(self.state['metadata'])
+
         return self.state
 
     def get_reward(self):
@@ -743,6 +790,9 @@ class BTgymBaseStrategy(bt.Strategy):
             Due to 'skip_frame' feature, INFO part of environment response transmitted by server can be  a list
             containing either all skipped frame's info objects, i.e. [info[-9], info[-8], ..., info[0]] or
             just latest one, [info[0]]. This behaviour is set inside btgym.server._BTgymAnalyzer().next() method.
+
+            This method is only used if `info_mode` param is None or method is overridden,
+            columnar `info_log` filled by update_info_log() is used otherwise.
         """
         return dict(
             step=self.iteration,
@@ -755,6 +805,72 @@ class BTgymBaseStrategy(bt.Strategy):
             max_drawdown=self.stats.drawdown.maxdrawdown[0],
         )
 
+    def get_info_fields(self):
+        """
+        Defines columns of step information log. Override along with update_info_log() to add custom fields.
+
+        Returns:
+            dictionary of {field_name: (dtype, shape, reducer)}, see btgym.strategy.info.StepInfoLog
+        """
+        if self.p.portfolio_actions:
+            # Discrete actions are logged as small-int codes: index of action in portfolio_actions, -1 if unknown:
+            action_field = (np.int8, (len(self.p.asset_names),), 'last')
+
+        else:
+            action_field = (np.float32, (len(self.p.asset_names),), 'last')
+
+        return dict(
+            step=(np.int64, (), 'last'),
+            time=(np.int64, (), 'last'),  # POSIX timestamp in milliseconds
+            action=action_field,
+            broker_cash=(np.float32, (), 'last'),
+            broker_value=(np.float32, (), 'last'),
+            drawdown=(np.float32, (), 'max'),
+            max_drawdown=(np.float32, (), 'last'),
+        )
+
+    def get_info_decoders(self):
+        """
+        Defines conversions making `last` mode info record hold same types as get_info() does:
+        datetime instead of timestamp and dictionary of asset actions instead of array of codes.
+        Override along with get_info_fields() if needed.
+
+        Returns:
+            dictionary of {field_name: callable}, see btgym.strategy.info.StepInfoLog
+        """
+        asset_names = list(self.p.asset_names)
+        if self.p.portfolio_actions:
+            actions = list(self.p.portfolio_actions)
+
+            def decode_action(codes):
+                return {asset: actions[code] if code >= 0 else None for asset, code in zip(asset_names, codes)}
+
+        else:
+            def decode_action(values):
+                return {asset: value for asset, value in zip(asset_names, values)}
+
+        return dict(time=timestamp2datetime, action=decode_action)
+
+    def update_info_log(self):
+        """
+        Writes current step information as new row of `info_log`, columnar counterpart of get_info().
+        Invoked every step by btgym.server._BTgymAnalyzer().next() method.
+        """
+        i = self.info_log.new_row()
+        log = self.info_log.buffers
+
+        log['step'][i] = self.iteration
+        log['time'][i] = bt_num2timestamp(self.data.datetime[0])
+        for j, asset in enumerate(self.p.asset_names):
+            action = self.action.get(asset, -1)
+            log['action'][i, j] = self.action_codes.get(action, -1) if self.action_codes else action
+        log['broker_cash'][i] = self.stats.broker.cash[0]
+        log['broker_value'][i] = self.stats.broker.value[0]
+        log['drawdown'][i] = self.stats.drawdown.drawdown[0]
+        log['max_drawdown'][i] = self.stats.drawdown.maxdrawdown[0]
+
+        self.info_log.broker_message = self.broker_message
+
     def get_done(self):
         """
         Episode termination estimator,
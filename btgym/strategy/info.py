@@ -0,0 +1,171 @@
+###############################################################################
+#
+# Copyright (C) 2017 Andrew Muzikin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import datetime
+import numpy as np
+
+
+# Backtrader datetime number of POSIX epoch start (1970-01-01 00:00:00):
+BT_EPOCH_NUM = 719163.0
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def bt_num2timestamp(num):
+    """
+    Converts backtrader float datetime number to integer POSIX timestamp in milliseconds
+    without instantiating datetime objects.
+    """
+    return int(round((num - BT_EPOCH_NUM) * 86400000.0))
+
+
+def timestamp2datetime(timestamp):
+    """
+    Converts integer POSIX timestamp in milliseconds to naive datetime, as backtrader `datetime.datetime()` does.
+    """
+    return EPOCH + datetime.timedelta(milliseconds=int(timestamp))
+
+
+class StepInfoLog:
+    """
+    Preallocated columnar (struct-of-arrays) log of per-bar strategy information.
+
+    Every field is kept as typed numpy array filled in place by strategy on each bar;
+    log is rewound after every environment response, so its length equals to `skip_frame` window.
+
+    Environment response record is composed according to `mode`:
+
+        'last' - dictionary of latest row values (default), converted by `decoders`, if any, to same types
+                 strategy get_info() reports, e.g. datetime instead of integer timestamp;
+        'window' - dictionary of arrays holding entire `skip_frame` window;
+        'aggregate' - dictionary of per-field reduced values over `skip_frame` window.
+
+    Either way, record also contains latest `broker_message` string.
+    """
+    reducers = {
+        'last': lambda x: x[-1],
+        'first': lambda x: x[0],
+        'min': lambda x: x.min(axis=0),
+        'max': lambda x: x.max(axis=0),
+        'sum': lambda x: x.sum(axis=0),
+        'mean': lambda x: x.mean(axis=0),
+    }
+    modes = ('last', 'window', 'aggregate')
+
+    def __init__(self, fields, capacity=1, mode='last', decoders=None):
+        """
+
+        Args:
+            fields:     dictionary of {field_name: (dtype, shape, reducer)} where `shape` is tuple describing
+                        single row of the field and `reducer` is one of: 'last', 'first', 'min', 'max', 'sum', 'mean'
+            capacity:   int, initial number of rows to allocate, usually equals to `skip_frame`; grows on demand
+            mode:       str, one of 'last', 'window', 'aggregate'
+            decoders:   dictionary of {field_name: callable} converting single row value of the field,
+                        applied to `last` mode records only
+        """
+        assert mode in self.modes, 'Expected info log mode be one of {}, got: {}'.format(self.modes, mode)
+        for name, (dtype, shape, reducer) in fields.items():
+            assert reducer in self.reducers, \
+                'Unknown reducer `{}` for field `{}`, expected one of: {}'.format(reducer, name, self.reducers.keys())
+
+        self.fields = fields
+        self.mode = mode
+        self.decoders = decoders or {}
+        self.capacity = max(int(capacity), 1)
+        self.buffers = {
+            name: np.zeros((self.capacity,) + tuple(shape), dtype=dtype)
+            for name, (dtype, shape, reducer) in fields.items()
+        }
+        self.size = 0
+        self.broker_message = '-'
+
+    def rewind(self):
+        """
+        Resets log length, keeps allocated buffers.
+        """
+        self.size = 0
+
+    def new_row(self):
+        """
+        Appends new row, doubles buffers capacity if exhausted.
+
+        Returns:
+            index of the row to fill in
+        """
+        if self.size == self.capacity:
+            self.buffers = {
+                name: np.concatenate([buffer, np.zeros_like(buffer)], axis=0)
+                for name, buffer in self.buffers.items()
+            }
+            self.capacity *= 2
+        self.size += 1
+
+        return self.size - 1
+
+    def get_last(self):
+        """
+        Returns:
+            dictionary of latest row values
+        """
+        record = {name: buffer[self.size - 1].copy() for name, buffer in self.buffers.items()}
+        for name, decode in self.decoders.items():
+            record[name] = decode(record[name])
+        record['broker_message'] = self.broker_message
+
+        return record
+
+    def get_window(self):
+        """
+        Returns:
+            dictionary of arrays holding all rows logged since last rewind
+        """
+        record = {name: buffer[:self.size].copy() for name, buffer in self.buffers.items()}
+        record['num_bars'] = self.size
+        record['broker_message'] = self.broker_message
+
+        return record
+
+    def get_aggregate(self):
+        """
+        Returns:
+            dictionary of field values reduced over all rows logged since last rewind
+        """
+        record = {
+            name: np.asarray(self.reducers[reducer](self.buffers[name][:self.size]), dtype=dtype)
+            for name, (dtype, shape, reducer) in self.fields.items()
+        }
+        record['num_bars'] = self.size
+        record['broker_message'] = self.broker_message
+
+        return record
+
+    def get_record(self):
+        """
+        Composes environment response info record w.r.t. log mode.
+
+        Returns:
+            dictionary of numpy values
+        """
+        if self.mode == 'window':
+            return self.get_window()
+
+        elif self.mode == 'aggregate':
+            return self.get_aggregate()
+
+        else:
+            return self.get_last()
@@ -0,0 +1,93 @@
+import unittest
+import datetime
+import numpy as np
+import backtrader as bt
+from types import SimpleNamespace
+
+from .info import StepInfoLog, bt_num2timestamp, timestamp2datetime
+from .base import BTgymBaseStrategy
+
+
+fields = dict(
+    step=(np.int64, (), 'last'),
+    time=(np.int64, (), 'last'),
+    action=(np.int8, (2,), 'last'),
+    broker_value=(np.float32, (), 'mean'),
+    drawdown=(np.float32, (), 'max'),
+)
+
+start_time = datetime.datetime(2017, 3, 1, 12, 30)
+
+
+def fill_log(log, num_rows):
+    for step in range(num_rows):
+        i = log.new_row()
+        log.buffers['step'][i] = step
+        log.buffers['time'][i] = bt_num2timestamp(bt.date2num(start_time + datetime.timedelta(minutes=step)))
+        log.buffers['action'][i] = [step % 3, 0]
+        log.buffers['broker_value'][i] = 100.0 + step
+        log.buffers['drawdown'][i] = [0.5, 2.0, 1.0][step % 3]
+    log.broker_message = 'message_{}'.format(num_rows)
+
+
+def get_decoders():
+    strategy = SimpleNamespace(p=SimpleNamespace(asset_names=['a', 'b'], portfolio_actions=('hold', 'buy', 'sell')))
+    return BTgymBaseStrategy.get_info_decoders(strategy)
+
+
+class StepInfoLogTest(unittest.TestCase):
+    """Testing step information records of every mode"""
+
+    def test_timestamp(self):
+        num = bt.date2num(start_time)
+        self.assertEqual(timestamp2datetime(bt_num2timestamp(num)), bt.num2date(num))
+
+    def test_last(self):
+        log = StepInfoLog(fields, capacity=2, mode='last', decoders=get_decoders())
+        fill_log(log, 5)
+        record = log.get_record()
+
+        # Same types as of strategy get_info():
+        self.assertEqual(record['step'], 4)
+        self.assertEqual(record['time'], start_time + datetime.timedelta(minutes=4))
+        self.assertIsInstance(record['time'], datetime.datetime)
+        self.assertEqual(record['action'], {'a': 'buy', 'b': 'hold'})
+        self.assertEqual(record['broker_value'], 104.0)
+        self.assertEqual(record['broker_message'], 'message_5')
+
+    def test_window(self):
+        log = StepInfoLog(fields, capacity=2, mode='window', decoders=get_decoders())
+        fill_log(log, 3)
+        log.rewind()
+        fill_log(log, 5)
+        record = log.get_record()
+
+        self.assertEqual(record['num_bars'], 5)
+        np.testing.assert_array_equal(record['step'], np.arange(5))
+        np.testing.assert_array_equal(record['action'][:, 0], [0, 1, 2, 0, 1])
+        self.assertEqual(record['time'].dtype, np.int64)
+        self.assertEqual(timestamp2datetime(record['time'][0]), start_time)
+
+        # Record is a copy:
+        log.buffers['step'][0] = 100
+        self.assertEqual(record['step'][0], 0)
+
+    def test_aggregate(self):
+        log = StepInfoLog(fields, capacity=8, mode='aggregate')
+        fill_log(log, 4)
+        record = log.get_record()
+
+        self.assertEqual(record['num_bars'], 4)
+        self.assertEqual(record['step'], 3)
+        self.assertAlmostEqual(record['broker_value'], 101.5)
+        self.assertEqual(record['drawdown'], 2.0)
+        self.assertEqual(record['broker_value'].dtype, np.float32)
+
+    def test_continuous_actions(self):
+        strategy = SimpleNamespace(p=SimpleNamespace(asset_names=['a', 'b'], portfolio_actions=None))
+        decoders = BTgymBaseStrategy.get_info_decoders(strategy)
+        self.assertEqual(decoders['action'](np.asarray([0.5, -1.0])), {'a': 0.5, 'b': -1.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,6 +36,12 @@ def norm_value(current_value, init_value, lower_bound, upper_bound, epsilon=1e-8
     """
     Current value normalized in [-1,1] wrt upper and lower bounds.
     """
+    if isinstance(current_value, float):
+        # Scalar fast path for per-step broker statistics, avoids numpy call overhead:
+        x = (current_value / init_value - 1) * 100
+        x = (x - upper_bound) / (lower_bound + upper_bound) + 1
+        return 2 * min(max(x, epsilon), 1 - epsilon) - 1
+
     x = np.asarray(current_value)
     x = (x / init_value - 1) * 100
     x = (x - upper_bound) / (lower_bound + upper_bound) + 1
@@ -100,4 +106,25 @@ def discounted_average(x, gamma=1):
     while len(x.shape) < 2:
         x = x[..., None]
     gamma = gamma * np.ones(x.shape)
-    return np.squeeze(np.average(x, weights=(gamma ** np.arange(x.shape[0])[..., None])[::-1], axis=0))
\ No newline at end of file
+    return np.squeeze(np.average(x, weights=(gamma ** np.arange(x.shape[0])[..., None])[::-1], axis=0))
+
+
+def cast_float(x, dtype):
+    """
+    Casts floating-point arrays of [nested] dictionary to given dtype, leaves any other values intact.
+
+    Args:
+        x:      array-like or [nested] dictionary of those
+        dtype:  numpy floating dtype
+
+    Returns:
+        same structure with floating-point values as arrays of `dtype`
+    """
+    if isinstance(x, dict):
+        return {key: cast_float(value, dtype) for key, value in x.items()}
+
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.floating) and x.dtype != dtype:
+        return x.astype(dtype)
+
+    return x
@@ -0,0 +1,376 @@
+###############################################################################
+#
+# Copyright (C) 2017 Andrew Muzikin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+import zmq
+
+from logbook import Logger, StreamHandler, WARNING
+
+
+def heartbeat_address(pid):
+    """
+    Returns:
+        address of heartbeat side channel of server process with given pid.
+    """
+    return 'ipc://{}'.format(os.path.join(tempfile.gettempdir(), 'btgym_heartbeat_{}'.format(pid)))
+
+
+def release_heartbeat_address(pid):
+    """
+    Removes side channel file left by server process that has not exited cleanly.
+    """
+    try:
+        os.remove(os.path.join(tempfile.gettempdir(), 'btgym_heartbeat_{}'.format(pid)))
+
+    except OSError:
+        pass
+
+
+class BTgymHeartbeat(threading.Thread):
+    """
+    Heartbeat side channel of server or data_server process: answers supervisor pings from separate thread,
+    so process state can be checked whatever its main loop is busy with or blocked on.
+    Main loop sets `waiting` flag while it legitimately waits for other process, e.g. for data_master
+    to get dataset ready, so supervisor does not take long response for a stall.
+    Should be started from within server process.
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.pid = None
+        self.waiting = False
+        self.stop_event = threading.Event()
+
+    def run(self):
+        self.pid = os.getpid()
+        context = zmq.Context()
+        socket = context.socket(zmq.REP)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.bind(heartbeat_address(self.pid))
+        while not self.stop_event.is_set():
+            if socket.poll(100):
+                socket.recv_pyobj()
+                socket.send_pyobj({'pid': self.pid, 'time': time.time(), 'waiting': self.waiting})
+
+        context.destroy()
+        release_heartbeat_address(self.pid)
+
+    def close(self):
+        """
+        Stops answering pings and releases side channel.
+        """
+        self.stop_event.set()
+        self.join()
+
+
+class BTgymEnvSupervisor(threading.Thread):
+    """
+    Watches server and data_server processes of several environments from background thread.
+
+    Every `interval` seconds pings heartbeat side channel of every process and checks pending environment
+    requests. Environment is considered failed if any of its processes has exited, left ping unanswered for
+    `heartbeat_timeout` seconds, or server has not answered pending request for `stall_factor` times its
+    usual response time (but no less than `min_stall_timeout` seconds) while not reporting it waits for data,
+    which catches hang-ups long before `connect_timeout` expires. Pending request of failed environment
+    gets aborted and environment is marked unhealthy until thread runner calls `env.recover()` and restarts
+    its processes (from server pool, if any).
+    Data_server process found hung is terminated, so data_master environment restarts it on recovery.
+    """
+
+    def __init__(
+            self,
+            env_list,
+            interval=1.0,
+            heartbeat_timeout=10.0,
+            stall_factor=100.0,
+            min_stall_timeout=20.0,
+            log_level=None,
+            task=0,
+    ):
+        """
+        Args:
+            env_list:           list of BTgymEnv instances to watch
+            interval:           seconds between checks
+            heartbeat_timeout:  seconds to wait for process to answer ping
+            stall_factor:       float, multiple of usual server response time to consider pending request stalled
+            min_stall_timeout:  seconds, lower bound of stall timeout
+            log_level:          int, logbook.level
+            task:               id
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.env_list = env_list
+        self.interval = interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.stall_factor = stall_factor
+        self.min_stall_timeout = min_stall_timeout
+        self.task = task
+        if log_level is None:
+            log_level = WARNING
+        StreamHandler(sys.stdout).push_application()
+        self.log = Logger('BTgymEnvSupervisor_{}'.format(task), level=log_level)
+
+        self.stop_event = threading.Event()
+        self.context = None
+        self.sockets = dict()  # pid: REQ socket
+        self.pings = dict()  # pid: time last ping has been sent, None if answered
+        self.waiting = dict()  # pid: last reported `waiting` flag
+        self.num_failures = 0
+
+    def _processes(self, env):
+        processes = [('server', env.server)]
+        if env.data_master:
+            processes.append(('data_server', env.data_server))
+
+        return [(name, process) for name, process in processes if process is not None]
+
+    def _ping(self, pid):
+        """
+        Sends ping to process if previous one has been answered.
+        """
+        if self.pings.get(pid, None) is not None:
+            return
+
+        if pid not in self.sockets:
+            socket = self.context.socket(zmq.REQ)
+            socket.setsockopt(zmq.LINGER, 0)
+            socket.connect(heartbeat_address(pid))
+            self.sockets[pid] = socket
+
+        self.sockets[pid].send_pyobj({'ctrl': 'ping'}, zmq.NOBLOCK)
+        self.pings[pid] = time.time()
+
+    def _collect(self, timeout):
+        """
+        Receives ping responses for `timeout` seconds.
+        """
+        poller = zmq.Poller()
+        for socket in self.sockets.values():
+            poller.register(socket, zmq.POLLIN)
+
+        deadline = time.time() + timeout
+        while time.time() < deadline and not self.stop_event.is_set():
+            for socket, _ in poller.poll(max(deadline - time.time(), 0) * 1000):
+                response = socket.recv_pyobj()
+                self.pings[response['pid']] = None
+                self.waiting[response['pid']] = response['waiting']
+
+    def _forget(self, pid):
+        if pid in self.sockets:
+            self.sockets.pop(pid).close()
+
+        self.pings.pop(pid, None)
+        self.waiting.pop(pid, None)
+
+    def stall_timeout(self, env):
+        """
+        Returns:
+            seconds environment server is allowed to process single request.
+        """
+        if env.request_latency is None:
+            return self.min_stall_timeout
+
+        return max(self.min_stall_timeout, self.stall_factor * env.request_latency)
+
+    def check(self, env):
+        """
+        Checks environment processes.
+
+        Returns:
+            failure description or None if environment looks fine.
+        """
+        now = time.time()
+        for name, process in self._processes(env):
+            if process.exitcode is not None:
+                release_heartbeat_address(process.pid)
+                return '{} process exited with code {}'.format(name, process.exitcode)
+
+            sent = self.pings.get(process.pid, None)
+            if sent is not None and now - sent > self.heartbeat_timeout:
+                if name == 'data_server':
+                    process.terminate()
+
+                return '{} process has not answered heartbeat for {:.1f}s'.format(name, now - sent)
+
+        request_started = env.request_started
+        if request_started is not None and not self.waiting.get(env.server.pid, False) and\
+                now - request_started > self.stall_timeout(env):
+            return 'server has not responded for {:.1f}s, usual response time is {:.4f}s'.format(
+                now - request_started,
+                env.request_latency or 0,
+            )
+
+        return None
+
+    def run(self):
+        self.context = zmq.Context()
+        try:
+            while not self.stop_event.is_set():
+                watched = set()
+                for env in self.env_list:
+                    if env.abort_request is None or env.abort_request.is_set():
+                        # Not started yet or being recovered:
+                        continue
+
+                    failure = self.check(env)
+                    if failure is not None:
+                        self.num_failures += 1
+                        self.log.warning('environment {} failed: {}; aborting its request.'.format(env.task, failure))
+                        for name, process in self._processes(env):
+                            self._forget(process.pid)
+                        env.abort_request.set()
+                        continue
+
+                    for name, process in self._processes(env):
+                        watched.add(process.pid)
+                        self._ping(process.pid)
+
+                # Drop restarted and stopped processes:
+                for pid in set(self.sockets.keys()) - watched:
+                    self._forget(pid)
+
+                self._collect(self.interval)
+
+        finally:
+            for pid in list(self.sockets.keys()):
+                self._forget(pid)
+            self.context.destroy()
+
+    def stop(self):
+        """
+        Stops watching.
+        """
+        self.stop_event.set()
+        self.join()
+
+
+class BTgymProcessWatchdog(threading.Thread):
+    """
+    Watches single server process, e.g. shared data_server, from background thread and restarts it on failure.
+    Process is considered failed if it has exited or left heartbeat ping unanswered for `heartbeat_timeout` seconds.
+    """
+
+    def __init__(
+            self,
+            get_process,
+            restart,
+            interval=1.0,
+            heartbeat_timeout=10.0,
+            log_level=None,
+            name='process',
+    ):
+        """
+        Args:
+            get_process:        callable returning process to watch or None if there is nothing to watch yet
+            restart:            callable stopping failed process and starting new one in place
+            interval:           seconds between checks
+            heartbeat_timeout:  seconds to wait for process to answer ping
+            log_level:          int, logbook.level
+            name:               str, process name to log
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.get_process = get_process
+        self.restart = restart
+        self.interval = interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.name = name
+        if log_level is None:
+            log_level = WARNING
+        StreamHandler(sys.stdout).push_application()
+        self.log = Logger('BTgymProcessWatchdog', level=log_level)
+
+        self.stop_event = threading.Event()
+        self.num_restarts = 0
+
+    def check(self, process, sent):
+        """
+        Returns:
+            failure description or None if process looks fine.
+        """
+        if process.exitcode is not None:
+            return 'process exited with code {}'.format(process.exitcode)
+
+        if sent is not None and time.time() - sent > self.heartbeat_timeout:
+            return 'process has not answered heartbeat for {:.1f}s'.format(time.time() - sent)
+
+        return None
+
+    def run(self):
+        context = zmq.Context()
+        socket = None
+        pid = None
+        sent = None
+        try:
+            while not self.stop_event.is_set():
+                process = self.get_process()
+                if process is None:
+                    self.stop_event.wait(self.interval)
+                    continue
+
+                if process.pid != pid:
+                    if socket is not None:
+                        socket.close()
+                    socket = context.socket(zmq.REQ)
+                    socket.setsockopt(zmq.LINGER, 0)
+                    socket.connect(heartbeat_address(process.pid))
+                    pid = process.pid
+                    sent = None
+
+                failure = self.check(process, sent)
+                if failure is not None:
+                    self.num_restarts += 1
+                    self.log.warning('{} failed: {}; restarting.'.format(self.name, failure))
+                    socket.close()
+                    socket = None
+                    pid = None
+                    release_heartbeat_address(process.pid)
+                    try:
+                        self.restart()
+
+                    except Exception as e:
+                        self.log.error('failed to restart {}: {}'.format(self.name, e))
+                        self.stop_event.wait(self.interval)
+
+                    continue
+
+                if sent is None:
+                    socket.send_pyobj({'ctrl': 'ping'}, zmq.NOBLOCK)
+                    sent = time.time()
+
+                if socket.poll(self.interval * 1000):
+                    socket.recv_pyobj()
+                    sent = None
+                    self.stop_event.wait(self.interval)
+
+        finally:
+            context.destroy()
+
+    def stop(self):
+        """
+        Stops watching.
+        """
+        self.stop_event.set()
+        self.join()
@@ -0,0 +1,152 @@
+import unittest
+import numpy as np
+from gym import spaces
+
+from .spaces import DictSpace, ActionDictSpace
+
+
+def make_space():
+    return DictSpace(
+        {
+            'external': spaces.Box(low=-100, high=100, shape=(4, 1, 3), dtype=np.float64),
+            'datetime': spaces.Box(low=0, high=1, shape=(1, 5), dtype=np.float32),
+            'metadata': DictSpace(
+                {
+                    'type': spaces.Box(shape=(), low=0, high=1, dtype=np.uint32),
+                    'trial_num': spaces.Box(shape=(), low=0, high=10 ** 10, dtype=np.uint32),
+                    'timestamp': spaces.Box(shape=(), low=0, high=np.finfo(np.float64).max, dtype=np.float64),
+                    'first_row': spaces.Box(shape=(), low=0, high=10 ** 10, dtype=np.uint32),
+                }
+            ),
+        }
+    )
+
+
+class DictSpaceTest(unittest.TestCase):
+    """Testing DictSpace compact encoding and dtype casting"""
+
+    def setUp(self):
+        self.space = make_space()
+        self.metadata = {
+            'type': np.asarray(1, dtype=np.uint32),
+            'trial_num': np.asarray(4000000000, dtype=np.uint32),
+            'timestamp': np.asarray(1488975540.123),
+            'first_row': np.asarray(12345, dtype=np.uint32),
+        }
+
+    def test_pack_unpack(self):
+        space = self.space.spaces['metadata']
+        vector = space.pack(self.metadata)
+        self.assertEqual(vector.shape, (4,))
+        self.assertEqual(vector.dtype, np.float64)
+
+        unpacked = space.unpack(vector)
+        self.assertEqual(list(unpacked.keys()), list(space.spaces.keys()))
+        for key, value in self.metadata.items():
+            self.assertEqual(unpacked[key].dtype, value.dtype)
+            self.assertEqual(unpacked[key].shape, value.shape)
+            self.assertEqual(unpacked[key], value)
+
+    def test_nested_pack_unpack(self):
+        x = self.space.sample()
+        x['metadata'] = self.metadata
+        unpacked = self.space.unpack(self.space.pack(x))
+        for key in ['external', 'datetime']:
+            self.assertEqual(unpacked[key].dtype, self.space.spaces[key].dtype)
+            np.testing.assert_array_equal(unpacked[key], x[key])
+
+        for key, value in self.metadata.items():
+            self.assertEqual(unpacked['metadata'][key], value)
+
+    def test_cast(self):
+        space = self.space.cast(np.float16, exclude=('metadata',))
+        self.assertEqual(space.dtypes['external'], np.float16)
+        self.assertEqual(space.dtypes['datetime'], np.float16)
+        self.assertEqual(space.dtypes['metadata'], self.space.dtypes['metadata'])
+        self.assertEqual(space.spaces['external'].shape, (4, 1, 3))
+
+        # Nested floating subspaces get cast, others are kept:
+        space = self.space.cast('float32')
+        self.assertEqual(space.dtypes['external'], np.float32)
+        self.assertEqual(space.dtypes['metadata']['timestamp'], np.float32)
+        self.assertEqual(space.dtypes['metadata']['trial_num'], np.uint32)
+
+        # Original space is intact:
+        self.assertEqual(self.space.dtypes['external'], np.float64)
+
+    def test_cast_round_trip(self):
+        space = self.space.cast(np.float32, exclude=('metadata',))
+        x = space.sample()
+        x['metadata'] = self.metadata
+        unpacked = space.unpack(space.pack(x))
+        self.assertEqual(unpacked['external'].dtype, np.float32)
+        np.testing.assert_array_equal(unpacked['external'], x['external'])
+        self.assertEqual(unpacked['metadata']['trial_num'], self.metadata['trial_num'])
+
+
+def lookup_vec_to_cat(space, vector):
+    """Reference categorical encoding by lookup table search"""
+    for key, value in space.lookup_table.items():
+        if list(value) == list(vector):
+            return key
+    raise ValueError
+
+
+def lookup_cat_to_binary(space, category):
+    """Reference binary encoding via bit string"""
+    return np.asarray(list(format(category, 'b').zfill(space.encoded_depth)), dtype='float')
+
+
+class ActionDictSpaceTest(unittest.TestCase):
+    """Testing ActionDictSpace encoding tables against lookup table semantics"""
+
+    def setUp(self):
+        self.spaces = [
+            ActionDictSpace(assets=assets, base_actions=base_actions)
+            for assets in [['a'], ['b', 'a'], ['x', 'y', 'z']]
+            for base_actions in [('hold', 'buy', 'sell'), ('hold', 'buy', 'sell', 'close')]
+        ]
+
+    def test_categories(self):
+        for space in self.spaces:
+            self.assertEqual(space.cardinality, len(space.base_actions) ** len(space.assets))
+            for category, vector in space.lookup_table.items():
+                self.assertEqual(space._vec_to_cat(vector), category)
+                self.assertEqual(space._vec_to_cat(np.asarray(vector)), lookup_vec_to_cat(space, vector))
+                np.testing.assert_array_equal(space._cat_to_vec(category), vector)
+
+    def test_binary(self):
+        for space in self.spaces:
+            for category, vector in space.lookup_table.items():
+                action = dict(zip(space.assets, vector))
+                code = space.encode(action)
+                np.testing.assert_array_equal(code, lookup_cat_to_binary(space, category))
+                self.assertEqual(code.dtype, np.float64)
+                self.assertEqual(dict(space.decode(code)), action)
+
+                # Encoding is a copy:
+                code[:] = 0
+                np.testing.assert_array_equal(space.encode(action), lookup_cat_to_binary(space, category))
+
+    def test_one_hot(self):
+        for space in self.spaces:
+            for category, vector in space.lookup_table.items():
+                one_hot = space.one_hot_encode(dict(zip(space.assets, vector)))
+                self.assertEqual(one_hot.shape, (space.cardinality,))
+                self.assertEqual(np.argmax(one_hot), category)
+                self.assertEqual(one_hot.sum(), 1)
+                np.testing.assert_array_equal(space._vec_to_one_hot(np.asarray(vector)), one_hot)
+
+    def test_invalid(self):
+        space = self.spaces[-1]
+        for vector in [[0, 1], [0, 1, 4], [0, -1, 1], [0, 1.5, 1]]:
+            with self.assertRaises(ValueError):
+                space._vec_to_cat(vector)
+
+        for category in [-1, space.cardinality, 1.5]:
+            with self.assertRaises(ValueError):
+                space._cat_to_vec(category)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import os
+import time
+import signal
+import unittest
+import threading
+import multiprocessing
+
+from logbook import Logger, CRITICAL
+
+from .supervisor import BTgymHeartbeat, BTgymEnvSupervisor, BTgymProcessWatchdog, release_heartbeat_address
+from .envs.base import BTgymEnv
+
+
+def serve_heartbeat(waiting=False):
+    heartbeat = BTgymHeartbeat()
+    heartbeat.waiting = waiting
+    heartbeat.start()
+    time.sleep(60)
+
+
+def start_process(waiting=False):
+    process = multiprocessing.Process(target=serve_heartbeat, args=(waiting,), daemon=True)
+    process.start()
+    return process
+
+
+def kill(process):
+    if process.is_alive():
+        os.kill(process.pid, signal.SIGKILL)
+    process.join()
+    release_heartbeat_address(process.pid)
+
+
+class WatchedEnv:
+    """Stands for BTgymEnv as seen by supervisor"""
+
+    def __init__(self, server):
+        self.task = 0
+        self.server = server
+        self.data_server = None
+        self.data_master = False
+        self.abort_request = threading.Event()
+        self.request_started = None
+        self.request_latency = None
+
+
+class BTgymEnvSupervisorTest(unittest.TestCase):
+    """Testing failed environments detection"""
+
+    def setUp(self):
+        self.processes = []
+        self.supervisor = None
+
+    def tearDown(self):
+        if self.supervisor is not None:
+            self.supervisor.stop()
+
+        for process in self.processes:
+            kill(process)
+
+    def watch(self, waiting=False, **kwargs):
+        process = start_process(waiting)
+        self.processes.append(process)
+        env = WatchedEnv(process)
+        self.supervisor = BTgymEnvSupervisor(
+            [env],
+            interval=0.1,
+            heartbeat_timeout=1.0,
+            log_level=CRITICAL,
+            **kwargs
+        )
+        self.supervisor.start()
+        return env
+
+    def test_healthy(self):
+        env = self.watch()
+        env.request_started = time.time()
+        self.assertFalse(env.abort_request.wait(2.0))
+        self.assertEqual(self.supervisor.num_failures, 0)
+
+    def test_heartbeat_stall(self):
+        env = self.watch()
+        # Let process answer first pings:
+        time.sleep(0.5)
+        env.request_started = time.time()
+        os.kill(env.server.pid, signal.SIGSTOP)
+        self.assertTrue(env.abort_request.wait(5.0))
+        self.assertEqual(self.supervisor.num_failures, 1)
+
+    def test_exited(self):
+        env = self.watch()
+        kill(env.server)
+        self.assertTrue(env.abort_request.wait(2.0))
+        self.assertEqual(self.supervisor.num_failures, 1)
+
+    def test_request_stall(self):
+        env = self.watch(min_stall_timeout=0.5)
+        env.request_latency = 0.001
+        env.request_started = time.time()
+        self.assertTrue(env.abort_request.wait(2.0))
+
+    def test_waiting_is_not_stall(self):
+        env = self.watch(waiting=True, min_stall_timeout=0.5)
+        env.request_latency = 0.001
+        env.request_started = time.time()
+        self.assertFalse(env.abort_request.wait(2.0))
+
+    def test_recovered_env_watched_again(self):
+        env = self.watch()
+        kill(env.server)
+        self.assertTrue(env.abort_request.wait(2.0))
+
+        # Recovered environment is checked again with its new process:
+        env.server = start_process()
+        self.processes.append(env.server)
+        env.abort_request.clear()
+        time.sleep(1.0)
+        self.assertTrue(env.server.pid in self.supervisor.sockets)
+        os.kill(env.server.pid, signal.SIGSTOP)
+        self.assertTrue(env.abort_request.wait(5.0))
+        self.assertEqual(self.supervisor.num_failures, 2)
+
+
+class RecoverTest(unittest.TestCase):
+    """Testing BTgymEnv.recover() restarts failed server processes"""
+
+    def make_env(self, server, data_server=None):
+        env = BTgymEnv.__new__(BTgymEnv)
+        env.log = Logger('RecoverTest', level=CRITICAL)
+        env.server = server
+        env.data_server = data_server
+        env.data_master = data_server is not None
+        env.abort_request = threading.Event()
+        env.abort_request.set()
+        env.started = []
+
+        def start_server():
+            env.server = start_process()
+            env.started.append('server')
+
+        def start_data_server():
+            env.data_server = start_process()
+            env.started.append('data_server')
+
+        env._start_server = start_server
+        env._start_data_server = start_data_server
+        return env
+
+    def tearDown(self):
+        for process in [self.env.server, self.env.data_server] + self.old:
+            if process is not None:
+                kill(process)
+
+    def test_frozen_server(self):
+        server = start_process()
+        time.sleep(0.2)
+        os.kill(server.pid, signal.SIGSTOP)
+        self.old = [server]
+        self.env = self.make_env(server)
+        self.assertFalse(self.env.is_healthy)
+
+        self.env.recover()
+        self.assertFalse(server.is_alive())
+        self.assertTrue(self.env.server.is_alive())
+        self.assertEqual(self.env.started, ['server'])
+        self.assertTrue(self.env.is_healthy)
+
+    def test_exited_data_server(self):
+        server = start_process()
+        data_server = start_process()
+        kill(data_server)
+        self.old = [server, data_server]
+        self.env = self.make_env(server, data_server)
+
+        self.env.recover()
+        self.assertFalse(server.is_alive())
+        self.assertEqual(self.env.started, ['data_server', 'server'])
+        self.assertTrue(self.env.data_server.is_alive())
+        self.assertTrue(self.env.is_healthy)
+
+    def test_running_data_server_kept(self):
+        server = start_process()
+        data_server = start_process()
+        self.old = [server]
+        self.env = self.make_env(server, data_server)
+
+        self.env.recover()
+        self.assertIs(self.env.data_server, data_server)
+        self.assertEqual(self.env.started, ['server'])
+
+
+class BTgymProcessWatchdogTest(unittest.TestCase):
+    """Testing shared process restarts"""
+
+    def setUp(self):
+        self.processes = [start_process()]
+        self.watchdog = BTgymProcessWatchdog(
+            get_process=lambda: self.processes[-1],
+            restart=self.restart,
+            interval=0.1,
+            heartbeat_timeout=1.0,
+            log_level=CRITICAL,
+        )
+        self.restarted = threading.Event()
+
+    def tearDown(self):
+        self.watchdog.stop()
+        for process in self.processes:
+            kill(process)
+
+    def restart(self):
+        kill(self.processes[-1])
+        self.processes.append(start_process())
+        self.restarted.set()
+
+    def test_healthy(self):
+        self.watchdog.start()
+        self.assertFalse(self.restarted.wait(2.0))
+        self.assertEqual(self.watchdog.num_restarts, 0)
+
+    def test_exited(self):
+        self.watchdog.start()
+        time.sleep(0.5)
+        os.kill(self.processes[-1].pid, signal.SIGKILL)
+        self.assertTrue(self.restarted.wait(2.0))
+        self.assertEqual(self.watchdog.num_restarts, 1)
+
+    def test_heartbeat_stall(self):
+        self.watchdog.start()
+        time.sleep(0.5)
+        os.kill(self.processes[-1].pid, signal.SIGSTOP)
+        self.assertTrue(self.restarted.wait(5.0))
+        self.assertEqual(self.watchdog.num_restarts, 1)
+
+        # Restarted process is watched in turn:
+        self.restarted.clear()
+        time.sleep(0.5)
+        os.kill(self.processes[-1].pid, signal.SIGSTOP)
+        self.assertTrue(self.restarted.wait(5.0))
+        self.assertEqual(self.watchdog.num_restarts, 2)
+
+    def test_nothing_to_watch(self):
+        self.processes.append(None)
+        self.watchdog.start()
+        time.sleep(0.5)
+        self.processes.pop()
+        self.assertEqual(self.watchdog.num_restarts, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,298 @@
+###############################################################################
+#
+# Copyright (C) 2017 Andrew Muzikin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+import numpy as np
+
+
+def update_position(size, price, order_size, order_price):
+    """
+    Vectorized counterpart of backtrader.Position.update().
+
+    Args:
+        size:           array of current position sizes
+        price:          array of current position prices
+        order_size:     array of sizes to update positions with, signed
+        order_price:    array of execution prices
+
+    Returns:
+        tuple of arrays (new size, new price, opened, closed), where `opened` and `closed` are parts of
+        order size used to open/increase and to close/reduce position respectively, carrying order size sign.
+    """
+    new_size = size + order_size
+
+    same_side = size * order_size > 0
+    reduced = (size * order_size < 0) & (new_size * size > 0)
+    reversed_ = (size * order_size < 0) & (new_size * size < 0)
+    from_zero = (size == 0) & (order_size != 0)
+    to_zero = (new_size == 0) & (order_size != 0)
+
+    opened = np.where(from_zero | same_side, order_size, np.where(reversed_, new_size, 0.0))
+    closed = np.where(reduced | to_zero, order_size, np.where(reversed_, -size, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_price = np.where(
+            to_zero,
+            0.0,
+            np.where(
+                from_zero | reversed_,
+                order_price,
+                np.where(same_side, (price * size + order_size * order_price) / new_size, price)
+            )
+        )
+    return new_size, new_price, opened, closed
+
+
+class VectorBroker:
+    """
+    Pure-NumPy counterpart of backtrader BackBroker for number of independent single-asset accounts,
+    all advanced in lock-step with every operation applied to entire batch of accounts at once.
+
+    Mimics broker setup used by BTgymEnv and BTgymBaseStrategy:
+
+        - market orders only; orders submitted at bar close are checked for margin against submission price
+          (as with `set_checksubmit(True)`) and executed at next bar open price;
+        - stock-like percentage commission, `.001` stands for 0.1% of operation value;
+        - leverage applied to cash requirements of opened positions;
+        - short positions valued as with `set_shortcash(False)`;
+        - each account holds up to `max_orders` orders pending per bar, executed in submission order.
+
+    Trade results are tracked to provide `notify_trade()`-like information: on every bar a position gets closed,
+    `trade_closed` flag is risen and `trade_result` holds trade profit/loss net of commissions.
+    """
+
+    def __init__(self, num_accounts, start_cash=100.0, commission=0.001, leverage=1.0, max_orders=4):
+        """
+
+        Args:
+            num_accounts:   int, number of accounts (batch size)
+            start_cash:     float, initial cash of every account
+            commission:     float, broker commission value, .001 stands for 0.1%
+            leverage:       float, broker leverage
+            max_orders:     int, maximum number of orders every account can have pending per bar
+        """
+        self.num_accounts = num_accounts
+        self.start_cash = float(start_cash)
+        self.commission = float(commission)
+        self.leverage = float(leverage)
+        self.max_orders = max_orders
+
+        self.cash = np.zeros(num_accounts)
+        self.value = np.zeros(num_accounts)
+        self.size = np.zeros(num_accounts)
+        self.price = np.zeros(num_accounts)
+
+        self.order_size = np.zeros((num_accounts, max_orders))
+        self.order_price = np.zeros((num_accounts, max_orders))
+        self.num_orders = np.zeros(num_accounts, dtype=np.int64)
+
+        self.trade_pnl = np.zeros(num_accounts)
+        self.trade_comm = np.zeros(num_accounts)
+        self.trade_closed = np.zeros(num_accounts, dtype=bool)
+        self.trade_result = np.zeros(num_accounts)
+        self.margin_call = np.zeros(num_accounts, dtype=bool)
+
+        self._rows = np.arange(num_accounts)
+        self.reset()
+
+    def reset(self):
+        """
+        Restores initial state of all accounts, cancels pending orders.
+        """
+        self.cash[:] = self.start_cash
+        self.value[:] = self.start_cash
+        self.size[:] = 0.0
+        self.price[:] = 0.0
+
+        self.order_size[:] = 0.0
+        self.order_price[:] = 0.0
+        self.num_orders[:] = 0
+
+        self.trade_pnl[:] = 0.0
+        self.trade_comm[:] = 0.0
+        self.trade_closed[:] = False
+        self.trade_result[:] = 0.0
+        self.margin_call[:] = False
+
+    def submit(self, size, price, mask=None):
+        """
+        Submits market orders, zero-sized orders are ignored.
+
+        Args:
+            size:   array of signed order sizes: positive to buy, negative to sell
+            price:  array of submission prices, usually current bar close
+            mask:   bool array, submit only for accounts set to True, optional
+        """
+        size = np.broadcast_to(np.asarray(size, dtype=np.float64), (self.num_accounts,))
+        price = np.broadcast_to(np.asarray(price, dtype=np.float64), (self.num_accounts,))
+        do_submit = size != 0
+        if mask is not None:
+            do_submit = do_submit & mask
+
+        if not do_submit.any():
+            return
+
+        assert (self.num_orders[do_submit] < self.max_orders).all(), \
+            'Number of orders pending exceeds max_orders={}'.format(self.max_orders)
+
+        rows = self._rows[do_submit]
+        cols = self.num_orders[do_submit]
+        self.order_size[rows, cols] = size[do_submit]
+        self.order_price[rows, cols] = price[do_submit]
+        self.num_orders[do_submit] += 1
+
+    def close(self, price, mask=None):
+        """
+        Submits orders countering current positions, as backtrader.Strategy.close() does.
+
+        Args:
+            price:  array of submission prices
+            mask:   bool array, submit only for accounts set to True, optional
+        """
+        self.submit(-self.size, price, mask)
+
+    def _check_submitted(self):
+        """
+        Pseudo-executes pending orders at submission prices to check if cash suffices,
+        mimics BackBroker.check_submitted() including its cash and position bookkeeping.
+
+        Returns:
+            bool array of shape [num_accounts, max_orders], True for accepted orders
+        """
+        cash = self.cash.copy()
+        size = self.size.copy()
+        price = self.price.copy()
+        accepted = np.zeros((self.num_accounts, self.max_orders), dtype=bool)
+
+        for j in range(self.max_orders):
+            order_size = self.order_size[:, j]
+            order_price = self.order_price[:, j]
+            active = order_size != 0
+            if not active.any():
+                break
+
+            new_size, new_price, opened, closed = update_position(size, price, order_size, order_price)
+
+            # Profit/loss is not accounted for by pseudo-execution:
+            new_cash = cash + np.abs(closed) * order_price / self.leverage
+            new_cash = new_cash - np.abs(closed) * self.commission * order_price
+
+            new_cash = new_cash - np.abs(opened) * order_price / self.leverage
+            new_cash = new_cash - np.abs(opened) * self.commission * order_price
+
+            cash = np.where(active, new_cash, cash)
+            size = np.where(active, new_size, size)
+            price = np.where(active, new_price, price)
+            accepted[:, j] = active & (cash >= 0.0)
+
+        return accepted
+
+    def execute(self, exec_price, mask=None):
+        """
+        Checks and executes all pending orders, clears orders queue.
+
+        Args:
+            exec_price: array of execution prices, usually current bar open
+            mask:       bool array, execute only for accounts set to True, optional;
+                        orders of other accounts are kept pending
+
+        Returns:
+            bool array, True for accounts closed a trade while executing
+        """
+        if mask is None:
+            mask = np.ones(self.num_accounts, dtype=bool)
+
+        self.trade_closed[:] = False
+        self.margin_call[:] = False
+
+        if not (self.num_orders[mask] > 0).any():
+            return self.trade_closed
+
+        exec_price = np.asarray(exec_price, dtype=np.float64)
+        accepted = self._check_submitted() & mask[:, None]
+        self.margin_call |= ((self.order_size != 0) & ~accepted).any(axis=-1) & mask
+
+        for j in range(self.max_orders):
+            order_size = np.where(accepted[:, j], self.order_size[:, j], 0.0)
+            if not order_size.any():
+                continue
+
+            _, _, opened, closed = update_position(self.size, self.price, order_size, exec_price)
+
+            # Closing part of the order re-injects cash and realizes profit/loss:
+            has_closed = closed != 0
+            pnl = -closed * (exec_price - self.price)
+            closed_comm = np.abs(closed) * self.commission * exec_price
+            closed_cash = self.cash + (np.abs(closed) * self.price / self.leverage + pnl)
+            closed_cash = closed_cash - closed_comm
+            self.cash = np.where(has_closed, closed_cash, self.cash)
+
+            # Opening part is nullified if not enough cash:
+            opened_value = np.abs(opened) * exec_price
+            opened_comm = np.abs(opened) * self.commission * exec_price
+            opened_cash = self.cash - opened_value / self.leverage
+            opened_cash = opened_cash - opened_comm
+            has_opened = (opened != 0) & (opened_cash >= 0.0)
+            self.margin_call |= (opened != 0) & ~has_opened
+            self.cash = np.where(has_opened, opened_cash, self.cash)
+            opened = np.where(has_opened, opened, 0.0)
+
+            # Trade is closed once position is back to zero:
+            self.trade_pnl = np.where(has_closed, self.trade_pnl + pnl, self.trade_pnl)
+            self.trade_comm = np.where(has_closed, self.trade_comm + closed_comm, self.trade_comm)
+            just_closed = has_closed & (self.size + closed == 0)
+            self.trade_result = np.where(just_closed, self.trade_pnl - self.trade_comm, self.trade_result)
+            self.trade_closed |= just_closed
+            self.trade_pnl = np.where(just_closed, 0.0, self.trade_pnl)
+            self.trade_comm = np.where(just_closed, 0.0, self.trade_comm)
+            self.trade_comm = np.where(has_opened, self.trade_comm + opened_comm, self.trade_comm)
+
+            self.size, self.price, _, _ = update_position(self.size, self.price, closed + opened, exec_price)
+
+        self.order_size[mask] = 0.0
+        self.order_price[mask] = 0.0
+        self.num_orders[mask] = 0
+
+        return self.trade_closed
+
+    def get_value(self, price, mask=None):
+        """
+        Updates and returns accounts values.
+
+        Args:
+            price:  array of current asset prices, usually bar close
+            mask:   bool array, update only accounts set to True, optional
+
+        Returns:
+            array of accounts values
+        """
+        size = self.size
+        # Short position is worth more as price goes down:
+        raw_value = np.abs(
+            np.where(size >= 0, size * price, self.price * size + (self.price - price) * size)
+        )
+        unrealized = size * (price - self.price)
+        position_value = np.where(raw_value > 0, (raw_value - unrealized) / self.leverage + unrealized, raw_value)
+        value = self.cash + position_value
+
+        if mask is None:
+            self.value = value
+
+        else:
+            self.value = np.where(mask, value, self.value)
+
+        return self.value
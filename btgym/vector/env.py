@@ -0,0 +1,647 @@
+###############################################################################
+#
+# Copyright (C) 2017 Andrew Muzikin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+
+from logbook import Logger, StreamHandler, WARNING, NOTICE, INFO, DEBUG
+import sys
+import copy
+import numpy as np
+import gym
+from gym import spaces
+
+from btgym import BTgymBaseStrategy, BTgymDataset, DictSpace, ActionDictSpace
+from btgym.datafeed import DataSampleConfig
+from btgym.strategy.utils import decayed_result
+from btgym.vector.broker import VectorBroker
+
+
+class BTgymVectorEnv(gym.Env):
+    """
+    OpenAI Gym API shell for pure-NumPy trading engine, an alternative to backtrader-based BTgymEnv
+    for discrete-action single-asset setups.
+
+    Instead of running backtrader event loop in server process, entire data of `num_envs` episodes is held as
+    arrays and all episodes are advanced in lock-step by VectorBroker, every broker and strategy computation
+    being applied to the whole batch at once.
+
+    Reproduces BTgymEnv running default BTgymBaseStrategy: market orders of fixed stake, commission and leverage,
+    drawdown/target/end-of-data termination with closing countdown, `skip_frame`, `raw` and `metadata`
+    observation modes and potential-based reward shaping.
+
+    Note:
+        - observations, rewards and done flags are batched along first dimension of size `num_envs`;
+          info is a list holding single columnar record of arrays, see btgym.strategy.info.StepInfoLog;
+        - observation_space and action_space describe single episode, as for BTgymEnv;
+        - finished episodes are kept frozen, i.e. repeat last observation with zero reward and `done` flag,
+          until all episodes are finished and reset() is called;
+        - custom strategies and observation modes other than `raw` and `metadata` are not supported.
+    """
+    # Dataset:
+    dataset = None  # BTgymDataset instance.
+    dataset_stat = None
+
+    # Number of episodes to run in lock-step:
+    num_envs = 1
+
+    # Strategy-related parameters, defaults are those of BTgymBaseStrategy:
+    time_dim = BTgymBaseStrategy.time_dim
+    avg_period = BTgymBaseStrategy.avg_period
+    skip_frame = BTgymBaseStrategy.skip_frame
+    gamma = BTgymBaseStrategy.gamma
+    reward_scale = BTgymBaseStrategy.reward_scale
+    portfolio_actions = BTgymBaseStrategy.portfolio_actions
+    drawdown_call = 10
+    target_call = 10
+    asset_names = ('default_asset',)
+    cash_name = 'default_cash'
+
+    # Broker-related parameters, defaults are those of BTgymEnv engine:
+    start_cash = 100.0
+    broker_commission = 0.001
+    fixed_stake = 10
+    leverage = 1.0
+
+    # Logging and id:
+    log = None
+    log_level = None
+    verbose = 0
+    task = 0
+
+    random_seed = None
+
+    closed = True
+
+    # Supported discrete actions:
+    order_actions = ('hold', 'buy', 'sell', 'close')
+
+    # Extra bars to make until episode is done when terminal conditions are met, as for BTgymBaseStrategy:
+    steps_till_is_done = 2
+
+    def __init__(self, **kwargs):
+        """
+
+        Keyword Args:
+            num_envs=1 (int):                   number of episodes to run in lock-step;
+            filename=None (str, list):          csv data file;
+            **datafeed_args (any):              any datafeed-related args, passed through to
+                                                default btgym.datafeed class;
+            dataset=None (btgym.datafeed):      BTgymDataDomain instance,
+                                                overrides `filename` or any other datafeed-related args;
+            time_dim=4 (int):                   time embedding length of `raw` observation;
+            skip_frame=1 (int):                 number of bars to make per environment step;
+            portfolio_actions (tuple):          agent actions, any of ('hold', 'buy', 'sell', 'close'),
+                                                `hold` should go first;
+            drawdown_call=10 (float):           finish episode when hitting drawdown threshold, in percent;
+            target_call=10 (float):             finish episode when reaching profit target, in percent;
+            start_cash=100 (float):             broker starting cash;
+            broker_commission=.001 (float):     broker commission value, .001 stands for 0.1%;
+            fixed_stake=10 (float):             single order size;
+            leverage=1.0 (float):               broker leverage;
+            gamma=.99 (float):                  reward shaping discount, should match MDP gamma decay;
+            reward_scale=1.0 (float):           reward multiplicator;
+            verbose=0 (int):                    verbosity mode, {0 - WARNING, 1 - INFO, 2 - DEBUG}
+            log_level=None (int):               logbook level {DEBUG=10, INFO=11, NOTICE=12, WARNING=13},
+                                                overrides `verbose` arg;
+            log=None (logbook.Logger):          external logbook logger,
+                                                overrides `log_level` and `verbose` args.
+            task=0 (int):                       environment id
+            random_seed(int):                   numpy random seed, def: None
+        """
+        # Update self attributes, remove used kwargs:
+        for key in dir(self):
+            if key in kwargs.keys():
+                setattr(self, key, kwargs.pop(key))
+
+        # Logging and verbosity control:
+        if self.log is None:
+            StreamHandler(sys.stdout).push_application()
+            if self.log_level is None:
+                log_levels = [(0, NOTICE), (1, INFO), (2, DEBUG)]
+                self.log_level = WARNING
+                for key, value in log_levels:
+                    if key == self.verbose:
+                        self.log_level = value
+            self.log = Logger('BTgymVectorEnv_{}'.format(self.task), level=self.log_level)
+
+        # Random seeding:
+        np.random.seed(self.random_seed)
+
+        try:
+            assert len(list(self.asset_names)) == 1
+
+        except AssertionError:
+            msg = 'BTgymVectorEnv supports single asset only, got: {}'.format(self.asset_names)
+            self.log.error(msg)
+            raise ValueError(msg)
+
+        try:
+            assert self.portfolio_actions and set(self.portfolio_actions).issubset(self.order_actions)
+
+        except AssertionError:
+            msg = 'BTgymVectorEnv supports discrete actions from {} only, got: {}'.format(
+                self.order_actions,
+                self.portfolio_actions
+            )
+            self.log.error(msg)
+            raise ValueError(msg)
+
+        # Dataset:
+        if self.dataset is None:
+            self.dataset = BTgymDataset(**kwargs)
+            self.log.info('Base Dataset class used.')
+
+        else:
+            self.log.info('Custom Dataset class used.')
+
+        self.dataset.set_logger(self.log_level, self.task)
+        if not self.dataset.is_ready:
+            self.dataset.reset()
+
+        self.dataset_stat = self.dataset.describe()
+        price_columns = [name for name in self.dataset_stat.columns if name != 'volume']
+
+        # Observation space is that of single episode, for `raw` state min/max values are inferred from dataset:
+        state_shape = copy.deepcopy(dict(BTgymBaseStrategy.params._gettuple())['state_shape'])
+        state_shape['raw'] = spaces.Box(
+            shape=(self.time_dim, 4),
+            low=self.dataset_stat.loc['min', price_columns].min(),
+            high=self.dataset_stat.loc['max', price_columns].max(),
+            dtype=np.float32,
+        )
+        self.observation_space = DictSpace(state_shape)
+        self.action_space = ActionDictSpace(
+            base_actions=self.portfolio_actions,
+            assets=self.asset_names
+        )
+        self.asset_name = self.action_space.assets[0]
+
+        # Translate action indices to order types once:
+        self.action_to_order = np.asarray(
+            [self.order_actions.index(name) for name in self.portfolio_actions],
+            dtype=np.int64
+        )
+
+        self.broker = VectorBroker(
+            num_accounts=self.num_envs,
+            start_cash=self.start_cash,
+            commission=self.broker_commission,
+            leverage=self.leverage,
+        )
+        # Normalisation constant for statistics derived from account value:
+        self.broker_value_normalizer = 1 / self.start_cash / (self.drawdown_call + self.target_call) * 100
+        self.target_value = self.start_cash * (1 + self.target_call / 100)
+
+        self.trials = [None] * self.num_envs
+        self.episode_num = 0
+        self.episode_stat = None
+        self.env_response = None
+        self.closed = False
+
+        self.log.info('Environment is ready.')
+
+    def _seed(self, seed=None):
+        """
+        Sets env. random seed.
+
+        Args:
+            seed:   int or None
+        """
+        self.random_seed = seed
+        np.random.seed(self.random_seed)
+
+    def get_initial_action(self):
+        return np.zeros(self.num_envs, dtype=np.int64)
+
+    def _sample_episodes(self, trial_config, episode_config):
+        """
+        Samples episode for every environment, data domain `Trial` is reused if not requested otherwise.
+
+        Returns:
+            list of BTgymEpisode instances
+        """
+        if not self.dataset.is_ready:
+            self.log.info('Data domain `reset()` called prior to `reset_data()` with [possibly inconsistent] defaults.')
+            self.dataset.reset()
+
+        for config in (trial_config, episode_config):
+            if config['timestamp'] is None:
+                config['timestamp'] = 0
+
+        episodes = []
+        for i in range(self.num_envs):
+            if trial_config['get_new'] or self.trials[i] is None:
+                self.trials[i] = self.dataset.sample(**trial_config)
+                self.trials[i].set_logger(self.log_level, self.task)
+                self.trials[i].reset()
+
+            episodes.append(self.trials[i].sample(**episode_config))
+
+        return episodes
+
+    def _load_episodes(self, episodes):
+        """
+        Converts episodes data to batch of arrays, shorter episodes are padded with their last bar.
+
+        Args:
+            episodes:   list of `num_envs` BTgymEpisode instances
+        """
+        self.num_records = np.asarray([episode.data.shape[0] for episode in episodes], dtype=np.int64)
+        max_records = self.num_records.max()
+
+        self.prices = np.empty((self.num_envs, max_records, 4))
+        self.timestamps = np.empty((self.num_envs, max_records))
+        self.times = np.empty((self.num_envs, max_records), dtype=np.int64)
+
+        for i, episode in enumerate(episodes):
+            # Column indices are given as for bt.feeds.PandasDirectData, i.e. with dataframe index being zero one:
+            columns = [episode.open - 1, episode.high - 1, episode.low - 1, episode.close - 1]
+            prices = episode.data.values[:, columns].astype(np.float64)
+            index = episode.data.index
+            timestamps = np.asarray([time.timestamp() for time in index.to_pydatetime()])
+            times = np.asarray(index.values.astype('datetime64[ms]').astype(np.int64))
+
+            pad = max_records - prices.shape[0]
+            self.prices[i] = np.pad(prices, ((0, pad), (0, 0)), mode='edge')
+            self.timestamps[i] = np.pad(timestamps, (0, pad), mode='edge')
+            self.times[i] = np.pad(times, (0, pad), mode='edge')
+
+        self.metadata_state = {
+            'type': np.asarray([episode.metadata['type'] for episode in episodes]),
+            'trial_num': np.asarray([episode.metadata['parent_sample_num'] for episode in episodes]),
+            'trial_type': np.asarray([episode.metadata['parent_sample_type'] for episode in episodes]),
+            'sample_num': np.asarray([episode.metadata['sample_num'] for episode in episodes]),
+            'first_row': np.asarray([episode.metadata['first_row'] for episode in episodes]),
+            'timestamp': np.zeros(self.num_envs, dtype=np.float64),
+        }
+
+    def reset(self, **kwargs):
+        """
+        Implementation of OpenAI Gym env.reset method. Starts `num_envs` new episodes. Episode data are sampled
+        according to data provider class logic, controlled via kwargs, same as for BTgymEnv.
+
+        Args:
+            kwargs:         `episode_config` and `trial_config` dictionaries, see btgym.datafeed.EnvResetConfig
+
+        Returns:
+            batch of observation space states
+        """
+        sample_config = dict(
+            episode_config=copy.deepcopy(DataSampleConfig),
+            trial_config=copy.deepcopy(DataSampleConfig)
+        )
+        for key, config in sample_config.items():
+            config.update(kwargs.get(key, {}))
+
+        self._load_episodes(self._sample_episodes(**sample_config))
+
+        # Episode state:
+        self.closed = False
+        self.broker.reset()
+        self.episode_num += 1
+        self.iteration = 0
+        self.bar = self.time_dim - 1  # first bar strategy is ready to act on
+
+        self.alive = np.ones(self.num_envs, dtype=bool)
+        self.is_done_enabled = np.zeros(self.num_envs, dtype=bool)
+        self.steps_till_done = np.full(self.num_envs, self.steps_till_is_done, dtype=np.int64)
+        self.final_message = np.full(self.num_envs, '-', dtype=object)
+
+        # Broker statistics:
+        self.realized_broker_value = np.full(self.num_envs, self.start_cash)
+        self.pos_duration = np.zeros(self.num_envs, dtype=np.int64)
+        self.unrealized_pnl = np.zeros((self.num_envs, self.avg_period))
+        self.realized_pnl = np.zeros((self.num_envs, self.avg_period))
+
+        # Broker and drawdown observers; as for backtrader, those are updated at the very end of every bar,
+        # so episode termination and info rely on previous bar observations:
+        self.max_value = np.full(self.num_envs, self.start_cash)
+        self.drawdown = np.zeros(self.num_envs)
+        self.max_drawdown = np.zeros(self.num_envs)
+        self.broker_cash = self.broker.cash.copy()
+        self.broker_value = self.broker.value.copy()
+
+        # Batched response:
+        self.raw_state = np.zeros((self.num_envs, self.time_dim, 4))
+        self.reward = np.zeros(self.num_envs)
+        self.is_done = np.zeros(self.num_envs, dtype=bool)
+        self.info = dict(
+            step=np.zeros(self.num_envs, dtype=np.int64),
+            time=np.zeros(self.num_envs, dtype=np.int64),
+            action=np.zeros((self.num_envs, 1), dtype=np.int8),
+            broker_cash=np.zeros(self.num_envs, dtype=np.float32),
+            broker_value=np.zeros(self.num_envs, dtype=np.float32),
+            drawdown=np.zeros(self.num_envs, dtype=np.float32),
+            max_drawdown=np.zeros(self.num_envs, dtype=np.float32),
+        )
+
+        # Termination is checked on first bar as well:
+        self._check_done(np.ones(self.num_envs, dtype=bool))
+
+        # Get initial environment response:
+        self.env_response = self.step(self.get_initial_action())
+
+        return self.env_response[0]
+
+    def _parse_action(self, action):
+        """
+        Converts action to array of action indices.
+
+        Args:
+            action:     array-like of `num_envs` ints or list of `num_envs` dictionaries {asset_name: int}
+
+        Returns:
+            int array of shape [num_envs]
+        """
+        if isinstance(action, (list, tuple)) and len(action) > 0 and isinstance(action[0], dict):
+            action = [single_action[self.asset_name] for single_action in action]
+
+        action = np.broadcast_to(np.asarray(action, dtype=np.int64), (self.num_envs,))
+
+        try:
+            assert ((action >= 0) & (action < len(self.portfolio_actions))).all()
+
+        except AssertionError:
+            msg = 'Action {} is out of action space.'.format(action)
+            self.log.error(msg)
+            raise AssertionError(msg)
+
+        return action
+
+    def _submit_orders(self, action, mask):
+        """
+        Emits orders for actions received, as BTgymBaseStrategy._next_discrete() does.
+        """
+        order = self.action_to_order[action]
+        mask = mask & ~self.is_done_enabled
+        price = self.prices[:, self.bar, 3]
+        size = np.where(
+            order == 1,
+            self.fixed_stake,
+            np.where(order == 2, -self.fixed_stake, np.where(order == 3, -self.broker.size, 0.0))
+        )
+        self.broker.submit(size, price, mask)
+
+    def _update_broker_stat(self, value, mask):
+        """
+        Updates sliding broker statistics used for reward estimation,
+        vectorized counterpart of BTgymBaseStrategy.update_broker_stat().
+        """
+        trade_closed = self.broker.trade_closed & mask
+        self.realized_broker_value = np.where(trade_closed, value, self.realized_broker_value)
+
+        self.unrealized_pnl[:, :-1] = self.unrealized_pnl[:, 1:]
+        self.unrealized_pnl[:, -1] = (value - self.realized_broker_value) * self.broker_value_normalizer
+
+        self.realized_pnl[:, :-1] = self.realized_pnl[:, 1:]
+        self.realized_pnl[:, -1] = np.where(
+            trade_closed,
+            decayed_result(
+                self.broker.trade_result,
+                value,
+                self.start_cash,
+                self.drawdown_call,
+                self.target_call,
+                gamma=1
+            ),
+            0.0
+        )
+        self.pos_duration = np.where(self.broker.size == 0, 0, self.pos_duration + 1)
+
+    def _check_done(self, mask):
+        """
+        Vectorized counterpart of BTgymBaseStrategy._get_done(): starts episode termination countdown
+        when terminal conditions are met and emits closing orders while counting down.
+
+        Returns:
+            bool array, True for episodes just finished
+        """
+        price = self.prices[:, self.bar, 3]
+
+        # Episodes already in termination phase keep hitting `Close` button:
+        countdown = mask & self.is_done_enabled
+        self.steps_till_done = np.where(countdown, self.steps_till_done - 1, self.steps_till_done)
+        self.broker.close(price, countdown)
+
+        # Sweep through base termination rules; every condition met issues closing order:
+        is_done_rules = [
+            (self.iteration >= self.num_records - self.time_dim - self.skip_frame - self.steps_till_is_done,
+             'END OF DATA'),
+            (self.max_drawdown >= self.drawdown_call, 'DRAWDOWN CALL'),
+            (self.broker.value > self.target_value, 'TARGET REACHED'),
+        ]
+        on_its_way = mask & ~self.is_done_enabled
+        for condition, message in is_done_rules:
+            triggered = on_its_way & condition
+            if triggered.any():
+                self.final_message[triggered] = message
+                self.is_done_enabled |= triggered
+                self.broker.close(price, triggered)
+
+        return mask & (self.steps_till_done <= 0)
+
+    def _update_observers(self, mask):
+        """
+        Vectorized counterpart of backtrader Broker and DrawDown observers.
+        """
+        self.broker_cash = np.where(mask, self.broker.cash, self.broker_cash)
+        self.broker_value = np.where(mask, self.broker.value, self.broker_value)
+
+        self.max_value = np.where(mask, np.maximum(self.max_value, self.broker.value), self.max_value)
+        self.drawdown = np.where(
+            mask,
+            100.0 * (self.max_value - self.broker.value) / self.max_value,
+            self.drawdown
+        )
+        self.max_drawdown = np.maximum(self.max_drawdown, self.drawdown)
+
+    def _window_average(self, x, start, stop):
+        """
+        Batched average of x[-start:-stop] slices taken along last dimension, zero for empty slices.
+        """
+        index = np.arange(x.shape[-1]) - x.shape[-1]
+        in_slice = (index >= -start[:, None]) & ((index < -stop[:, None]) | (stop[:, None] == 0))
+        count = in_slice.sum(axis=-1)
+
+        return (x * in_slice).sum(axis=-1) / np.maximum(count, 1)
+
+    def get_reward(self):
+        """
+        Vectorized counterpart of BTgymBaseStrategy.get_reward():
+        normalized realized profit/loss augmented with potential-based shaping term
+        of averaged unrealized profit/loss of opened position.
+
+        Returns:
+            array of rewards
+        """
+        skip_frame = np.full(self.num_envs, self.skip_frame)
+        duration = self.pos_duration
+
+        fi_1 = self._window_average(
+            self.unrealized_pnl,
+            start=np.where(duration < skip_frame, 0, np.minimum(skip_frame + duration, 2 * skip_frame)),
+            stop=skip_frame,
+        )
+        fi_1_prime = self._window_average(
+            self.unrealized_pnl,
+            start=np.minimum(duration, skip_frame),
+            stop=np.zeros_like(skip_frame),
+        )
+        f1 = np.where(duration == 0, 0.0, self.gamma * fi_1_prime - fi_1)
+
+        realized_pnl = self.realized_pnl[:, -self.skip_frame:].sum(axis=-1)
+
+        reward = (10.0 * f1 + 10.0 * realized_pnl) * self.reward_scale
+
+        return np.clip(reward, -self.reward_scale, self.reward_scale)
+
+    def get_state(self, mask):
+        """
+        Updates batch of `raw` and `metadata` observations for episodes given by mask.
+
+        Returns:
+            dictionary of batched observation states
+        """
+        raw_state = self.prices[:, self.bar - self.time_dim + 1: self.bar + 1, :]
+        self.raw_state = np.where(mask[:, None, None], raw_state, self.raw_state)
+        self.metadata_state['timestamp'] = np.where(
+            mask,
+            self.timestamps[:, self.bar],
+            self.metadata_state['timestamp']
+        )
+        return {
+            'raw': self.raw_state.copy(),
+            'metadata': {key: value.copy() for key, value in self.metadata_state.items()},
+        }
+
+    def get_info(self, action, mask):
+        """
+        Updates columnar step information record for episodes given by mask,
+        mimics btgym.strategy.info.StepInfoLog record of `last` mode with no decoders,
+        i.e. holding millisecond timestamps and action codes.
+
+        Returns:
+            dictionary of batched info values
+        """
+        # Action logged is the one of responding bar, i.e. `hold` when skipping frames:
+        if self.skip_frame > 1:
+            action = np.zeros_like(action)
+
+        info = self.info
+        info['step'] = np.where(mask, self.iteration, info['step'])
+        info['time'] = np.where(mask, self.times[:, self.bar], info['time'])
+        info['action'] = np.where(mask[:, None], action[:, None], info['action']).astype(np.int8)
+        info['broker_cash'] = np.where(mask, self.broker_cash, info['broker_cash']).astype(np.float32)
+        info['broker_value'] = np.where(mask, self.broker_value, info['broker_value']).astype(np.float32)
+        info['drawdown'] = np.where(mask, self.drawdown, info['drawdown']).astype(np.float32)
+        info['max_drawdown'] = np.where(mask, self.max_drawdown, info['max_drawdown']).astype(np.float32)
+
+        record = {key: value.copy() for key, value in info.items()}
+        record['broker_message'] = np.where(self.is_done_enabled, self.final_message, '-')
+
+        return record
+
+    def step(self, action):
+        """
+        Implementation of OpenAI Gym env.step() method.
+        Advances all running episodes by `skip_frame` bars or until episode is done.
+
+        Args:
+            action:     array-like of `num_envs` ints or list of `num_envs` dictionaries {asset_name: int}
+
+        Returns:
+            tuple (Observation, Reward, Done, Info) of batched values
+        """
+        if self.closed or not hasattr(self, 'alive'):
+            msg = 'Environment closed or not reset. Hint: forgot to call reset()?'
+            self.log.error(msg)
+            raise AssertionError(msg)
+
+        action = self._parse_action(action)
+
+        running = self.alive.copy()
+        responded = np.zeros(self.num_envs, dtype=bool)
+        reward = np.zeros(self.num_envs)
+
+        is_first_bar = True
+        while running.any():
+            self.bar += 1
+            self.iteration += 1
+
+            # Broker executes pending orders at bar open, updates accounts value at bar close:
+            self.broker.execute(self.prices[:, self.bar, 0], running)
+            value = self.broker.get_value(self.prices[:, self.bar, 3], running)
+            self._update_broker_stat(value, running)
+
+            # Strategy acts on agent action once per step:
+            if is_first_bar:
+                self._submit_orders(action, running)
+                is_first_bar = False
+
+            is_done = self._check_done(running)
+
+            # Only if it's time to respond or episode has come to end:
+            if self.iteration % self.skip_frame == 0:
+                respond = running
+
+            else:
+                respond = is_done
+
+            if respond.any():
+                reward = np.where(respond, self.get_reward(), reward)
+                state = self.get_state(respond)
+                info = self.get_info(action, respond)
+                responded |= respond
+                self.is_done |= is_done
+                self.alive &= ~is_done
+
+            self._update_observers(running)
+            running &= ~respond
+
+        if not responded.any():
+            msg = 'All episodes are done. Hint: forgot to call reset()?'
+            self.log.error(msg)
+            raise AssertionError(msg)
+
+        self.env_response = (state, reward, self.is_done.copy(), [info])
+
+        if not self.alive.any():
+            self.log.debug('Episodes run finished at step: {}'.format(self.iteration))
+
+        return self.env_response
+
+    def close(self):
+        """
+        Implementation of OpenAI Gym env.close method.
+        """
+        self.closed = True
+        self.log.info('Environment closed.')
+
+    def get_stat(self):
+        """
+        Returns last run episodes statistics.
+
+        Returns:
+            dictionary of batched values
+        """
+        return dict(
+            episode=self.episode_num,
+            length=self.num_records.copy(),
+            broker_value=self.broker.value.copy(),
+            max_drawdown=self.max_drawdown.copy(),
+            final_message=self.final_message.copy(),
+        )
@@ -0,0 +1,217 @@
+import unittest
+import copy
+import numpy as np
+import backtrader as bt
+from logbook import Logger, WARNING
+
+from btgym import BTgymBaseStrategy
+from btgym.datafeed.derivative import BTgymDataset
+from btgym.server import _BTgymAnalyzer
+from btgym.rendering import BTgymNullRendering
+from .broker import VectorBroker
+from .env import BTgymVectorEnv
+
+
+filename = '../examples/data/DAT_ASCII_EURUSD_M1_201703.csv'
+
+dataset_params = dict(
+    filename=filename,
+    episode_duration={'days': 0, 'hours': 23, 'minutes': 55},
+    start_00=False,
+    time_gap={'days': 0, 'hours': 10},
+    log_level=WARNING,
+)
+
+num_episodes = 3
+
+
+def sample_episodes(dataset, num_episodes):
+    episodes = []
+    for i in range(num_episodes):
+        trial = dataset.sample()
+        trial.reset()
+        episodes.append(trial.sample())
+    return episodes
+
+
+class ScriptedOrdersStrategy(bt.Strategy):
+    """
+    Submits orders given by script of sizes, 0 - none, nan - close position; records account value every bar.
+    """
+    params = dict(orders=None)
+
+    def __init__(self):
+        self.equity = []
+
+    def next(self):
+        self.equity.append(self.broker.get_value())
+        size = self.p.orders[len(self) - 1]
+        if np.isnan(size):
+            self.close()
+
+        elif size > 0:
+            self.buy(size=size)
+
+        elif size < 0:
+            self.sell(size=-size)
+
+
+class ScriptedSocket:
+    """
+    Stands for environment side of server connection: sends scripted actions, keeps responses received.
+    """
+    def __init__(self, actions):
+        self.actions = list(actions)
+        self.responses = []
+
+    def recv_pyobj(self):
+        if len(self.actions) == 0:
+            return {'ctrl': '_done'}
+        return {'action': {'default_asset': self.actions.pop(0)}}
+
+    def send_pyobj(self, message):
+        if isinstance(message, tuple):
+            self.responses.append(copy.deepcopy(message))
+
+
+class VectorEngineTest(unittest.TestCase):
+    """Testing vectorized engine against backtrader"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dataset = BTgymDataset(**dataset_params)
+        cls.dataset.reset()
+        cls.episodes = sample_episodes(cls.dataset, num_episodes)
+
+    def run_broker(self, orders, start_cash, commission, leverage):
+        """
+        Runs VectorBroker on batch of episodes with orders given.
+
+        Returns:
+            equity curves as array of shape [num_episodes, num_bars]
+        """
+        num_bars = min([episode.data.shape[0] for episode in self.episodes])
+        prices = np.stack([episode.data.values[:num_bars, :4] for episode in self.episodes], axis=0)
+
+        broker = VectorBroker(num_episodes, start_cash=start_cash, commission=commission, leverage=leverage)
+        equity = np.zeros((num_episodes, num_bars))
+        for i in range(num_bars):
+            broker.execute(prices[:, i, 0])
+            equity[:, i] = broker.get_value(prices[:, i, 3])
+            broker.submit(np.nan_to_num(orders[:, i]), prices[:, i, 3])
+            broker.close(prices[:, i, 3], mask=np.isnan(orders[:, i]))
+
+        return equity
+
+    def run_backtrader(self, episode, orders, start_cash, commission, leverage):
+        """
+        Runs backtrader with same broker setup as BTgymEnv does.
+
+        Returns:
+            equity curve as list
+        """
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(ScriptedOrdersStrategy, orders=orders)
+        cerebro.broker.setcash(start_cash)
+        cerebro.broker.setcommission(commission=commission, leverage=leverage)
+        cerebro.broker.set_checksubmit(True)
+        cerebro.broker.set_shortcash(False)
+        for name, feed in episode.to_btfeed().items():
+            cerebro.adddata(feed, name=name)
+
+        return cerebro.run(stdstats=False, preload=False)[0].equity
+
+    def test_equity_curves(self):
+        """
+        Vectorized broker equity curves should match those of backtrader for same orders,
+        including margin calls, short positions and leverage.
+        """
+        rng = np.random.RandomState(0)
+        num_bars = min([episode.data.shape[0] for episode in self.episodes])
+
+        for stake, leverage in [(10, 1.0), (40, 1.0), (30, 10.0)]:
+            orders = rng.choice([0, stake, -stake, np.nan], size=(num_episodes, num_bars), p=[.7, .1, .1, .1])
+            equity = self.run_broker(orders, start_cash=100.0, commission=0.001, leverage=leverage)
+
+            for i, episode in enumerate(self.episodes):
+                bt_equity = self.run_backtrader(episode, orders[i], 100.0, 0.001, leverage)
+                with self.subTest(stake=stake, leverage=leverage, episode=i):
+                    np.testing.assert_allclose(equity[i, :len(bt_equity)], bt_equity, rtol=1e-10)
+
+    def run_strategy(self, episode, actions, skip_frame, drawdown_call):
+        """
+        Runs BTgymBaseStrategy on episode, same way BTgymServer does.
+
+        Returns:
+            list of environment responses
+        """
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(
+            BTgymBaseStrategy,
+            metadata=episode.metadata,
+            skip_frame=skip_frame,
+            drawdown_call=drawdown_call,
+            order_size=10,
+            initial_portfolio_action={'default_asset': 'hold'},
+            initial_action={'default_asset': 0},
+        )
+        cerebro.broker.setcash(100.0)
+        cerebro.broker.setcommission(0.001)
+        cerebro.broker.set_shortcash(False)
+        cerebro.addobserver(bt.observers.DrawDown)
+        cerebro.addanalyzer(_BTgymAnalyzer, _name='_env_analyzer')
+
+        socket = ScriptedSocket(actions)
+        cerebro._socket = socket
+        cerebro._data_socket = None
+        cerebro._log = Logger('test', level=WARNING)
+        cerebro._render = BTgymNullRendering()
+        cerebro._get_data = None
+        cerebro._get_info = None
+        for name, feed in episode.to_btfeed().items():
+            cerebro.adddata(feed, name=name)
+
+        cerebro.run(stdstats=True, preload=False, oldbuysell=True, tradehistory=True)
+
+        return socket.responses
+
+    def test_env_responses(self):
+        """
+        Lock-step environment responses should match those of BTgymBaseStrategy, episode by episode.
+        """
+        rng = np.random.RandomState(1)
+        num_steps = max([episode.data.shape[0] for episode in self.episodes])
+
+        for skip_frame, drawdown_call in [(1, 10), (3, 1)]:
+            actions = rng.choice(4, size=(num_steps, num_episodes), p=[.7, .1, .1, .1])
+
+            env = BTgymVectorEnv(
+                num_envs=num_episodes,
+                dataset=self.dataset,
+                skip_frame=skip_frame,
+                drawdown_call=drawdown_call,
+                log_level=WARNING,
+            )
+            env._sample_episodes = lambda **kwargs: self.episodes
+            env.reset()
+            responses = [env.env_response]
+            while not env.env_response[2].all():
+                responses.append(env.step(actions[len(responses) - 1]))
+
+            for i, episode in enumerate(self.episodes):
+                bt_actions = ['hold'] + [env.portfolio_actions[action] for action in actions[:, i]]
+                bt_responses = self.run_strategy(episode, bt_actions, skip_frame, drawdown_call)
+
+                with self.subTest(skip_frame=skip_frame, drawdown_call=drawdown_call, episode=i):
+                    self.assertEqual(len(bt_responses), int(np.argmax([r[2][i] for r in responses])) + 1)
+                    for (o, r, d, info), (bt_o, bt_r, bt_d, bt_info) in zip(responses, bt_responses):
+                        np.testing.assert_allclose(o['raw'][i], bt_o['raw'])
+                        self.assertAlmostEqual(r[i], bt_r, places=10)
+                        self.assertEqual(d[i], bt_d)
+                        self.assertEqual(info[0]['step'][i], bt_info[0]['step'])
+                        self.assertAlmostEqual(info[0]['broker_value'][i], bt_info[0]['broker_value'], places=4)
+                        self.assertAlmostEqual(info[0]['max_drawdown'][i], bt_info[0]['max_drawdown'], places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
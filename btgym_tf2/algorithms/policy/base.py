@@ -293,19 +293,21 @@ class BaseAacPolicy(object):
             Action as dictionary of several action encodings, actions logits, V-fn value, output RNN state
         """
         try:
-            sess = tf.compat.v1.get_default_session()
-            feeder = {pl: value for pl, value in zip(self.on_lstm_state_pl_flatten, flatten_nested(lstm_state))}
-            feeder.update(feed_dict_from_nested(self.on_state_in, observation, expand_batch=True))
-            feeder.update(
-                {
-                    self.on_last_a_in: last_action,
-                    self.on_last_reward_in: last_reward,
-                    self.on_batch_size: 1,
-                    self.on_time_length: 1,
-                    self.train_phase: False
-                }
+            run = self._get_callable(
+                'act',
+                [self.on_logits, self.on_vf, self.on_lstm_state_out],
+                self._get_on_policy_feed_list,
+                lambda: self._get_on_policy_structure(observation, lstm_state)
+            )
+            logits, value, context = run(
+                *flatten_nested(lstm_state),
+                *[[leaf] for leaf in flatten_nested(observation)],
+                last_action,
+                last_reward,
+                1,
+                1,
+                False
             )
-            logits, value, context = sess.run([self.on_logits, self.on_vf, self.on_lstm_state_out], feeder)
             logits = logits[0, ...]
             if self.ac_space.is_discrete:
                 if deterministic:
@@ -317,22 +319,26 @@ class BaseAacPolicy(object):
 
                 # print('ploicy_determ: {}, logits: {}, sample: {}'.format(deterministic, logits, sample))
 
-                sample = self.ac_space._cat_to_vec(np.argmax(sample))
-
-                # print('policy_sample_vector: ', sample)
+                # Get all needed action encodings straight from category, sampled action needs no checks:
+                cat = np.argmax(sample)
+                action_pack = {
+                    'environment': self.ac_space._vec_to_action(self.ac_space._cat_to_vec(cat), check=False),
+                    'encoded': self.ac_space._cat_to_binary(cat),
+                    'one_hot': self.ac_space._cat_to_one_hot(cat),
+                }
 
             else:
                 # Use DP to get sample (continuous):
                 sample = sample_dp(logits, alpha=self.action_dp_alpha)
 
-            # Get all needed action encodings:
-            action = self.ac_space._vec_to_action(sample)
-            one_hot = self.ac_space._vec_to_one_hot(sample)
-            action_pack = {
-                'environment': action,
-                'encoded': self.ac_space.encode(action),
-                'one_hot': one_hot,
-            }
+                # Get all needed action encodings:
+                action = self.ac_space._vec_to_action(sample)
+                one_hot = self.ac_space._vec_to_one_hot(sample)
+                action_pack = {
+                    'environment': action,
+                    'encoded': self.ac_space.encode(action),
+                    'one_hot': one_hot,
+                }
             # print('action_pack: ', action_pack)
         except Exception as e:
             print(e)
@@ -353,20 +359,22 @@ class BaseAacPolicy(object):
         Returns:
             V-function value
         """
-        sess = tf.compat.v1.get_default_session()
-        feeder = feed_dict_rnn_context(self.on_lstm_state_pl_flatten, lstm_state)
-        feeder.update(feed_dict_from_nested(self.on_state_in, observation, expand_batch=True))
-        feeder.update(
-            {
-                self.on_last_a_in: last_action,
-                self.on_last_reward_in: last_reward,
-                self.on_batch_size: 1,
-                self.on_time_length: 1,
-                self.train_phase: False
-            }
+        run = self._get_callable(
+            'get_value',
+            self.on_vf,
+            self._get_on_policy_feed_list,
+            lambda: self._get_on_policy_structure(observation, lstm_state)
         )
 
-        return sess.run(self.on_vf, feeder)[0]
+        return run(
+            *flatten_nested(lstm_state),
+            *[[leaf] for leaf in flatten_nested(observation)],
+            last_action,
+            last_reward,
+            1,
+            1,
+            False
+        )[0]
 
     def get_pc_target(self, state, last_state, **kwargs):
         """
@@ -380,10 +388,71 @@ class BaseAacPolicy(object):
         Returns:
             Estimated absolute difference between two subsampled states.
         """
+        run = self._get_callable(
+            'get_pc_target',
+            self.pc_target,
+            lambda: [self.pc_change_state_in, self.pc_change_last_state_in]
+        )
+
+        return run(state['external'], last_state['external'])[0,...,0]
+
+    def _get_on_policy_feed_list(self):
+        """
+        Returns:
+            flat list of placeholders fed by act() and get_value(), in order values are passed in
+        """
+        return list(self.on_lstm_state_pl_flatten) + flatten_nested(self.on_state_in) + [
+            self.on_last_a_in,
+            self.on_last_reward_in,
+            self.on_batch_size,
+            self.on_time_length,
+            self.train_phase,
+        ]
+
+    def _get_on_policy_structure(self, observation, lstm_state):
+        """
+        Returns:
+            list of pairs of [nested] placeholders and single environment values fed by act() and get_value(),
+            expected to be of same structure
+        """
+        return [
+            (self.on_state_in, observation),
+            (list(self.on_lstm_state_pl_flatten), flatten_nested(lstm_state)),
+        ]
+
+    def _get_callable(self, name, fetches, get_feed_list, get_structure=None):
+        """
+        Returns callable running `fetches` in default session, made once per session by `Session.make_callable()`;
+        saves feed dictionary composition and fetches parsing on every call.
+        Graph-mode counterpart of wrapping policy evaluation in `tf.function`.
+
+        Args:
+            name:           str, callable cache key
+            fetches:        [nested] structure of tensors to run
+            get_feed_list:  callable returning flat list of placeholders to feed, in order of callable arguments
+            get_structure:  callable returning list of pairs of [nested] placeholders and values, if given,
+                            values are checked to match placeholders structure once, when callable is made,
+                            as values are passed positionally and mismatched ones won't be caught by session
+
+        Returns:
+            callable accepting values to feed as positional arguments
+        """
         sess = tf.compat.v1.get_default_session()
-        feeder = {self.pc_change_state_in: state['external'], self.pc_change_last_state_in: last_state['external']}
+        try:
+            callables = self._session_callables
+
+        except AttributeError:
+            # Not all subclasses call base __init__():
+            callables = self._session_callables = {}
+
+        if name not in callables or callables[name][0] is not sess:
+            if get_structure is not None:
+                for placeholders, values in get_structure():
+                    assert_same_structure(placeholders, values, check_types=True)
+
+            callables[name] = (sess, sess.make_callable(fetches, feed_list=get_feed_list()))
 
-        return sess.run(self.pc_target, feeder)[0,...,0]
+        return callables[name][1]
 
     @staticmethod
     def get_sample_config(*args, **kwargs):